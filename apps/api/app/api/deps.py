@@ -37,3 +37,13 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e),
         )
+
+
+async def get_optional_user(
+    authorization: Optional[str] = Header(default=None),
+) -> Optional[Dict[str, Any]]:
+    """Like get_current_user for routes that also serve anonymous callers: None instead of a 401."""
+    try:
+        return await get_current_user(authorization)
+    except HTTPException:
+        return None
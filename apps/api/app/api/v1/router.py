@@ -1,5 +1,12 @@
 from fastapi import APIRouter
-from app.api.v1.routes import auth
+from app.api.v1.routes import analytics, anomalies, auth, budgets, categories, expenses, ingestion, insights
 
 router = APIRouter()
 router.include_router(auth.router, prefix="/auth", tags=["auth"])
+router.include_router(categories.router, prefix="/categories", tags=["categories"])
+router.include_router(expenses.router, prefix="/expenses", tags=["expenses"])
+router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+router.include_router(budgets.router, prefix="/budgets", tags=["budgets"])
+router.include_router(anomalies.router, prefix="/anomalies", tags=["anomalies"])
+router.include_router(insights.router, prefix="/insights", tags=["insights"])
+router.include_router(ingestion.router, prefix="/ingestion", tags=["ingestion"])
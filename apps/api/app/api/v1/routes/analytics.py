@@ -0,0 +1,30 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_current_user
+from app.domain.value_objects.date_range import DateRange
+from app.schemas.analytics import SpendingSummary
+from app.services.analytics_service import AnalyticsService, get_analytics_service
+
+router = APIRouter()
+
+
+@router.get("/summary", response_model=SpendingSummary)
+async def spending_summary(
+    start: Optional[date] = Query(None, description="First day included; defaults to 11 months before the end month"),
+    end: Optional[date] = Query(None, description="Last day included; defaults to today"),
+    currency: str = Query("INR", min_length=3, max_length=3),
+    user=Depends(get_current_user),
+    service: AnalyticsService = Depends(get_analytics_service),
+):
+    """Totals by category, month and payment method over a date range, in one currency."""
+    end = end or date.today()
+    if start is None:
+        months = end.year * 12 + end.month - 1 - 11
+        start = date(months // 12, months % 12 + 1, 1)
+    try:
+        return service.summary(user["sub"], DateRange(start, end), currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
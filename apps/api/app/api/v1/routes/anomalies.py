@@ -0,0 +1,28 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import get_current_user
+from app.schemas.anomaly import Anomaly, BackfillResponse
+from app.services.anomalies_service import AnomaliesService, get_anomalies_service
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[Anomaly])
+async def list_anomalies(
+    limit: int = Query(50, ge=1, le=500),
+    user=Depends(get_current_user),
+    service: AnomaliesService = Depends(get_anomalies_service),
+):
+    """Expenses flagged as unusual when they were saved, newest first."""
+    return await service.list(user["sub"], limit)
+
+
+@router.post("/backfill", response_model=BackfillResponse)
+async def backfill_anomalies(
+    user=Depends(get_current_user),
+    service: AnomaliesService = Depends(get_anomalies_service),
+):
+    """Rebuilds the anomaly stats from all saved expenses and re-flags the history."""
+    return await service.backfill(user["sub"])
@@ -0,0 +1,45 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_current_user
+from app.domain.value_objects.date_range import DateRange
+from app.schemas.budget import Budget, BurndownReport, SetBudgetsRequest
+from app.services.budgets_service import BudgetsService, get_budgets_service
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[Budget])
+async def list_budgets(
+    user=Depends(get_current_user),
+    service: BudgetsService = Depends(get_budgets_service),
+):
+    return await service.list(user["sub"])
+
+
+@router.put("", response_model=List[Budget])
+async def set_budgets(
+    body: SetBudgetsRequest,
+    user=Depends(get_current_user),
+    service: BudgetsService = Depends(get_budgets_service),
+):
+    """Replaces the user's monthly budgets."""
+    return await service.replace(user["sub"], body.budgets)
+
+
+@router.get("/burndown", response_model=BurndownReport)
+async def budget_burndown(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM; defaults to the current month"),
+    as_of: Optional[date] = Query(None, alias="asOf", description="Defaults to today"),
+    user=Depends(get_current_user),
+    service: BudgetsService = Depends(get_budgets_service),
+):
+    """Spend against each budget day by day through the month, with a month-end projection."""
+    as_of = as_of or date.today()
+    try:
+        date_range = DateRange.parse_month(month) if month else DateRange.month(as_of.year, as_of.month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await service.burndown(user["sub"], date_range, as_of)
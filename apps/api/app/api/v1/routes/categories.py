@@ -0,0 +1,73 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.deps import get_current_user
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.pipelines.categorizer.pipeline import Categorizer, get_categorizer
+from app.schemas.category import (
+    ConfirmExpensesRequest,
+    ConfirmExpensesResponse,
+    MerchantCategory,
+    RecategorizeRequest,
+    RecategorizeResponse,
+)
+
+router = APIRouter()
+
+
+@router.post("/confirmations", response_model=ConfirmExpensesResponse)
+async def confirm_expenses(
+    body: ConfirmExpensesRequest,
+    user=Depends(get_current_user),
+    categorizer: Categorizer = Depends(get_categorizer),
+):
+    """
+    Teaches the categorizer from saved expenses: later parses from the same
+    merchant get the confirmed category instead of the model's guess.
+    Expenses without a merchant or title are skipped.
+    """
+    # Checked up front so a bad row does not leave the batch half learned
+    unknown = sorted({e.category for e in body.expenses} - set(ALLOWED_CATEGORIES))
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown categories: {', '.join(unknown)}. Allowed: {', '.join(ALLOWED_CATEGORIES)}.",
+        )
+
+    learned = 0
+    for expense in body.expenses:
+        key = categorizer.learn(user["sub"], expense.merchant or expense.title or "", expense.category)
+        learned += key is not None
+    return ConfirmExpensesResponse(learned=learned, skipped=len(body.expenses) - learned)
+
+
+@router.get("/merchants", response_model=List[MerchantCategory])
+async def list_merchant_categories(
+    user=Depends(get_current_user),
+    categorizer: Categorizer = Depends(get_categorizer),
+):
+    """The caller's learned merchants, least recently confirmed first."""
+    return [
+        MerchantCategory(merchant=merchant, category=category, confirmations=confirmations)
+        for merchant, category, confirmations in categorizer.merchants.entries(user["sub"])
+    ]
+
+
+@router.post("/recategorize", response_model=RecategorizeResponse)
+async def recategorize_expenses(
+    body: RecategorizeRequest,
+    user=Depends(get_current_user),
+    categorizer: Categorizer = Depends(get_categorizer),
+):
+    """
+    Categories for historical expenses, in request order, using the caller's
+    confirmed merchants and the current alias tables. Nothing is stored.
+    """
+    categories = categorizer.recategorize(
+        [e.merchant or e.title for e in body.expenses],
+        [e.category for e in body.expenses],
+        user_id=user["sub"],
+    ).tolist()
+    changed = sum(new != e.category for new, e in zip(categories, body.expenses))
+    return RecategorizeResponse(categories=categories, changed=changed)
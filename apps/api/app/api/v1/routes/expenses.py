@@ -0,0 +1,79 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.api.deps import get_current_user
+from app.domain.value_objects.date_range import DateRange
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+from app.schemas.common import Page
+from app.schemas.expense import Expense
+from app.services.expenses_service import ExpensesService, get_expenses_service
+
+router = APIRouter()
+
+
+@router.post("", response_model=Expense, status_code=status.HTTP_201_CREATED)
+async def create_expense(
+    body: ExpenseDetails,
+    user=Depends(get_current_user),
+    service: ExpensesService = Depends(get_expenses_service),
+):
+    """Saves an expense, e.g. a parse result the user reviewed. Without a date it is dated now."""
+    return await service.create(user["sub"], body)
+
+
+@router.get("", response_model=Page[Expense])
+async def search_expenses(
+    q: str = Query("", max_length=200, description="Words to find in the title, merchant or notes"),
+    category: Optional[List[str]] = Query(None, description="Repeat to allow several"),
+    start: Optional[date] = Query(None, description="First day included"),
+    end: Optional[date] = Query(None, description="Last day included"),
+    min_amount: Optional[float] = Query(None, alias="minAmount", ge=0),
+    max_amount: Optional[float] = Query(None, alias="maxAmount", ge=0),
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    cursor: Optional[str] = Query(None, description="nextCursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+    service: ExpensesService = Depends(get_expenses_service),
+):
+    """Searches and filters the user's expenses, newest first, a page at a time."""
+    date_range = None
+    if start or end:
+        try:
+            date_range = DateRange(start or date.min, end or date.max)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await service.search(
+        user["sub"], q, date_range=date_range, currency=currency, categories=category,
+        min_amount=min_amount, max_amount=max_amount, cursor=cursor, limit=limit,
+    )
+
+
+@router.get("/{expense_id}", response_model=Expense)
+async def get_expense(
+    expense_id: str,
+    user=Depends(get_current_user),
+    service: ExpensesService = Depends(get_expenses_service),
+):
+    return await service.get(user["sub"], expense_id)
+
+
+@router.put("/{expense_id}", response_model=Expense)
+async def update_expense(
+    expense_id: str,
+    body: ExpenseDetails,
+    user=Depends(get_current_user),
+    service: ExpensesService = Depends(get_expenses_service),
+):
+    return await service.update(user["sub"], expense_id, body)
+
+
+@router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_expense(
+    expense_id: str,
+    user=Depends(get_current_user),
+    service: ExpensesService = Depends(get_expenses_service),
+):
+    await service.delete(user["sub"], expense_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
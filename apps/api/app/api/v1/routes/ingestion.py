@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+
+from app.api.deps import get_current_user
+from app.modules.ai_expense_parser.uploads import (
+    AUDIO_MIME_TYPES,
+    IMAGE_MIME_TYPES,
+    MAX_AUDIO_BYTES,
+    MAX_IMAGE_BYTES,
+    read_upload,
+)
+from app.schemas.ingestion import IngestionJob, StatementImport, UploadedJobRequest, UploadTicket, UploadTicketRequest
+from app.services.ingestion_service import IngestionService, get_ingestion_service
+from app.services.statement_import_service import StatementImportService, get_statement_import_service
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=IngestionJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_ingestion_job(
+    file: UploadFile = File(...),
+    kind: Literal["image", "audio"] = Form("image"),
+    timezone: str = Form("UTC"),
+    now_iso: Optional[str] = Form(None),
+    user=Depends(get_current_user),
+    service: IngestionService = Depends(get_ingestion_service),
+):
+    """
+    Queues an upload for parsing and returns the job right away.
+    Poll GET /jobs/{jobId} or consume the ingestion-job-completed event for the result.
+    """
+    if kind == "image":
+        contents, mime_type = await read_upload(
+            file,
+            max_bytes=MAX_IMAGE_BYTES,
+            allowed_types=IMAGE_MIME_TYPES,
+            invalid_detail="File must be an image (jpeg, png, webp).",
+        )
+    else:
+        contents, mime_type = await read_upload(
+            file,
+            max_bytes=MAX_AUDIO_BYTES,
+            allowed_types=AUDIO_MIME_TYPES,
+            invalid_detail="File must be an audio recording (webm, mp4, ogg, wav, mp3).",
+        )
+
+    if not now_iso:
+        now_iso = datetime.now().isoformat()
+
+    return await service.submit(
+        user_id=user["sub"],
+        kind=kind,
+        file_bytes=contents,
+        mime_type=mime_type,
+        timezone=timezone,
+        now_iso=now_iso,
+    )
+
+
+@router.post("/uploads", response_model=UploadTicket, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    payload: UploadTicketRequest,
+    user=Depends(get_current_user),
+    service: IngestionService = Depends(get_ingestion_service),
+):
+    """
+    Signs a direct upload to object storage, so the file never passes through
+    the API. Send the file to the returned url (a form POST with `fields`, or
+    a PUT with `headers`), then queue it with POST /uploads/{uploadId}/jobs.
+    """
+    return service.create_upload(
+        user_id=user["sub"],
+        kind=payload.kind,
+        mime_type=payload.mimeType,
+        size_bytes=payload.sizeBytes,
+        method=payload.method,
+    )
+
+
+@router.post("/uploads/{upload_id}/jobs", response_model=IngestionJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_uploaded_job(
+    upload_id: str,
+    payload: UploadedJobRequest,
+    user=Depends(get_current_user),
+    service: IngestionService = Depends(get_ingestion_service),
+):
+    """Queues a file uploaded with a ticket from POST /uploads. Retrying returns the same job."""
+    return await service.submit_uploaded(
+        user_id=user["sub"],
+        upload_id=upload_id,
+        timezone=payload.timezone,
+        now_iso=payload.nowIso or datetime.now().isoformat(),
+    )
+
+
+@router.post("/statements", response_model=StatementImport, status_code=status.HTTP_201_CREATED)
+async def import_statement(
+    file: UploadFile = File(...),
+    currency: str = Form("INR", min_length=3, max_length=3, description="For rows without a currency column"),
+    user=Depends(get_current_user),
+    service: StatementImportService = Depends(get_statement_import_service),
+):
+    """
+    Imports a bank, card or UPI app statement export (CSV or .xlsx): every
+    debit row is saved as an expense. Rows are categorized from known
+    merchants and any category column first; only the rest go to the model.
+    """
+    return await service.import_upload(user["sub"], file, currency)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(
+    job_id: str,
+    user=Depends(get_current_user),
+    service: IngestionService = Depends(get_ingestion_service),
+):
+    job = await service.get_job(user["sub"], job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return job
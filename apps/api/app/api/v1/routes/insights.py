@@ -0,0 +1,44 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_current_user
+from app.domain.value_objects.date_range import epoch_month, month_label
+from app.schemas.insight import InsightsReport, MonthlyRollup
+from app.services.insights_service import InsightsService, get_insights_service
+
+router = APIRouter()
+
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+
+@router.get("", response_model=InsightsReport)
+async def get_insights(
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="YYYY-MM; defaults to the current month"),
+    currency: str = Query("INR", min_length=3, max_length=3),
+    user=Depends(get_current_user),
+    service: InsightsService = Depends(get_insights_service),
+):
+    """Short observations about a month's spending against the months before it."""
+    try:
+        return await service.insights(user["sub"], month or month_label(epoch_month(date.today())), currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/rollups", response_model=List[MonthlyRollup])
+async def get_rollups(
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First month; defaults to 11 months before the end"),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last month; defaults to the current month"),
+    currency: str = Query("INR", min_length=3, max_length=3),
+    user=Depends(get_current_user),
+    service: InsightsService = Depends(get_insights_service),
+):
+    """Monthly totals by category, read from the rollups kept up to date as expenses change."""
+    end = end or month_label(epoch_month(date.today()))
+    try:
+        start = start or month_label(epoch_month(f"{end}-01") - 11)
+        return await service.rollups(user["sub"], start, end, currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,257 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Literal, Optional, Tuple
+
+try:
+    import boto3
+    from botocore.config import Config
+except ImportError:  # only needed against real S3; local runs use InMemoryObjectStore
+    boto3 = None
+
+DEFAULT_PRESIGN_EXPIRES_SECONDS = 15 * 60
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+PresignMethod = Literal["POST", "PUT"]
+
+
+@dataclass
+class PresignedUpload:
+    """
+    A request the browser can send straight to storage. POST is a multipart
+    form with `fields` before the file and enforces the size and type in its
+    signed policy; PUT sends the raw body with `headers` and only pins the type.
+    """
+    method: PresignMethod
+    url: str
+    expires_in: int
+    fields: Dict[str, str] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class ObjectStore(ABC):
+    """Blob storage for uploads waiting to be processed."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Returns (data, content type), or None when the object does not exist."""
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def head(self, key: str) -> Optional[Tuple[int, str]]:
+        """Returns (size in bytes, content type) without reading the object, or None when it does not exist."""
+        ...
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Streams the object; raises FileNotFoundError when it does not exist."""
+        ...
+
+    @abstractmethod
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        method: PresignMethod = "POST",
+        expires_in: int = DEFAULT_PRESIGN_EXPIRES_SECONDS,
+    ) -> PresignedUpload:
+        """Signs a direct upload of at most `max_bytes` of `content_type` to `key`."""
+        ...
+
+
+class InMemoryObjectStore(ObjectStore):
+    """
+    Process-local store for tests and single-process runs. Its presigned
+    uploads use a memory:// URL nothing can send to; callers store the
+    object with put() in place of the browser.
+    """
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, str]] = {}
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        self._objects[key] = (data, content_type)
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        return self._objects.get(key)
+
+    async def delete(self, key: str) -> None:
+        self._objects.pop(key, None)
+
+    async def head(self, key: str) -> Optional[Tuple[int, str]]:
+        stored = self._objects.get(key)
+        return (len(stored[0]), stored[1]) if stored else None
+
+    async def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        stored = self._objects.get(key)
+        if stored is None:
+            raise FileNotFoundError(key)
+        data = stored[0]
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        method: PresignMethod = "POST",
+        expires_in: int = DEFAULT_PRESIGN_EXPIRES_SECONDS,
+    ) -> PresignedUpload:
+        if method == "PUT":
+            return PresignedUpload("PUT", f"memory://{key}", expires_in, headers={"Content-Type": content_type})
+        return PresignedUpload("POST", "memory://", expires_in, fields={"key": key, "Content-Type": content_type})
+
+
+_clients: Dict[Tuple[Any, ...], Any] = {}
+
+
+def get_s3_client(endpoint_url: Optional[str] = None, region_name: Optional[str] = None):
+    """
+    Shared boto3 S3 client per endpoint. boto3 clients are thread-safe, so
+    one client and its connection pool (S3_MAX_POOL_CONNECTIONS, sized for
+    the to_thread calls made at once) serve every store in the process.
+    """
+    if boto3 is None:
+        raise RuntimeError("boto3 is required for S3ObjectStore.")
+    key = (endpoint_url, region_name)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS)),
+                retries={"max_attempts": 3, "mode": "standard"},
+                # Path-style works with MinIO and moto as well as S3
+                s3={"addressing_style": "path" if endpoint_url else "auto"},
+            ),
+        )
+    return client
+
+
+class S3ObjectStore(ObjectStore):
+    """
+    boto3-backed store; network calls run on a worker thread. Presigning is
+    local computation. `presign_endpoint_url` is the address browsers use
+    when it differs from the API's, e.g. MinIO behind a container network.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        presign_endpoint_url: Optional[str] = None,
+    ):
+        self.bucket = bucket
+        self._s3 = get_s3_client(endpoint_url, region_name)
+        self._presigner = get_s3_client(presign_endpoint_url, region_name) if presign_endpoint_url else self._s3
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(
+            self._s3.put_object, Bucket=self.bucket, Key=key, Body=data, ContentType=content_type
+        )
+
+    def _get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        try:
+            obj = self._s3.get_object(Bucket=self.bucket, Key=key)
+        except self._s3.exceptions.NoSuchKey:
+            return None
+        return obj["Body"].read(), obj.get("ContentType", "application/octet-stream")
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._s3.delete_object, Bucket=self.bucket, Key=key)
+
+    def _head(self, key: str) -> Optional[Tuple[int, str]]:
+        try:
+            obj = self._s3.head_object(Bucket=self.bucket, Key=key)
+        except self._s3.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return obj["ContentLength"], obj.get("ContentType", "application/octet-stream")
+
+    async def head(self, key: str) -> Optional[Tuple[int, str]]:
+        return await asyncio.to_thread(self._head, key)
+
+    async def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        try:
+            obj = await asyncio.to_thread(self._s3.get_object, Bucket=self.bucket, Key=key)
+        except self._s3.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+        body = obj["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            # Stopping early (a rejected file) returns the connection instead of draining it
+            body.close()
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        method: PresignMethod = "POST",
+        expires_in: int = DEFAULT_PRESIGN_EXPIRES_SECONDS,
+    ) -> PresignedUpload:
+        if method == "PUT":
+            url = self._presigner.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+                ExpiresIn=expires_in,
+            )
+            return PresignedUpload("PUT", url, expires_in, headers={"Content-Type": content_type})
+
+        post = self._presigner.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=expires_in,
+        )
+        return PresignedUpload("POST", post["url"], expires_in, fields=post["fields"])
+
+
+_upload_store: Optional[ObjectStore] = None
+
+
+def get_upload_store() -> ObjectStore:
+    """
+    Process-wide upload store: S3 when UPLOADS_BUCKET is set (S3_ENDPOINT_URL
+    for a local stand-in, S3_PUBLIC_ENDPOINT_URL for the address browsers
+    upload to), otherwise in memory.
+    """
+    global _upload_store
+    if _upload_store is None:
+        bucket = os.getenv("UPLOADS_BUCKET")
+        if bucket:
+            _upload_store = S3ObjectStore(
+                bucket,
+                endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                region_name=os.getenv("AWS_REGION"),
+                presign_endpoint_url=os.getenv("S3_PUBLIC_ENDPOINT_URL"),
+            )
+        else:
+            _upload_store = InMemoryObjectStore()
+    return _upload_store
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import boto3
+except ImportError:  # only needed against real SQS / ElasticMQ; local runs use InMemoryQueue
+    boto3 = None
+
+# SQS caps a single ReceiveMessage at 10 messages and long polls at 20s
+MAX_BATCH_SIZE = 10
+MAX_WAIT_SECONDS = 20
+DEFAULT_VISIBILITY_TIMEOUT = 30
+
+
+@dataclass
+class QueueMessage:
+    message_id: str
+    receipt_handle: str
+    body: Dict[str, Any]
+    receive_count: int
+
+
+class QueueClient(ABC):
+    """
+    The subset of SQS the ingestion pipeline needs. Message bodies are JSON
+    objects; a received message stays invisible to other consumers until its
+    visibility timeout lapses or it is deleted.
+    """
+
+    @abstractmethod
+    async def send(self, body: Dict[str, Any]) -> str:
+        ...
+
+    @abstractmethod
+    async def receive(
+        self,
+        max_messages: int = MAX_BATCH_SIZE,
+        wait_seconds: float = MAX_WAIT_SECONDS,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    ) -> List[QueueMessage]:
+        ...
+
+    @abstractmethod
+    async def delete(self, receipt_handle: str) -> None:
+        ...
+
+    @abstractmethod
+    async def change_visibility(self, receipt_handle: str, visibility_timeout: float) -> None:
+        ...
+
+
+class InMemoryQueue(QueueClient):
+    """
+    Process-local queue with SQS semantics (long polling, visibility timeouts,
+    redelivery, receive counts) for tests, benchmarks and single-process dev.
+    """
+
+    def __init__(self):
+        self._ready: Deque[Tuple[str, Dict[str, Any], int]] = deque()
+        # receipt handle -> (message id, body, receive count, visible again at)
+        self._in_flight: Dict[str, Tuple[str, Dict[str, Any], int, float]] = {}
+        self._arrived: Optional[asyncio.Event] = None
+        self.sent = 0
+
+    def __len__(self) -> int:
+        return len(self._ready) + len(self._in_flight)
+
+    async def send(self, body: Dict[str, Any]) -> str:
+        message_id = str(uuid.uuid4())
+        # Round-trip through JSON like the real queue, so nothing unserializable slips through
+        self._ready.append((message_id, json.loads(json.dumps(body)), 0))
+        self.sent += 1
+        self._notify()
+        return message_id
+
+    async def receive(
+        self,
+        max_messages: int = MAX_BATCH_SIZE,
+        wait_seconds: float = MAX_WAIT_SECONDS,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    ) -> List[QueueMessage]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            self._requeue_expired()
+            if self._ready:
+                return self._take(min(max_messages, MAX_BATCH_SIZE), visibility_timeout)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            event = self._event()
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, self._next_expiry_in()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def delete(self, receipt_handle: str) -> None:
+        self._in_flight.pop(receipt_handle, None)
+
+    async def change_visibility(self, receipt_handle: str, visibility_timeout: float) -> None:
+        entry = self._in_flight.get(receipt_handle)
+        if entry is not None:
+            message_id, body, count, _ = entry
+            self._in_flight[receipt_handle] = (message_id, body, count, time.monotonic() + visibility_timeout)
+
+    def _take(self, n: int, visibility_timeout: float) -> List[QueueMessage]:
+        messages = []
+        visible_at = time.monotonic() + visibility_timeout
+        while self._ready and len(messages) < n:
+            message_id, body, count = self._ready.popleft()
+            handle = str(uuid.uuid4())
+            self._in_flight[handle] = (message_id, body, count + 1, visible_at)
+            messages.append(QueueMessage(message_id, handle, body, count + 1))
+        return messages
+
+    def _requeue_expired(self) -> None:
+        now = time.monotonic()
+        for handle, (message_id, body, count, visible_at) in list(self._in_flight.items()):
+            if visible_at <= now:
+                del self._in_flight[handle]
+                self._ready.append((message_id, body, count))
+
+    def _next_expiry_in(self) -> float:
+        if not self._in_flight:
+            return MAX_WAIT_SECONDS
+        return max(0.0, min(v[3] for v in self._in_flight.values()) - time.monotonic())
+
+    def _event(self) -> asyncio.Event:
+        if self._arrived is None:
+            self._arrived = asyncio.Event()
+        return self._arrived
+
+    def _notify(self) -> None:
+        if self._arrived is not None:
+            self._arrived.set()
+
+
+class SqsQueue(QueueClient):
+    """
+    boto3-backed queue. `endpoint_url` points it at ElasticMQ for local runs.
+    boto3 is synchronous, so every call runs on a worker thread.
+    """
+
+    def __init__(self, queue_url: str, endpoint_url: Optional[str] = None, region_name: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError("boto3 is required for SqsQueue.")
+        self.queue_url = queue_url
+        self._sqs = boto3.client("sqs", endpoint_url=endpoint_url, region_name=region_name)
+
+    async def send(self, body: Dict[str, Any]) -> str:
+        resp = await asyncio.to_thread(
+            self._sqs.send_message, QueueUrl=self.queue_url, MessageBody=json.dumps(body)
+        )
+        return resp["MessageId"]
+
+    async def receive(
+        self,
+        max_messages: int = MAX_BATCH_SIZE,
+        wait_seconds: float = MAX_WAIT_SECONDS,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    ) -> List[QueueMessage]:
+        resp = await asyncio.to_thread(
+            self._sqs.receive_message,
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, MAX_BATCH_SIZE),
+            WaitTimeSeconds=int(min(wait_seconds, MAX_WAIT_SECONDS)),
+            VisibilityTimeout=int(visibility_timeout),
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+        return [
+            QueueMessage(
+                message_id=m["MessageId"],
+                receipt_handle=m["ReceiptHandle"],
+                body=json.loads(m["Body"]),
+                receive_count=int(m.get("Attributes", {}).get("ApproximateReceiveCount", 1)),
+            )
+            for m in resp.get("Messages", [])
+        ]
+
+    async def delete(self, receipt_handle: str) -> None:
+        await asyncio.to_thread(self._sqs.delete_message, QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+
+    async def change_visibility(self, receipt_handle: str, visibility_timeout: float) -> None:
+        await asyncio.to_thread(
+            self._sqs.change_message_visibility,
+            QueueUrl=self.queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=int(visibility_timeout),
+        )
+
+
+_queues: Dict[str, QueueClient] = {}
+
+
+def get_queue(url_env: str) -> QueueClient:
+    """
+    Process-wide queue for the URL in env var `url_env`. Uses SqsQueue (with
+    SQS_ENDPOINT_URL for ElasticMQ) when the URL is set, else an InMemoryQueue.
+    """
+    queue = _queues.get(url_env)
+    if queue is None:
+        url = os.getenv(url_env)
+        if url:
+            queue = SqsQueue(url, endpoint_url=os.getenv("SQS_ENDPOINT_URL"), region_name=os.getenv("AWS_REGION"))
+        else:
+            queue = InMemoryQueue()
+        _queues[url_env] = queue
+    return queue
+
+
+def is_in_memory(queue: QueueClient) -> bool:
+    return isinstance(queue, InMemoryQueue)
@@ -0,0 +1,18 @@
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from starlette.responses import JSONResponse
+
+
+async def request_validation_error(request: Request, exc: RequestValidationError) -> JSONResponse:
+    """
+    FastAPI's 422 without the rejected inputs echoed back: a NaN or Infinity
+    amount would make the response body itself unencodable, turning the 422
+    into a 500.
+    """
+    errors = [{key: value for key, value in error.items() if key != "input"} for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+
+def add_exception_handlers(app):
+    app.add_exception_handler(RequestValidationError, request_validation_error)
@@ -0,0 +1,41 @@
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+DEFAULT_LOG_LEVEL = "INFO"
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_RESERVED = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger and message, plus any
+    fields passed with `extra=` and the traceback when one is attached.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = None) -> None:
+    """Routes the root logger to stdout as JSON lines at LOG_LEVEL (default INFO)."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level or os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL))
@@ -1,4 +1,13 @@
+from typing import Dict
+
+from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Room for multipart boundaries and the small form fields sent alongside a file
+MULTIPART_OVERHEAD_BYTES = 256 * 1024
+
 
 def add_cors(app):
     app.add_middleware(
@@ -8,3 +17,56 @@ def add_cors(app):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+
+def add_upload_limits(app, limits: Dict[str, int]):
+    app.add_middleware(UploadSizeLimitMiddleware, limits=limits)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized request bodies on upload routes before they are buffered.
+
+    `limits` maps a request path to the maximum file size it accepts. A declared
+    Content-Length over the limit is answered with 413 without reading the body;
+    bodies without one (chunked) are counted as they stream in and cut off with
+    413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = {path: size + MULTIPART_OVERHEAD_BYTES for path, size in limits.items()}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits[scope["path"]]
+        detail = f"File too large. Max {(limit - MULTIPART_OVERHEAD_BYTES) // (1024 * 1024)}MB."
+
+        content_length = _header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _header(scope: Scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
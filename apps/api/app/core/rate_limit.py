@@ -0,0 +1,320 @@
+import asyncio
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.security import CognitoAuthError, verify_cognito_access_token
+from app.core.telemetry import REGISTRY
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # only needed when buckets are shared across replicas
+    redis = None
+
+REJECTED = REGISTRY.counter("rate_limited_requests_total", "Requests answered 429, by limit.", ("limit",))
+
+DEFAULT_RATE_PER_MINUTE = 30.0
+DEFAULT_BURST = 10.0
+DEFAULT_MAX_KEYS = 100_000
+DEFAULT_MAX_CONCURRENT = 32
+DEFAULT_LATENCY_BUDGET_SECONDS = 10.0
+# Starting estimate of an AI request's duration, before any have finished
+DEFAULT_SERVICE_TIME_SECONDS = 3.0
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class RateLimitStore(ABC):
+    """
+    Token buckets keyed by caller. Each key holds up to `burst` tokens and
+    refills at `rate_per_second`; implementations must be safe to call
+    concurrently from the event loop.
+    """
+
+    def __init__(self, rate_per_second: float, burst: float):
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("rate_per_second must be positive and burst at least 1")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+
+    @abstractmethod
+    async def take(self, key: str, cost: float = 1.0) -> float:
+        """Spends `cost` tokens. Returns 0 when allowed, else seconds until the bucket can pay."""
+        ...
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process buckets, for a single replica. The least recently seen keys
+    are dropped past `max_keys`; a dropped key comes back with a full bucket,
+    which is what it would have refilled to anyway once idle long enough.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: float,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(rate_per_second, burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> [tokens, updated_at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, cost: float = 1.0) -> float:
+        now = self._clock()
+        cost = min(cost, self.burst)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / self.rate_per_second
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Refill and spend in one round trip, on the Redis clock so replicas agree
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every replica pointed at the same Redis."""
+
+    def __init__(self, url: str, rate_per_second: float, burst: float, prefix: str = "ratelimit:"):
+        if redis is None:
+            raise RuntimeError("redis is required for RedisRateLimitStore.")
+        super().__init__(rate_per_second, burst)
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TAKE)
+
+    async def take(self, key: str, cost: float = 1.0) -> float:
+        wait = await self._script(
+            keys=[self.prefix + key], args=[self.rate_per_second, self.burst, min(cost, self.burst)]
+        )
+        return float(wait)
+
+
+class AdmissionGate:
+    """
+    Global cap on concurrent AI requests with latency-based load shedding.
+
+    Requests beyond `max_concurrent` queue, but only while the expected wait
+    (queue depth over capacity, times a moving average of how long a request
+    holds its slot) fits inside `latency_budget`. Past that, or if a queued
+    request is still waiting when the budget runs out, the request is shed so
+    the client retries later instead of timing out in line.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        latency_budget: float = DEFAULT_LATENCY_BUDGET_SECONDS,
+        service_time: float = DEFAULT_SERVICE_TIME_SECONDS,
+    ):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.latency_budget = latency_budget
+        self.service_time = service_time
+        self.shed = 0
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_concurrent - self._sem._value
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def expected_wait(self) -> float:
+        return (self._waiting + 1) / self.max_concurrent * self.service_time
+
+    async def acquire(self) -> Optional[float]:
+        """Returns None once admitted (pair with release()), else a suggested Retry-After in seconds."""
+        if not self._sem.locked():
+            await self._sem.acquire()
+            return None
+
+        expected = self.expected_wait()
+        if expected > self.latency_budget:
+            self.shed += 1
+            return expected
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.latency_budget)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return self.expected_wait()
+        finally:
+            self._waiting -= 1
+        return None
+
+    def release(self, elapsed: float) -> None:
+        self.service_time += SERVICE_TIME_SMOOTHING * (elapsed - self.service_time)
+        self._sem.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "inFlight": self.in_flight,
+            "waiting": self._waiting,
+            "shed": self.shed,
+            "serviceTimeMs": round(self.service_time * 1000, 1),
+        }
+
+
+class RateLimitMiddleware:
+    """
+    Per-caller token buckets and admission control for expensive routes.
+
+    `costs` maps a request path to the tokens one request spends. Callers are
+    keyed by the Cognito `sub` when they send a valid bearer token (a claims
+    cache hit after their first request), otherwise by client address.
+    Paths in `admission_paths` additionally pass through the AdmissionGate.
+    Both limits answer 429 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        costs: Dict[str, float],
+        admission_paths: Iterable[str] = (),
+        store: Optional[RateLimitStore] = None,
+        gate: Optional[AdmissionGate] = None,
+    ):
+        self.app = app
+        self.costs = costs
+        self.admission_paths = frozenset(admission_paths)
+        self.store = store if store is not None else get_rate_limit_store()
+        self.gate = gate if gate is not None else get_admission_gate()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.costs:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.store.take(await caller_key(scope), self.costs[scope["path"]])
+        if retry_after:
+            REJECTED.inc("user")
+            await _too_many_requests(scope, receive, send, "Rate limit exceeded, please slow down.", retry_after)
+            return
+
+        if scope["path"] not in self.admission_paths:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.gate.acquire()
+        if retry_after is not None:
+            REJECTED.inc("admission")
+            await _too_many_requests(scope, receive, send, "AI parser is overloaded, please retry shortly.", retry_after)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.gate.release(time.perf_counter() - start)
+
+
+async def caller_key(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token.strip():
+                try:
+                    claims = await verify_cognito_access_token(token.strip())
+                except CognitoAuthError:
+                    break
+                if claims.get("sub"):
+                    return "sub:" + claims["sub"]
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+async def _too_many_requests(scope: Scope, receive: Receive, send: Send, detail: str, retry_after: float) -> None:
+    response = JSONResponse(
+        {"detail": detail}, status_code=429, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+    await response(scope, receive, send)
+
+
+def add_rate_limits(app, costs: Dict[str, float], admission_paths: Iterable[str] = ()):
+    app.add_middleware(RateLimitMiddleware, costs=costs, admission_paths=admission_paths)
+
+
+_store: Optional[RateLimitStore] = None
+_gate: Optional[AdmissionGate] = None
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    """
+    Process-wide bucket store configured from RATE_LIMIT_PER_MINUTE and
+    RATE_LIMIT_BURST; shared through Redis when RATE_LIMIT_REDIS_URL is set.
+    """
+    global _store
+    if _store is None:
+        rate = float(os.getenv("RATE_LIMIT_PER_MINUTE", DEFAULT_RATE_PER_MINUTE)) / 60
+        burst = float(os.getenv("RATE_LIMIT_BURST", DEFAULT_BURST))
+        url = os.getenv("RATE_LIMIT_REDIS_URL")
+        _store = RedisRateLimitStore(url, rate, burst) if url else InMemoryRateLimitStore(rate, burst)
+    return _store
+
+
+def get_admission_gate() -> AdmissionGate:
+    """Process-wide gate configured from AI_MAX_CONCURRENT_REQUESTS / AI_LATENCY_BUDGET_SECONDS."""
+    global _gate
+    if _gate is None:
+        _gate = AdmissionGate(
+            max_concurrent=int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", DEFAULT_MAX_CONCURRENT)),
+            latency_budget=float(os.getenv("AI_LATENCY_BUDGET_SECONDS", DEFAULT_LATENCY_BUDGET_SECONDS)),
+        )
+    return _gate
+
+
+REGISTRY.callback(
+    "ai_requests_in_flight", "gauge", "AI requests admitted by the admission gate.",
+    lambda: [({}, _gate.in_flight)] if _gate else [],
+)
+REGISTRY.callback(
+    "ai_requests_waiting", "gauge", "AI requests queued at the admission gate.",
+    lambda: [({}, _gate.waiting)] if _gate else [],
+)
@@ -1,49 +1,240 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 
 import httpx
-from jose import jwt
-from jose.exceptions import JWTError, ExpiredSignatureError
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWKError, JWTError, ExpiredSignatureError
 
 from app.core.config import settings
+from app.utils.hashing import sha256_hex
+
+logger = logging.getLogger(__name__)
 
 
 class CognitoAuthError(Exception):
     pass
 
 
-_JWKS_CACHE: Dict[str, Any] = {"keys": None, "expires_at": 0}
 _JWKS_TTL_SECONDS = 60 * 60  # 1 hour
+_JWKS_REFRESH_MARGIN_SECONDS = 5 * 60
+_JWKS_RETRY_SECONDS = 30
+_UNKNOWN_KID_REFETCH_INTERVAL_SECONDS = 30
+
+
+_CLAIMS_CACHE_MAX_ENTRIES = 10_000
+
+
+class VerifiedClaimsCache:
+    """
+    Bounded LRU of claims for tokens that already passed full verification.
+
+    Keyed by a SHA-256 digest of the token so raw bearer tokens are never held
+    as dict keys. Each entry lives until the token's own `exp`, so a cached
+    token is never accepted past the point jwt.decode would reject it.
+    """
+
+    def __init__(self, max_entries: int = _CLAIMS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            return None
+        self._entries.move_to_end(digest)
+        return claims
+
+    def put(self, digest: str, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        self._entries[digest] = (claims, float(exp))
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_CLAIMS_CACHE = VerifiedClaimsCache()
+
+
+def invalidate_claims_cache() -> None:
+    """
+    Drops every cached verification. Called when the JWKS key set changes so
+    tokens signed by a retired key are re-verified against the new keys.
+    """
+    _CLAIMS_CACHE.clear()
 
 
 def _jwks_url() -> str:
     return f"{settings.cognito_issuer}/.well-known/jwks.json"
 
 
-async def _get_jwks() -> Dict[str, Any]:
-    now = int(time.time())
-    if _JWKS_CACHE["keys"] and now < int(_JWKS_CACHE["expires_at"]):
-        return _JWKS_CACHE["keys"]
+class JwksKeyStore:
+    """
+    Cognito signing keys indexed by kid, held as constructed public-key objects
+    so a request does no JWK parsing or list scanning.
+
+    Refreshes are single-flight: concurrent callers await one shared fetch over
+    one pooled client. `start()` runs a background task that renews the set
+    `refresh_margin_seconds` before it expires, so requests do not wait on
+    Cognito. Refetches for an unknown kid run at most once per
+    `unknown_kid_interval_seconds`, so tokens with forged kids cannot turn
+    into a flood of JWKS fetches.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl_seconds: float = _JWKS_TTL_SECONDS,
+        refresh_margin_seconds: float = _JWKS_REFRESH_MARGIN_SECONDS,
+        retry_seconds: float = _JWKS_RETRY_SECONDS,
+        unknown_kid_interval_seconds: float = _UNKNOWN_KID_REFETCH_INTERVAL_SECONDS,
+    ):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self.unknown_kid_interval_seconds = unknown_kid_interval_seconds
+        self.fetches = 0
+        self._keys: Dict[str, Key] = {}
+        self._expires_at = 0.0
+        self._last_unknown_kid_refresh = float("-inf")
+        self._refreshing: Optional[asyncio.Task] = None
+        self._renewer: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def kids(self) -> FrozenSet[str]:
+        return frozenset(self._keys)
+
+    async def get_key(self, kid: str) -> Optional[Key]:
+        if self._expires_at <= time.monotonic():
+            try:
+                await self.refresh()
+            except CognitoAuthError:
+                # A stale key set beats failing every request while Cognito is unreachable
+                if not self._keys:
+                    raise
+
+        key = self._keys.get(kid)
+        if key is None and (self._refreshing is not None or self._unknown_kid_refetch_allowed()):
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self) -> None:
+        """Fetches the key set, joining a fetch that is already in flight."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            self._refreshing.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refreshing)
+
+    async def start(self) -> None:
+        if self._renewer is None:
+            self._renewer = asyncio.create_task(self._renew_loop())
+
+    async def stop(self) -> None:
+        if self._renewer is not None:
+            self._renewer.cancel()
+            try:
+                await self._renewer
+            except asyncio.CancelledError:
+                pass
+            self._renewer = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _unknown_kid_refetch_allowed(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_unknown_kid_refresh < self.unknown_kid_interval_seconds:
+            return False
+        self._last_unknown_kid_refresh = now
+        return True
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshing = None
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(self) -> None:
+        jwks = await self._fetch()
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.get(_jwks_url())
+        keys: Dict[str, Key] = {}
+        for k in jwks.get("keys", []):
+            kid = k.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwk.construct(k, k.get("alg", "RS256"))
+            except JWKError as e:
+                logger.warning("Skipping unusable JWKS key %s: %s", kid, e)
+
+        previous_kids = self.kids
+        self._keys = keys
+        self._expires_at = time.monotonic() + self.ttl_seconds
+        if previous_kids and previous_kids != self.kids:
+            invalidate_claims_cache()
+
+    async def _fetch(self) -> Dict[str, Any]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10)
+        self.fetches += 1
+        try:
+            resp = await self._client.get(self.url)
+        except httpx.HTTPError:
+            raise CognitoAuthError("Unable to fetch JWKS from Cognito.")
         if resp.status_code != 200:
             raise CognitoAuthError("Unable to fetch JWKS from Cognito.")
-        jwks = resp.json()
+        return resp.json()
+
+    async def _renew_loop(self) -> None:
+        while True:
+            delay = self._expires_at - self.refresh_margin_seconds - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("JWKS refresh failed: %s", e)
+                await asyncio.sleep(self.retry_seconds)
+
+
+_KEY_STORE: Optional[JwksKeyStore] = None
 
-    _JWKS_CACHE["keys"] = jwks
-    _JWKS_CACHE["expires_at"] = now + _JWKS_TTL_SECONDS
-    return jwks
 
+def get_jwks_key_store() -> JwksKeyStore:
+    global _KEY_STORE
+    if _KEY_STORE is None:
+        _KEY_STORE = JwksKeyStore(_jwks_url())
+    return _KEY_STORE
 
-def _pick_jwk(jwks: Dict[str, Any], kid: str) -> Optional[Dict[str, Any]]:
-    keys = jwks.get("keys", [])
-    for k in keys:
-        if k.get("kid") == kid:
-            return k
-    return None
+
+async def start_jwks_key_store() -> None:
+    await get_jwks_key_store().start()
+
+
+async def stop_jwks_key_store() -> None:
+    global _KEY_STORE
+    if _KEY_STORE is not None:
+        await _KEY_STORE.stop()
+        _KEY_STORE = None
 
 
 async def verify_cognito_access_token(token: str) -> Dict[str, Any]:
@@ -55,26 +246,29 @@ async def verify_cognito_access_token(token: str) -> Dict[str, Any]:
       - token_use == "access"
       - client_id matches app client
     Returns claims.
+
+    Successful verifications are cached until the token expires, so repeat
+    requests with the same token skip the RS256 signature check.
     """
+    digest = sha256_hex(token)
+    cached = _CLAIMS_CACHE.get(digest)
+    if cached is not None:
+        return cached
+
     try:
         header = jwt.get_unverified_header(token)
         kid = header.get("kid")
         if not kid:
             raise CognitoAuthError("Invalid token header (missing kid).")
 
-        jwks = await _get_jwks()
-        jwk = _pick_jwk(jwks, kid)
-        if not jwk:
-            # keys rotated -> refetch once
-            _JWKS_CACHE["keys"] = None
-            jwks = await _get_jwks()
-            jwk = _pick_jwk(jwks, kid)
-            if not jwk:
-                raise CognitoAuthError("Invalid token (unknown kid).")
+        # An unknown kid triggers a (rate-limited) refetch in case keys rotated
+        key = await get_jwks_key_store().get_key(kid)
+        if key is None:
+            raise CognitoAuthError("Invalid token (unknown kid).")
 
         claims = jwt.decode(
             token,
-            jwk,
+            key,
             algorithms=["RS256"],
             issuer=settings.cognito_issuer,
             options={
@@ -91,6 +285,7 @@ async def verify_cognito_access_token(token: str) -> Dict[str, Any]:
         if client_id != settings.cognito_client_id:
             raise CognitoAuthError("Token client_id mismatch.")
 
+        _CLAIMS_CACHE.put(digest, claims)
         return claims
 
     except ExpiredSignatureError:
@@ -0,0 +1,259 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.request")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1KB .. 64MB
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+TOKEN_BUCKETS = tuple(64 * 2 ** i for i in range(10))  # 64 .. 32768
+
+Labels = Tuple[str, ...]
+# (label values, value) pairs read from a live object at scrape time
+CallbackSamples = Iterable[Tuple[Dict[str, str], float]]
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram. observe() is a bisect and three additions,
+    so it is cheap enough to call on every stage of every request.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series.count if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _num(bound)
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series.count}")
+        return lines
+
+
+class CallbackMetric:
+    """A counter or gauge whose samples are read from an existing object when scraped."""
+
+    def __init__(self, name: str, kind: str, help: str, fn: Callable[[], CallbackSamples]):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.fn():
+            lines.append(f"{self.name}{_labels(tuple(labels), tuple(labels.values()))} {_num(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, kind: str, help: str, fn: Callable[[], CallbackSamples]) -> CallbackMetric:
+        return self._add(CallbackMetric(name, kind, help, fn))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to serve a request, including streamed bodies.", ("route", "status"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "expense_parse_stage_seconds", "Time spent in each stage of an expense parse.", ("stage",),
+)
+MODEL_SECONDS = REGISTRY.histogram(
+    "expense_parse_model_seconds", "Latency of individual model calls.", ("model", "outcome"),
+)
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "expense_parse_payload_bytes", "Size of uploads sent for parsing.", ("kind",), buckets=BYTES_BUCKETS,
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "expense_parse_prompt_tokens", "Input tokens per model call as reported by Gemini: all of them, and the share served from a cache.",
+    ("kind", "part"), buckets=TOKEN_BUCKETS,
+)
+CONFIDENCE = REGISTRY.histogram(
+    "expense_parse_confidence", "Confidence of parsed expenses.", ("source",), buckets=CONFIDENCE_BUCKETS,
+)
+
+# Stage name -> seconds for the current request; None outside a request
+_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_trace", default=None)
+
+
+class span:
+    """
+    Times a block as one parse stage: observed into STAGE_SECONDS and added to
+    the current request's trace, which is logged when the request finishes.
+    Concurrent work in one request (a batch) sums into the same stage.
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace[self.stage] = trace.get(self.stage, 0.0) + elapsed
+
+
+def route_template(scope: Scope) -> str:
+    """
+    The full path template of the route that served the request, e.g.
+    "/api/v1/expenses/{expense_id}". Routes of an included router carry only
+    their own part of the path, so the router's prefix is recovered as the
+    part of the request path in front of what the route matched.
+    """
+    route = scope.get("route")
+    regex = getattr(route, "path_regex", None)
+    if regex is None:
+        return "unmatched"
+    path = scope["path"]
+    for start in (i for i in range(len(path) + 1) if i == len(path) or path[i] == "/"):
+        if regex.match(path[start:]):
+            return path[:start] + route.path
+    return route.path
+
+
+class RequestTelemetryMiddleware:
+    """
+    Starts a trace for each HTTP request, records its duration by route and
+    status, and writes one structured log line with the per-stage timings.
+    """
+
+    def __init__(self, app: ASGIApp, skip_paths: Iterable[str] = ("/health", "/metrics")):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        trace: Dict[str, float] = {}
+        token = _trace.set(trace)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _trace.reset(token)
+            route_path = route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(elapsed, route_path, str(status))
+            logger.info("request", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_path,
+                "status": status,
+                "durationMs": round(elapsed * 1000, 2),
+                "stagesMs": {stage: round(seconds * 1000, 2) for stage, seconds in trace.items()},
+            })
+
+
+def add_request_telemetry(app):
+    app.add_middleware(RequestTelemetryMiddleware)
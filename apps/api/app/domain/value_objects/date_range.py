@@ -0,0 +1,100 @@
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Union
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+def to_date(value: Union[date, str]) -> date:
+    """A date from a date, datetime or ISO string ("2024-05-01", "2024-05-01T12:30:00Z")."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+
+
+def canonical_iso(value: str) -> str:
+    """
+    An ISO date or timestamp in extended form ("2024-05-01", "2024-05-01T12:30:00"),
+    whose first ten characters are the date. Compact and week forms that
+    fromisoformat also takes ("20240501", "2024-W18-3") are rewritten; strings
+    already in extended form come back as given.
+    """
+    day = to_date(value)
+    if value[:10] == day.isoformat():
+        return value
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+
+
+def epoch_day(value: Union[date, str]) -> int:
+    """Days since 1970-01-01, the date column's encoding."""
+    return to_date(value).toordinal() - _EPOCH_ORDINAL
+
+
+def from_epoch_day(day: int) -> date:
+    return date.fromordinal(int(day) + _EPOCH_ORDINAL)
+
+
+def epoch_month(value: Union[date, str]) -> int:
+    """Months since 1970-01, matching months_of(epoch days)."""
+    d = to_date(value)
+    return (d.year - 1970) * 12 + d.month - 1
+
+
+def months_of(days: np.ndarray) -> np.ndarray:
+    """Vectorized epoch_month over an array of epoch days."""
+    return np.asarray(days).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def month_label(month: int) -> str:
+    """"2024-05" for an epoch month."""
+    year, month0 = divmod(int(month), 12)
+    return f"{1970 + year:04d}-{month0 + 1:02d}"
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """Closed range of calendar days, start and end included."""
+    start: date
+    end: date
+
+    def __post_init__(self):
+        if self.end < self.start:
+            raise ValueError(f"range ends ({self.end}) before it starts ({self.start})")
+
+    @classmethod
+    def month(cls, year: int, month: int) -> "DateRange":
+        return cls(date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))
+
+    @classmethod
+    def parse_month(cls, label: str) -> "DateRange":
+        """From "2024-05"."""
+        year, month = label.split("-")
+        return cls.month(int(year), int(month))
+
+    @property
+    def start_day(self) -> int:
+        return epoch_day(self.start)
+
+    @property
+    def end_day(self) -> int:
+        return epoch_day(self.end)
+
+    @property
+    def days(self) -> int:
+        return self.end_day - self.start_day + 1
+
+    def __contains__(self, value: Union[date, str]) -> bool:
+        return self.start <= to_date(value) <= self.end
+
+    def mask(self, days: np.ndarray) -> np.ndarray:
+        """Which epoch days in `days` fall in the range."""
+        return (days >= self.start_day) & (days <= self.end_day)
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CURRENCY = "INR"
+# The ISO 4217 codes of circulating currencies; expenses in any other are rejected
+ISO_CURRENCIES: Tuple[str, ...] = (
+    "AED", "AFN", "ALL", "AMD", "ANG", "AOA", "ARS", "AUD", "AWG", "AZN", "BAM", "BBD", "BDT", "BGN", "BHD", "BIF",
+    "BMD", "BND", "BOB", "BRL", "BSD", "BTN", "BWP", "BYN", "BZD", "CAD", "CDF", "CHF", "CLP", "CNY", "COP", "CRC",
+    "CUP", "CVE", "CZK", "DJF", "DKK", "DOP", "DZD", "EGP", "ERN", "ETB", "EUR", "FJD", "FKP", "GBP", "GEL", "GHS",
+    "GIP", "GMD", "GNF", "GTQ", "GYD", "HKD", "HNL", "HTG", "HUF", "IDR", "ILS", "INR", "IQD", "IRR", "ISK", "JMD",
+    "JOD", "JPY", "KES", "KGS", "KHR", "KMF", "KPW", "KRW", "KWD", "KYD", "KZT", "LAK", "LBP", "LKR", "LRD", "LSL",
+    "LYD", "MAD", "MDL", "MGA", "MKD", "MMK", "MNT", "MOP", "MRU", "MUR", "MVR", "MWK", "MXN", "MYR", "MZN", "NAD",
+    "NGN", "NIO", "NOK", "NPR", "NZD", "OMR", "PAB", "PEN", "PGK", "PHP", "PKR", "PLN", "PYG", "QAR", "RON", "RSD",
+    "RUB", "RWF", "SAR", "SBD", "SCR", "SDG", "SEK", "SGD", "SHP", "SLE", "SOS", "SRD", "SSP", "STN", "SVC", "SYP",
+    "SZL", "THB", "TJS", "TMT", "TND", "TOP", "TRY", "TTD", "TWD", "TZS", "UAH", "UGX", "USD", "UYU", "UZS", "VES",
+    "VND", "VUV", "WST", "XAF", "XCD", "XOF", "XPF", "YER", "ZAR", "ZMW", "ZWL",
+)
+_ISO_CURRENCY_SET = frozenset(ISO_CURRENCIES)
+# Largest amount accepted, in major units: far inside int64 minor units at any
+# exponent, with room for a user's totals
+MAX_AMOUNT = 1e12
+# ISO 4217 minor-unit exponents that differ from the usual 2
+_EXPONENTS = {"JPY": 0, "KRW": 0, "VND": 0, "CLP": 0, "ISK": 0, "BHD": 3, "KWD": 3, "OMR": 3, "JOD": 3, "TND": 3}
+
+
+def minor_exponent(currency: str) -> int:
+    return _EXPONENTS.get(currency.upper(), 2)
+
+
+def is_currency(code: str) -> bool:
+    """Whether `code` is a known ISO 4217 code, written as one (three capital letters)."""
+    return code in _ISO_CURRENCY_SET
+
+
+@dataclass(frozen=True)
+class Money:
+    """
+    An amount in integer minor units (paise for INR), so sums are exact and
+    columns of amounts fit in int64 arrays.
+    """
+    minor: int
+    currency: str = DEFAULT_CURRENCY
+
+    @classmethod
+    def of(cls, amount: Union[int, float, str, Decimal], currency: str = DEFAULT_CURRENCY) -> "Money":
+        """From a major-unit amount, rounding half away from zero: 10.005 -> 1001 paise."""
+        scale = Decimal(10) ** minor_exponent(currency)
+        minor = (Decimal(str(amount)) * scale).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return cls(int(minor), currency.upper())
+
+    @property
+    def amount(self) -> float:
+        """Major units, as the API and ExpenseDetails carry them."""
+        return self.minor / 10 ** minor_exponent(self.currency)
+
+    def _check(self, other: "Money") -> None:
+        if other.currency != self.currency:
+            raise ValueError(f"cannot combine {self.currency} and {other.currency}")
+
+    def __add__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.minor + other.minor, self.currency)
+
+    def __sub__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.minor - other.minor, self.currency)
+
+    def __neg__(self) -> "Money":
+        return Money(-self.minor, self.currency)
+
+
+def to_minor(amounts, currency: str = DEFAULT_CURRENCY) -> np.ndarray:
+    """Vectorized Money.of for float amounts; rounds to the nearest minor unit."""
+    scale = 10 ** minor_exponent(currency)
+    return np.rint(np.asarray(amounts, dtype=np.float64) * scale).astype(np.int64)
+
+
+def to_minor_each(amounts: Sequence[float], currencies: Sequence[str]) -> np.ndarray:
+    """to_minor where every amount has its own currency."""
+    scales = np.array([10 ** minor_exponent(c) for c in currencies], dtype=np.float64)
+    return np.rint(np.asarray(amounts, dtype=np.float64) * scales).astype(np.int64)
+
+
+def to_major(minor, currency: str = DEFAULT_CURRENCY) -> np.ndarray:
+    return np.asarray(minor, dtype=np.int64) / 10 ** minor_exponent(currency)
@@ -1,19 +1,85 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.api.v1.router import router as v1_router
 from app.modules.ai_expense_parser.router import router as ai_router
-from app.core.middleware import add_cors
+from app.modules.ai_expense_parser.service import start_parser_service, stop_parser_service
+from app.modules.ai_expense_parser.uploads import MAX_AUDIO_BYTES, MAX_BATCH_BYTES, MAX_IMAGE_BYTES, MAX_STATEMENT_BYTES
+from app.core.exceptions import add_exception_handlers
+from app.core.logging import configure_logging
+from app.core.middleware import add_cors, add_upload_limits
+from app.core.rate_limit import add_rate_limits
+from app.core.security import start_jwks_key_store, stop_jwks_key_store
+from app.core.telemetry import REGISTRY, add_request_telemetry
+from app.workers.run_worker import start_embedded_worker, stop_embedded_worker
+from app.workers.scheduler import start_scheduler, stop_scheduler
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_jwks_key_store()
+    await start_parser_service()
+    await start_embedded_worker()
+    await start_scheduler()
+    yield
+    await stop_scheduler()
+    await stop_embedded_worker()
+    await stop_parser_service()
+    await stop_jwks_key_store()
 
-app = FastAPI(title="SpendSenseAI API")
 
+app = FastAPI(title="SpendSenseAI API", lifespan=lifespan)
+add_exception_handlers(app)
+
+AI_ROUTES = {
+    "/api/ai/expense/parse-image": 1,
+    "/api/ai/expense/parse-audio": 1,
+    # One batch fans out to as many as MAX_BATCH_FILES model calls
+    "/api/ai/expense/parse-image/batch": 10,
+    "/api/ai/expense/parse-image/stream": 1,
+    "/api/ai/expense/parse-audio/stream": 1,
+}
+
+# Added before CORS so 429s and 413s still carry CORS headers
+add_rate_limits(
+    app,
+    {
+        **AI_ROUTES,
+        "/api/v1/ingestion/jobs": 1,
+        "/api/v1/ingestion/uploads": 1,
+        # One import sends up to 20 categorization prompts; a full burst, like a batch
+        "/api/v1/ingestion/statements": 10,
+    },
+    admission_paths=AI_ROUTES,
+)
+add_upload_limits(app, {
+    "/api/ai/expense/parse-image": MAX_IMAGE_BYTES,
+    "/api/ai/expense/parse-audio": MAX_AUDIO_BYTES,
+    "/api/ai/expense/parse-image/batch": MAX_BATCH_BYTES,
+    "/api/ai/expense/parse-image/stream": MAX_IMAGE_BYTES,
+    "/api/ai/expense/parse-audio/stream": MAX_AUDIO_BYTES,
+    "/api/v1/ingestion/jobs": max(MAX_IMAGE_BYTES, MAX_AUDIO_BYTES),
+    "/api/v1/ingestion/statements": MAX_STATEMENT_BYTES,
+})
 add_cors(app)
+# Outermost, so rejected and oversized requests are timed and logged too
+add_request_telemetry(app)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(v1_router, prefix="/api/v1")
 app.include_router(ai_router, prefix="/api/ai/expense", tags=["AI Expense Parser"])
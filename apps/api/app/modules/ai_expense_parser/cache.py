@@ -0,0 +1,159 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.telemetry import REGISTRY
+from app.repos.idempotency_repo import IdempotencyRepo, SqliteIdempotencyRepo
+from app.utils.hashing import content_key
+from .normalizer import normalize_date
+from .prompts import PROMPT_VERSION
+from .schemas import ExpenseAIResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# (result, raw model date, expires_at)
+_Entry = Tuple[ExpenseAIResult, Optional[str], float]
+
+
+def with_request_date(result: ExpenseAIResult, raw_date: Optional[str], now_iso: str) -> ExpenseAIResult:
+    """Re-applies date normalization for a result produced for another request."""
+    expense = result.expense.model_copy(update={"date": normalize_date(raw_date, now_iso)})
+    return result.model_copy(update={"expense": expense})
+
+
+class ParseResultCache:
+    """
+    Content-addressed cache of parse results.
+
+    Keys cover the file bytes, mime type, prompt version and model, so a prompt
+    or model change never serves stale extractions. The in-memory tier is an
+    LRU bounded by `max_entries` with a TTL; an optional IdempotencyRepo acts
+    as the persistent tier shared across restarts and replicas.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        store: Optional[IdempotencyRepo] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        # Wall clock, since expiries are stored for other processes to read
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def key_for(kind: str, file_bytes: bytes, mime_type: str, model: str) -> str:
+        return content_key(file_bytes, kind, mime_type, PROMPT_VERSION, model)
+
+    async def get(self, key: str, now_iso: str) -> Optional[ExpenseAIResult]:
+        """
+        Returns the cached result with its date re-normalized against `now_iso`,
+        so a receipt without a printed date gets the current upload time.
+        """
+        entry = self._get_memory(key)
+        if entry is None and self.store is not None:
+            entry = await self._get_persistent(key)
+            if entry is not None:
+                self._set_memory(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result, raw_date, _ = entry
+        return with_request_date(result, raw_date, now_iso)
+
+    async def put(self, key: str, result: ExpenseAIResult, raw_date: Optional[str]) -> None:
+        expires_at = self.clock() + self.ttl_seconds
+        self._set_memory(key, (result, raw_date, expires_at))
+        if self.store is not None:
+            try:
+                await self.store.put(
+                    key,
+                    {"result": result.model_dump(), "rawDate": raw_date, "expiresAt": expires_at},
+                    self.ttl_seconds,
+                )
+            except Exception as e:
+                logger.warning("Parse cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+        }
+
+    def _get_memory(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_memory(self, key: str, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_persistent(self, key: str) -> Optional[_Entry]:
+        try:
+            doc = await self.store.get(key)
+        except Exception as e:
+            logger.warning("Parse cache read failed: %s", e)
+            return None
+        if not doc:
+            return None
+        # Promoted entries keep the expiry they were written with, not a fresh TTL
+        expires_at = doc.get("expiresAt") or self.clock() + self.ttl_seconds
+        if expires_at <= self.clock():
+            return None
+        result = ExpenseAIResult.model_validate(doc["result"])
+        return result, doc.get("rawDate"), expires_at
+
+
+_cache: Optional[ParseResultCache] = None
+
+
+def get_parse_cache() -> ParseResultCache:
+    """
+    Process-wide cache configured from PARSE_CACHE_MAX_ENTRIES, PARSE_CACHE_TTL_SECONDS
+    and, for the persistent tier, PARSE_CACHE_SQLITE_PATH.
+    """
+    global _cache
+    if _cache is None:
+        sqlite_path = os.getenv("PARSE_CACHE_SQLITE_PATH")
+        _cache = ParseResultCache(
+            max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("PARSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            store=SqliteIdempotencyRepo(sqlite_path) if sqlite_path else None,
+        )
+    return _cache
+
+
+REGISTRY.callback(
+    "expense_parse_cache_lookups_total", "counter", "Parse cache lookups by result.",
+    lambda: [({"result": "hit"}, _cache.hits), ({"result": "miss"}, _cache.misses)] if _cache else [],
+)
+REGISTRY.callback(
+    "expense_parse_cache_entries", "gauge", "Results held in the in-memory parse cache.",
+    lambda: [({}, len(_cache._entries))] if _cache else [],
+)
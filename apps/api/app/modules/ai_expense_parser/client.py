@@ -0,0 +1,83 @@
+import logging
+import os
+from typing import Optional
+
+import httpx
+from google import genai
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive pool for the Gemini endpoint. Every parse goes to the same host,
+# so a handful of warm connections covers the in-flight limit without
+# re-doing the TCP + TLS handshake on each request.
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE = 16
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 120.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_READ_TIMEOUT_SECONDS = 120.0
+
+_client: Optional[genai.Client] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def build_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(os.getenv("GEMINI_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+        keepalive_expiry=float(os.getenv("GEMINI_HTTP_KEEPALIVE_EXPIRY_SECONDS", DEFAULT_KEEPALIVE_EXPIRY_SECONDS)),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("GEMINI_HTTP_READ_TIMEOUT_SECONDS", DEFAULT_READ_TIMEOUT_SECONDS)),
+        connect=DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def build_gemini_client(api_key: str, http_client: httpx.AsyncClient, base_url: Optional[str] = None) -> genai.Client:
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            base_url=base_url,
+            httpx_async_client=http_client,
+        ),
+    )
+
+
+def get_gemini_client() -> Optional[genai.Client]:
+    """
+    Returns the process-wide Gemini client, building it on first use.
+    Returns None when GEMINI_API_KEY is not configured.
+    """
+    global _client, _http_client
+    if _client is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+        _http_client = build_http_client()
+        _client = build_gemini_client(api_key, _http_client, base_url=os.getenv("GEMINI_BASE_URL"))
+    return _client
+
+
+async def start_gemini_client(warmup_model: Optional[str] = None) -> None:
+    """
+    App startup hook: builds the shared client and opens a pooled connection
+    with a cheap model lookup so the first parse does not pay for the handshake.
+    A failed warm-up is not fatal; the pool simply connects on first use.
+    """
+    client = get_gemini_client()
+    if client is None or not warmup_model:
+        return
+    try:
+        await client.aio.models.get(model=warmup_model)
+    except Exception as e:
+        logger.warning("Gemini warm-up failed: %s", e)
+
+
+async def stop_gemini_client() -> None:
+    """App shutdown hook: closes pooled connections and drops the singleton."""
+    global _client, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _client = None
+    _http_client = None
@@ -0,0 +1,83 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+
+from app.core.telemetry import REGISTRY
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10.0
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+class InFlightLimiter:
+    """
+    Caps the number of concurrent model calls made by this process.
+    Callers beyond the limit wait in line for up to `queue_timeout` seconds,
+    after which they are rejected with a 503 so the client can retry.
+    """
+
+    def __init__(self, max_in_flight: int, queue_timeout: float):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._sem = asyncio.Semaphore(max_in_flight)
+        self._waiting = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_in_flight - self._sem._value
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="AI parser is busy, please retry shortly.",
+            )
+        finally:
+            self._waiting -= 1
+
+        try:
+            yield
+        finally:
+            self._sem.release()
+
+
+_limiter: Optional[InFlightLimiter] = None
+
+
+def get_in_flight_limiter() -> InFlightLimiter:
+    """Process-wide limiter configured from GEMINI_MAX_IN_FLIGHT / GEMINI_QUEUE_TIMEOUT_SECONDS."""
+    global _limiter
+    if _limiter is None:
+        _limiter = InFlightLimiter(
+            max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+            queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", DEFAULT_QUEUE_TIMEOUT_SECONDS)),
+        )
+    return _limiter
+
+
+def get_batch_concurrency() -> int:
+    """Model calls one batch request may have in flight (GEMINI_BATCH_CONCURRENCY)."""
+    return int(os.getenv("GEMINI_BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+
+
+REGISTRY.callback(
+    "gemini_calls_in_flight", "gauge", "Model calls currently holding a limiter slot.",
+    lambda: [({}, _limiter.in_flight)] if _limiter else [],
+)
+REGISTRY.callback(
+    "gemini_calls_waiting", "gauge", "Model calls queued for a limiter slot.",
+    lambda: [({}, _limiter.waiting)] if _limiter else [],
+)
@@ -1,6 +1,6 @@
 import json
 import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 def extract_json(text: str) -> Optional[Dict[str, Any]]:
     """
@@ -30,3 +30,98 @@ def extract_json(text: str) -> Optional[Dict[str, Any]]:
             pass
             
     return None
+
+
+class IncrementalJsonExtractor:
+    """
+    Pulls top-level fields out of a JSON object as the model streams it.
+
+    Text before the first `{` (prose, a ```json fence) is skipped. Each call to
+    `feed` returns the (key, value) pairs whose values were completed by that
+    chunk, so callers can act on a field without waiting for the whole object.
+    Values that fail to parse are dropped; `value()` returns everything seen.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._fields: Dict[str, Any] = {}
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        emitted: List[Tuple[str, Any]] = []
+        if self.complete or not chunk:
+            return emitted
+        self._buf += chunk
+
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None and self._key_start is not None:
+                        self._key = self._loads(buf[self._key_start:i + 1])
+                continue
+
+            if self._depth == 0:
+                # Still looking for the object; everything else is fence or prose
+                if c == "{":
+                    self._depth = 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    self._finish_value(buf, i, emitted)
+                    self.complete = True
+                    self._pos = i + 1
+                    return emitted
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ":" and self._key is not None and self._value_start is None:
+                    self._value_start = i + 1
+                elif c == ",":
+                    self._finish_value(buf, i, emitted)
+
+        self._pos = len(buf)
+        return emitted
+
+    def value(self) -> Dict[str, Any]:
+        return dict(self._fields)
+
+    def _finish_value(self, buf: str, end: int, emitted: List[Tuple[str, Any]]) -> None:
+        if self._key is not None and self._value_start is not None:
+            raw = buf[self._value_start:end].strip()
+            try:
+                value = json.loads(raw)
+            except json.JSONDecodeError:
+                pass
+            else:
+                self._fields[self._key] = value
+                emitted.append((self._key, value))
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    @staticmethod
+    def _loads(raw: str) -> Optional[str]:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
@@ -1,6 +1,8 @@
+import math
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from .prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+from app.pipelines.categorizer.rules import match_category, match_payment_method
 
 def normalize_amount(amount: Any) -> float:
     if isinstance(amount, (int, float)):
@@ -14,6 +16,11 @@ def normalize_amount(amount: Any) -> float:
             return 0.0
     return 0.0
 
+def normalize_parsed_amount(amount: Any) -> float:
+    """normalize_amount for a model's answer; NaN and infinity count as no amount, as ExpenseDetails refuses them."""
+    value = normalize_amount(amount)
+    return value if math.isfinite(value) else 0.0
+
 def normalize_date(date_str: Optional[str], default_iso: str) -> str:
     if not date_str:
         return default_iso
@@ -27,21 +34,11 @@ def normalize_date(date_str: Optional[str], default_iso: str) -> str:
         return default_iso
 
 def normalize_category(category: str) -> str:
-    if category in ALLOWED_CATEGORIES:
-        return category
-    # Simple fuzzy matching or fallback
-    for allowed in ALLOWED_CATEGORIES:
-        if category.lower() in allowed.lower() or allowed.lower() in category.lower():
-            return allowed
-    return "Misc"
+    # Alias tables and memoized lookups live in the categorizer pipeline
+    return match_category(category)
 
 def normalize_payment_method(method: str) -> str:
-    if method in ALLOWED_PAYMENT_METHODS:
-        return method
-    for allowed in ALLOWED_PAYMENT_METHODS:
-        if allowed.lower() in method.lower():
-            return allowed
-    return "Cash"
+    return match_payment_method(method)
 
 def compute_confidence(data: Dict[str, Any]) -> float:
     score = 0.0
@@ -56,3 +53,15 @@ def compute_confidence(data: Dict[str, Any]) -> float:
     if data.get("category") in ALLOWED_CATEGORIES:
         score += 0.15
     return min(score, 1.0)
+
+def normalize_field(name: str, value: Any, now_iso: str) -> Any:
+    """Normalizes a single ExpenseDetails field, for results assembled field by field."""
+    if name == "amount":
+        return normalize_parsed_amount(value)
+    if name == "date":
+        return normalize_date(value if isinstance(value, str) else None, now_iso)
+    if name == "category":
+        return normalize_category(value if isinstance(value, str) else "")
+    if name == "paymentMethod":
+        return normalize_payment_method(value if isinstance(value, str) else "")
+    return value
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from google import genai
+from google.genai import errors, types
+
+from app.core.telemetry import REGISTRY
+from .client import get_gemini_client
+from .prompts import PROMPT_VERSION, SYSTEM_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_RETRY_SECONDS = 600.0
+# Replace a cache once this share of its TTL has passed, before Gemini drops it
+REFRESH_FRACTION = 0.9
+
+# (model, prompt kind)
+_Key = Tuple[str, str]
+# Gemini answers a request naming an expired or deleted cache with one of these
+LOST_CACHE_STATUSES = frozenset({403, 404})
+
+
+def is_lost_cache(error: errors.ClientError) -> bool:
+    """Whether Gemini rejected a call because its cachedContent no longer exists."""
+    return error.code in LOST_CACHE_STATUSES or "cache" in (error.message or "").lower()
+
+
+class SystemPromptCache:
+    """
+    Serves each static system prompt from Gemini context caching, so the
+    instruction block is stored once per model and not re-sent, re-tokenized
+    and billed at the full input rate on every call.
+
+    `config_for` never waits: until a cache exists, and whenever one cannot
+    be made, calls carry the prompt as a plain system instruction, the same
+    text at the same position, which keeps it eligible for implicit prefix
+    caching. Caches are created in the background; a failed attempt (e.g.
+    the prompt is under the model's minimum cacheable size) is retried after
+    `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        client: Optional[genai.Client],
+        prompts: Mapping[str, str] = SYSTEM_PROMPTS,
+        enabled: bool = True,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.prompts = dict(prompts)
+        self.enabled = enabled and client is not None
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.failures = 0
+        self._inline = {kind: types.GenerateContentConfig(system_instruction=text) for kind, text in self.prompts.items()}
+        # key -> (config naming the cache, refresh at)
+        self._cached: Dict[_Key, Tuple[types.GenerateContentConfig, float]] = {}
+        self._retry_at: Dict[_Key, float] = {}
+        self._creating: Dict[_Key, asyncio.Task] = {}
+
+    def config_for(self, model: str, kind: str) -> types.GenerateContentConfig:
+        key = (model, kind)
+        entry = self._cached.get(key)
+        if entry is not None and self.clock() < entry[1]:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        if self.enabled:
+            self._schedule(key)
+        return self._inline[kind]
+
+    def invalidate(self, model: str, kind: str) -> None:
+        """Drops a cache Gemini no longer recognizes; the next call starts a new one."""
+        self._cached.pop((model, kind), None)
+
+    def _schedule(self, key: _Key) -> None:
+        if key in self._creating or self.clock() < self._retry_at.get(key, 0.0):
+            return
+        task = asyncio.get_running_loop().create_task(self._create(key))
+        self._creating[key] = task
+        task.add_done_callback(lambda _: self._creating.pop(key, None))
+
+    async def _create(self, key: _Key) -> None:
+        model, kind = key
+        try:
+            cached = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=self.prompts[kind],
+                    ttl=f"{int(self.ttl_seconds)}s",
+                    display_name=f"expense-parser-{kind}-v{PROMPT_VERSION}",
+                ),
+            )
+            if not cached.name:
+                raise ValueError("no cache name in the response")
+        except Exception as e:
+            self.failures += 1
+            self._retry_at[key] = self.clock() + self.retry_seconds
+            logger.info("Context cache unavailable for %s %s prompt, sending it inline: %s", model, kind, e)
+            return
+        self.created += 1
+        self._cached[key] = (
+            types.GenerateContentConfig(cached_content=cached.name),
+            self.clock() + self.ttl_seconds * REFRESH_FRACTION,
+        )
+
+    async def close(self) -> None:
+        for task in list(self._creating.values()):
+            task.cancel()
+        await asyncio.gather(*self._creating.values(), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "failures": self.failures,
+            "cached": sorted(f"{model}/{kind}" for model, kind in self._cached),
+        }
+
+
+_prompt_cache: Optional[SystemPromptCache] = None
+
+
+def get_prompt_cache() -> SystemPromptCache:
+    """
+    Process-wide prompt cache on the shared Gemini client. Context caching is
+    on unless GEMINI_CONTEXT_CACHE_ENABLED is "0"; GEMINI_CONTEXT_CACHE_TTL_SECONDS
+    sets how long each cache lives.
+    """
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = SystemPromptCache(
+            get_gemini_client(),
+            enabled=os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "1") != "0",
+            ttl_seconds=float(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+    return _prompt_cache
+
+
+async def stop_prompt_cache() -> None:
+    global _prompt_cache
+    if _prompt_cache is not None:
+        await _prompt_cache.close()
+    _prompt_cache = None
+
+
+def _lookup_samples():
+    if _prompt_cache is None:
+        return []
+    return [({"outcome": "hit"}, _prompt_cache.hits), ({"outcome": "miss"}, _prompt_cache.misses)]
+
+
+REGISTRY.callback(
+    "gemini_context_cache_lookups_total", "counter",
+    "Model calls that referenced a context-cached system prompt (hit) or sent it inline (miss).",
+    _lookup_samples,
+)
@@ -1,3 +1,8 @@
+from typing import Sequence
+
+# Bump whenever a prompt changes so cached parses from the old prompt are not reused.
+PROMPT_VERSION = "2"
+
 ALLOWED_CATEGORIES = [
     "Food & Dining",
     "Transport",
@@ -17,7 +22,13 @@ ALLOWED_PAYMENT_METHODS = [
     "Cash"
 ]
 
-EXPENSE_PARSER_PROMPT = """
+# Each prompt is a static system prefix, identical on every call so Gemini can
+# cache it (see prompt_cache.py), and a short per-request suffix with the
+# request's clock and input type. The allowed values are filled in once here.
+_CATEGORIES = ", ".join(ALLOWED_CATEGORIES)
+_PAYMENT_METHODS = ", ".join(ALLOWED_PAYMENT_METHODS)
+
+IMAGE_SYSTEM_PROMPT = f"""
 You are an expert receipt parser. Your job is to extract structured expense data from the provided image.
 Return valid JSON only. No markdown formatting, no explanations.
 
@@ -32,21 +43,15 @@ Schema:
 }}
 
 Rules:
-1. **Category**: Must be one of: {categories}. If unsure, choose 'Misc' or 'Shopping'.
-2. **Payment Method**: Must be one of: {payment_methods}. Guess from text (e.g. 'UPI', 'Visa', 'Cash'). Default to 'Cash' if unknown.
+1. **Category**: Must be one of: {_CATEGORIES}. If unsure, choose 'Misc' or 'Shopping'.
+2. **Payment Method**: Must be one of: {_PAYMENT_METHODS}. Guess from text (e.g. 'UPI', 'Visa', 'Cash'). Default to 'Cash' if unknown.
 3. **Amount**: Find the Grand Total / Payable Amount. Must be a number.
 4. **Date**: Extract the date and time. Convert to ISO8601 format. If date is not found, leave it null.
 5. **Title**: value should be the Merchant Name (e.g. 'Starbucks', 'Uber', 'Zomato'). Keep it short.
 6. **Description**: Brief summary (e.g. 'Coffee and snacks', 'Taxi ride'). Max 1-2 sentences.
-
-Context:
-- Current Time: {now_iso}
-- Timezone: {timezone}
-
-Input Image is a {image_type}.
 """
 
-AUDIO_EXPENSE_PARSER_PROMPT = """
+AUDIO_SYSTEM_PROMPT = f"""
 You are an expert expense tracker assistant. Your job is to extract structured expense data from the provided audio file.
 Return valid JSON only. No markdown formatting, no explanations.
 
@@ -63,17 +68,44 @@ Schema:
 }}
 
 Rules:
-1. **Category**: Must be one of: {categories}. If unsure, choose 'Misc'.
-2. **Payment Method**: Must be one of: {payment_methods}. Default to 'Cash' if unknown.
+1. **Category**: Must be one of: {_CATEGORIES}. If unsure, choose 'Misc'.
+2. **Payment Method**: Must be one of: {_PAYMENT_METHODS}. Default to 'Cash' if unknown.
 3. **Amount**: Extract the amount. If not mentioned, set to 0.
-4. **Date**: Extract the date. Use the current date if 'today' is mentioned. Context provided below.
+4. **Date**: Extract the date. Use the current date if 'today' is mentioned. Context is provided with the audio.
 5. **Merchant**: Extract the merchant name if available.
 6. **Notes**: Summarize any other details.
 7. **Title**: A short title for the expense (e.g. 'Lunch at Haldiram').
+"""
 
-Context:
-- Current Time: {now_iso}
-- Timezone: {timezone}
+STATEMENT_SYSTEM_PROMPT = f"""
+You are an expert at reading bank and UPI statements. Your job is to categorize spending transactions from their statement descriptions.
+Return valid JSON only. No markdown formatting, no explanations.
 
-Input is an audio file of a user describing an expense.
+Schema:
+{{
+  "categories": ["One of the allowed categories for each description, in order"]
+}}
+
+Rules:
+1. **Category**: Must be one of: {_CATEGORIES}. If unsure, choose 'Misc'.
+2. **Order**: Return exactly one category per numbered description, in the same order.
+3. **Descriptions**: They usually carry the payment rail ({_PAYMENT_METHODS}), reference numbers and a payee name or UPI id. Judge by the payee and any remarks.
 """
+
+SYSTEM_PROMPTS = {"image": IMAGE_SYSTEM_PROMPT, "audio": AUDIO_SYSTEM_PROMPT, "statement": STATEMENT_SYSTEM_PROMPT}
+
+
+def image_request_prompt(now_iso: str, timezone: str, mime_type: str) -> str:
+    return f"Context:\n- Current Time: {now_iso}\n- Timezone: {timezone}\n\nInput Image is a {mime_type}."
+
+
+def audio_request_prompt(now_iso: str, timezone: str) -> str:
+    return (
+        f"Context:\n- Current Time: {now_iso}\n- Timezone: {timezone}\n\n"
+        "Input is an audio file of a user describing an expense."
+    )
+
+
+def statement_request_prompt(descriptions: Sequence[str]) -> str:
+    lines = "\n".join(f"{i}. {text}" for i, text in enumerate(descriptions, 1))
+    return f"Categorize these {len(descriptions)} statement descriptions:\n{lines}"
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from typing import Optional
+import time
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from datetime import datetime
 from .schemas import ExpenseAIResult
-from .service import GeminiExpenseParserService
+from .cache import get_parse_cache
+from .uploads import AUDIO_MIME_TYPES, IMAGE_MIME_TYPES, MAX_AUDIO_BYTES, MAX_BATCH_FILES, MAX_IMAGE_BYTES, read_upload
+from .service import GeminiExpenseParserService, get_parser_service
+from .streaming import SSE_HEADERS, ndjson_line, sse_stream
+from .routing import get_model_router
+from .prompt_cache import get_prompt_cache
+from app.api.deps import get_optional_user
+from app.pipelines.categorizer.pipeline import get_categorizer
+from app.pipelines.screenshot_parser.pipeline import get_screenshot_fast_path
 
 router = APIRouter()
 
@@ -11,23 +21,23 @@ async def parse_expense_image(
     file: UploadFile = File(...),
     timezone: str = Form("UTC"),
     now_iso: Optional[str] = Form(None),
-    service: GeminiExpenseParserService = Depends(GeminiExpenseParserService)
+    user=Depends(get_optional_user),
+    service: GeminiExpenseParserService = Depends(get_parser_service)
 ):
     """
     Parses an expense receipt image using Gemini Vision API.
     Returns structured data (ExpenseDetails) and a confidence score.
+    Signed-in callers get their confirmed merchant categories applied.
     """
     
-    # MIME validation
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image (jpeg, png, webp).")
-
-    # Size validation (approx 10MB limit)
-    # file.size is not always available depending on backend, so we read chunks or just read all
-    # For MVP, read all and checking len is fine
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large. Max 10MB.")
+    # Validate the real type from magic bytes and enforce the size limit while reading;
+    # oversized bodies are already cut off by UploadSizeLimitMiddleware.
+    contents, mime_type = await read_upload(
+        file,
+        max_bytes=MAX_IMAGE_BYTES,
+        allowed_types=IMAGE_MIME_TYPES,
+        invalid_detail="File must be an image (jpeg, png, webp).",
+    )
 
     # Time fallback
     if not now_iso:
@@ -35,9 +45,10 @@ async def parse_expense_image(
 
     return await service.parse_image(
         file_bytes=contents,
-        mime_type=file.content_type,
+        mime_type=mime_type,
         now_iso=now_iso,
-        timezone=timezone
+        timezone=timezone,
+        user_id=user["sub"] if user else None,
     )
 
 @router.post("/parse-audio", response_model=ExpenseAIResult)
@@ -45,27 +56,24 @@ async def parse_expense_audio(
     file: UploadFile = File(...),
     timezone: str = Form("Asia/Kolkata"),
     now_iso: Optional[str] = Form(None),
-    service: GeminiExpenseParserService = Depends(GeminiExpenseParserService)
+    user=Depends(get_optional_user),
+    service: GeminiExpenseParserService = Depends(get_parser_service)
 ):
     """
     Parses an expense audio recording using Gemini 1.5 Flash.
     Returns structured data (ExpenseDetails) and a confidence score.
     """
     
-    # Basic MIME validation
-    # Allow common audio types. 
     # Gemini supports: WAV, MP3, AIFF, AAC, OGG, FLAC
     # Browsers send: audio/webm, audio/mp4, audio/ogg
-    if not file.content_type.startswith("audio/") and file.content_type != "application/octet-stream":
-        # loose check because sometimes mobile/browsers send weird mime types
-        # but "audio/" is a good baseline.
-        # application/octet-stream might happen if type is lost.
-        pass
-
-    # Size validation (approx 15MB limit)
-    contents = await file.read()
-    if len(contents) > 15 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large. Max 15MB.")
+    # The declared content_type is unreliable on mobile (often application/octet-stream),
+    # so the type is sniffed from the file itself.
+    contents, mime_type = await read_upload(
+        file,
+        max_bytes=MAX_AUDIO_BYTES,
+        allowed_types=AUDIO_MIME_TYPES,
+        invalid_detail="File must be an audio recording (webm, mp4, ogg, wav, mp3).",
+    )
 
     # Time fallback
     if not now_iso:
@@ -73,7 +81,163 @@ async def parse_expense_audio(
 
     return await service.parse_audio(
         file_bytes=contents,
-        mime_type=file.content_type,
+        mime_type=mime_type,
+        now_iso=now_iso,
+        timezone=timezone,
+        user_id=user["sub"] if user else None,
+    )
+
+@router.post("/parse-image/batch")
+async def parse_expense_image_batch(
+    files: List[UploadFile] = File(...),
+    timezone: str = Form("UTC"),
+    now_iso: Optional[str] = Form(None),
+    user=Depends(get_optional_user),
+    service: GeminiExpenseParserService = Depends(get_parser_service)
+):
+    """
+    Parses up to MAX_BATCH_FILES receipt images from one multipart request.
+    Streams NDJSON in completion order: one line per file with its `index`,
+    `filename`, `status` and either `result` or `error`, then a `summary` line.
+    A file that is invalid or fails to parse only fails its own line.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {MAX_BATCH_FILES} files.")
+
+    if not now_iso:
+        now_iso = datetime.now().isoformat()
+
+    start = time.perf_counter()
+    rejected, items, positions = [], [], []
+    for index, file in enumerate(files):
+        try:
+            contents, mime_type = await read_upload(
+                file,
+                max_bytes=MAX_IMAGE_BYTES,
+                allowed_types=IMAGE_MIME_TYPES,
+                invalid_detail="File must be an image (jpeg, png, webp).",
+            )
+        except HTTPException as e:
+            rejected.append({"index": index, "filename": file.filename, "status": e.status_code, "error": e.detail})
+            continue
+        items.append((contents, mime_type))
+        positions.append((index, file.filename))
+
+    results = service.parse_image_batch(items, now_iso=now_iso, timezone=timezone, user_id=user["sub"] if user else None)
+
+    async def lines():
+        failed = len(rejected)
+        for line in rejected:
+            yield ndjson_line(line)
+        async for item, outcome in results:
+            index, filename = positions[item]
+            if isinstance(outcome, HTTPException):
+                failed += 1
+                yield ndjson_line({"index": index, "filename": filename, "status": outcome.status_code, "error": outcome.detail})
+            else:
+                yield ndjson_line({"index": index, "filename": filename, "status": 200, "result": outcome.model_dump()})
+        yield ndjson_line({"summary": {
+            "total": len(files),
+            "succeeded": len(files) - failed,
+            "failed": failed,
+            "elapsedMs": int((time.perf_counter() - start) * 1000),
+        }})
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/parse-image/stream")
+async def parse_expense_image_stream(
+    file: UploadFile = File(...),
+    timezone: str = Form("UTC"),
+    now_iso: Optional[str] = Form(None),
+    user=Depends(get_optional_user),
+    service: GeminiExpenseParserService = Depends(get_parser_service)
+):
+    """
+    Streaming variant of /parse-image. Emits server-sent events: one `field`
+    event per expense field as soon as the model has produced it, then a
+    `result` event with the full ExpenseAIResult (or an `error` event).
+    """
+    contents, mime_type = await read_upload(
+        file,
+        max_bytes=MAX_IMAGE_BYTES,
+        allowed_types=IMAGE_MIME_TYPES,
+        invalid_detail="File must be an image (jpeg, png, webp).",
+    )
+
+    if not now_iso:
+        now_iso = datetime.now().isoformat()
+
+    events = service.stream_image(
+        file_bytes=contents,
+        mime_type=mime_type,
+        now_iso=now_iso,
+        timezone=timezone,
+        user_id=user["sub"] if user else None,
+    )
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/parse-audio/stream")
+async def parse_expense_audio_stream(
+    file: UploadFile = File(...),
+    timezone: str = Form("Asia/Kolkata"),
+    now_iso: Optional[str] = Form(None),
+    user=Depends(get_optional_user),
+    service: GeminiExpenseParserService = Depends(get_parser_service)
+):
+    """
+    Streaming variant of /parse-audio; same events as /parse-image/stream.
+    """
+    contents, mime_type = await read_upload(
+        file,
+        max_bytes=MAX_AUDIO_BYTES,
+        allowed_types=AUDIO_MIME_TYPES,
+        invalid_detail="File must be an audio recording (webm, mp4, ogg, wav, mp3).",
+    )
+
+    if not now_iso:
+        now_iso = datetime.now().isoformat()
+
+    events = service.stream_audio(
+        file_bytes=contents,
+        mime_type=mime_type,
         now_iso=now_iso,
-        timezone=timezone
+        timezone=timezone,
+        user_id=user["sub"] if user else None,
     )
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/cache/stats")
+async def parse_cache_stats():
+    """
+    Hit/miss counters for the content-addressed parse result cache.
+    """
+    return get_parse_cache().stats()
+
+@router.get("/fast-path/stats")
+async def screenshot_fast_path_stats():
+    """
+    Share of image parses answered by the local UPI screenshot parser instead of Gemini.
+    """
+    return get_screenshot_fast_path().stats()
+
+@router.get("/prompt-cache/stats")
+async def prompt_cache_stats():
+    """
+    Whether system prompts are served from Gemini context caches, and which ones exist.
+    """
+    return get_prompt_cache().stats()
+
+@router.get("/categorizer/stats")
+async def categorizer_stats():
+    """
+    Users with confirmed merchants, and how often a known merchant replaced the parsed category.
+    """
+    return get_categorizer().stats()
+
+@router.get("/routing/stats")
+async def model_routing_stats():
+    """
+    Per-model latency percentiles and breaker state, plus hedge and fallback counters.
+    """
+    return get_model_router().stats()
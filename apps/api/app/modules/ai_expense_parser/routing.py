@@ -0,0 +1,337 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from app.core.telemetry import REGISTRY
+
+# Primary first; later tiers are used when earlier ones are slow, failing or tripped
+DEFAULT_MODELS = ("gemini-flash-latest", "gemini-flash-lite-latest")
+DEFAULT_ATTEMPT_TIMEOUT_SECONDS = 20.0
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = 1.0
+# Used until a model has enough samples for a percentile
+DEFAULT_HEDGE_DELAY_SECONDS = 6.0
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30.0
+# 4xx statuses that still say the model, not the request, is at fault
+RETRYABLE_CLIENT_STATUSES = frozenset({408, 429})
+
+ModelCall = Callable[[str], Awaitable[Any]]
+# Opens a streamed call to the given model
+StreamCall = Callable[[str], Awaitable[AsyncIterator[Any]]]
+
+_END = object()
+
+
+def is_model_failure(error: BaseException) -> bool:
+    """
+    Whether a failed attempt counts against the model: timeouts, 5xx, 429 and
+    transport errors (which carry no status) do. Other 4xx, such as a bad
+    image or an invalid argument, are the request's fault and would fail on
+    every tier too.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # google.genai's APIError carries `code`; HTTPException `status_code`
+    status = getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        return True
+    return status >= 500 or status in RETRYABLE_CLIENT_STATUSES
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * (len(ordered) - 1)))]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `failure_threshold` failures the model
+    is skipped for `reset_timeout` seconds; then a single trial call is let
+    through, which closes the breaker on success or re-opens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_FAILURES, reset_timeout: float = DEFAULT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot when its call was cancelled without an outcome."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class ModelRouter:
+    """
+    Sends a model call down a list of model tiers.
+
+    Each attempt has a deadline. If the first request to a model has not
+    answered by that model's observed p95 latency (clamped to
+    `hedge_min_delay`), an identical hedge request is sent and whichever
+    answers first wins; the other is cancelled. A timed-out or failed attempt
+    moves on to the next tier, and each model's circuit breaker skips it
+    outright while its backend is down. Errors that are the request's fault
+    (see is_model_failure) are raised straight away and leave the breaker alone.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str] = DEFAULT_MODELS,
+        attempt_timeout: float = DEFAULT_ATTEMPT_TIMEOUT_SECONDS,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        hedge_min_delay: float = DEFAULT_HEDGE_MIN_DELAY_SECONDS,
+        hedge_default_delay: float = DEFAULT_HEDGE_DELAY_SECONDS,
+        hedging: bool = True,
+        breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+        breaker_reset_timeout: float = DEFAULT_BREAKER_RESET_SECONDS,
+    ):
+        if not models:
+            raise ValueError("at least one model is required")
+        self.models: List[str] = list(models)
+        self.attempt_timeout = attempt_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.hedging = hedging
+        self.latency: Dict[str, LatencyTracker] = {m: LatencyTracker() for m in self.models}
+        self.breakers: Dict[str, CircuitBreaker] = {
+            m: CircuitBreaker(breaker_failures, breaker_reset_timeout) for m in self.models
+        }
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    @property
+    def primary(self) -> str:
+        return self.models[0]
+
+    def hedge_delay(self, model: str) -> float:
+        tracker = self.latency[model]
+        if len(tracker) < HEDGE_MIN_SAMPLES:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, tracker.percentile(self.hedge_percentile))
+
+    async def generate(self, call: ModelCall) -> Tuple[Any, str]:
+        """Returns (call result, model that produced it)."""
+        last_error: Optional[BaseException] = None
+        for tier, model in enumerate(self.models):
+            breaker = self.breakers[model]
+            if not breaker.allow():
+                continue
+            if tier > 0:
+                self.fallbacks += 1
+            try:
+                result = await self._attempt(model, call)
+            except asyncio.CancelledError:
+                breaker.release_trial()
+                raise
+            except asyncio.TimeoutError as e:
+                self.timeouts += 1
+                breaker.record_failure()
+                last_error = e
+                continue
+            except Exception as e:
+                if not is_model_failure(e):
+                    breaker.release_trial()
+                    raise
+                breaker.record_failure()
+                last_error = e
+                continue
+            breaker.record_success()
+            return result, model
+
+        if last_error is None:
+            raise HTTPException(status_code=503, detail="AI backend is unavailable, please retry shortly.")
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise HTTPException(status_code=504, detail="AI model did not respond in time.")
+        raise last_error
+
+    async def stream(self, call: StreamCall) -> AsyncIterator[Any]:
+        """
+        Chunks of a streamed call to the primary model. Chunks already sent
+        cannot be hedged or taken back, so a stream gets no hedge and no
+        fallback tier: the attempt deadline covers opening it and the first
+        chunk, and the primary's breaker records the outcome. A tripped
+        breaker refuses the stream with 503, a missed deadline ends it with 504.
+        """
+        model = self.primary
+        breaker = self.breakers[model]
+        if not breaker.allow():
+            raise HTTPException(status_code=503, detail="AI backend is unavailable, please retry shortly.")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.attempt_timeout
+        try:
+            chunks = aiter(await asyncio.wait_for(call(model), self.attempt_timeout))
+            chunk = await asyncio.wait_for(anext(chunks, _END), deadline - loop.time())
+            while chunk is not _END:
+                yield chunk
+                chunk = await anext(chunks, _END)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            breaker.record_failure()
+            raise HTTPException(status_code=504, detail="AI model did not respond in time.")
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client went away; that says nothing about the model
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            if is_model_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release_trial()
+            raise
+        breaker.record_success()
+
+    async def _timed(self, model: str, call: ModelCall) -> Any:
+        start = time.perf_counter()
+        result = await call(model)
+        self.latency[model].record(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, model: str, call: ModelCall) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.attempt_timeout
+        tasks = [asyncio.ensure_future(self._timed(model, call))]
+        hedge: Optional[asyncio.Future] = None
+        try:
+            hedge_at = min(self.hedge_delay(model), self.attempt_timeout) if self.hedging else None
+            if hedge_at is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_at)
+                if not done and loop.time() < deadline:
+                    hedge = asyncio.ensure_future(self._timed(model, call))
+                    tasks.append(hedge)
+                    self.hedges += 1
+
+            last_error: Optional[BaseException] = None
+            while tasks:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_model_failure(last_error):
+                        # The hedge would be rejected the same way
+                        raise last_error
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": {
+                model: {
+                    "breaker": self.breakers[model].state,
+                    "p50Ms": _ms(self.latency[model].percentile(0.5)),
+                    "p95Ms": _ms(self.latency[model].percentile(0.95)),
+                    "hedgeDelayMs": _ms(self.hedge_delay(model)),
+                }
+                for model in self.models
+            },
+            "hedges": self.hedges,
+            "hedgeWins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """
+    Process-wide router configured from GEMINI_MODELS (comma-separated tiers),
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS, GEMINI_HEDGING_ENABLED,
+    GEMINI_HEDGE_PERCENTILE, GEMINI_HEDGE_MIN_DELAY_SECONDS,
+    GEMINI_BREAKER_FAILURES and GEMINI_BREAKER_RESET_SECONDS.
+    """
+    global _router
+    if _router is None:
+        models = [m.strip() for m in os.getenv("GEMINI_MODELS", ",".join(DEFAULT_MODELS)).split(",") if m.strip()]
+        _router = ModelRouter(
+            models=models,
+            attempt_timeout=float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_SECONDS", DEFAULT_ATTEMPT_TIMEOUT_SECONDS)),
+            hedge_percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)),
+            hedge_min_delay=float(os.getenv("GEMINI_HEDGE_MIN_DELAY_SECONDS", DEFAULT_HEDGE_MIN_DELAY_SECONDS)),
+            hedging=os.getenv("GEMINI_HEDGING_ENABLED", "1") != "0",
+            breaker_failures=int(os.getenv("GEMINI_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+            breaker_reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", DEFAULT_BREAKER_RESET_SECONDS)),
+        )
+    return _router
+
+
+def _router_counter(attr: str):
+    return lambda: [({}, getattr(_router, attr))] if _router else []
+
+
+REGISTRY.callback("model_hedges_total", "counter", "Hedge requests sent.", _router_counter("hedges"))
+REGISTRY.callback("model_hedge_wins_total", "counter", "Hedge requests that answered first.", _router_counter("hedge_wins"))
+REGISTRY.callback("model_fallbacks_total", "counter", "Attempts made on a fallback model tier.", _router_counter("fallbacks"))
+REGISTRY.callback("model_timeouts_total", "counter", "Attempts that ran past their deadline.", _router_counter("timeouts"))
+REGISTRY.callback(
+    "model_breaker_open", "gauge", "1 while a model's circuit breaker is open or half-open.",
+    lambda: [({"model": m}, int(b.state != "closed")) for m, b in _router.breakers.items()] if _router else [],
+)
@@ -6,7 +6,7 @@ class ExpenseDetails(BaseModel):
     title: str = Field(..., description="Merchant name or transaction title")
     category: str = Field(..., description="Expense category")
     paymentMethod: str = Field(..., description="Payment method used")
-    amount: float = Field(..., description="Total amount of the expense")
+    amount: float = Field(..., allow_inf_nan=False, description="Total amount of the expense")
     currency: str = Field("INR", description="Currency code, defaults to INR")
     date: Optional[str] = Field(None, description="Date of the expense in ISO format")
     merchant: Optional[str] = Field(None, description="Merchant/Store name")
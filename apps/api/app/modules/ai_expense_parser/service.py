@@ -1,126 +1,441 @@
-import os
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
 from google import genai
-from google.genai import types
-from typing import Optional
-from fastapi import UploadFile, HTTPException
+from google.genai import errors, types
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from fastapi import HTTPException
+from app.pipelines.audio_parser.pipeline import PreprocessedAudio, preprocess_audio_async
+from app.pipelines.categorizer.pipeline import Categorizer, get_categorizer
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage, preprocess_receipt_image_async, shutdown_preprocess_pool
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath, get_screenshot_fast_path
+from app.core.telemetry import CONFIDENCE, MODEL_SECONDS, PAYLOAD_BYTES, PROMPT_TOKENS, span
 from .schemas import ExpenseAIResult, ExpenseDetails
-from .prompts import EXPENSE_PARSER_PROMPT, AUDIO_EXPENSE_PARSER_PROMPT, ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
-from .json_guard import extract_json
-from .normalizer import normalize_amount, normalize_date, normalize_category, normalize_payment_method, compute_confidence
+from .prompts import audio_request_prompt, image_request_prompt, statement_request_prompt
+from .prompt_cache import SystemPromptCache, get_prompt_cache, is_lost_cache, stop_prompt_cache
+from .json_guard import IncrementalJsonExtractor, extract_json
+from .normalizer import normalize_parsed_amount, normalize_date, normalize_category, normalize_payment_method, normalize_field, compute_confidence
+from .concurrency import InFlightLimiter, get_batch_concurrency, get_in_flight_limiter
+from .cache import ParseResultCache, get_parse_cache, with_request_date
+from .single_flight import SingleFlight
+from .client import get_gemini_client, start_gemini_client, stop_gemini_client
+from .routing import ModelRouter, get_model_router
+
+logger = logging.getLogger(__name__)
+
+ImagePreprocessor = Callable[[bytes, str], Awaitable[PreprocessedImage]]
+AudioPreprocessor = Callable[[bytes, str], Awaitable[PreprocessedAudio]]
+# (event name, payload) pairs emitted by the streaming parse
+StreamEvent = Tuple[str, Dict[str, Any]]
+# (position in the batch, result or the error that item failed with)
+BatchItemResult = Tuple[int, Union[ExpenseAIResult, HTTPException]]
+
 
 class GeminiExpenseParserService:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-        else:
-            self.client = None
-
-    async def parse_image(self, file_bytes: bytes, mime_type: str, now_iso: str, timezone: str) -> ExpenseAIResult:
+    def __init__(
+        self,
+        client: Optional[genai.Client] = None,
+        limiter: Optional[InFlightLimiter] = None,
+        cache: Optional[ParseResultCache] = None,
+        image_preprocessor: Optional[ImagePreprocessor] = None,
+        audio_preprocessor: Optional[AudioPreprocessor] = None,
+        fast_path: Optional[ScreenshotFastPath] = None,
+        router: Optional[ModelRouter] = None,
+        categorizer: Optional[Categorizer] = None,
+        prompt_cache: Optional[SystemPromptCache] = None,
+    ):
+        # The SDK client and its connection pool are shared process-wide; see client.py
+        self.client = client if client is not None else get_gemini_client()
+        self.limiter = limiter or get_in_flight_limiter()
+        self.cache = cache or get_parse_cache()
+        self.inflight = SingleFlight()
+        self.image_preprocessor = image_preprocessor or preprocess_receipt_image_async
+        self.audio_preprocessor = audio_preprocessor or preprocess_audio_async
+        self.fast_path = fast_path or get_screenshot_fast_path()
+        self.router = router or get_model_router()
+        self.categorizer = categorizer or get_categorizer()
+        self.prompt_cache = prompt_cache or get_prompt_cache()
+
+    async def parse_image(
+        self,
+        file_bytes: bytes,
+        mime_type: str,
+        now_iso: str,
+        timezone: str,
+        model_slots: Optional[asyncio.Semaphore] = None,
+        user_id: Optional[str] = None,
+    ) -> ExpenseAIResult:
+        if not self.client:
+             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+
+        with span("prompt"):
+            prompt = self._image_prompt(mime_type, now_iso, timezone)
+        result = await self._parse(
+            "image", file_bytes, mime_type, prompt, now_iso,
+            default_title="Unknown Merchant", source="receipt", model_slots=model_slots,
+        )
+        # Per user, so applied after the shared cache rather than stored in it
+        return self.categorizer.apply(result, user_id)
+
+    async def parse_audio(
+        self, file_bytes: bytes, mime_type: str, now_iso: str, timezone: str, user_id: Optional[str] = None
+    ) -> ExpenseAIResult:
+        if not self.client:
+             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+
+        with span("prompt"):
+            prompt = self._audio_prompt(now_iso, timezone)
+        result = await self._parse(
+            "audio", file_bytes, mime_type, prompt, now_iso,
+            default_title="Unknown Expense", source="audio",
+        )
+        return self.categorizer.apply(result, user_id)
+
+    def parse_image_batch(
+        self,
+        items: List[Tuple[bytes, str]],
+        now_iso: str,
+        timezone: str,
+        max_concurrency: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[BatchItemResult]:
+        """
+        Parses many receipts from one request, yielding (index, result or
+        HTTPException) in completion order so one bad item never fails the rest.
+
+        Every item is preprocessed in parallel as soon as the batch starts; only
+        the model calls are capped, at `max_concurrency` for this batch on top of
+        the process-wide limiter, so a large batch does not sit in the limiter
+        queue long enough to time out.
+        """
+        if not self.client:
+             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+
+        return self._parse_batch(items, now_iso, timezone, max_concurrency or get_batch_concurrency(), user_id)
+
+    async def _parse_batch(
+        self,
+        items: List[Tuple[bytes, str]],
+        now_iso: str,
+        timezone: str,
+        max_concurrency: int,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[BatchItemResult]:
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def parse_one(index: int, file_bytes: bytes, mime_type: str) -> BatchItemResult:
+            try:
+                return index, await self.parse_image(
+                    file_bytes, mime_type, now_iso, timezone, model_slots=slots, user_id=user_id
+                )
+            except HTTPException as e:
+                return index, e
+            except Exception as e:
+                logger.exception("Batch item %d failed", index)
+                return index, HTTPException(status_code=500, detail=f"AI Processing Failed: {str(e)}")
+
+        tasks = [asyncio.create_task(parse_one(i, data, mime)) for i, (data, mime) in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client went away mid-batch; don't keep spending model calls on it
+            for task in tasks:
+                task.cancel()
+
+    def stream_image(
+        self, file_bytes: bytes, mime_type: str, now_iso: str, timezone: str, user_id: Optional[str] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Streaming variant of parse_image: yields a "field" event per normalized
+        field as soon as the model has written it, then a "result" event with
+        confidence and warnings, or an "error" event. The user's confirmed
+        merchant categories are applied to the result event.
+        """
+        if not self.client:
+             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+
+        with span("prompt"):
+            prompt = self._image_prompt(mime_type, now_iso, timezone)
+        return self._stream(
+            "image", file_bytes, mime_type, prompt, now_iso,
+            default_title="Unknown Merchant", source="receipt", user_id=user_id,
+        )
+
+    def stream_audio(
+        self, file_bytes: bytes, mime_type: str, now_iso: str, timezone: str, user_id: Optional[str] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """Streaming variant of parse_audio; see stream_image."""
         if not self.client:
              raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
 
-        # 1. Build Prompt
-        prompt = EXPENSE_PARSER_PROMPT.format(
-            categories=", ".join(ALLOWED_CATEGORIES),
-            payment_methods=", ".join(ALLOWED_PAYMENT_METHODS),
-            now_iso=now_iso,
-            timezone=timezone,
-            image_type=mime_type
+        with span("prompt"):
+            prompt = self._audio_prompt(now_iso, timezone)
+        return self._stream(
+            "audio", file_bytes, mime_type, prompt, now_iso,
+            default_title="Unknown Expense", source="audio", user_id=user_id,
         )
 
+    async def categorize_descriptions(
+        self, descriptions: Sequence[str], model_slots: Optional[asyncio.Semaphore] = None
+    ) -> List[str]:
+        """
+        Categorizes many statement descriptions with one text-only model call,
+        for the rows a bulk import could not categorize locally. Returns an
+        allowed category per description, in order; entries the model skipped
+        or mangled come back as Misc.
+        """
+        if not self.client:
+             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+        if not descriptions:
+            return []
+
+        with span("model_call"):
+            raw_text, _ = await self._generate("statement", [statement_request_prompt(descriptions)], model_slots)
+        with span("extract_json"):
+            data = extract_json(raw_text)
+        categories = data.get("categories") if isinstance(data, dict) else None
+        if not isinstance(categories, list):
+            raise HTTPException(status_code=502, detail="AI Processing Failed: no categories in the response")
+        categories = categories[:len(descriptions)] + [""] * (len(descriptions) - len(categories))
+        return [normalize_category(c if isinstance(c, str) else "") for c in categories]
+
+    def _image_prompt(self, mime_type: str, now_iso: str, timezone: str) -> str:
+        # 1. Build Prompt: only the per-request part, the instructions go as the system prompt
+        return image_request_prompt(now_iso, timezone, mime_type)
+
+    def _audio_prompt(self, now_iso: str, timezone: str) -> str:
+        return audio_request_prompt(now_iso, timezone)
+
+    async def _parse(
+        self,
+        kind: str,
+        file_bytes: bytes,
+        mime_type: str,
+        prompt: str,
+        now_iso: str,
+        default_title: str,
+        source: str,
+        model_slots: Optional[asyncio.Semaphore] = None,
+    ) -> ExpenseAIResult:
+        PAYLOAD_BYTES.observe(len(file_bytes), kind)
+        # Re-uploads of the same file are served without a model call
+        with span("cache_lookup"):
+            cache_key = self.cache.key_for(kind, file_bytes, mime_type, self.router.primary)
+            cached = await self.cache.get(cache_key, now_iso)
+        if cached:
+            return cached
+
+        # Identical uploads arriving together (double-submits) share one model call
+        async def call() -> Tuple[ExpenseAIResult, Optional[str]]:
+            return await self._call_model(
+                kind, cache_key, file_bytes, mime_type, prompt, now_iso, default_title, source, model_slots
+            )
+
+        result, raw_date = await self.inflight.do(cache_key, call)
+        return with_request_date(result, raw_date, now_iso)
+
+    async def _call_model(
+        self,
+        kind: str,
+        cache_key: str,
+        file_bytes: bytes,
+        mime_type: str,
+        prompt: str,
+        now_iso: str,
+        default_title: str,
+        source: str,
+        model_slots: Optional[asyncio.Semaphore] = None,
+    ) -> Tuple[ExpenseAIResult, Optional[str]]:
+        # UPI payment screenshots have a fixed layout and are read locally when possible
+        if kind == "image":
+            with span("fast_path"):
+                fast = await self.fast_path.try_parse(file_bytes, mime_type, now_iso)
+            if fast:
+                CONFIDENCE.observe(fast[0].confidence, "screenshot")
+                await self.cache.put(cache_key, *fast)
+                return fast
+
         try:
+            # Shrink the upload before sending it; the cache key stays on the original bytes
+            preprocess = self.image_preprocessor if kind == "image" else self.audio_preprocessor
+            with span("preprocess"):
+                prepared = await preprocess(file_bytes, mime_type)
+            file_bytes, mime_type = prepared.data, prepared.mime_type
+
             # 2. Call Gemini
-            response = self.client.models.generate_content(
-                model='gemini-flash-latest',
-                contents=[
+            with span("model_call"):
+                raw_text, model = await self._generate(kind, [
                     types.Part.from_bytes(data=file_bytes, mime_type=mime_type),
                     prompt
-                ]
-            )
-            
+                ], model_slots)
+
             # 3. Extract JSON
-            raw_text = response.text
-            data = extract_json(raw_text)
-            
+            with span("extract_json"):
+                data = extract_json(raw_text)
+
             if not data:
                 # Retry once logic could go here, for MVP we fail or return empty
                 raise ValueError("Failed to extract JSON from Gemini response")
 
-            # 4. Normalize & Validate
-            # We create a dictionary with normalized values first
-            normalized_data = {
-                "title": data.get("title", "Unknown Merchant"),
-                "category": normalize_category(data.get("category", "")),
-                "paymentMethod": normalize_payment_method(data.get("paymentMethod", "")),
-                "amount": normalize_amount(data.get("amount", 0)),
-                "currency": data.get("currency", "INR"),
-                "date": normalize_date(data.get("date"), now_iso),
-                "merchant": data.get("merchant", None),
-                "notes": data.get("notes", None),
-                "description": data.get("description", "")
-            }
-
-            # 5. Compute Confidence
-            confidence_score = compute_confidence(normalized_data)
-            
-            # 6. Warnings
-            warnings = []
-            if normalized_data["date"] == now_iso and data.get("date") != now_iso:
-                warnings.append("Date not found in receipt, used current time.")
-            if confidence_score < 0.5:
-                warnings.append("Low confidence extraction, please verify carefully.")
-
-            # 7. Construct Result
-            expense_details = ExpenseDetails(**normalized_data)
-            
-            return ExpenseAIResult(
-                expense=expense_details,
-                confidence=confidence_score,
-                warnings=warnings,
-                rawText=raw_text # Optional: remove in production if sensitive
-            )
+            # 4-7. Normalize, score and construct result
+            result = self._build_result(data, raw_text, now_iso, default_title=default_title, source=source)
 
+        except HTTPException:
+            raise
         except Exception as e:
-            # Log the error
-            print(f"Gemini Error: {e}")
+            logger.exception("Gemini call failed", extra={"kind": kind})
             raise HTTPException(status_code=502, detail=f"AI Processing Failed: {str(e)}")
 
-    async def parse_audio(self, file_bytes: bytes, mime_type: str, now_iso: str, timezone: str) -> ExpenseAIResult:
-        if not self.client:
-             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
+        # Only successful parses from the primary model are cached; the key names the primary
+        if model == self.router.primary:
+            await self.cache.put(cache_key, result, data.get("date"))
+        return result, data.get("date")
 
-        # 1. Build Prompt
-        prompt = AUDIO_EXPENSE_PARSER_PROMPT.format(
-            categories=", ".join(ALLOWED_CATEGORIES),
-            payment_methods=", ".join(ALLOWED_PAYMENT_METHODS),
-            now_iso=now_iso,
-            timezone=timezone
-        )
+    async def _stream(
+        self,
+        kind: str,
+        file_bytes: bytes,
+        mime_type: str,
+        prompt: str,
+        now_iso: str,
+        default_title: str,
+        source: str,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        # Cached and fast-path results are complete already; replay them as events.
+        # Streams are not coalesced with the single-flight group: each one needs its own chunks.
+        PAYLOAD_BYTES.observe(len(file_bytes), kind)
+        with span("cache_lookup"):
+            cache_key = self.cache.key_for(kind, file_bytes, mime_type, self.router.primary)
+            cached = await self.cache.get(cache_key, now_iso)
+        if cached is None and kind == "image":
+            with span("fast_path"):
+                fast = await self.fast_path.try_parse(file_bytes, mime_type, now_iso)
+            if fast:
+                CONFIDENCE.observe(fast[0].confidence, "screenshot")
+                await self.cache.put(cache_key, *fast)
+                cached = with_request_date(fast[0], fast[1], now_iso)
+        if cached is not None:
+            cached = self.categorizer.apply(cached, user_id)
+            for name, value in cached.expense.model_dump().items():
+                yield "field", {"name": name, "value": value}
+            yield "result", cached.model_dump()
+            return
 
         try:
-            # 2. Call Gemini
-            response = self.client.models.generate_content(
-                model='gemini-flash-latest',
-                contents=[
-                    types.Part.from_bytes(data=file_bytes, mime_type=mime_type),
-                    prompt
-                ]
-            )
-            
-            # 3. Extract JSON
-            raw_text = response.text
-            data = extract_json(raw_text)
-            
+            preprocess = self.image_preprocessor if kind == "image" else self.audio_preprocessor
+            with span("preprocess"):
+                prepared = await preprocess(file_bytes, mime_type)
+
+            extractor = IncrementalJsonExtractor()
+            chunks: List[str] = []
+            # Includes the time the client takes to read each field event
+            with span("model_call"):
+                async with self.limiter.slot():
+                    # Streams go to the primary model only: a half-sent stream cannot be hedged.
+                    # The router still bounds the wait for the first chunk and keeps the breaker
+                    model_start = time.perf_counter()
+
+                    def open_stream(model: str):
+                        return self.client.aio.models.generate_content_stream(
+                            model=model,
+                            contents=[
+                                types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime_type),
+                                prompt
+                            ],
+                            config=self.prompt_cache.config_for(model, kind),
+                        )
+
+                    async for chunk in self.router.stream(open_stream):
+                        # Usage comes with the last chunk
+                        record_prompt_tokens(kind, getattr(chunk, "usage_metadata", None))
+                        text = chunk.text or ""
+                        chunks.append(text)
+                        for name, value in extractor.feed(text):
+                            if name in ExpenseDetails.model_fields:
+                                yield "field", {"name": name, "value": normalize_field(name, value, now_iso)}
+                    MODEL_SECONDS.observe(time.perf_counter() - model_start, self.router.primary, "stream")
+
+            raw_text = "".join(chunks)
+            with span("extract_json"):
+                data = extractor.value() if extractor.complete else extract_json(raw_text)
             if not data:
                 raise ValueError("Failed to extract JSON from Gemini response")
+            result = self._build_result(data, raw_text, now_iso, default_title=default_title, source=source)
+
+        except HTTPException as e:
+            yield "error", {"status": e.status_code, "detail": e.detail}
+            return
+        except Exception as e:
+            logger.exception("Gemini stream failed", extra={"kind": kind})
+            yield "error", {"status": 502, "detail": f"AI Processing Failed: {str(e)}"}
+            return
 
-            # 4. Normalize & Validate
+        await self.cache.put(cache_key, result, data.get("date"))
+        yield "result", self.categorizer.apply(result, user_id).model_dump()
+
+    async def _generate(
+        self, kind: str, contents: List[Any], model_slots: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[str, str]:
+        """
+        Runs the model call on the SDK's async client so the event loop stays free
+        while Gemini works. Concurrency is capped process-wide by the in-flight limiter,
+        and per batch by `model_slots` when given. The router applies deadlines,
+        hedging and model fallback; returns (text, model that answered).
+        The `kind` system prompt comes from the prompt cache, per model.
+        """
+        async def send(model: str, config: types.GenerateContentConfig) -> str:
+            start, outcome = time.perf_counter(), "error"
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config,
+                )
+                outcome = "ok"
+                record_prompt_tokens(kind, getattr(response, "usage_metadata", None))
+                return response.text
+            except asyncio.CancelledError:
+                # Lost a hedge race or ran past the attempt deadline
+                outcome = "cancelled"
+                raise
+            finally:
+                MODEL_SECONDS.observe(time.perf_counter() - start, model, outcome)
+
+        async def call(model: str) -> str:
+            config = self.prompt_cache.config_for(model, kind)
+            try:
+                return await send(model, config)
+            except errors.ClientError as e:
+                if not config.cached_content or not is_lost_cache(e):
+                    raise
+                # The context cache expired early or was deleted: drop it and retry
+                # once on this model with the inline prompt
+                self.prompt_cache.invalidate(model, kind)
+            return await send(model, self.prompt_cache.config_for(model, kind))
+
+        async with model_slots if model_slots is not None else nullcontext():
+            async with self.limiter.slot():
+                return await self.router.generate(call)
+
+    def _build_result(
+        self,
+        data: Dict[str, Any],
+        raw_text: str,
+        now_iso: str,
+        default_title: str,
+        source: str,
+    ) -> ExpenseAIResult:
+        # 4. Normalize & Validate
+        # We create a dictionary with normalized values first
+        with span("normalize"):
             normalized_data = {
-                "title": data.get("title", "Unknown Expense"),
+                "title": data.get("title", default_title),
                 "category": normalize_category(data.get("category", "")),
                 "paymentMethod": normalize_payment_method(data.get("paymentMethod", "")),
-                "amount": normalize_amount(data.get("amount", 0)),
+                "amount": normalize_parsed_amount(data.get("amount", 0)),
                 "currency": data.get("currency", "INR"),
                 "date": normalize_date(data.get("date"), now_iso),
                 "merchant": data.get("merchant", None),
@@ -130,24 +445,54 @@ class GeminiExpenseParserService:
 
             # 5. Compute Confidence
             confidence_score = compute_confidence(normalized_data)
-            
+
             # 6. Warnings
             warnings = []
             if normalized_data["date"] == now_iso and data.get("date") != now_iso:
-                warnings.append("Date not found in audio, used current time.")
+                warnings.append(f"Date not found in {source}, used current time.")
             if confidence_score < 0.5:
                 warnings.append("Low confidence extraction, please verify carefully.")
 
-            # 7. Construct Result
+        CONFIDENCE.observe(confidence_score, source)
+
+        # 7. Construct Result
+        with span("validate"):
             expense_details = ExpenseDetails(**normalized_data)
-            
+
             return ExpenseAIResult(
                 expense=expense_details,
                 confidence=confidence_score,
                 warnings=warnings,
-                rawText=raw_text
+                rawText=raw_text # Optional: remove in production if sensitive
             )
 
-        except Exception as e:
-            print(f"Gemini Error: {e}")
-            raise HTTPException(status_code=502, detail=f"AI Processing Failed: {str(e)}")
+
+def record_prompt_tokens(kind: str, usage: Optional[types.GenerateContentResponseUsageMetadata]) -> None:
+    if usage is None or not usage.prompt_token_count:
+        return
+    PROMPT_TOKENS.observe(usage.prompt_token_count, kind, "total")
+    PROMPT_TOKENS.observe(usage.cached_content_token_count or 0, kind, "cached")
+
+
+_service: Optional[GeminiExpenseParserService] = None
+
+
+def get_parser_service() -> GeminiExpenseParserService:
+    """FastAPI dependency returning the process-wide parser service."""
+    global _service
+    if _service is None:
+        _service = GeminiExpenseParserService()
+    return _service
+
+
+async def start_parser_service() -> None:
+    await start_gemini_client(warmup_model=get_model_router().primary)
+    get_parser_service()
+
+
+async def stop_parser_service() -> None:
+    global _service
+    _service = None
+    await stop_prompt_cache()
+    await stop_gemini_client()
+    shutdown_preprocess_pool()
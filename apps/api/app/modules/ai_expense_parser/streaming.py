@@ -0,0 +1,21 @@
+import json
+from typing import Any, AsyncIterator, Dict, Tuple
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream into one response
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def ndjson_line(data: Dict[str, Any]) -> str:
+    return json.dumps(data) + "\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield sse_event(event, data)
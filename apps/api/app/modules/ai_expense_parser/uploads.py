@@ -0,0 +1,145 @@
+from typing import FrozenSet, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from app.clients.s3_client import ObjectStore
+from app.core.telemetry import span
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_AUDIO_BYTES = 15 * 1024 * 1024
+MAX_BATCH_FILES = 50
+MAX_BATCH_BYTES = 100 * 1024 * 1024
+# Statements are streamed row by row, so the cap only bounds how long one import runs
+MAX_STATEMENT_BYTES = 200 * 1024 * 1024
+
+SNIFF_BYTES = 64
+CHUNK_SIZE = 256 * 1024
+
+IMAGE_MIME_TYPES: FrozenSet[str] = frozenset({
+    "image/jpeg", "image/png", "image/webp", "image/gif", "image/heic", "image/avif",
+})
+AUDIO_MIME_TYPES: FrozenSet[str] = frozenset({
+    "audio/webm", "audio/ogg", "audio/wav", "audio/mpeg", "audio/aac", "audio/flac", "audio/mp4", "audio/aiff",
+})
+
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1"}
+_MP4_AUDIO_BRANDS = {b"M4A ", b"M4B ", b"mp41", b"mp42", b"isom", b"iso2", b"iso5", b"iso6", b"dash"}
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """
+    Identifies the real file type from its leading magic bytes.
+    Returns None for anything that is not a supported image or audio format.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"GIF87a") or head.startswith(b"GIF89a"):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head.startswith(b"FORM") and head[8:12] in (b"AIFF", b"AIFC"):
+        return "audio/aiff"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in _HEIF_BRANDS:
+            return "image/heic"
+        if brand in (b"avif", b"avis"):
+            return "image/avif"
+        if brand in _MP4_AUDIO_BRANDS:
+            return "audio/mp4"
+        return None
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "audio/webm"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"ID3"):
+        return "audio/mpeg"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # Frame sync: layer bits 00 mean an ADTS AAC stream, anything else is MPEG audio
+        return "audio/aac" if head[1] & 0x06 == 0 else "audio/mpeg"
+    return None
+
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: int,
+    allowed_types: FrozenSet[str],
+    invalid_detail: str,
+) -> Tuple[bytes, str]:
+    """
+    Reads an upload after validating it, returning (contents, sniffed_mime_type).
+
+    The size is checked against the spooled size before anything is loaded,
+    the type is taken from the magic bytes rather than the client's
+    content_type, and the body is read in bounded chunks when the size is unknown.
+    """
+    with span("upload_read"):
+        return await _read_upload(file, max_bytes, allowed_types, invalid_detail)
+
+
+async def _read_upload(
+    file: UploadFile,
+    max_bytes: int,
+    allowed_types: FrozenSet[str],
+    invalid_detail: str,
+) -> Tuple[bytes, str]:
+    too_large = HTTPException(status_code=413, detail=f"File too large. Max {max_bytes // (1024 * 1024)}MB.")
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    head = await file.read(SNIFF_BYTES)
+    mime_type = sniff_mime(head)
+    if mime_type not in allowed_types:
+        raise HTTPException(status_code=400, detail=invalid_detail)
+
+    await file.seek(0)
+    if file.size is not None:
+        return await file.read(), mime_type
+
+    buf = bytearray()
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise too_large
+    return bytes(buf), mime_type
+
+
+async def read_stored_upload(
+    store: ObjectStore,
+    key: str,
+    max_bytes: int,
+    allowed_types: FrozenSet[str],
+    invalid_detail: str,
+) -> Tuple[bytes, str]:
+    """
+    read_upload for a file the client put in object storage directly: streams
+    it in chunks, checking the magic bytes on the first chunk and the size as
+    it goes, so a wrong or oversized file is rejected without downloading it
+    all. Raises 410 when the object is gone.
+    """
+    with span("upload_read"):
+        buf = bytearray()
+        chunks = store.iter_chunks(key, CHUNK_SIZE)
+        try:
+            async for chunk in chunks:
+                if not buf and sniff_mime(chunk[:SNIFF_BYTES]) not in allowed_types:
+                    raise HTTPException(status_code=400, detail=invalid_detail)
+                buf += chunk
+                if len(buf) > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large. Max {max_bytes // (1024 * 1024)}MB.")
+        except FileNotFoundError:
+            raise HTTPException(status_code=410, detail="Upload is no longer available.")
+        finally:
+            await chunks.aclose()
+        if not buf:
+            raise HTTPException(status_code=400, detail=invalid_detail)
+        return bytes(buf), sniff_mime(bytes(buf[:SNIFF_BYTES]))
@@ -0,0 +1,298 @@
+import math
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.telemetry import REGISTRY
+from app.domain.value_objects.money import minor_exponent
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.pipelines.categorizer.rules import match_category, merchant_tokens
+from app.schemas.expense import Expense
+from . import rules
+
+DEFAULT_MAX_USERS = 10_000
+DEFAULT_MAX_MERCHANTS_PER_USER = 5_000
+# EWMA levels are computed this many expenses at a time in batch mode; the
+# (1 - alpha) ** -k factors stay far from overflow at this size
+EWMA_BLOCK = 128
+
+_CATEGORY_CODES = {category: code for code, category in enumerate(ALLOWED_CATEGORIES)}
+
+
+def category_code(category: str) -> int:
+    code = _CATEGORY_CODES.get(category)
+    return code if code is not None else _CATEGORY_CODES[match_category(category)]
+
+
+def merchant_key(expense: Expense) -> str:
+    return " ".join(merchant_tokens(expense.merchant or expense.title or ""))
+
+
+@dataclass
+class AnomalyScore:
+    zScore: float
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.reasons)
+
+
+class UserStats:
+    """
+    One user's running statistics: per category the count, mean and sum of
+    squared deviations of log amounts (Welford) and an EWMA level, plus how
+    often each merchant was seen, least recently seen first.
+    """
+
+    def __init__(self):
+        n = len(ALLOWED_CATEGORIES)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.ewma = np.zeros(n)
+        self.merchants: "OrderedDict[str, int]" = OrderedDict()
+
+    def learn(self, code: int, x: float, merchant: str) -> None:
+        count = int(self.count[code])
+        self.count[code], self.mean[code], self.m2[code] = rules.welford_update(count, self.mean[code], self.m2[code], x)
+        self.ewma[code] = x if count == 0 else self.ewma[code] + rules.EWMA_ALPHA * (x - self.ewma[code])
+        if merchant:
+            self.merchants[merchant] = self.merchants.pop(merchant, 0) + 1
+
+    def forget(self, code: int, x: float, merchant: str) -> None:
+        """Takes a deleted expense back out. The EWMA only moves forward, so it keeps the expense's influence."""
+        self.count[code], self.mean[code], self.m2[code] = rules.welford_remove(
+            int(self.count[code]), self.mean[code], self.m2[code], x
+        )
+        seen = self.merchants.get(merchant, 0)
+        if seen > 1:
+            self.merchants[merchant] = seen - 1
+        else:
+            self.merchants.pop(merchant, None)
+
+    def prune(self, max_merchants: int) -> None:
+        """Evicts the least recently seen merchants once the table outgrows its cap."""
+        while len(self.merchants) > max_merchants:
+            self.merchants.popitem(last=False)
+
+
+def ewma_levels(x: np.ndarray, level: float, alpha: float = rules.EWMA_ALPHA) -> np.ndarray:
+    """
+    The EWMA level after each value of `x`, starting from `level`, without a
+    Python loop per value: within a block, level_k = d**k * (level + alpha *
+    sum(x_i * d**-i for i <= k)) with d = 1 - alpha, which is a cumsum.
+    """
+    out = np.empty(len(x))
+    decay = 1.0 - alpha
+    for start in range(0, len(x), EWMA_BLOCK):
+        chunk = x[start:start + EWMA_BLOCK]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = powers * (level + np.cumsum(alpha * chunk / powers))
+        level = out[start + len(chunk) - 1]
+    return out
+
+
+def _group_positions(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For codes sorted into groups: each row's position within its group, the
+    index of its group's first row, and the first row of every group.
+    """
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.empty(0, dtype=np.intp)
+    first = np.repeat(starts, np.diff(np.r_[starts, n]))
+    return np.arange(n) - first, first, starts
+
+
+class AnomalyEngine:
+    """
+    Flags unusual expenses against per-user, per-category running statistics.
+    `observe` scores one expense in O(1) against what came before it and then
+    folds it into the stats; `observe_batch` does the same for a whole
+    history at once with NumPy, for backfills and bulk imports, and leaves
+    the stats exactly where one-by-one observation would.
+    """
+
+    def __init__(self, max_users: int = DEFAULT_MAX_USERS, max_merchants_per_user: int = DEFAULT_MAX_MERCHANTS_PER_USER):
+        self.max_users = max_users
+        self.max_merchants_per_user = max_merchants_per_user
+        self._users: "OrderedDict[str, UserStats]" = OrderedDict()
+        self.flagged = {name: 0 for name in rules.REASONS.values()}
+        self.scored = 0
+
+    def _stats(self, user_id: str) -> UserStats:
+        stats = self._users.get(user_id)
+        if stats is None:
+            stats = self._users[user_id] = UserStats()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return stats
+
+    def _count(self, masks) -> None:
+        if isinstance(masks, int):
+            if masks:
+                for bit, name in rules.REASONS.items():
+                    self.flagged[name] += bool(masks & bit)
+            return
+        for bit, name in rules.REASONS.items():
+            self.flagged[name] += int(np.count_nonzero(np.bitwise_and(masks, bit)))
+
+    @staticmethod
+    def _features(expense: Expense) -> Tuple[int, float, str]:
+        """(category code, log amount, merchant key)"""
+        # Rounded half to even like to_minor_each in batch mode, so both paths see the same amounts
+        x = math.log(max(round(expense.amount * 10 ** minor_exponent(expense.currency)), 1))
+        return category_code(expense.category), x, merchant_key(expense)
+
+    @staticmethod
+    def _flags(stats: Optional[UserStats], code: int, x: float, key: str) -> Tuple[float, int]:
+        stats = stats or UserStats()
+        z, mask = rules.flags(
+            x, stats.count[code], stats.mean[code], stats.m2[code], stats.ewma[code],
+            stats.merchants.get(key, 0) if key else 1,
+        )
+        return float(z), int(mask)
+
+    def score(self, user_id: str, expense: Expense) -> AnomalyScore:
+        """Scores without learning from the expense, e.g. a parse the user has not saved yet."""
+        z, mask = self._flags(self._users.get(user_id), *self._features(expense))
+        return AnomalyScore(z, rules.reasons(mask))
+
+    def observe(self, user_id: str, expense: Expense) -> AnomalyScore:
+        """Scores the expense against the user's stats so far, then learns from it."""
+        code, x, key = self._features(expense)
+        stats = self._stats(user_id)
+        z, mask = self._flags(stats, code, x, key)
+        stats.learn(code, x, key)
+        stats.prune(self.max_merchants_per_user)
+        self.scored += 1
+        self._count(mask)
+        return AnomalyScore(z, rules.reasons(mask))
+
+    def learn(self, user_id: str, expense: Expense) -> None:
+        stats = self._stats(user_id)
+        stats.learn(*self._features(expense))
+        stats.prune(self.max_merchants_per_user)
+
+    def forget(self, user_id: str, expense: Expense) -> None:
+        stats = self._users.get(user_id)
+        if stats is not None:
+            stats.forget(*self._features(expense))
+
+    def reset(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+    def observe_batch(
+        self,
+        user_id: str,
+        amount_minor: np.ndarray,
+        categories: np.ndarray,
+        merchants: Sequence[str],
+        days: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized observe over many expenses, in date order (ties keep their
+        input order). Each one is scored against the stats before it, i.e.
+        the current stats merged with the batch's earlier rows. Returns
+        (z-scores, REASONS bitmasks) in input order.
+        """
+        n = len(amount_minor)
+        stats = self._stats(user_id)
+        if n == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        chronological = np.argsort(days, kind="stable") if days is not None else np.arange(n)
+
+        # Prior sightings of each merchant: earlier stats plus earlier rows here
+        keys = [merchants[i] for i in chronological.tolist()]
+        index: Dict[str, int] = {}
+        merchant_codes = np.array([index.setdefault(key, len(index)) for key in keys], dtype=np.int64)
+        by_merchant = np.argsort(merchant_codes, kind="stable")
+        seen_in_batch = np.empty(n, dtype=np.int64)
+        seen_in_batch[by_merchant] = _group_positions(merchant_codes[by_merchant])[0]
+        seen_before = np.array([stats.merchants.get(key, 0) if key else 1 for key in index])
+        seen = seen_before[merchant_codes] + seen_in_batch
+
+        # Chronological within each category
+        by_category = np.argsort(np.asarray(categories)[chronological], kind="stable")
+        order, seen = chronological[by_category], seen[by_category]
+        x = rules.log_amount(np.asarray(amount_minor, dtype=np.int64)[order])
+        codes = np.asarray(categories, dtype=np.int64)[order]
+        position, first, starts = _group_positions(codes)
+
+        # Stats of the earlier rows of the same category in this batch, from
+        # cumulative sums minus the sums before the category's first row
+        sums, squares = np.cumsum(x) - x, np.cumsum(x * x) - x * x
+        prior_sum, prior_sq = sums - sums[first], squares - squares[first]
+        prior_mean = prior_sum / np.maximum(position, 1)
+        prior_m2 = np.maximum(prior_sq - position * prior_mean * prior_mean, 0.0)
+        count, mean, m2 = rules.combine(
+            stats.count[codes], stats.mean[codes], stats.m2[codes], position, prior_mean, prior_m2
+        )
+
+        ewma = np.empty(n)
+        for start, end in zip(starts.tolist(), np.r_[starts[1:], n].tolist()):
+            code = codes[start]
+            level = stats.ewma[code] if stats.count[code] else x[start]
+            levels = ewma_levels(x[start:end], level)
+            ewma[start] = level
+            ewma[start + 1:end] = levels[:-1]
+            stats.ewma[code] = levels[-1]
+
+        z, mask = rules.flags(x, count, mean, m2, ewma, seen)
+
+        # Fold the batch into the stats
+        totals = np.bincount(codes, minlength=len(ALLOWED_CATEGORIES))
+        safe = np.maximum(totals, 1)
+        batch_mean = np.bincount(codes, weights=x, minlength=len(ALLOWED_CATEGORIES)) / safe
+        batch_m2 = np.bincount(codes, weights=(x - batch_mean[codes]) ** 2, minlength=len(ALLOWED_CATEGORIES))
+        stats.count, stats.mean, stats.m2 = rules.combine(stats.count, stats.mean, stats.m2, totals, batch_mean, batch_m2)
+        occurrences = dict(zip(index, np.bincount(merchant_codes).tolist()))
+        # Re-inserted in order of their last row, as one-by-one learning would leave them
+        for key in reversed(list(dict.fromkeys(reversed(keys)))):
+            if key:
+                stats.merchants[key] = stats.merchants.pop(key, 0) + occurrences[key]
+        stats.prune(self.max_merchants_per_user)
+
+        self.scored += n
+        self._count(mask)
+        z_out, mask_out = np.empty(n), np.empty(n, dtype=np.int64)
+        z_out[order], mask_out[order] = z, mask
+        return z_out, mask_out
+
+    def stats(self) -> Dict[str, int]:
+        return {"users": len(self._users), "scored": self.scored, **self.flagged}
+
+
+_engine: Optional[AnomalyEngine] = None
+
+
+def get_anomaly_engine() -> AnomalyEngine:
+    """
+    Process-wide engine. Stats live in memory, capped by ANOMALY_MAX_USERS and
+    ANOMALY_MAX_MERCHANTS_PER_USER; an evicted user's stats are rebuilt by a
+    backfill.
+    """
+    global _engine
+    if _engine is None:
+        _engine = AnomalyEngine(
+            max_users=int(os.getenv("ANOMALY_MAX_USERS", DEFAULT_MAX_USERS)),
+            max_merchants_per_user=int(os.getenv("ANOMALY_MAX_MERCHANTS_PER_USER", DEFAULT_MAX_MERCHANTS_PER_USER)),
+        )
+    return _engine
+
+
+def _flagged_samples():
+    if _engine is None:
+        return []
+    return [({"reason": reason}, n) for reason, n in _engine.flagged.items()]
+
+
+REGISTRY.callback(
+    "expense_anomalies_flagged_total", "counter",
+    "Saved expenses flagged as unusual, by the rule that fired.",
+    _flagged_samples,
+)
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Anomaly rules over per-category statistics of log amounts. Spend is roughly
+# log-normal, so on a log scale a 3-sigma outlier means "unusually large for
+# this category" whether the category is coffee or rent. Every function here
+# takes floats or NumPy arrays alike, so the streaming path (one expense,
+# scalars) and the batch path (whole histories, arrays) score identically.
+
+# Stats need this many earlier expenses in the category before anything is flagged
+MIN_HISTORY = 5
+Z_THRESHOLD = 3.0
+# Floor on the standard deviation, so a run of identical amounts does not
+# make every small difference infinitely unusual (0.05 ~ 5% of the amount)
+MIN_STD = 0.05
+EWMA_ALPHA = 0.1
+# Flag amounts this many times the category's recent (EWMA) level
+SPIKE_RATIO = 4.0
+_LOG_SPIKE_RATIO = float(np.log(SPIKE_RATIO))
+# The recent-level and new-merchant rules also need the amount to be this
+# unusual overall; alone they fire on every ordinary wide-spread category
+SUPPORTING_Z = 2.0
+
+AMOUNT_OUTLIER = 1
+ABOVE_RECENT_LEVEL = 2
+NEW_MERCHANT = 4
+REASONS = {
+    AMOUNT_OUTLIER: "amount_outlier",
+    ABOVE_RECENT_LEVEL: "above_recent_level",
+    NEW_MERCHANT: "new_merchant",
+}
+
+
+def log_amount(amount_minor):
+    """The scale the stats are kept on; amounts below one minor unit count as one."""
+    return np.log(np.maximum(amount_minor, 1))
+
+
+def welford_update(count, mean, m2, x):
+    """Adds x to (count, mean, sum of squared deviations)."""
+    count = count + 1
+    delta = x - mean
+    mean = mean + delta / count
+    return count, mean, m2 + delta * (x - mean)
+
+
+def welford_remove(count, mean, m2, x):
+    """Inverse of welford_update, for a deleted expense."""
+    if count <= 1:
+        return 0, 0.0, 0.0
+    new_mean = (count * mean - x) / (count - 1)
+    return count - 1, new_mean, max(m2 - (x - mean) * (x - new_mean), 0.0)
+
+
+def combine(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Chan et al.'s merge of two Welford states; elementwise over arrays."""
+    count = count_a + count_b
+    safe = np.maximum(count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / safe
+    m2 = m2_a + m2_b + delta * delta * count_a * count_b / safe
+    return count, mean, m2
+
+
+def zscore(x, count, mean, m2):
+    std = np.sqrt(m2 / np.maximum(count - 1, 1))
+    return (x - mean) / np.maximum(std, MIN_STD)
+
+
+def flags(x, count, mean, m2, ewma, merchant_count):
+    """
+    (z-score, bitmask of REASONS) for log amount x against the stats of the
+    expenses before it: the category's count, mean, m2 and EWMA level, and
+    how often the merchant was seen.
+    """
+    z = zscore(x, count, mean, m2)
+    warm = count >= MIN_HISTORY
+    # bool * bit rather than np.where, which is slow on the scalar path
+    mask = (
+        AMOUNT_OUTLIER * (warm & (z >= Z_THRESHOLD))
+        | ABOVE_RECENT_LEVEL * (warm & (x - ewma >= _LOG_SPIKE_RATIO) & (z >= SUPPORTING_Z))
+        | NEW_MERCHANT * (warm & (merchant_count == 0) & (z >= SUPPORTING_Z))
+    )
+    return z, mask
+
+
+def reasons(mask: int):
+    return [name for bit, name in REASONS.items() if mask & bit]
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Speech only needs 16 kHz mono. Silence is detected on 20 ms frames: a frame
+# counts as voiced when its RMS is within SILENCE_THRESHOLD_DB of the loudest
+# frame and above an absolute floor. PAD_MS of context is kept either side.
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+SILENCE_THRESHOLD_DB = -35.0
+ABSOLUTE_FLOOR_DB = -55.0
+PAD_MS = 250
+MAX_OUTPUT_SECONDS = 60.0
+# Decoding stops this far past the cap, leaving room for leading silence to be
+# trimmed before the capped window starts
+DECODE_HEADROOM_SECONDS = 15.0
+OPUS_BITRATE = "24k"
+FFMPEG_TIMEOUT_SECONDS = 30
+
+
+@dataclass
+class PreprocessedAudio:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    duration_seconds: float
+    trimmed_seconds: float
+    changed: bool
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+
+def _ffmpeg() -> Optional[str]:
+    return shutil.which(os.getenv("FFMPEG_BINARY", "ffmpeg"))
+
+
+def _lowpass(samples: np.ndarray, cutoff: float, taps: int = 63) -> np.ndarray:
+    # Windowed-sinc FIR; cutoff is a fraction of the input sample rate
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel, mode="same")
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    if rate == target_rate or samples.size == 0:
+        return samples
+    if rate > target_rate:
+        samples = _lowpass(samples, 0.45 * target_rate / rate)
+    out_len = int(samples.size * target_rate / rate)
+    positions = np.arange(out_len) * (rate / target_rate)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def _decode_wav(data: bytes, max_seconds: Optional[float] = None) -> Optional[np.ndarray]:
+    with wave.open(io.BytesIO(data)) as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        frames = w.getnframes() if max_seconds is None else min(w.getnframes(), int(max_seconds * rate))
+        raw = w.readframes(frames)
+    if width == 1:
+        pcm = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        pcm = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        pcm = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        return None
+    mono = pcm.reshape(-1, channels).mean(axis=1)
+    return resample(mono, rate)
+
+
+def _decode_ffmpeg(data: bytes, ffmpeg: str, max_seconds: Optional[float] = None) -> Optional[np.ndarray]:
+    # -t stops ffmpeg after max_seconds of output, so a long recording is never decoded in full
+    limit = [] if max_seconds is None else ["-t", f"{max_seconds:g}"]
+    # A temp file rather than a pipe: mp4 recordings often keep their index at the end
+    with tempfile.NamedTemporaryFile() as src:
+        src.write(data)
+        src.flush()
+        proc = subprocess.run(
+            [ffmpeg, "-v", "error", "-i", src.name, *limit, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT_SECONDS,
+        )
+    if proc.returncode != 0:
+        return None
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768
+
+
+def decode(data: bytes, mime_type: str, max_seconds: Optional[float] = None) -> Optional[np.ndarray]:
+    """
+    Decodes to float32 mono at SAMPLE_RATE, or None when no decoder is
+    available. Only the first max_seconds are decoded when it is given.
+    """
+    ffmpeg = _ffmpeg()
+    if ffmpeg:
+        return _decode_ffmpeg(data, ffmpeg, max_seconds)
+    if mime_type == "audio/wav":
+        return _decode_wav(data, max_seconds)
+    return None
+
+
+def voiced_bounds(samples: np.ndarray, rate: int = SAMPLE_RATE) -> Tuple[int, int]:
+    """
+    Sample range that contains speech, found with a vectorized frame-energy gate.
+    Falls back to the whole signal when nothing crosses the gate.
+    """
+    frame = rate * FRAME_MS // 1000
+    n_frames = samples.size // frame
+    if n_frames == 0:
+        return 0, samples.size
+
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    rms_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+    threshold = max(rms_db.max() + SILENCE_THRESHOLD_DB, ABSOLUTE_FLOOR_DB)
+    voiced = np.flatnonzero(rms_db > threshold)
+    if voiced.size == 0:
+        return 0, samples.size
+
+    pad = rate * PAD_MS // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(samples.size, (voiced[-1] + 1) * frame + pad)
+    return start, end
+
+
+def _encode_wav(samples: np.ndarray) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def _encode_opus(samples: np.ndarray, ffmpeg: str) -> Optional[bytes]:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    try:
+        proc = subprocess.run(
+            [ffmpeg, "-v", "error", "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+             "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+            input=pcm,
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT_SECONDS,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        # A slow or missing encoder falls back to WAV rather than failing the parse
+        return None
+    return proc.stdout if proc.returncode == 0 else None
+
+
+def preprocess_audio(data: bytes, mime_type: str, max_seconds: float = MAX_OUTPUT_SECONDS) -> PreprocessedAudio:
+    """
+    Decode -> mono 16 kHz -> trim leading/trailing silence -> cap duration -> re-encode.
+
+    Re-encodes to Ogg/Opus when ffmpeg is available and to 16-bit WAV otherwise.
+    Input that cannot be decoded, or (uncapped) output that is not smaller, is
+    passed through untouched. Decoding stops DECODE_HEADROOM_SECONDS past the
+    cap, so trimmed_seconds does not count audio beyond that.
+    """
+    unchanged = PreprocessedAudio(data, mime_type, len(data), 0.0, 0.0, changed=False)
+    try:
+        samples = decode(data, mime_type, max_seconds + DECODE_HEADROOM_SECONDS)
+    except Exception:
+        return unchanged
+    if samples is None or samples.size == 0:
+        return unchanged
+
+    start, end = voiced_bounds(samples)
+    capped = end - start > int(max_seconds * SAMPLE_RATE)
+    end = min(end, start + int(max_seconds * SAMPLE_RATE))
+    trimmed = samples[start:end]
+    duration = trimmed.size / SAMPLE_RATE
+    trimmed_seconds = (samples.size - trimmed.size) / SAMPLE_RATE
+
+    ffmpeg = _ffmpeg()
+    encoded, out_mime = (_encode_opus(trimmed, ffmpeg), "audio/ogg") if ffmpeg else (None, None)
+    if encoded is None:
+        encoded, out_mime = _encode_wav(trimmed), "audio/wav"
+
+    # The duration cap is a hard limit, so a capped recording is always replaced
+    if len(encoded) >= len(data) and not capped:
+        return PreprocessedAudio(data, mime_type, len(data), duration, 0.0, changed=False)
+    return PreprocessedAudio(encoded, out_mime, len(data), duration, trimmed_seconds, changed=True)
+
+
+async def preprocess_audio_async(data: bytes, mime_type: str) -> PreprocessedAudio:
+    """
+    Runs preprocess_audio on a worker thread. The heavy parts (ffmpeg subprocesses
+    and NumPy kernels) release the GIL, so a thread keeps the event loop free
+    without the pickling cost of a process pool.
+    """
+    return await asyncio.to_thread(preprocess_audio, data, mime_type)
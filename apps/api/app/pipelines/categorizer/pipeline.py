@@ -0,0 +1,230 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.telemetry import REGISTRY
+from app.modules.ai_expense_parser.normalizer import compute_confidence
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult
+from app.pipelines.screenshot_parser.pipeline import CATEGORY_NOT_DETECTED
+from . import rules
+
+DEFAULT_MAX_USERS = 10_000
+DEFAULT_MAX_MERCHANTS_PER_USER = 1_000
+
+
+class MerchantIndex:
+    """
+    Per-user merchant -> category map learned from expenses the user confirmed.
+    The latest confirmation for a merchant wins. Users are evicted least
+    recently used first, and each user keeps their most recent merchants.
+    """
+
+    def __init__(self, max_users: int = DEFAULT_MAX_USERS, max_merchants_per_user: int = DEFAULT_MAX_MERCHANTS_PER_USER):
+        self.max_users = max_users
+        self.max_merchants_per_user = max_merchants_per_user
+        # user id -> merchant key -> (category, confirmations)
+        self._users: "OrderedDict[str, OrderedDict[str, Tuple[str, int]]]" = OrderedDict()
+
+    def learn(self, user_id: str, key: str, category: str) -> None:
+        merchants = self._users.get(user_id)
+        if merchants is None:
+            merchants = self._users[user_id] = OrderedDict()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+
+        previous = merchants.pop(key, None)
+        confirmations = previous[1] + 1 if previous and previous[0] == category else 1
+        merchants[key] = (category, confirmations)
+        if len(merchants) > self.max_merchants_per_user:
+            merchants.popitem(last=False)
+
+    def lookup(self, user_id: str, tokens: Sequence[str]) -> Optional[str]:
+        """Category of the longest confirmed prefix of the merchant's tokens, as in rules.lookup_merchant."""
+        merchants = self._users.get(user_id)
+        if not merchants:
+            return None
+        for end in range(len(tokens), 0, -1):
+            entry = merchants.get(" ".join(tokens[:end]))
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def entries(self, user_id: str) -> List[Tuple[str, str, int]]:
+        merchants = self._users.get(user_id) or {}
+        return [(key, category, confirmations) for key, (category, confirmations) in merchants.items()]
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class Categorizer:
+    """
+    Category and payment-method resolution for parsed expenses. Free-text
+    labels go through the precompiled alias tables in `rules`; merchants are
+    looked up in the user's confirmed merchants first and the built-in list
+    of well-known merchants second, and a hit overrides the model's guess.
+    """
+
+    def __init__(self, merchants: Optional[MerchantIndex] = None):
+        self.merchants = merchants or MerchantIndex()
+        self.overrides = {"user": 0, "global": 0}
+
+    @staticmethod
+    def category(raw: str) -> str:
+        return rules.match_category(raw)
+
+    @staticmethod
+    def payment_method(raw: str) -> str:
+        return rules.match_payment_method(raw)
+
+    def merchant_category(self, merchant: Optional[str], user_id: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(category, "user" | "global") for a known merchant, else None."""
+        tokens = rules.merchant_tokens(merchant or "")
+        if not tokens:
+            return None
+        if user_id:
+            category = self.merchants.lookup(user_id, tokens)
+            if category:
+                return category, "user"
+        category = rules.lookup_merchant(rules.MERCHANT_INDEX, tokens)
+        return (category, "global") if category else None
+
+    def text_category(self, text: Optional[str], user_id: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        (category, "user" | "global") for a known merchant named anywhere in
+        free text, such as a statement narration ("UPI/DR/4123/SWIGGY/YESB"),
+        where merchant_category only looks at the start of the name.
+        """
+        tokens = rules.merchant_tokens(text or "")
+        if not tokens:
+            return None
+        if user_id:
+            for start in range(len(tokens)):
+                category = self.merchants.lookup(user_id, tokens[start:])
+                if category:
+                    return category, "user"
+        category = rules.longest_match(rules.MERCHANT_INDEX, tokens, rules.MERCHANT_MAX_TOKENS)
+        return (category, "global") if category else None
+
+    def learn(self, user_id: str, merchant: str, category: str) -> Optional[str]:
+        """
+        Records a confirmed expense. Returns the merchant key it was filed
+        under, or None when the merchant name has nothing to key on.
+        """
+        if category not in ALLOWED_CATEGORIES:
+            raise ValueError(f"unknown category {category!r}")
+        key = " ".join(rules.merchant_tokens(merchant))
+        if not key:
+            return None
+        self.merchants.learn(user_id, key, category)
+        return key
+
+    def apply(self, result: ExpenseAIResult, user_id: Optional[str] = None) -> ExpenseAIResult:
+        """
+        Overrides the parsed category when the merchant is known. Returns a
+        copy, never mutating `result`, since parse results are shared through
+        the cache.
+        """
+        expense = result.expense
+        hit = self.merchant_category(expense.merchant or expense.title, user_id)
+        if hit is None:
+            return result
+        category, source = hit
+        undetected = CATEGORY_NOT_DETECTED in result.warnings
+        if category == expense.category and not undetected:
+            return result
+
+        self.overrides[source] += 1
+        expense = expense.model_copy(update={"category": category})
+        return result.model_copy(update={
+            "expense": expense,
+            "confidence": compute_confidence(expense.model_dump()),
+            "warnings": [w for w in result.warnings if w != CATEGORY_NOT_DETECTED],
+        })
+
+    def recategorize(
+        self,
+        merchants: Sequence[Optional[str]],
+        categories: Sequence[Optional[str]],
+        user_id: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Bulk mode for historical expenses: the category for each row, from its
+        merchant when known, else from its stored category label. Rows repeat
+        the same few merchants and labels, so each distinct value is resolved
+        once and the answers are scattered back with numpy.
+        """
+        merchant_values, merchant_rows = np.unique(np.asarray([m or "" for m in merchants], dtype=str), return_inverse=True)
+        label_values, label_rows = np.unique(np.asarray([c or "" for c in categories], dtype=str), return_inverse=True)
+
+        by_merchant = np.array(
+            [(self.merchant_category(m, user_id) or ("",))[0] for m in merchant_values.tolist()], dtype=object
+        )
+        by_label = np.array([rules.match_category(c) for c in label_values.tolist()], dtype=object)
+
+        from_merchant = by_merchant[merchant_rows]
+        return np.where(from_merchant != "", from_merchant, by_label[label_rows])
+
+    def statement_categories(
+        self,
+        merchants: Sequence[Optional[str]],
+        descriptions: Sequence[Optional[str]],
+        labels: Sequence[Optional[str]],
+        user_id: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Bulk mode for imported statement rows: the category from a known
+        merchant in the merchant column or anywhere in the description, else
+        from the row's category label. Rows none of these place (the label is
+        missing or only says Misc) get "", for the caller to categorize some
+        other way. As in recategorize, each distinct value is resolved once.
+        """
+        def resolve(values: Sequence[Optional[str]], fn) -> np.ndarray:
+            unique, rows = np.unique(np.asarray([v or "" for v in values], dtype=str), return_inverse=True)
+            return np.array([fn(v) for v in unique.tolist()], dtype=object)[rows]
+
+        def from_label(label: str) -> str:
+            category = rules.match_category(label)
+            return "" if category == rules.DEFAULT_CATEGORY else category
+
+        by_merchant = resolve(merchants, lambda m: (self.merchant_category(m, user_id) or ("",))[0])
+        by_text = resolve(descriptions, lambda d: (self.text_category(d, user_id) or ("",))[0])
+        by_label = resolve(labels, from_label)
+        return np.where(by_merchant != "", by_merchant, np.where(by_text != "", by_text, by_label))
+
+    def stats(self) -> Dict[str, int]:
+        return {"users": len(self.merchants), **{f"{source}Overrides": n for source, n in self.overrides.items()}}
+
+
+_categorizer: Optional[Categorizer] = None
+
+
+def get_categorizer() -> Categorizer:
+    """
+    Process-wide categorizer. The merchant index is held in memory and sized
+    by CATEGORIZER_MAX_USERS and CATEGORIZER_MAX_MERCHANTS_PER_USER.
+    """
+    global _categorizer
+    if _categorizer is None:
+        _categorizer = Categorizer(MerchantIndex(
+            max_users=int(os.getenv("CATEGORIZER_MAX_USERS", DEFAULT_MAX_USERS)),
+            max_merchants_per_user=int(os.getenv("CATEGORIZER_MAX_MERCHANTS_PER_USER", DEFAULT_MAX_MERCHANTS_PER_USER)),
+        ))
+    return _categorizer
+
+
+def _override_samples():
+    if _categorizer is None:
+        return []
+    return [({"source": source}, n) for source, n in _categorizer.overrides.items()]
+
+
+REGISTRY.callback(
+    "expense_category_overrides_total", "counter",
+    "Parsed categories replaced from a known merchant: the user's confirmations or the built-in list.",
+    _override_samples,
+)
@@ -0,0 +1,186 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+
+# Alias tables for category and payment-method matching, plus well-known
+# merchants. Keys are folded with `fold` when the lookup indexes are built at
+# import, so entries here can be written naturally.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Lower-cases and collapses everything but letters and digits to single spaces."""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+CATEGORY_ALIASES = {
+    "Food & Dining": (
+        "food", "dining", "food and dining", "restaurant", "restaurants", "cafe", "coffee", "meal", "meals",
+        "lunch", "dinner", "breakfast", "snacks", "takeaway", "food delivery", "eating out",
+    ),
+    "Transport": (
+        "transport", "transportation", "travel", "commute", "cab", "taxi", "auto", "rickshaw", "fuel", "petrol",
+        "diesel", "parking", "toll", "metro", "bus", "train", "flight", "ride",
+    ),
+    "Shopping": (
+        "shopping", "shop", "clothes", "clothing", "apparel", "electronics", "gadgets", "online shopping",
+        "fashion", "accessories", "gifts",
+    ),
+    "Bills & Utilities": (
+        "bills", "bill", "utilities", "utility", "bills and utilities", "electricity", "water", "gas",
+        "internet", "broadband", "mobile", "recharge", "phone", "dth", "insurance", "subscription",
+    ),
+    "Entertainment": (
+        "entertainment", "movies", "movie", "cinema", "streaming", "games", "gaming", "music", "concert",
+        "events", "leisure",
+    ),
+    "Health & Wellness": (
+        "health", "wellness", "health and wellness", "medical", "medicine", "medicines", "pharmacy",
+        "doctor", "hospital", "clinic", "fitness", "gym", "healthcare",
+    ),
+    "Rent": ("rent", "housing", "house rent", "lease", "accommodation"),
+    "Groceries": ("groceries", "grocery", "supermarket", "vegetables", "fruits", "provisions", "kirana"),
+    "Misc": ("misc", "miscellaneous", "other", "others", "general", "uncategorized", "unknown"),
+}
+
+PAYMENT_METHOD_ALIASES = {
+    "UPI": ("upi", "gpay", "g pay", "google pay", "phonepe", "phone pe", "paytm", "bhim", "upi id", "vpa"),
+    "Card": (
+        "card", "credit card", "debit card", "credit", "debit", "visa", "mastercard", "master card", "rupay",
+        "amex", "american express", "maestro", "pos", "swipe",
+    ),
+    "NetBanking": (
+        "netbanking", "net banking", "internet banking", "online banking", "bank transfer", "neft", "imps",
+        "rtgs", "wire transfer",
+    ),
+    "Cash": ("cash", "cod", "cash on delivery"),
+}
+
+# Merchants common enough to categorize for every user; a user's own confirmations take precedence
+MERCHANT_CATEGORIES = {
+    "Food & Dining": (
+        "zomato", "swiggy", "eatsure", "dominos", "domino s", "pizza hut", "mcdonalds", "mcdonald s", "kfc",
+        "burger king", "subway", "starbucks", "cafe coffee day", "ccd", "chaayos", "haldiram", "haldirams",
+        "barbeque nation",
+    ),
+    "Transport": (
+        "uber", "ola", "rapido", "namma yatri", "irctc", "indigo", "air india", "vistara", "spicejet", "redbus",
+        "indian oil", "iocl", "bharat petroleum", "bpcl", "hindustan petroleum", "hpcl", "fastag",
+    ),
+    "Shopping": (
+        "amazon", "flipkart", "myntra", "ajio", "meesho", "nykaa", "croma", "reliance digital", "decathlon",
+        "ikea", "tata cliq", "westside", "zara",
+    ),
+    "Groceries": (
+        "bigbasket", "big basket", "blinkit", "zepto", "instamart", "swiggy instamart", "dmart", "d mart",
+        "jiomart", "reliance fresh", "spencers", "nature s basket", "star bazaar",
+    ),
+    "Bills & Utilities": (
+        "airtel", "jio", "vodafone idea", "bsnl", "act fibernet", "tata power", "adani electricity",
+        "bescom", "mahanagar gas", "tata play",
+    ),
+    "Entertainment": (
+        "netflix", "hotstar", "disney hotstar", "prime video", "spotify", "youtube premium", "bookmyshow",
+        "pvr", "inox", "sony liv", "zee5", "steam",
+    ),
+    "Health & Wellness": (
+        "apollo pharmacy", "apollo", "pharmeasy", "netmeds", "1mg", "tata 1mg", "practo", "cult fit", "cultfit",
+        "medplus",
+    ),
+}
+
+# Legal-form suffixes that do not identify a merchant: "Zomato Ltd", "Bundl Technologies Pvt. Ltd."
+MERCHANT_NOISE = frozenset({"pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp"})
+
+
+def build_index(aliases: Mapping[str, Iterable[str]]) -> Dict[str, str]:
+    """Folded alias -> canonical value; the canonical names index themselves."""
+    index: Dict[str, str] = {}
+    for canonical, names in aliases.items():
+        for name in (canonical, *names):
+            index.setdefault(fold(name), canonical)
+    return index
+
+
+def longest_match(index: Mapping[str, str], tokens: Sequence[str], max_tokens: int) -> Optional[str]:
+    """
+    First hit scanning left to right, preferring the longest run of tokens at
+    each position: a walk of a token trie done as at most `max_tokens` hash
+    lookups per token.
+    """
+    for start in range(len(tokens)):
+        for end in range(min(len(tokens), start + max_tokens), start, -1):
+            hit = index.get(" ".join(tokens[start:end]))
+            if hit is not None:
+                return hit
+    return None
+
+
+def merchant_tokens(name: str) -> List[str]:
+    """Folded merchant name without legal-form suffixes; "Zomato@paytm" -> ["zomato", "paytm"]."""
+    return [token for token in fold(name).split() if token not in MERCHANT_NOISE]
+
+
+def lookup_merchant(index: Mapping[str, str], tokens: Sequence[str]) -> Optional[str]:
+    """
+    Longest known prefix of the merchant's tokens, so "Swiggy Instamart" and
+    "Swiggy Order 4411" resolve differently while both start from "swiggy".
+    """
+    for end in range(len(tokens), 0, -1):
+        hit = index.get(" ".join(tokens[:end]))
+        if hit is not None:
+            return hit
+    return None
+
+
+def _max_tokens(index: Mapping[str, str]) -> int:
+    return max(len(key.split()) for key in index)
+
+
+CATEGORY_INDEX = build_index(CATEGORY_ALIASES)
+PAYMENT_METHOD_INDEX = build_index(PAYMENT_METHOD_ALIASES)
+MERCHANT_INDEX = {" ".join(merchant_tokens(name)): category
+                  for category, names in MERCHANT_CATEGORIES.items() for name in names}
+_CATEGORY_MAX_TOKENS = _max_tokens(CATEGORY_INDEX)
+_PAYMENT_METHOD_MAX_TOKENS = _max_tokens(PAYMENT_METHOD_INDEX)
+MERCHANT_MAX_TOKENS = _max_tokens(MERCHANT_INDEX)
+_FOLDED_CATEGORIES: Tuple[Tuple[str, str], ...] = tuple((fold(c), c) for c in ALLOWED_CATEGORIES)
+
+DEFAULT_CATEGORY = "Misc"
+DEFAULT_PAYMENT_METHOD = "Cash"
+
+
+@lru_cache(maxsize=4096)
+def match_category(raw: str) -> str:
+    """
+    Maps free text from the model to an allowed category: exact alias, then
+    any aliased word or phrase in it, then a partial word ("groc"), else Misc.
+    Model output repeats a lot, so answers are memoized.
+    """
+    key = fold(raw)
+    if not key:
+        return DEFAULT_CATEGORY
+    hit = CATEGORY_INDEX.get(key) or longest_match(CATEGORY_INDEX, key.split(), _CATEGORY_MAX_TOKENS)
+    if hit:
+        return hit
+    for folded, category in _FOLDED_CATEGORIES:
+        if key in folded or folded in key:
+            return category
+    return DEFAULT_CATEGORY
+
+
+@lru_cache(maxsize=1024)
+def match_payment_method(raw: str) -> str:
+    """Maps free text to an allowed payment method ("HDFC credit card" -> Card), else Cash."""
+    key = fold(raw)
+    if not key:
+        return DEFAULT_PAYMENT_METHOD
+    return (
+        PAYMENT_METHOD_INDEX.get(key)
+        or longest_match(PAYMENT_METHOD_INDEX, key.split(), _PAYMENT_METHOD_MAX_TOKENS)
+        or DEFAULT_PAYMENT_METHOD
+    )
+
@@ -0,0 +1,82 @@
+from typing import Dict, List, Sequence
+
+from app.schemas.insight import Insight, MonthlyRollup
+from . import templates
+
+# Months before the reported one that category spend is compared against
+TRAILING_MONTHS = 3
+MIN_TOTAL_CHANGE = 0.05
+MIN_CATEGORY_CHANGE = 0.25
+# Category moves smaller than this share of the month's spend are not worth a message
+MIN_CATEGORY_SHARE = 0.05
+MAX_CATEGORY_INSIGHTS = 3
+
+
+class InsightsEngine:
+    """
+    Turns monthly rollups into short insights about one month: its largest
+    category, the change in total spend from the month before, and the
+    categories that moved most against their trailing average. It only sees
+    the month's rollup and the TRAILING_MONTHS before it, so its cost does
+    not depend on how many expenses the user has.
+    """
+
+    def generate(self, month: MonthlyRollup, previous: Sequence[MonthlyRollup]) -> List[Insight]:
+        """`previous` holds the months before `month`, most recent first."""
+        if not month.count:
+            return []
+        label = templates.format_month(month.month)
+
+        def money(amount: float) -> str:
+            return templates.format_amount(amount, month.currency)
+
+        top = month.byCategory[0]
+        insights = [Insight(
+            kind="top_category", category=top.key, amount=top.amount,
+            message=templates.TOP_CATEGORY.format(
+                category=top.key, month=label, amount=money(top.amount), share=top.amount / month.total,
+            ),
+        )]
+
+        if previous and previous[0].total > 0:
+            before = previous[0]
+            change = month.total / before.total - 1
+            if abs(change) >= MIN_TOTAL_CHANGE:
+                template = templates.MONTH_UP if change > 0 else templates.MONTH_DOWN
+                insights.append(Insight(
+                    kind="month_over_month", amount=month.total, change=round(change, 4),
+                    message=template.format(
+                        month=label, previous=templates.format_month(before.month), change=abs(change),
+                        amount=money(month.total), baseline=money(before.total),
+                    ),
+                ))
+
+        if previous:
+            baselines: Dict[str, float] = {}
+            for rollup in previous:
+                for bucket in rollup.byCategory:
+                    baselines[bucket.key] = baselines.get(bucket.key, 0.0) + bucket.amount / len(previous)
+            current = {bucket.key: bucket.amount for bucket in month.byCategory}
+            moves = []
+            for category, baseline in baselines.items():
+                amount = current.get(category, 0.0)
+                change = amount / baseline - 1
+                if abs(change) >= MIN_CATEGORY_CHANGE and abs(amount - baseline) >= MIN_CATEGORY_SHARE * month.total:
+                    moves.append((abs(amount - baseline), category, amount, baseline, change))
+            for _, category, amount, baseline, change in sorted(moves, reverse=True)[:MAX_CATEGORY_INSIGHTS]:
+                template = templates.CATEGORY_UP if change > 0 else templates.CATEGORY_DOWN
+                insights.append(Insight(
+                    kind="category_change", category=category, amount=amount, change=round(change, 4),
+                    message=template.format(
+                        category=category, month=label, change=abs(change), amount=money(amount),
+                        baseline=money(baseline),
+                    ),
+                ))
+        return insights
+
+
+_engine = InsightsEngine()
+
+
+def get_insights_engine() -> InsightsEngine:
+    return _engine
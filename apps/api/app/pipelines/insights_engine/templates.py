@@ -0,0 +1,21 @@
+import calendar
+
+from app.domain.value_objects.money import minor_exponent
+
+# Message templates for the insights engine; amounts are pre-formatted strings
+
+TOP_CATEGORY = "{category} was your biggest expense in {month}: {amount} ({share:.0%} of your spending)."
+CATEGORY_UP = "You spent {change:.0%} more on {category} in {month} than your recent average ({amount} vs {baseline})."
+CATEGORY_DOWN = "You spent {change:.0%} less on {category} in {month} than your recent average ({amount} vs {baseline})."
+MONTH_UP = "Your spending in {month} was {change:.0%} higher than in {previous} ({amount} vs {baseline})."
+MONTH_DOWN = "Your spending in {month} was {change:.0%} lower than in {previous} ({amount} vs {baseline})."
+
+
+def format_amount(amount: float, currency: str) -> str:
+    return f"{currency} {amount:,.{minor_exponent(currency)}f}"
+
+
+def format_month(label: str) -> str:
+    """"May 2024" for "2024-05"."""
+    year, month = label.split("-")
+    return f"{calendar.month_name[int(month)]} {year}"
@@ -0,0 +1,110 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+# A receipt stays legible to the model well below camera resolution. The long
+# edge is scaled to TARGET_LONG_EDGE, but never so far that the short edge
+# (the text line width) drops under MIN_SHORT_EDGE, which matters for long,
+# narrow till rolls.
+TARGET_LONG_EDGE = 1600
+MIN_SHORT_EDGE = 720
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+
+OUTPUT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreprocessedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    width: int
+    height: int
+    changed: bool
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+
+def _target_size(width: int, height: int, target_long_edge: int, min_short_edge: int):
+    long_edge, short_edge = max(width, height), min(width, height)
+    scale = target_long_edge / long_edge
+    if short_edge * scale < min_short_edge:
+        scale = min_short_edge / short_edge
+    if scale >= 1.0:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def preprocess_receipt_image(
+    data: bytes,
+    mime_type: str,
+    target_long_edge: int = TARGET_LONG_EDGE,
+    min_short_edge: int = MIN_SHORT_EDGE,
+    output_format: str = "JPEG",
+) -> PreprocessedImage:
+    """
+    Shrinks a receipt photo before it is sent to the model:
+    EXIF auto-rotate -> grayscale -> autocontrast -> document-aware downscale
+    -> JPEG/WebP recompression.
+
+    Anything Pillow cannot decode, or an output that would not be smaller,
+    is passed through untouched so preprocessing never fails a parse.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # Let the JPEG decoder do most of the downscale (DCT scaling) and skip colour
+            if img.format == "JPEG":
+                img.draft("L", _target_size(img.width, img.height, target_long_edge, min_short_edge))
+            img = ImageOps.exif_transpose(img)
+            img = ImageOps.grayscale(img)
+            img = ImageOps.autocontrast(img, cutoff=1)
+
+            size = _target_size(img.width, img.height, target_long_edge, min_short_edge)
+            if size != (img.width, img.height):
+                img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+            out = io.BytesIO()
+            if output_format == "WEBP":
+                img.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+            else:
+                img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            width, height = img.width, img.height
+    except Exception:
+        return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+    processed = out.getvalue()
+    if len(processed) >= len(data):
+        return PreprocessedImage(data, mime_type, len(data), width, height, changed=False)
+    return PreprocessedImage(processed, OUTPUT_MIME_TYPES[output_format], len(data), width, height, changed=True)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("RECEIPT_PREPROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+async def preprocess_receipt_image_async(data: bytes, mime_type: str) -> PreprocessedImage:
+    """Runs preprocess_receipt_image in the process pool so decoding never blocks the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), preprocess_receipt_image, data, mime_type)
+
+
+def shutdown_preprocess_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
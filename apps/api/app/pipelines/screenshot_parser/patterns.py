@@ -0,0 +1,51 @@
+import re
+
+# Patterns for payment-confirmation screenshots from Google Pay, PhonePe and
+# Paytm, applied to OCR text. All patterns are compiled once at import.
+
+AMOUNT = re.compile(
+    r"(?:₹|\bRs\.?|\bINR)\s*([0-9]{1,3}(?:,[0-9]{2,3})*(?:\.[0-9]{1,2})?|[0-9]+(?:\.[0-9]{1,2})?)",
+    re.IGNORECASE,
+)
+
+# "Paid to X" (PhonePe, Google Pay), "Paid Successfully to X" (Paytm), "To X" / "To: X"
+PAYEE = re.compile(
+    r"^\s*(?:paid\s+(?:successfully\s+)?to|sent\s+to|to)\s*:?\s*(?P<payee>[^\n₹]{2,60}?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+PAYEE_NEXT_LINE = re.compile(
+    r"^\s*(?:paid\s+(?:successfully\s+)?to|sent\s+to|to)\s*:?\s*\n\s*(?P<payee>[^\n₹]{2,60}?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+VPA = re.compile(r"\b([a-z0-9.\-_]{2,64}@[a-z]{2,32})\b", re.IGNORECASE)
+
+# 12-digit UPI reference, optionally printed in groups of four
+UPI_REF = re.compile(
+    r"(?:UPI\s*(?:transaction\s*ID|Ref(?:erence)?\.?\s*(?:No\.?|Number|ID)?)|UTR(?:\s*No\.?)?)\s*:?\s*\n?\s*"
+    r"(?P<ref>\d{4}\s?\d{4}\s?\d{4})",
+    re.IGNORECASE,
+)
+
+SUCCESS = re.compile(r"\b(?:paid|payment\s+successful|transaction\s+successful|completed|sent)\b", re.IGNORECASE)
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?P<month>jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*"
+_TIME = r"(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::\d{2})?\s*(?P<ampm>[ap]\.?m\.?)?"
+
+# "12 Jan 2024, 10:32 pm" (Google Pay), "10:32 pm on 12 Jan 2024" (PhonePe), "Jan 12, 2024 10:32 PM"
+DATE_TIME_PATTERNS = (
+    re.compile(rf"(?P<day>\d{{1,2}})\s+{_MONTH}\.?,?\s+(?P<year>\d{{4}}),?\s+(?:at\s+)?{_TIME}", re.IGNORECASE),
+    re.compile(rf"{_TIME}\s+on\s+(?P<day>\d{{1,2}})\s+{_MONTH}\.?,?\s+(?P<year>\d{{4}})", re.IGNORECASE),
+    re.compile(rf"{_MONTH}\.?\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}}),?\s+(?:at\s+)?{_TIME}", re.IGNORECASE),
+)
+DATE_ONLY = re.compile(rf"(?P<day>\d{{1,2}})\s+{_MONTH}\.?,?\s+(?P<year>\d{{4}})", re.IGNORECASE)
+
+APP_MARKERS = (
+    ("Google Pay", re.compile(r"\bG\s?Pay\b|\bGoogle\s+Pay\b", re.IGNORECASE)),
+    ("PhonePe", re.compile(r"\bPhone\s?Pe\b", re.IGNORECASE)),
+    ("Paytm", re.compile(r"\bPaytm\b", re.IGNORECASE)),
+)
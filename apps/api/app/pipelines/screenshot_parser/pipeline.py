@@ -0,0 +1,226 @@
+import asyncio
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+from app.core.telemetry import REGISTRY
+from app.modules.ai_expense_parser.normalizer import compute_confidence, normalize_amount
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult, ExpenseDetails
+from . import patterns
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # local OCR is optional; without it every screenshot goes to Gemini
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+# Payment-app screenshots are saved losslessly; camera photos of paper receipts are JPEG
+SCREENSHOT_MIME_TYPES: FrozenSet[str] = frozenset({"image/png", "image/webp"})
+
+OcrFn = Callable[[bytes], Optional[str]]
+
+# Cleared by the categorizer when it recognizes the payee
+CATEGORY_NOT_DETECTED = "Category not detected from screenshot, please verify."
+
+
+def tesseract_ocr(image_bytes: bytes) -> Optional[str]:
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        return pytesseract.image_to_string(img, config="--psm 6")
+
+
+def _parse_datetime(text: str) -> Optional[str]:
+    for pattern in patterns.DATE_TIME_PATTERNS:
+        m = pattern.search(text)
+        if not m:
+            continue
+        hour, minute = int(m.group("hour")), int(m.group("minute"))
+        ampm = (m.group("ampm") or "").lower().replace(".", "")
+        if ampm == "pm" and hour < 12:
+            hour += 12
+        elif ampm == "am" and hour == 12:
+            hour = 0
+        try:
+            return datetime(
+                int(m.group("year")), patterns.MONTHS[m.group("month").lower()[:3]], int(m.group("day")), hour, minute,
+            ).isoformat()
+        except (ValueError, KeyError):
+            continue
+
+    m = patterns.DATE_ONLY.search(text)
+    if m:
+        try:
+            return datetime(int(m.group("year")), patterns.MONTHS[m.group("month").lower()[:3]], int(m.group("day"))).isoformat()
+        except (ValueError, KeyError):
+            return None
+    return None
+
+
+def extract_payment_fields(text: str) -> Dict[str, Any]:
+    """Pulls amount, payee, UPI reference, timestamp and source app out of OCR text."""
+    fields: Dict[str, Any] = {}
+
+    amount = patterns.AMOUNT.search(text)
+    if amount:
+        fields["amount"] = normalize_amount(amount.group(1))
+
+    payee = patterns.PAYEE.search(text) or patterns.PAYEE_NEXT_LINE.search(text)
+    if payee and payee.group("payee").strip():
+        fields["payee"] = payee.group("payee").strip()
+    else:
+        vpa = patterns.VPA.search(text)
+        if vpa:
+            fields["payee"] = vpa.group(1)
+
+    ref = patterns.UPI_REF.search(text)
+    if ref:
+        fields["upiRef"] = ref.group("ref").replace(" ", "")
+
+    date = _parse_datetime(text)
+    if date:
+        fields["date"] = date
+
+    for app, marker in patterns.APP_MARKERS:
+        if marker.search(text):
+            fields["app"] = app
+            break
+
+    return fields
+
+
+def build_result(fields: Dict[str, Any], now_iso: str, raw_text: str) -> Optional[ExpenseAIResult]:
+    """
+    Turns extracted fields into a result, or None when the text does not look
+    like a payment confirmation (no amount or no UPI reference).
+    """
+    if not fields.get("amount") or not fields.get("upiRef"):
+        return None
+
+    scored = {
+        "amount": fields["amount"],
+        "title": fields.get("payee"),
+        "date": fields.get("date"),
+        "paymentMethod": "UPI",
+        # The category is not printed on the screenshot, so it earns no confidence
+        "category": "",
+    }
+    confidence = compute_confidence(scored)
+
+    notes = f"UPI Ref {fields['upiRef']}"
+    if fields.get("app"):
+        notes = f"{fields['app']} payment, {notes}"
+
+    warnings = [CATEGORY_NOT_DETECTED]
+    if not fields.get("date"):
+        warnings.append("Date not found in screenshot, used current time.")
+
+    expense = ExpenseDetails(
+        title=fields.get("payee") or "UPI Payment",
+        category="Misc",
+        paymentMethod="UPI",
+        amount=fields["amount"],
+        currency="INR",
+        date=fields.get("date") or now_iso,
+        merchant=fields.get("payee"),
+        notes=notes,
+    )
+    return ExpenseAIResult(expense=expense, confidence=confidence, warnings=warnings, rawText=raw_text)
+
+
+class ScreenshotFastPath:
+    """
+    Deterministic parser for UPI payment screenshots that answers without a
+    model call. Results below `min_confidence` are discarded so the caller can
+    fall back to Gemini. Keeps counters for the share of traffic it serves.
+    """
+
+    def __init__(
+        self,
+        ocr: Optional[OcrFn] = None,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        mime_types: FrozenSet[str] = SCREENSHOT_MIME_TYPES,
+    ):
+        self.ocr = ocr
+        self.min_confidence = min_confidence
+        self.mime_types = mime_types
+        self.attempts = 0
+        self.served = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ocr is not None
+
+    async def try_parse(
+        self, image_bytes: bytes, mime_type: str, now_iso: str
+    ) -> Optional[Tuple[ExpenseAIResult, Optional[str]]]:
+        """Returns (result, printed date) when the screenshot is parsed confidently, else None."""
+        if not self.enabled or mime_type not in self.mime_types:
+            self.skipped += 1
+            return None
+
+        self.attempts += 1
+        try:
+            text = await asyncio.to_thread(self.ocr, image_bytes)
+        except Exception as e:
+            logger.warning("Screenshot OCR failed: %s", e)
+            return None
+        if not text:
+            return None
+
+        fields = extract_payment_fields(text)
+        result = build_result(fields, now_iso, text)
+        if result is None or result.confidence < self.min_confidence:
+            return None
+        self.served += 1
+        return result, fields.get("date")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.attempts + self.skipped
+        return {
+            "enabled": self.enabled,
+            "requests": total,
+            "attempts": self.attempts,
+            "served": self.served,
+            "servedFraction": self.served / total if total else 0.0,
+        }
+
+
+_fast_path: Optional[ScreenshotFastPath] = None
+
+
+def get_screenshot_fast_path() -> ScreenshotFastPath:
+    """
+    Process-wide fast path. Uses Tesseract when pytesseract is installed and
+    SCREENSHOT_FAST_PATH_ENABLED is not "0"; the confidence bar comes from
+    SCREENSHOT_FAST_PATH_MIN_CONFIDENCE.
+    """
+    global _fast_path
+    if _fast_path is None:
+        enabled = pytesseract is not None and os.getenv("SCREENSHOT_FAST_PATH_ENABLED", "1") != "0"
+        _fast_path = ScreenshotFastPath(
+            ocr=tesseract_ocr if enabled else None,
+            min_confidence=float(os.getenv("SCREENSHOT_FAST_PATH_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE)),
+        )
+    return _fast_path
+
+
+def _fast_path_samples():
+    if _fast_path is None:
+        return []
+    return [
+        ({"outcome": "served"}, _fast_path.served),
+        ({"outcome": "fallback"}, _fast_path.attempts - _fast_path.served),
+        ({"outcome": "skipped"}, _fast_path.skipped),
+    ]
+
+
+REGISTRY.callback(
+    "screenshot_fast_path_requests_total", "counter",
+    "Image parses seen by the screenshot fast path: served locally, fell back to Gemini, or not a screenshot.",
+    _fast_path_samples,
+)
@@ -0,0 +1,285 @@
+import csv
+import io
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from itertools import chain, islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+try:
+    import openpyxl
+except ImportError:  # only needed for Excel statements; CSV exports are read with the csv module
+    openpyxl = None
+
+from app.domain.value_objects.money import MAX_AMOUNT, is_currency
+from app.pipelines.categorizer.pipeline import Categorizer
+from app.pipelines.categorizer.rules import DEFAULT_CATEGORY, match_payment_method
+from app.schemas.expense import Expense
+from . import rules
+
+# Rows normalized together: big enough for the per-batch numpy work to pay
+# off, small enough that a batch is a few MB whatever the file size
+DEFAULT_BATCH_SIZE = 5_000
+# Exports often open with account details above the header row
+HEADER_SEARCH_ROWS = 30
+SNIFF_LINES = 20
+SNIFF_BYTES = 8
+MAX_TITLE_CHARS = 120
+
+XLSX_SIGNATURE = b"PK\x03\x04"
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0"
+
+# The cells of one statement row, as text
+Row = Sequence[str]
+
+
+class StatementFormatError(ValueError):
+    """The file is not a statement this pipeline can read."""
+
+
+def statement_rows(file: BinaryIO) -> Iterator[Row]:
+    """
+    Rows of a statement file, read lazily: an Excel workbook (.xlsx) when it
+    has the zip signature, else CSV text in UTF-8 or, with a byte-order mark,
+    UTF-16 (Excel's "Unicode text" export). `file` must be seekable.
+    """
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    if head.startswith(XLSX_SIGNATURE):
+        return xlsx_rows(file)
+    if head.startswith(XLS_SIGNATURE):
+        raise StatementFormatError("Legacy .xls workbooks are not supported; save the statement as .xlsx or CSV.")
+    encoding = "utf-16" if head[:2] in (b"\xff\xfe", b"\xfe\xff") else "utf-8-sig"
+    if encoding == "utf-8-sig" and b"\x00" in head:
+        raise StatementFormatError("Statement must be a CSV or .xlsx file.")
+    return csv_rows(io.TextIOWrapper(file, encoding=encoding, errors="replace", newline=""))
+
+
+def csv_rows(stream: TextIO) -> Iterator[List[str]]:
+    """CSV rows read lazily; the delimiter (comma, semicolon, tab or pipe) is sniffed from the first lines."""
+    head = list(islice(stream, SNIFF_LINES))
+    try:
+        dialect = csv.Sniffer().sniff("".join(head), delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(chain(head, stream), dialect)
+
+
+def xlsx_rows(file: BinaryIO) -> Iterator[List[str]]:
+    """Rows of the workbook's first sheet, streamed with openpyxl's read-only mode."""
+    if openpyxl is None:
+        raise StatementFormatError("Excel statements are not supported on this server; upload a CSV export.")
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise StatementFormatError(f"Unreadable Excel statement: {e}")
+    return _sheet_rows(workbook)
+
+
+def _sheet_rows(workbook: Any) -> Iterator[List[str]]:
+    try:
+        for values in workbook.worksheets[0].iter_rows(values_only=True):
+            yield [_cell_text(value) for value in values]
+    finally:
+        workbook.close()
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _distinct(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """The distinct values and, for each row, the position of its value among them."""
+    unique, rows = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return unique.tolist(), rows
+
+
+def _each(fn: Callable[[str], Any], values: Sequence[str]) -> np.ndarray:
+    """fn applied once per distinct value and scattered back to every row."""
+    unique, rows = _distinct(values)
+    return np.array([fn(v) for v in unique], dtype=object)[rows]
+
+
+def _row_error(dated: bool, priced: bool, in_range: bool) -> str:
+    if not dated:
+        return "unreadable date"
+    if not priced:
+        return "unknown currency"
+    return "amount out of range" if not in_range else "no amount"
+
+
+def _amounts(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    unique, rows = _distinct(values)
+    parsed = [rules.parse_amount(v) for v in unique]
+    amounts = np.array([amount for amount, _ in parsed], dtype=np.float64)
+    sides = np.array([side for _, side in parsed], dtype=np.int8)
+    return amounts[rows], sides[rows]
+
+
+@dataclass
+class StatementBatch:
+    """
+    One batch of statement rows, normalized column-wise. Only rows that are
+    spending come through; `categories` is "" where no local rule placed
+    the row, for the caller to ask the model about by description key.
+    """
+    rows: int
+    credits: int
+    dates: List[str]
+    amounts: np.ndarray
+    currencies: List[str]
+    titles: List[str]
+    merchants: List[Optional[str]]
+    notes: List[Optional[str]]
+    payment_methods: np.ndarray
+    categories: np.ndarray
+    keys: np.ndarray
+    # (source row number, what was wrong) for rows that were not imported
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def uncategorized(self) -> np.ndarray:
+        return np.flatnonzero(self.categories == "")
+
+    def expenses(self) -> List[Expense]:
+        """
+        The rows as expenses, built without re-validation: every field is
+        already normalized. Rows still uncategorized are filed under Misc.
+        """
+        categories = np.where(self.categories == "", DEFAULT_CATEGORY, self.categories).tolist()
+        return [
+            Expense.model_construct(
+                id=str(uuid.uuid4()), title=title, category=category, paymentMethod=method, amount=amount,
+                currency=currency, date=day, merchant=merchant, notes=notes, description=None,
+            )
+            for title, category, method, amount, currency, day, merchant, notes in zip(
+                self.titles, categories, self.payment_methods.tolist(), self.amounts.tolist(), self.currencies,
+                self.dates, self.merchants, self.notes,
+            )
+        ]
+
+
+def find_header(rows: Iterator[Row]) -> Tuple[Dict[str, int], int]:
+    """
+    Reads up to the header row, returning its field -> column map and its
+    row number. Raises StatementFormatError when none of the first rows is one.
+    """
+    for line, cells in enumerate(islice(rows, HEADER_SEARCH_ROWS), 1):
+        fields = rules.header_fields(cells)
+        if rules.is_header(fields):
+            return fields, line
+    raise StatementFormatError(
+        "No header row found: a statement needs date, amount (or debit) and description columns."
+    )
+
+
+def statement_batches(
+    rows: Iterable[Row],
+    categorizer: Categorizer,
+    user_id: Optional[str] = None,
+    currency: str = "INR",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[StatementBatch]:
+    """
+    Normalizes statement rows a batch at a time. Rows are pulled from `rows`
+    only as batches are asked for, so memory stays flat however long the
+    statement is.
+    """
+    rows = iter(rows)
+    fields, line = find_header(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        yield normalize_rows(chunk, line + 1, fields, categorizer, user_id, currency)
+        line += len(chunk)
+
+
+def normalize_rows(
+    chunk: Sequence[Row],
+    first_line: int,
+    fields: Dict[str, int],
+    categorizer: Categorizer,
+    user_id: Optional[str],
+    currency: str,
+) -> StatementBatch:
+    """
+    Dates, amounts, payment methods and categories for a batch of rows. Each
+    normalizer runs once per distinct value in the batch (statements repeat a
+    few dates, amounts and payees), and the row-level decisions are numpy
+    masks over the results.
+    """
+    width = max(fields.values()) + 1
+    # Footers and blank lines come through short
+    cells = [row if len(row) >= width else [*row, *[""] * (width - len(row))] for row in chunk]
+
+    def column(name: str) -> Optional[List[str]]:
+        position = fields.get(name)
+        return None if position is None else [row[position].strip() for row in cells]
+
+    blank = np.array([not any(row) for row in cells], dtype=bool)
+    dates = _each(rules.parse_date, column("date"))
+    dated = dates.astype(bool)
+    if "debit" in fields:
+        amounts, _ = _amounts(column("debit"))
+        credited = _amounts(column("credit"))[0] > 0 if "credit" in fields else np.zeros(len(cells), dtype=bool)
+        credit = (amounts == 0) & credited
+    else:
+        amounts, sides = _amounts(column("amount"))
+        if "side" in fields:
+            # A type column is more reliable than a sign or a suffix
+            marked = _each(rules.side_of, column("side")).astype(np.int8)
+            sides = np.where(marked != 0, marked, sides)
+        credit = sides == rules.CREDIT
+
+    currencies = _each(lambda c: c.upper() or currency.upper(), column("currency") or [""] * len(cells))
+    priced = _each(is_currency, currencies.tolist()).astype(bool)
+
+    # "1e30" and "inf" parse as amounts, but would overflow the int64 minor-unit column
+    in_range = np.isfinite(amounts) & (amounts <= MAX_AMOUNT)
+    keep = ~blank & ~credit & dated & priced & (amounts > 0) & in_range
+    errors = [
+        (first_line + i, _row_error(dated[i], priced[i], in_range[i]))
+        for i in np.flatnonzero(~blank & ~credit & ~keep).tolist()
+    ]
+
+    kept = np.flatnonzero(keep)
+    picked = kept.tolist()
+
+    def kept_column(name: str) -> List[str]:
+        values = column(name)
+        return [values[i] for i in picked] if values is not None else [""] * len(picked)
+
+    descriptions = kept_column("description")
+    merchants = kept_column("merchant")
+    notes = kept_column("notes")
+    keys = _each(rules.description_key, descriptions)
+
+    methods = kept_column("paymentMethod")
+    payment_methods = _each(match_payment_method, methods if "paymentMethod" in fields else keys.tolist())
+    categories = categorizer.statement_categories(merchants, keys.tolist(), kept_column("category"), user_id)
+
+    return StatementBatch(
+        rows=len(chunk),
+        credits=int(np.count_nonzero(credit & ~blank)),
+        dates=dates[kept].tolist(),
+        amounts=amounts[kept],
+        currencies=currencies[kept].tolist(),
+        titles=[(m or d or "Statement entry")[:MAX_TITLE_CHARS] for m, d in zip(merchants, descriptions)],
+        merchants=[m or None for m in merchants],
+        notes=[n or (d if m else None) or None for n, d, m in zip(notes, descriptions, merchants)],
+        payment_methods=payment_methods,
+        categories=categories,
+        keys=keys,
+        errors=errors,
+    )
@@ -0,0 +1,126 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from app.modules.ai_expense_parser.normalizer import normalize_amount, normalize_date
+from app.pipelines.categorizer.rules import build_index, fold
+
+# Header names bank, card and UPI app exports use for each field. Keys are
+# folded like the headers ("Withdrawal Amt." -> "withdrawal amt"), so entries
+# here can be written naturally.
+HEADER_ALIASES = {
+    "date": ("date", "txn date", "tran date", "transaction date", "value date", "posting date", "booking date"),
+    "description": (
+        "description", "narration", "particulars", "remarks", "details", "transaction details",
+        "transaction remarks", "transaction description", "title",
+    ),
+    "merchant": ("merchant", "payee", "paid to", "beneficiary", "merchant name"),
+    "amount": ("amount", "amount inr", "txn amount", "transaction amount", "amt"),
+    "debit": (
+        "debit", "debits", "debit amount", "debit amt", "withdrawal", "withdrawals", "withdrawal amt",
+        "withdrawal amount", "dr", "paid out",
+    ),
+    "credit": ("credit", "credits", "credit amount", "credit amt", "deposit", "deposits", "deposit amt", "cr", "paid in"),
+    "side": ("type", "dr cr", "cr dr", "debit credit", "transaction type", "txn type"),
+    "category": ("category",),
+    "paymentMethod": ("payment method", "payment mode", "mode", "method", "channel"),
+    "currency": ("currency", "ccy"),
+    "notes": ("notes", "note", "comment", "comments"),
+}
+HEADER_INDEX = build_index(HEADER_ALIASES)
+
+# Day first, as Indian bank and UPI exports write dates; ISO dates are tried before these.
+# Two-digit years go first: %Y would read "24" as the year 24
+DATE_FORMATS = (
+    "%d/%m/%y", "%d/%m/%Y", "%d-%m-%y", "%d-%m-%Y", "%d.%m.%y", "%d.%m.%Y",
+    "%d-%b-%y", "%d-%b-%Y", "%d %b %y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%Y/%m/%d",
+)
+_TIME_SUFFIXES = ("", " %H:%M:%S", " %H:%M", " %I:%M %p", " %I:%M:%S %p")
+
+DEBIT, CREDIT = 1, 2
+SIDE_WORDS: Dict[str, int] = {
+    "dr": DEBIT, "d": DEBIT, "debit": DEBIT, "withdrawal": DEBIT, "paid": DEBIT, "sent": DEBIT,
+    "cr": CREDIT, "c": CREDIT, "credit": CREDIT, "deposit": CREDIT, "received": CREDIT, "refund": CREDIT,
+}
+
+_AMOUNT_SIDE = re.compile(r"(?<![a-z])(dr|cr)\.?$", re.IGNORECASE)
+_CURRENCY_PREFIX = re.compile(r"^(inr|rs\.?)\s*", re.IGNORECASE)
+# Tokens carrying reference numbers, account numbers or IFSC codes; short digit runs ("1mg") are kept
+_REFERENCE = re.compile(r"\S*\d{4}\S*")
+
+
+def header_fields(cells: Sequence[str]) -> Dict[str, int]:
+    """Field -> column position for the recognised headers of a row; the first column wins a field."""
+    fields: Dict[str, int] = {}
+    for position, cell in enumerate(cells):
+        field = HEADER_INDEX.get(fold(cell or ""))
+        if field is not None:
+            fields.setdefault(field, position)
+    return fields
+
+
+def is_header(fields: Dict[str, int]) -> bool:
+    return "date" in fields and ("amount" in fields or "debit" in fields) and (
+        "description" in fields or "merchant" in fields
+    )
+
+
+@lru_cache(maxsize=8192)
+def parse_date(raw: str) -> Optional[str]:
+    """
+    ISO date (or the ISO timestamp as given) for a statement date, else None.
+    Statements repeat a few hundred dates, so answers are memoized.
+    """
+    raw = raw.strip()
+    if not raw:
+        return None
+    if normalize_date(raw, "") == raw:
+        parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        # fromisoformat also takes compact forms ("20240415") that the date column cannot
+        return raw if raw[:10] == parsed.date().isoformat() else parsed.date().isoformat()
+    for fmt in DATE_FORMATS:
+        for suffix in _TIME_SUFFIXES:
+            try:
+                parsed = datetime.strptime(raw, fmt + suffix)
+            except ValueError:
+                continue
+            return parsed.isoformat() if suffix else parsed.date().isoformat()
+    return None
+
+
+def parse_amount(raw: str) -> Tuple[float, int]:
+    """
+    (amount, DEBIT | CREDIT | 0) for a statement amount: "1,250.00 Dr",
+    "(500.00)" and "-500" are debits, a "Cr" suffix a credit, a bare number
+    says neither. 0.0 when there is no amount. Not memoized: amounts rarely
+    repeat beyond a batch, and batches already parse each distinct one once.
+    """
+    text = raw.strip()
+    side = 0
+    marker = _AMOUNT_SIDE.search(text)
+    if marker:
+        side = SIDE_WORDS[marker.group(1).lower()]
+        text = text[:marker.start()]
+    if text.startswith("(") and text.endswith(")"):
+        text, side = text[1:-1], DEBIT
+    text = _CURRENCY_PREFIX.sub("", text.strip())
+    amount = normalize_amount(text)
+    if amount < 0:
+        amount, side = -amount, side or DEBIT
+    return amount, side
+
+
+def side_of(raw: str) -> int:
+    """DEBIT or CREDIT for a transaction-type cell ("Dr", "DEBIT", "Cr."), else 0."""
+    words = fold(raw).split()
+    return SIDE_WORDS.get(words[0], 0) if words else 0
+
+
+def description_key(text: str) -> str:
+    """
+    The folded description without reference numbers:
+    "UPI/DR/412345678901/SWIGGY/YESB" -> "upi dr swiggy yesb". Rows to the
+    same payee share a key, so each payee is categorized once.
+    """
+    return " ".join(_REFERENCE.sub(" ", fold(text)).split())
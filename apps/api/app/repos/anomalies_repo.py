@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from app.schemas.anomaly import Anomaly
+
+DEFAULT_MAX_PER_USER = 500
+
+
+class AnomaliesRepo:
+    """Each user's most recently flagged expenses, held in process memory."""
+
+    def __init__(self, max_per_user: int = DEFAULT_MAX_PER_USER):
+        self.max_per_user = max_per_user
+        # user id -> expense id -> anomaly, oldest flag first
+        self._users: Dict[str, "OrderedDict[str, Anomaly]"] = {}
+
+    async def add_many(self, user_id: str, anomalies: Sequence[Anomaly]) -> None:
+        items = self._users.setdefault(user_id, OrderedDict())
+        for anomaly in anomalies:
+            items.pop(anomaly.expenseId, None)
+            items[anomaly.expenseId] = anomaly
+        while len(items) > self.max_per_user:
+            items.popitem(last=False)
+
+    async def replace(self, user_id: str, anomalies: Sequence[Anomaly]) -> None:
+        self._users.pop(user_id, None)
+        await self.add_many(user_id, anomalies)
+
+    async def remove(self, user_id: str, expense_id: str) -> None:
+        items = self._users.get(user_id)
+        if items is not None:
+            items.pop(expense_id, None)
+
+    async def list(self, user_id: str, limit: int) -> List[Anomaly]:
+        """Newest flag first."""
+        items = self._users.get(user_id) or {}
+        return list(reversed(items.values()))[:limit]
+
+
+_repo: Optional[AnomaliesRepo] = None
+
+
+def get_anomalies_repo() -> AnomaliesRepo:
+    global _repo
+    if _repo is None:
+        _repo = AnomaliesRepo()
+    return _repo
@@ -0,0 +1,26 @@
+from typing import Dict, List, Optional
+
+from app.schemas.budget import Budget
+
+
+class BudgetsRepo:
+    """Each user's monthly budgets, held in process memory."""
+
+    def __init__(self):
+        self._users: Dict[str, List[Budget]] = {}
+
+    async def list(self, user_id: str) -> List[Budget]:
+        return list(self._users.get(user_id, ()))
+
+    async def replace(self, user_id: str, budgets: List[Budget]) -> None:
+        self._users[user_id] = list(budgets)
+
+
+_repo: Optional[BudgetsRepo] = None
+
+
+def get_budgets_repo() -> BudgetsRepo:
+    global _repo
+    if _repo is None:
+        _repo = BudgetsRepo()
+    return _repo
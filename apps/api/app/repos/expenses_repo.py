@@ -0,0 +1,371 @@
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.domain.value_objects.date_range import DateRange, epoch_day, from_epoch_day
+from app.domain.value_objects.money import ISO_CURRENCIES, minor_exponent, to_minor_each
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+from app.pipelines.categorizer.rules import match_category, match_payment_method
+from app.repos.search_index import SearchIndex, search_tokens
+from app.schemas.expense import Expense
+
+CATEGORY_CODES = {category: code for code, category in enumerate(ALLOWED_CATEGORIES)}
+PAYMENT_METHOD_CODES = {method: code for code, method in enumerate(ALLOWED_PAYMENT_METHODS)}
+
+# Currency codes index a fixed table shared by every user's columns; it never
+# grows at runtime, so what users send cannot exhaust it
+CURRENCIES: Tuple[str, ...] = ISO_CURRENCIES
+_CURRENCY_CODES: Dict[str, int] = {currency: code for code, currency in enumerate(CURRENCIES)}
+
+INITIAL_CAPACITY = 64
+# Edits that dropped words leave rows for the search index to re-check; past
+# this many (or a quarter of the rows) the index is rebuilt instead
+MAX_STALE_SEARCH_ROWS = 1024
+
+
+def currency_code(currency: str) -> int:
+    code = _CURRENCY_CODES.get(currency.upper())
+    if code is None:
+        raise ValueError(f"unknown currency {currency!r}")
+    return code
+
+
+class ExpenseColumns:
+    """
+    One user's expenses as parallel NumPy columns, the shape the analytics
+    group-bys read: int64 amounts in minor units, int8 category and
+    payment-method codes, int16 currency codes and int32 epoch-day dates.
+    Text fields sit in plain lists beside them, for returning whole expenses.
+
+    Rows 0..size-1 are in use; `live` is False for deleted rows, which are
+    compacted away once they make up half the columns. Arrays grow by
+    doubling, so appends are amortized O(1). `version` counts writes, so a
+    reader can tell which writes a snapshot of the columns includes, and
+    `seq` numbers rows in the order they were saved, surviving compaction.
+
+    The search index over the text fields is built on the first search and
+    kept current by later writes, so users who never search do not pay for it.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self.dead = 0
+        self.version = 0
+        self.saved = 0
+        self.rows: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.amount_minor = np.zeros(capacity, dtype=np.int64)
+        self.category = np.zeros(capacity, dtype=np.int8)
+        self.payment_method = np.zeros(capacity, dtype=np.int8)
+        self.currency = np.zeros(capacity, dtype=np.int16)
+        self.day = np.zeros(capacity, dtype=np.int32)
+        self.seq = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.titles: List[str] = []
+        self.merchants: List[Optional[str]] = []
+        self.notes: List[Optional[str]] = []
+        self.dates: List[Optional[str]] = []
+        self._search: Optional[SearchIndex] = None
+
+    _ARRAYS = ("amount_minor", "category", "payment_method", "currency", "day", "seq", "live")
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def __contains__(self, expense_id: str) -> bool:
+        return expense_id in self.rows
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        capacity = len(self.live)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, expenses: Sequence[Expense]) -> None:
+        """Adds expenses in one pass: the numeric columns are filled as whole slices."""
+        expenses = [e for e in expenses if e.id not in self.rows]
+        if not expenses:
+            return
+        # Everything that can reject an expense runs before the first column is written
+        currencies = [e.currency.upper() for e in expenses]
+        codes = [currency_code(c) for c in currencies]
+        # numpy parses the ISO date prefix itself, much faster than fromisoformat per row
+        days = np.array([e.date[:10] for e in expenses], dtype="datetime64[D]").astype(np.int32)
+
+        n = len(expenses)
+        self._reserve(n)
+        start, end = self.size, self.size + n
+        self.amount_minor[start:end] = to_minor_each([e.amount for e in expenses], currencies)
+        self.category[start:end] = [_category_code(e.category) for e in expenses]
+        self.payment_method[start:end] = [_payment_method_code(e.paymentMethod) for e in expenses]
+        self.currency[start:end] = codes
+        self.day[start:end] = days
+        self.seq[start:end] = np.arange(self.saved, self.saved + n)
+        self.live[start:end] = True
+        self.saved += n
+
+        for row, expense in enumerate(expenses, start):
+            self.rows[expense.id] = row
+            self.ids.append(expense.id)
+            self.titles.append(expense.title)
+            self.merchants.append(expense.merchant)
+            self.notes.append(expense.notes)
+            self.dates.append(expense.date)
+        if self._search is not None:
+            self._search.add_many((row, search_tokens(e.title, e.merchant, e.notes)) for row, e in enumerate(expenses, start))
+        self.size = end
+        self.version += 1
+
+    def get(self, expense_id: str) -> Optional[Expense]:
+        row = self.rows.get(expense_id)
+        return None if row is None else self._expense(row)
+
+    def update(self, expense: Expense) -> Optional[Expense]:
+        """Overwrites an expense in place; returns the previous version, or None when unknown."""
+        row = self.rows.get(expense.id)
+        if row is None:
+            return None
+        previous = self._expense(row)
+        currency = expense.currency.upper()
+        code, day = currency_code(currency), epoch_day(expense.date)
+        self.amount_minor[row] = round(expense.amount * 10 ** minor_exponent(currency))
+        self.category[row] = _category_code(expense.category)
+        self.payment_method[row] = _payment_method_code(expense.paymentMethod)
+        self.currency[row] = code
+        self.day[row] = day
+        self.titles[row] = expense.title
+        self.merchants[row] = expense.merchant
+        self.notes[row] = expense.notes
+        self.dates[row] = expense.date
+        if self._search is not None:
+            self._search.update(
+                row,
+                search_tokens(previous.title, previous.merchant, previous.notes),
+                search_tokens(expense.title, expense.merchant, expense.notes),
+            )
+            if len(self._search.stale) > max(MAX_STALE_SEARCH_ROWS, self.size // 4):
+                self._search = None
+        self.version += 1
+        return previous
+
+    def delete(self, expense_id: str) -> Optional[Expense]:
+        """Removes an expense; returns it, or None when unknown."""
+        row = self.rows.pop(expense_id, None)
+        if row is None:
+            return None
+        previous = self._expense(row)
+        self.live[row] = False
+        self.ids[row] = self.titles[row] = self.merchants[row] = self.notes[row] = self.dates[row] = None
+        self.dead += 1
+        self.version += 1
+        if self.dead * 2 > self.size and self.size > INITIAL_CAPACITY:
+            self._compact()
+        return previous
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.live[:self.size])
+        for name in self._ARRAYS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+            column[len(keep):self.size] = 0
+        for name in ("ids", "titles", "merchants", "notes", "dates"):
+            values = getattr(self, name)
+            setattr(self, name, [values[row] for row in keep.tolist()])
+        self.size, self.dead = len(keep), 0
+        self.rows = {expense_id: row for row, expense_id in enumerate(self.ids)}
+        # Rows moved; the next search rebuilds the index
+        self._search = None
+
+    def _expense(self, row: int) -> Expense:
+        currency = CURRENCIES[self.currency[row]]
+        return Expense(
+            id=self.ids[row],
+            title=self.titles[row],
+            category=ALLOWED_CATEGORIES[self.category[row]],
+            paymentMethod=ALLOWED_PAYMENT_METHODS[self.payment_method[row]],
+            amount=int(self.amount_minor[row]) / 10 ** minor_exponent(currency),
+            currency=currency,
+            date=self.dates[row] or from_epoch_day(self.day[row]).isoformat(),
+            merchant=self.merchants[row],
+            notes=self.notes[row],
+        )
+
+    def select(self, date_range: Optional[DateRange] = None, currency: Optional[str] = None) -> np.ndarray:
+        """Indices of the live rows in `date_range` and `currency`, for fancy-indexing the columns."""
+        mask = self.live[:self.size].copy()
+        if date_range is not None:
+            mask &= date_range.mask(self.day[:self.size])
+        if currency is not None:
+            code = _CURRENCY_CODES.get(currency.upper())
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self.currency[:self.size] == code
+        return np.flatnonzero(mask)
+
+    def _index_sources(self) -> Tuple[List[int], List[str], List[Optional[str]], List[Optional[str]]]:
+        # Compaction swaps in new lists rather than editing these, so a build can read them on another thread
+        return np.flatnonzero(self.live[:self.size]).tolist(), self.titles, self.merchants, self.notes
+
+    @staticmethod
+    def _build_index(
+        rows: List[int], titles: List[str], merchants: List[Optional[str]], notes: List[Optional[str]],
+    ) -> SearchIndex:
+        index = SearchIndex()
+        index.add_many((row, search_tokens(titles[row], merchants[row], notes[row])) for row in rows)
+        return index
+
+    def search_index(self) -> SearchIndex:
+        if self._search is None:
+            self._search = self._build_index(*self._index_sources())
+        return self._search
+
+    async def build_search_index(self) -> None:
+        """
+        Builds the search index on a worker thread, so a user's first search
+        over a long history does not stall the event loop. The index is kept
+        only if no write landed while it was built; otherwise the search
+        builds it inline, with those writes.
+        """
+        if self._search is not None:
+            return
+        version = self.version
+        index = await asyncio.to_thread(self._build_index, *self._index_sources())
+        if self._search is None and self.version == version:
+            self._search = index
+
+    def sort_keys(self, rows: np.ndarray) -> np.ndarray:
+        """Newest-first order as one int64 per row: the date, then the save order within a day."""
+        return self.day[rows].astype(np.int64) * 2 ** 32 + self.seq[rows]
+
+    def search(
+        self,
+        terms: Sequence[str] = (),
+        date_range: Optional[DateRange] = None,
+        currency: Optional[str] = None,
+        categories: Optional[Sequence[str]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> Tuple[np.ndarray, bool]:
+        """
+        One page of the live rows whose text matches every term (all rows
+        when there are none) and that pass the filters, newest first, and
+        whether more follow. Amounts are in major units of each row's own
+        currency. `before` is the sort key of the previous page's last row.
+        """
+        if terms:
+            rows = self.search_index().search(terms)
+            rows = rows[self.live[rows]]
+        else:
+            rows = np.flatnonzero(self.live[:self.size])
+        mask = np.ones(len(rows), dtype=bool)
+        if date_range is not None:
+            mask &= date_range.mask(self.day[rows])
+        if currency is not None:
+            code = _CURRENCY_CODES.get(currency.upper())
+            if code is None:
+                return np.empty(0, dtype=np.intp), False
+            mask &= self.currency[rows] == code
+        if categories is not None:
+            mask &= np.isin(self.category[rows], [_category_code(c) for c in categories])
+        if min_amount is not None or max_amount is not None:
+            scales = np.array([10 ** minor_exponent(c) for c in CURRENCIES])[self.currency[rows]]
+            amounts = self.amount_minor[rows]
+            if min_amount is not None:
+                mask &= amounts >= np.rint(min_amount * scales)
+            if max_amount is not None:
+                mask &= amounts <= np.rint(max_amount * scales)
+        rows = rows[mask]
+
+        keys = self.sort_keys(rows)
+        if before is not None:
+            earlier = keys < before
+            rows, keys = rows[earlier], keys[earlier]
+        has_more = len(rows) > limit
+        if has_more:
+            top = np.argpartition(-keys, limit)[:limit]
+            rows, keys = rows[top], keys[top]
+        order = np.argsort(-keys, kind="stable")
+        return rows[order], has_more
+
+
+def _category_code(category: str) -> int:
+    code = CATEGORY_CODES.get(category)
+    return code if code is not None else CATEGORY_CODES[match_category(category)]
+
+
+def _payment_method_code(method: str) -> int:
+    code = PAYMENT_METHOD_CODES.get(method)
+    return code if code is not None else PAYMENT_METHOD_CODES[match_payment_method(method)]
+
+
+class ExpensesRepo:
+    """
+    Saved expenses, one ExpenseColumns per user, held in process memory.
+    Writes return the previous version of the expense so callers can apply
+    deltas elsewhere.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, ExpenseColumns] = {}
+
+    def columns(self, user_id: str) -> ExpenseColumns:
+        """The user's columns for reading; empty ones for a user with no expenses."""
+        columns = self._users.get(user_id)
+        return columns if columns is not None else ExpenseColumns(capacity=0)
+
+    async def add_many(self, user_id: str, expenses: Sequence[Expense]) -> None:
+        columns = self._users.get(user_id)
+        if columns is None:
+            columns = self._users[user_id] = ExpenseColumns()
+        columns.append(expenses)
+
+    async def add(self, user_id: str, expense: Expense) -> None:
+        await self.add_many(user_id, [expense])
+
+    def user_ids(self) -> List[str]:
+        return list(self._users)
+
+    async def get(self, user_id: str, expense_id: str) -> Optional[Expense]:
+        columns = self._users.get(user_id)
+        return columns.get(expense_id) if columns else None
+
+    async def update(self, user_id: str, expense: Expense) -> Optional[Expense]:
+        columns = self._users.get(user_id)
+        return columns.update(expense) if columns else None
+
+    async def delete(self, user_id: str, expense_id: str) -> Optional[Expense]:
+        columns = self._users.get(user_id)
+        return columns.delete(expense_id) if columns else None
+
+    async def search(
+        self, user_id: str, terms: Sequence[str] = (), before: Optional[int] = None, limit: int = 50, **filters,
+    ) -> Tuple[List[Expense], Optional[int]]:
+        """
+        A page of the user's expenses (see ExpenseColumns.search) and the
+        sort key to pass as `before` for the next page, None on the last.
+        """
+        columns = self.columns(user_id)
+        if terms:
+            await columns.build_search_index()
+        rows, has_more = columns.search(terms, before=before, limit=limit, **filters)
+        expenses = [columns._expense(row) for row in rows.tolist()]
+        return expenses, int(columns.sort_keys(rows[-1:])[0]) if has_more else None
+
+
+_repo: Optional[ExpensesRepo] = None
+
+
+def get_expenses_repo() -> ExpensesRepo:
+    global _repo
+    if _repo is None:
+        _repo = ExpensesRepo()
+    return _repo
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+
+class IdempotencyRepo(ABC):
+    """
+    Persistent key -> JSON document store with per-entry expiry.
+    Used as the durable tier behind in-process caches; implementations must be
+    safe to call concurrently from the event loop.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def put(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+# Expired entries are dropped when read, and by a sweep at most this often on writes
+SWEEP_INTERVAL_SECONDS = 60.0
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class InMemoryIdempotencyRepo(IdempotencyRepo):
+    """
+    Process-local store. Entries nobody reads again are swept once expired,
+    and past `max_entries` the least recently written are evicted, so a
+    long-lived process holds a bounded number of them.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, sweep_interval: float = SWEEP_INTERVAL_SECONDS):
+        self._items: Dict[str, tuple] = {}
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _sweep(self, now: float) -> None:
+        self._next_sweep = now + self.sweep_interval
+        expired = [key for key, (_, expires_at) in self._items.items() if expires_at <= now]
+        for key in expired:
+            del self._items[key]
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(key)
+        if not item:
+            return None
+        value, expires_at = item
+        if expires_at <= time.time():
+            self._items.pop(key, None)
+            return None
+        return value
+
+    async def put(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        now = time.time()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        # Re-inserted, so the dict stays in write order and eviction takes the oldest write
+        self._items.pop(key, None)
+        self._items[key] = (value, now + ttl_seconds)
+        while len(self._items) > self.max_entries:
+            del self._items[next(iter(self._items))]
+
+    async def delete(self, key: str) -> None:
+        self._items.pop(key, None)
+
+
+class SqliteIdempotencyRepo(IdempotencyRepo):
+    """Single-file store; queries run on a worker thread so the loop never blocks on disk."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM idempotency WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def _put(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_seconds),
+            )
+            self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        await asyncio.to_thread(self._put, key, value, ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
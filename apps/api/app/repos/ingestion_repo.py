@@ -0,0 +1,55 @@
+import os
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.repos.idempotency_repo import IdempotencyRepo, InMemoryIdempotencyRepo, SqliteIdempotencyRepo
+from app.schemas.ingestion import IngestionJob
+
+DEFAULT_JOB_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IngestionJobRepo:
+    """
+    Ingestion job records on top of a key/value IdempotencyRepo. The API
+    writes the queued record and the worker moves it through processing to
+    completed or failed, so both sides must point at the same store.
+    """
+
+    def __init__(self, store: IdempotencyRepo, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"ingestion-job:{job_id}"
+
+    async def create(self, job: IngestionJob) -> None:
+        await self.store.put(self._key(job.jobId), job.model_dump(), self.ttl_seconds)
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        doc = await self.store.get(self._key(job_id))
+        return IngestionJob.model_validate(doc) if doc else None
+
+    async def update(self, job_id: str, **changes: Any) -> Optional[IngestionJob]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        job = job.model_copy(update={**changes, "updatedAt": utc_now_iso()})
+        await self.store.put(self._key(job_id), job.model_dump(), self.ttl_seconds)
+        return job
+
+
+_repo: Optional[IngestionJobRepo] = None
+
+
+def get_ingestion_repo() -> IngestionJobRepo:
+    """Process-wide job repo; INGESTION_SQLITE_PATH shares it between the API and a worker process."""
+    global _repo
+    if _repo is None:
+        sqlite_path = os.getenv("INGESTION_SQLITE_PATH")
+        _repo = IngestionJobRepo(SqliteIdempotencyRepo(sqlite_path) if sqlite_path else InMemoryIdempotencyRepo())
+    return _repo
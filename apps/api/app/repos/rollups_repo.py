@@ -0,0 +1,147 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.repos.idempotency_repo import IdempotencyRepo, InMemoryIdempotencyRepo, SqliteIdempotencyRepo
+from app.schemas.expense import RollupDelta
+
+# Rollups are derived data that reconciliation can always rebuild, but they
+# should outlive any realistic gap between a user's expenses
+DEFAULT_ROLLUP_TTL_SECONDS = 10 * 365 * 24 * 60 * 60
+# Event ids remembered per month document, for spotting redeliveries
+MAX_APPLIED_EVENTS = 256
+
+# month "YYYY-MM" -> currency -> category -> [amount in minor units, count]
+MonthTotals = Dict[str, Dict[str, Dict[str, List[int]]]]
+
+
+class MonthlyRollupsRepo:
+    """
+    Per-user, per-month spend totals by currency and category, on top of a
+    key/value IdempotencyRepo: one document per (user, month) plus an index
+    of the user's months and the expense version last reconciled.
+
+    `apply` adds an event's deltas at most once: an event whose version the
+    last reconciliation already covered is skipped, and each month document
+    remembers the ids of the events applied to it, so a redelivery (or a
+    retry after a partial apply) does not count twice. `replace` overwrites
+    a user's rollups with totals recomputed from their expenses. Both hold
+    the user's lock, so the two never interleave within a process.
+    """
+
+    def __init__(self, store: IdempotencyRepo, ttl_seconds: float = DEFAULT_ROLLUP_TTL_SECONDS):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.applied = 0
+        self.duplicates = 0
+
+    @staticmethod
+    def _key(user_id: str, month: str) -> str:
+        return f"rollup:{user_id}:{month}"
+
+    @staticmethod
+    def _index_key(user_id: str) -> str:
+        return f"rollup-index:{user_id}"
+
+    def _lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def index(self, user_id: str) -> Dict[str, Any]:
+        """{"months": sorted month labels with totals, "version": last reconciled expense version}"""
+        return await self.store.get(self._index_key(user_id)) or {"months": [], "version": 0}
+
+    async def months(self, user_id: str, months: Sequence[str]) -> Dict[str, Dict[str, Dict[str, List[int]]]]:
+        """Totals for each of `months` that has any; one document read per month."""
+        totals = {}
+        for month in months:
+            doc = await self.store.get(self._key(user_id, month))
+            if doc and doc["totals"]:
+                totals[month] = doc["totals"]
+        return totals
+
+    async def apply(self, user_id: str, event_id: str, version: int, deltas: Sequence[RollupDelta]) -> bool:
+        """Adds the deltas unless this event was already applied; True if anything changed."""
+        async with self._lock(user_id):
+            index = await self.index(user_id)
+            if version <= index["version"]:
+                self.duplicates += 1
+                return False
+
+            by_month: Dict[str, List[RollupDelta]] = {}
+            for delta in deltas:
+                by_month.setdefault(delta.month, []).append(delta)
+
+            changed = False
+            for month, month_deltas in by_month.items():
+                doc = await self.store.get(self._key(user_id, month)) or {"totals": {}, "applied": []}
+                if event_id in doc["applied"]:
+                    continue
+                for delta in month_deltas:
+                    _add(doc["totals"], delta.currency, delta.category, delta.amountMinor, delta.count)
+                doc["applied"] = (doc["applied"] + [event_id])[-MAX_APPLIED_EVENTS:]
+                await self.store.put(self._key(user_id, month), doc, self.ttl_seconds)
+                changed = True
+                if month not in index["months"]:
+                    index["months"] = sorted(index["months"] + [month])
+                    await self.store.put(self._index_key(user_id), index, self.ttl_seconds)
+
+            if changed:
+                self.applied += 1
+            else:
+                self.duplicates += 1
+            return changed
+
+    async def replace(self, user_id: str, compute: Callable[[], Tuple[MonthTotals, int]]) -> int:
+        """
+        Overwrites the user's rollups with `compute()`'s (totals, expense
+        version), called under the user's lock so no event lands between the
+        snapshot and the write. Returns how many months were wrong.
+        """
+        async with self._lock(user_id):
+            totals, version = compute()
+            index = await self.index(user_id)
+            drifted = 0
+            for month in sorted(set(index["months"]) | set(totals)):
+                doc = await self.store.get(self._key(user_id, month))
+                fresh = totals.get(month, {})
+                if (doc["totals"] if doc else {}) == fresh:
+                    continue
+                drifted += 1
+                if fresh:
+                    await self.store.put(
+                        self._key(user_id, month), {"totals": fresh, "applied": doc["applied"] if doc else []},
+                        self.ttl_seconds,
+                    )
+                else:
+                    await self.store.delete(self._key(user_id, month))
+            await self.store.put(
+                self._index_key(user_id), {"months": sorted(totals), "version": version}, self.ttl_seconds,
+            )
+            return drifted
+
+
+def _add(totals: Dict[str, Dict[str, List[int]]], currency: str, category: str, amount_minor: int, count: int) -> None:
+    by_category = totals.setdefault(currency, {})
+    cell = by_category.setdefault(category, [0, 0])
+    cell[0] += amount_minor
+    cell[1] += count
+    if cell == [0, 0]:
+        del by_category[category]
+        if not by_category:
+            del totals[currency]
+
+
+_repo: Optional[MonthlyRollupsRepo] = None
+
+
+def get_rollups_repo() -> MonthlyRollupsRepo:
+    """Process-wide rollups; ROLLUPS_SQLITE_PATH keeps them on disk and shares them with a worker process."""
+    global _repo
+    if _repo is None:
+        sqlite_path = os.getenv("ROLLUPS_SQLITE_PATH")
+        _repo = MonthlyRollupsRepo(SqliteIdempotencyRepo(sqlite_path) if sqlite_path else InMemoryIdempotencyRepo())
+    return _repo
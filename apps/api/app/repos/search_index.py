@@ -0,0 +1,179 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.pipelines.categorizer.rules import fold
+
+# Terms this long also match inside words ("iggy" -> swiggy), through trigrams
+MIN_SUBSTRING_TERM = 3
+# A term that matches no word falls back to words sharing this much of its
+# trigrams (Dice coefficient), so "swigy" still finds swiggy
+FUZZY_MIN_SIMILARITY = 0.5
+# "{" sorts right after "z", so [term, term + "{") is every folded word starting with term
+_PREFIX_END = "{"
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def search_tokens(*texts: Optional[str]) -> Set[str]:
+    """The distinct folded words of the given texts; None and empty texts are skipped."""
+    return {token for text in texts if text for token in fold(text).split()}
+
+
+def search_terms(query: str) -> List[str]:
+    """Query words, folded like the indexed text."""
+    return list(dict.fromkeys(fold(query).split()))
+
+
+def trigrams(word: str, padded: bool = False) -> Set[str]:
+    """
+    The word's three-letter windows. Padded, as pg_trgm does, they also mark
+    where the word starts and ends, which keeps short misspellings similar.
+    """
+    if padded:
+        word = f"  {word} "
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def token_matches(term: str, token: str) -> bool:
+    """The rule the index applies: a prefix, or for longer terms anywhere in the word."""
+    return token.startswith(term) or (len(term) >= MIN_SUBSTRING_TERM and term in token)
+
+
+class SearchIndex:
+    """
+    Inverted index over one user's expense text (title, merchant and notes):
+    every folded word maps to the rows that contain it, as a compact int32
+    posting list. A sorted vocabulary answers prefix queries with two
+    bisects, and a trigram index over the vocabulary finds words containing
+    a term, or close to a misspelt one, without scanning every word. New
+    words are sorted into the vocabulary in bulk on the next query, not one
+    insertion at a time, so building over mostly-unique words (statement
+    reference numbers) stays O(n log n).
+
+    Rows are ExpenseColumns positions and are only ever appended. Deleted
+    rows stay in the postings for the caller to filter out with its live
+    mask. An edit appends the new words' postings, so posting lists are
+    not kept in row order; if the edit also dropped words, the row is
+    marked stale with its current words, and matches on stale rows are
+    re-checked against those until the next rebuild.
+    """
+
+    def __init__(self):
+        self._vocabulary: List[str] = []
+        self._new_words: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._postings: List[array] = []
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self.stale: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Every indexed word, sorted."""
+        if self._new_words:
+            # Timsort merges the sorted run and the new words' run in one pass
+            self._vocabulary.extend(self._new_words)
+            self._vocabulary.sort()
+            self._new_words = []
+        return self._vocabulary
+
+    def _id(self, token: str) -> int:
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = self._ids[token] = len(self._postings)
+            self._tokens.append(token)
+            self._postings.append(array("i"))
+            self._new_words.append(token)
+            # Padded windows include the inner ones that substring lookups use
+            for gram in trigrams(token, padded=True):
+                self._trigrams[gram].add(token_id)
+        return token_id
+
+    def add(self, row: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            self._postings[self._id(token)].append(row)
+
+    def add_many(self, rows: Iterable[Tuple[int, Iterable[str]]]) -> None:
+        for row, tokens in rows:
+            self.add(row, tokens)
+
+    def update(self, row: int, old: Set[str], new: Set[str]) -> None:
+        self.add(row, new - old)
+        if old - new or row in self.stale:
+            self.stale[row] = new
+
+    def _words(self, term: str) -> List[int]:
+        """Ids of the words `term` matches."""
+        vocabulary = self.vocabulary
+        start = bisect_left(vocabulary, term)
+        end = bisect_left(vocabulary, term + _PREFIX_END, start)
+        ids = {self._ids[token] for token in vocabulary[start:end]}
+        if len(term) >= MIN_SUBSTRING_TERM:
+            grams = trigrams(term)
+            candidates = set.intersection(*(self._trigrams.get(gram, set()) for gram in grams))
+            ids.update(token_id for token_id in candidates if term in self._tokens[token_id])
+            if not ids:
+                ids = self._fuzzy(trigrams(term, padded=True))
+        return list(ids)
+
+    def _fuzzy(self, grams: Set[str]) -> Set[int]:
+        """Words whose padded trigrams are similar enough to `grams`."""
+        shared = Counter(token_id for gram in grams for token_id in self._trigrams.get(gram, ()))
+        # Dice >= t needs 2 * shared >= t * (|a| + |b|) >= t * (|a| + 1)
+        floor = FUZZY_MIN_SIMILARITY * (len(grams) + 1) / 2
+        return {
+            token_id for token_id, n in shared.items()
+            if n >= floor and _similarity(grams, trigrams(self._tokens[token_id], padded=True)) >= FUZZY_MIN_SIMILARITY
+        }
+
+    def _rows(self, term: str) -> np.ndarray:
+        postings = [np.frombuffer(self._postings[token_id], dtype=np.int32) for token_id in self._words(term)]
+        postings = [p for p in postings if len(p)]
+        if not postings:
+            return _EMPTY
+        # Only an edit can list a row twice under one word, and it leaves the row stale.
+        # Copied, since a live view would stop the posting array from growing
+        if len(postings) == 1 and not self.stale:
+            return postings[0].copy()
+        return np.unique(np.concatenate(postings))
+
+    def search(self, terms: Sequence[str]) -> np.ndarray:
+        """Rows whose text matches every term, deleted rows included."""
+        rows: Optional[np.ndarray] = None
+        for term in sorted(terms, key=len, reverse=True):
+            matched = self._rows(term)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if len(rows) == 0:
+                return _EMPTY
+        if rows is None:
+            return _EMPTY
+        if self.stale:
+            stale = rows[np.isin(rows, np.fromiter(self.stale, dtype=np.int32, count=len(self.stale)))]
+            gone = [
+                row for row in stale.tolist()
+                if not all(self._still_matches(term, self.stale[row]) for term in terms)
+            ]
+            if gone:
+                rows = rows[~np.isin(rows, gone)]
+        return rows
+
+    def _still_matches(self, term: str, tokens: Set[str]) -> bool:
+        if any(token_matches(term, token) for token in tokens):
+            return True
+        # The fuzzy fallback only applies when nothing matched exactly
+        grams = trigrams(term, padded=True)
+        return (
+            len(term) >= MIN_SUBSTRING_TERM
+            and any(_similarity(grams, trigrams(token, padded=True)) >= FUZZY_MIN_SIMILARITY for token in tokens)
+        )
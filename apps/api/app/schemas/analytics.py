@@ -0,0 +1,20 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class SpendBucket(BaseModel):
+    key: str
+    amount: float
+    count: int
+
+
+class SpendingSummary(BaseModel):
+    currency: str
+    start: str
+    end: str
+    total: float
+    count: int
+    byCategory: List[SpendBucket]
+    byMonth: List[SpendBucket]
+    byPaymentMethod: List[SpendBucket]
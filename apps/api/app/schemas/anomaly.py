@@ -0,0 +1,20 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class Anomaly(BaseModel):
+    """A saved expense the anomaly engine flagged as unusual for the user."""
+    expenseId: str
+    title: str
+    category: str
+    amount: float
+    currency: str
+    date: str
+    zScore: float = Field(..., description="Standard deviations above the category's typical log amount")
+    reasons: List[str]
+
+
+class BackfillResponse(BaseModel):
+    scanned: int
+    flagged: int
@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.domain.value_objects.money import MAX_AMOUNT
+
+
+class Budget(BaseModel):
+    """A monthly spending limit for one category, or for all spending when category is null."""
+    category: Optional[str] = None
+    amount: float = Field(..., gt=0, le=MAX_AMOUNT, allow_inf_nan=False)
+    currency: str = Field("INR", min_length=3, max_length=3)
+
+
+class SetBudgetsRequest(BaseModel):
+    budgets: List[Budget] = Field(..., max_length=50)
+
+
+class BudgetBurndown(BaseModel):
+    category: Optional[str]
+    currency: str
+    limit: float
+    spent: float
+    remaining: float
+    projected: float = Field(..., description="Month-end spend if the pace so far continues")
+    onTrack: bool
+    daily: List[float] = Field(..., description="Cumulative spend at the end of each day of the month up to asOf")
+
+
+class BurndownReport(BaseModel):
+    month: str
+    asOf: str
+    budgets: List[BudgetBurndown]
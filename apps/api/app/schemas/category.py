@@ -0,0 +1,43 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+MAX_CONFIRMATIONS_PER_REQUEST = 500
+MAX_RECATEGORIZE_ROWS = 10_000
+
+
+class ConfirmedExpense(BaseModel):
+    """An expense the user saved, with the category they settled on."""
+    merchant: Optional[str] = None
+    title: Optional[str] = None
+    category: str
+
+
+class ConfirmExpensesRequest(BaseModel):
+    expenses: List[ConfirmedExpense] = Field(..., min_length=1, max_length=MAX_CONFIRMATIONS_PER_REQUEST)
+
+
+class ConfirmExpensesResponse(BaseModel):
+    learned: int
+    skipped: int
+
+
+class MerchantCategory(BaseModel):
+    merchant: str
+    category: str
+    confirmations: int
+
+
+class ExpenseToRecategorize(BaseModel):
+    merchant: Optional[str] = None
+    title: Optional[str] = None
+    category: Optional[str] = None
+
+
+class RecategorizeRequest(BaseModel):
+    expenses: List[ExpenseToRecategorize] = Field(..., max_length=MAX_RECATEGORIZE_ROWS)
+
+
+class RecategorizeResponse(BaseModel):
+    categories: List[str]
+    changed: int
@@ -0,0 +1,11 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """One page of a cursor-paginated list; mirrors packages/contracts/shared/pagination.json."""
+    items: List[T]
+    nextCursor: Optional[str] = Field(None, description="Pass as `cursor` for the next page; null on the last page")
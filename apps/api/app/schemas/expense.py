@@ -0,0 +1,32 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+
+# Events mirror packages/contracts/events/expenses-changed.json
+
+
+class Expense(ExpenseDetails):
+    """A saved expense: the parsed or entered details plus its id."""
+    id: str = Field(..., description="Expense id")
+
+
+class RollupDelta(BaseModel):
+    """What a write changed in one (month, category, currency) total; negative for removals."""
+    month: str = Field(..., pattern=r"^\d{4}-\d{2}$")
+    category: str
+    currency: str
+    amountMinor: int
+    count: int
+
+
+class ExpensesChangedEvent(BaseModel):
+    eventType: Literal["expenses-changed"] = "expenses-changed"
+    eventId: str
+    occurredAt: str
+    userId: str
+    change: Literal["created", "updated", "deleted"]
+    # The user's expense write counter just after the change
+    version: int = Field(..., ge=1)
+    deltas: List[RollupDelta]
@@ -0,0 +1,105 @@
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult
+
+# Mirrors packages/contracts/events/ingestion-job-*.json
+
+IngestionKind = Literal["image", "audio"]
+JobStatus = Literal["queued", "processing", "completed", "failed"]
+
+
+class UploadRef(BaseModel):
+    key: str
+    mimeType: str
+    sizeBytes: int = Field(..., ge=0)
+
+
+class JobError(BaseModel):
+    status: int
+    detail: str
+
+
+class IngestionJobCreatedEvent(BaseModel):
+    eventType: Literal["ingestion-job-created"] = "ingestion-job-created"
+    eventId: str
+    occurredAt: str
+    jobId: str
+    userId: str
+    kind: IngestionKind
+    upload: UploadRef
+    timezone: str
+    nowIso: str
+
+
+class IngestionJobCompletedEvent(BaseModel):
+    eventType: Literal["ingestion-job-completed"] = "ingestion-job-completed"
+    eventId: str
+    occurredAt: str
+    jobId: str
+    userId: str
+    result: ExpenseAIResult
+    durationMs: int = Field(..., ge=0)
+
+
+class IngestionJobFailedEvent(BaseModel):
+    eventType: Literal["ingestion-job-failed"] = "ingestion-job-failed"
+    eventId: str
+    occurredAt: str
+    jobId: str
+    userId: str
+    error: JobError
+    attempts: int = Field(..., ge=1)
+
+
+class IngestionJob(BaseModel):
+    jobId: str
+    userId: str
+    kind: IngestionKind
+    status: JobStatus
+    createdAt: str
+    updatedAt: str
+    result: Optional[ExpenseAIResult] = None
+    error: Optional[JobError] = None
+
+
+class UploadTicketRequest(BaseModel):
+    kind: IngestionKind
+    mimeType: str
+    sizeBytes: int = Field(..., gt=0)
+    method: Literal["POST", "PUT"] = "POST"
+
+
+class UploadTicket(BaseModel):
+    """Where and how the client uploads a file straight to storage."""
+    uploadId: str
+    method: Literal["POST", "PUT"]
+    url: str
+    fields: Dict[str, str] = Field(default_factory=dict)
+    headers: Dict[str, str] = Field(default_factory=dict)
+    expiresAt: str
+
+
+class UploadedJobRequest(BaseModel):
+    timezone: str = "UTC"
+    nowIso: Optional[str] = None
+
+
+class StatementRowError(BaseModel):
+    row: int = Field(..., ge=1, description="Row number in the file, the header row included")
+    detail: str
+
+
+class StatementImport(BaseModel):
+    """What a statement import saved and what it left out."""
+    rowsRead: int = Field(..., ge=0)
+    imported: int = Field(..., ge=0)
+    # Incoming money (salary, refunds, transfers in) is not spending
+    creditsSkipped: int = Field(..., ge=0)
+    failed: int = Field(..., ge=0)
+    categorizedByModel: int = Field(..., ge=0)
+    uncategorized: int = Field(..., ge=0, description="Imported as Misc")
+    modelCalls: int = Field(..., ge=0)
+    errors: List[StatementRowError] = Field(default_factory=list, description="The first rows that failed")
+    durationMs: int = Field(..., ge=0)
@@ -0,0 +1,30 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.analytics import SpendBucket
+
+InsightKind = Literal["top_category", "category_change", "month_over_month"]
+
+
+class MonthlyRollup(BaseModel):
+    """One month's spend in one currency, from the materialized rollups."""
+    month: str
+    currency: str
+    total: float
+    count: int
+    byCategory: List[SpendBucket]
+
+
+class Insight(BaseModel):
+    kind: InsightKind
+    message: str
+    category: Optional[str] = None
+    amount: float
+    change: Optional[float] = Field(None, description="Relative change against the comparison period, 0.25 = 25% more")
+
+
+class InsightsReport(BaseModel):
+    month: str
+    currency: str
+    insights: List[Insight]
@@ -0,0 +1,79 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.domain.value_objects.date_range import DateRange, month_label, months_of
+from app.domain.value_objects.money import to_major
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+from app.repos.expenses_repo import ExpensesRepo, get_expenses_repo
+from app.schemas.analytics import SpendBucket, SpendingSummary
+
+# byMonth lists every month in the range, so the range is capped like insight rollups
+MAX_SUMMARY_MONTHS = 120
+
+
+def group_sum(codes: np.ndarray, amounts: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (totals, counts) per code in 0..size-1, as one bincount pass each. The
+    float64 weights are exact for integer totals below 2**53 minor units.
+    """
+    totals = np.bincount(codes, weights=amounts, minlength=size).astype(np.int64)
+    counts = np.bincount(codes, minlength=size)
+    return totals, counts
+
+
+def _buckets(keys: Sequence[str], totals: np.ndarray, counts: np.ndarray, currency: str) -> List[SpendBucket]:
+    """Non-empty groups, largest first."""
+    amounts = to_major(totals, currency).tolist()
+    order = np.argsort(-totals, kind="stable").tolist()
+    return [SpendBucket(key=keys[i], amount=amounts[i], count=int(counts[i])) for i in order if counts[i]]
+
+
+class AnalyticsService:
+    """Spending breakdowns computed as vectorized group-bys over a user's expense columns."""
+
+    def __init__(self, expenses: Optional[ExpensesRepo] = None):
+        self.expenses = expenses or get_expenses_repo()
+
+    def summary(self, user_id: str, date_range: DateRange, currency: str = "INR") -> SpendingSummary:
+        first_month = months_of(np.array([date_range.start_day]))[0]
+        span = int(months_of(np.array([date_range.end_day]))[0] - first_month) + 1
+        if span > MAX_SUMMARY_MONTHS:
+            raise ValueError(f"at most {MAX_SUMMARY_MONTHS} months at a time")
+
+        columns = self.expenses.columns(user_id)
+        rows = columns.select(date_range, currency)
+        amounts = columns.amount_minor[rows]
+
+        by_category = group_sum(columns.category[rows], amounts, len(ALLOWED_CATEGORIES))
+        by_method = group_sum(columns.payment_method[rows], amounts, len(ALLOWED_PAYMENT_METHODS))
+
+        months = months_of(columns.day[rows]) - first_month
+        month_totals, month_counts = group_sum(months, amounts, span)
+        # Months stay in calendar order, empty ones included, for charting
+        month_amounts = to_major(month_totals, currency).tolist()
+        by_month = [
+            SpendBucket(key=month_label(first_month + i), amount=month_amounts[i], count=int(month_counts[i]))
+            for i in range(span)
+        ]
+
+        return SpendingSummary(
+            currency=currency.upper(),
+            start=date_range.start.isoformat(),
+            end=date_range.end.isoformat(),
+            total=float(to_major(amounts.sum(), currency)),
+            count=len(rows),
+            byCategory=_buckets(ALLOWED_CATEGORIES, *by_category, currency),
+            byMonth=by_month,
+            byPaymentMethod=_buckets(ALLOWED_PAYMENT_METHODS, *by_method, currency),
+        )
+
+
+_service: Optional[AnalyticsService] = None
+
+
+def get_analytics_service() -> AnalyticsService:
+    global _service
+    if _service is None:
+        _service = AnalyticsService()
+    return _service
@@ -0,0 +1,108 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.domain.value_objects.money import to_minor_each
+from app.pipelines.anomaly_engine import rules
+from app.pipelines.anomaly_engine.pipeline import (
+    AnomalyEngine, AnomalyScore, category_code, get_anomaly_engine, merchant_key,
+)
+from app.pipelines.categorizer.rules import merchant_tokens
+from app.repos.anomalies_repo import AnomaliesRepo, get_anomalies_repo
+from app.repos.expenses_repo import ExpensesRepo, get_expenses_repo
+from app.schemas.anomaly import Anomaly, BackfillResponse
+from app.schemas.expense import Expense
+
+# Saving more expenses than this at once goes through the engine's batch mode
+BATCH_THRESHOLD = 32
+
+
+def _anomaly(expense: Expense, z: float, reasons: List[str]) -> Anomaly:
+    return Anomaly(
+        expenseId=expense.id, title=expense.title, category=expense.category, amount=expense.amount,
+        currency=expense.currency, date=expense.date or "", zScore=round(z, 3), reasons=reasons,
+    )
+
+
+class AnomaliesService:
+    """
+    Keeps the anomaly engine's stats in step with saved expenses and records
+    the expenses it flags. New expenses are scored as they are saved; edits
+    and deletes adjust the stats without scoring.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[AnomalyEngine] = None,
+        repo: Optional[AnomaliesRepo] = None,
+        expenses: Optional[ExpensesRepo] = None,
+    ):
+        self.engine = engine or get_anomaly_engine()
+        self.repo = repo or get_anomalies_repo()
+        self.expenses = expenses or get_expenses_repo()
+
+    async def on_created(self, user_id: str, expenses: Sequence[Expense]) -> List[Anomaly]:
+        if len(expenses) > BATCH_THRESHOLD:
+            z, masks = self.engine.observe_batch(
+                user_id,
+                to_minor_each([e.amount for e in expenses], [e.currency for e in expenses]),
+                np.array([category_code(e.category) for e in expenses], dtype=np.int64),
+                [merchant_key(e) for e in expenses],
+                np.array([e.date[:10] for e in expenses], dtype="datetime64[D]"),
+            )
+            scores = [AnomalyScore(float(z[i]), rules.reasons(int(masks[i]))) for i in np.flatnonzero(masks).tolist()]
+            flagged = [expenses[i] for i in np.flatnonzero(masks).tolist()]
+        else:
+            results = [(e, self.engine.observe(user_id, e)) for e in expenses]
+            flagged = [e for e, score in results if score.flagged]
+            scores = [score for _, score in results if score.flagged]
+        anomalies = [_anomaly(e, s.zScore, s.reasons) for e, s in zip(flagged, scores)]
+        if anomalies:
+            await self.repo.add_many(user_id, anomalies)
+        return anomalies
+
+    async def on_updated(self, user_id: str, previous: Expense, expense: Expense) -> None:
+        self.engine.forget(user_id, previous)
+        self.engine.learn(user_id, expense)
+        await self.repo.remove(user_id, expense.id)
+
+    async def on_deleted(self, user_id: str, expense: Expense) -> None:
+        self.engine.forget(user_id, expense)
+        await self.repo.remove(user_id, expense.id)
+
+    async def list(self, user_id: str, limit: int) -> List[Anomaly]:
+        return await self.repo.list(user_id, limit)
+
+    async def backfill(self, user_id: str) -> BackfillResponse:
+        """
+        Rebuilds the user's stats from their saved expenses in one batch pass,
+        flagging each expense against the ones dated before it.
+        """
+        columns = self.expenses.columns(user_id)
+        rows = columns.select()
+        merchants = [
+            " ".join(merchant_tokens(columns.merchants[row] or columns.titles[row] or "")) for row in rows.tolist()
+        ]
+        self.engine.reset(user_id)
+        z, masks = self.engine.observe_batch(
+            user_id, columns.amount_minor[rows], columns.category[rows], merchants, columns.day[rows],
+        )
+        flagged = np.flatnonzero(masks)
+        # Oldest first, so the newest flags are the ones kept
+        flagged = flagged[np.argsort(columns.day[rows][flagged], kind="stable")]
+        anomalies = [
+            _anomaly(columns.get(columns.ids[rows[i]]), float(z[i]), rules.reasons(int(masks[i])))
+            for i in flagged.tolist()
+        ]
+        await self.repo.replace(user_id, anomalies)
+        return BackfillResponse(scanned=len(rows), flagged=len(anomalies))
+
+
+_service: Optional[AnomaliesService] = None
+
+
+def get_anomalies_service() -> AnomaliesService:
+    global _service
+    if _service is None:
+        _service = AnomaliesService()
+    return _service
@@ -0,0 +1,91 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.domain.value_objects.date_range import DateRange
+from app.domain.value_objects.money import Money, is_currency, to_major
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.repos.budgets_repo import BudgetsRepo, get_budgets_repo
+from app.repos.expenses_repo import CATEGORY_CODES, ExpensesRepo, get_expenses_repo
+from app.schemas.budget import Budget, BudgetBurndown, BurndownReport
+
+
+class BudgetsService:
+    """Monthly budgets and their burn-down against the user's expense columns."""
+
+    def __init__(self, budgets: Optional[BudgetsRepo] = None, expenses: Optional[ExpensesRepo] = None):
+        self.budgets = budgets or get_budgets_repo()
+        self.expenses = expenses or get_expenses_repo()
+
+    async def list(self, user_id: str) -> List[Budget]:
+        return await self.budgets.list(user_id)
+
+    async def replace(self, user_id: str, budgets: List[Budget]) -> List[Budget]:
+        unknown = sorted({b.category for b in budgets if b.category is not None} - set(ALLOWED_CATEGORIES))
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown categories: {', '.join(unknown)}. Allowed: {', '.join(ALLOWED_CATEGORIES)}.",
+            )
+        currencies = sorted({b.currency.upper() for b in budgets if not is_currency(b.currency.upper())})
+        if currencies:
+            raise HTTPException(status_code=422, detail=f"Unknown currencies: {', '.join(currencies)}.")
+        keys = [(b.category, b.currency.upper()) for b in budgets]
+        if len(set(keys)) != len(keys):
+            raise HTTPException(status_code=422, detail="One budget per category and currency.")
+        budgets = [b.model_copy(update={"currency": b.currency.upper()}) for b in budgets]
+        await self.budgets.replace(user_id, budgets)
+        return budgets
+
+    def _daily_spend(self, user_id: str, month: DateRange, currency: str) -> np.ndarray:
+        """
+        (category, day of month) grid of cumulative spend in minor units: one
+        bincount over category * days + day, reshaped and summed along days.
+        """
+        columns = self.expenses.columns(user_id)
+        rows = columns.select(month, currency)
+        cells = columns.category[rows].astype(np.int64) * month.days + (columns.day[rows] - month.start_day)
+        grid = np.bincount(
+            cells, weights=columns.amount_minor[rows], minlength=len(ALLOWED_CATEGORIES) * month.days
+        ).astype(np.int64)
+        return np.cumsum(grid.reshape(len(ALLOWED_CATEGORIES), month.days), axis=1)
+
+    async def burndown(self, user_id: str, month: DateRange, as_of: date) -> BurndownReport:
+        budgets = await self.budgets.list(user_id)
+        # Days of the month elapsed by the end of `as_of`
+        elapsed = min(max((as_of - month.start).days + 1, 0), month.days)
+        grids: Dict[str, np.ndarray] = {}
+        report = []
+        for budget in budgets:
+            grid = grids.get(budget.currency)
+            if grid is None:
+                grid = grids[budget.currency] = self._daily_spend(user_id, month, budget.currency)
+            cumulative = grid.sum(axis=0) if budget.category is None else grid[CATEGORY_CODES[budget.category]]
+            cumulative = cumulative[:elapsed]
+
+            limit = Money.of(budget.amount, budget.currency)
+            spent = Money(int(cumulative[-1]) if elapsed else 0, budget.currency)
+            projected = Money(round(spent.minor * month.days / elapsed) if elapsed else 0, budget.currency)
+            report.append(BudgetBurndown(
+                category=budget.category,
+                currency=budget.currency,
+                limit=limit.amount,
+                spent=spent.amount,
+                remaining=(limit - spent).amount,
+                projected=projected.amount,
+                onTrack=projected.minor <= limit.minor,
+                daily=to_major(cumulative, budget.currency).tolist(),
+            ))
+        return BurndownReport(month=month.start.strftime("%Y-%m"), asOf=as_of.isoformat(), budgets=report)
+
+
+_service: Optional[BudgetsService] = None
+
+
+def get_budgets_service() -> BudgetsService:
+    global _service
+    if _service is None:
+        _service = BudgetsService()
+    return _service
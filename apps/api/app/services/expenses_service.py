@@ -0,0 +1,224 @@
+import base64
+import binascii
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from app.clients.sqs_client import QueueClient, get_queue
+from app.domain.value_objects.date_range import DateRange, canonical_iso, epoch_month, month_label
+from app.domain.value_objects.money import MAX_AMOUNT, is_currency, to_minor_each
+from app.modules.ai_expense_parser.normalizer import normalize_category, normalize_payment_method
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+from app.pipelines.categorizer.pipeline import Categorizer, get_categorizer
+from app.pipelines.categorizer.rules import DEFAULT_CATEGORY
+from app.repos.expenses_repo import ExpensesRepo, get_expenses_repo
+from app.repos.ingestion_repo import utc_now_iso
+from app.repos.search_index import search_terms
+from app.schemas.common import Page
+from app.schemas.expense import Expense, ExpensesChangedEvent, RollupDelta
+from app.services.anomalies_service import AnomaliesService, get_anomalies_service
+
+EXPENSE_EVENTS_QUEUE_URL_ENV = "EXPENSE_EVENTS_QUEUE_URL"
+# Keeps a bulk import's event well under the 256 KB SQS message limit
+MAX_DELTAS_PER_EVENT = 500
+
+
+def encode_cursor(sort_key: int) -> str:
+    return base64.urlsafe_b64encode(str(sort_key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def rollup_deltas(added: Sequence[Expense] = (), removed: Sequence[Expense] = ()) -> List[RollupDelta]:
+    """The changes to the monthly (category, currency) totals from adding and removing expenses."""
+    expenses = [*added, *removed]
+    if not expenses:
+        return []
+    minor = to_minor_each([e.amount for e in expenses], [e.currency for e in expenses]).tolist()
+    totals: Dict[Tuple[str, str, str], List[int]] = {}
+    for i, (expense, amount) in enumerate(zip(expenses, minor)):
+        sign = 1 if i < len(added) else -1
+        month = month_label(epoch_month(expense.date))
+        cell = totals.setdefault((month, expense.category, expense.currency.upper()), [0, 0])
+        cell[0] += sign * amount
+        cell[1] += sign
+    return [
+        RollupDelta(month=month, category=category, currency=currency, amountMinor=amount, count=count)
+        for (month, category, currency), (amount, count) in totals.items()
+        if amount or count
+    ]
+
+
+class ExpensesService:
+    """
+    Saving and editing expenses. Details are normalized on the way in (an
+    allowed category and payment method, an ISO 4217 currency, an ISO date,
+    a positive amount), so everything downstream of the repo can rely on
+    them. Writes are passed on to the anomaly service when one is attached,
+    and published as `expenses-changed` events carrying the monthly rollup
+    deltas when an events queue is. With a categorizer attached, each
+    expense a user saves or edits confirms its merchant's category for
+    later parses.
+    """
+
+    def __init__(
+        self,
+        repo: Optional[ExpensesRepo] = None,
+        anomalies: Optional[AnomaliesService] = None,
+        events: Optional[QueueClient] = None,
+        categorizer: Optional[Categorizer] = None,
+    ):
+        self.repo = repo or get_expenses_repo()
+        self.anomalies = anomalies
+        self.events = events
+        self.categorizer = categorizer
+
+    def _learn(self, user_id: str, expenses: Sequence[Expense]) -> None:
+        if self.categorizer is None:
+            return
+        for expense in expenses:
+            # Misc is where unplaced expenses land, not a choice worth learning
+            if expense.category != DEFAULT_CATEGORY:
+                self.categorizer.learn(user_id, expense.merchant or expense.title, expense.category)
+
+    async def _publish(self, user_id: str, change: str, version: int, deltas: List[RollupDelta]) -> None:
+        if self.events is None:
+            return
+        for start in range(0, len(deltas), MAX_DELTAS_PER_EVENT):
+            await self.events.send(ExpensesChangedEvent(
+                eventId=str(uuid.uuid4()),
+                occurredAt=utc_now_iso(),
+                userId=user_id,
+                change=change,
+                version=version,
+                deltas=deltas[start:start + MAX_DELTAS_PER_EVENT],
+            ).model_dump())
+
+    @staticmethod
+    def _normalize(expense_id: str, details: ExpenseDetails) -> Expense:
+        if not details.amount > 0:
+            raise HTTPException(status_code=422, detail="Amount must be greater than zero.")
+        # Also false for infinity; past the cap, amounts would overflow the int64 minor-unit column
+        if not details.amount <= MAX_AMOUNT:
+            raise HTTPException(status_code=422, detail=f"Amount must be at most {MAX_AMOUNT:,.0f}.")
+        try:
+            # Stored in extended form: the columns and rollups read the date from its first ten characters
+            date = canonical_iso(details.date or datetime.now().isoformat())
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid date {details.date!r}, expected ISO 8601.")
+        currency = details.currency.strip().upper()
+        if not is_currency(currency):
+            raise HTTPException(status_code=422, detail=f"Unknown currency {details.currency!r}, expected an ISO 4217 code.")
+        return Expense(
+            **details.model_dump(exclude={"category", "paymentMethod", "currency", "date", "notes", "description"}),
+            id=expense_id,
+            currency=currency,
+            category=normalize_category(details.category),
+            paymentMethod=normalize_payment_method(details.paymentMethod),
+            date=date,
+            notes=details.notes or details.description,
+        )
+
+    async def create(self, user_id: str, details: ExpenseDetails) -> Expense:
+        (expense,) = await self.create_many(user_id, [details])
+        return expense
+
+    async def create_many(self, user_id: str, details: Sequence[ExpenseDetails]) -> List[Expense]:
+        expenses = [self._normalize(str(uuid.uuid4()), d) for d in details]
+        await self.save_many(user_id, expenses)
+        self._learn(user_id, expenses)
+        return expenses
+
+    async def save_many(self, user_id: str, expenses: Sequence[Expense]) -> None:
+        """
+        Saves expenses that were normalized elsewhere, such as a statement
+        import's batches, with the same anomaly checks and events as
+        create_many. Their categories are not learned: nobody confirmed them.
+        """
+        await self.repo.add_many(user_id, expenses)
+        # Read before anything else can await, so it is this write's version
+        version = self.repo.columns(user_id).version
+        if self.anomalies is not None:
+            await self.anomalies.on_created(user_id, expenses)
+        await self._publish(user_id, "created", version, rollup_deltas(added=expenses))
+
+    async def get(self, user_id: str, expense_id: str) -> Expense:
+        expense = await self.repo.get(user_id, expense_id)
+        if expense is None:
+            raise HTTPException(status_code=404, detail="Expense not found.")
+        return expense
+
+    async def search(
+        self,
+        user_id: str,
+        query: str = "",
+        date_range: Optional[DateRange] = None,
+        currency: Optional[str] = None,
+        categories: Optional[Sequence[str]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Page[Expense]:
+        """
+        Expenses whose title, merchant or notes contain every word of the
+        query (as a word prefix, inside a word, or close to it when nothing
+        matches exactly), filtered and newest first.
+        """
+        unknown = [c for c in categories or () if c not in ALLOWED_CATEGORIES]
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown categories: {', '.join(unknown)}.")
+        expenses, next_key = await self.repo.search(
+            user_id, search_terms(query),
+            before=decode_cursor(cursor) if cursor else None,
+            limit=limit,
+            date_range=date_range,
+            currency=currency,
+            categories=categories or None,
+            min_amount=min_amount,
+            max_amount=max_amount,
+        )
+        return Page[Expense](items=expenses, nextCursor=encode_cursor(next_key) if next_key is not None else None)
+
+    async def update(self, user_id: str, expense_id: str, details: ExpenseDetails) -> Expense:
+        expense = self._normalize(expense_id, details)
+        previous = await self.repo.update(user_id, expense)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Expense not found.")
+        version = self.repo.columns(user_id).version
+        if self.anomalies is not None:
+            await self.anomalies.on_updated(user_id, previous, expense)
+        await self._publish(user_id, "updated", version, rollup_deltas(added=[expense], removed=[previous]))
+        self._learn(user_id, [expense])
+        return expense
+
+    async def delete(self, user_id: str, expense_id: str) -> None:
+        previous = await self.repo.delete(user_id, expense_id)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Expense not found.")
+        version = self.repo.columns(user_id).version
+        if self.anomalies is not None:
+            await self.anomalies.on_deleted(user_id, previous)
+        await self._publish(user_id, "deleted", version, rollup_deltas(removed=[previous]))
+
+
+_service: Optional[ExpensesService] = None
+
+
+def get_expenses_service() -> ExpensesService:
+    global _service
+    if _service is None:
+        _service = ExpensesService(
+            anomalies=get_anomalies_service(),
+            events=get_queue(EXPENSE_EVENTS_QUEUE_URL_ENV),
+            categorizer=get_categorizer(),
+        )
+    return _service
@@ -0,0 +1,153 @@
+import uuid
+from datetime import datetime, timedelta, timezone as tz
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.clients.s3_client import ObjectStore, PresignMethod, get_upload_store
+from app.clients.sqs_client import QueueClient, get_queue
+from app.modules.ai_expense_parser.uploads import AUDIO_MIME_TYPES, IMAGE_MIME_TYPES, MAX_AUDIO_BYTES, MAX_IMAGE_BYTES
+from app.repos.ingestion_repo import IngestionJobRepo, get_ingestion_repo, utc_now_iso
+from app.schemas.ingestion import IngestionJob, IngestionJobCreatedEvent, IngestionKind, UploadRef, UploadTicket
+
+INGESTION_QUEUE_URL_ENV = "INGESTION_QUEUE_URL"
+INGESTION_EVENTS_QUEUE_URL_ENV = "INGESTION_EVENTS_QUEUE_URL"
+
+UPLOAD_LIMITS = {
+    "image": (IMAGE_MIME_TYPES, MAX_IMAGE_BYTES),
+    "audio": (AUDIO_MIME_TYPES, MAX_AUDIO_BYTES),
+}
+
+
+def upload_key(user_id: str, upload_id: str) -> str:
+    return f"uploads/{user_id}/{upload_id}"
+
+
+class IngestionService:
+    """
+    Accepts uploads for asynchronous parsing: the file is stored, a queued job
+    record is written and an `ingestion-job-created` event is enqueued for the
+    worker. The caller gets a job id back without waiting on the model.
+
+    Files can also skip the API entirely: `create_upload` signs a direct
+    upload to storage and `submit_uploaded` queues the stored file, which the
+    worker then streams from storage.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[QueueClient] = None,
+        uploads: Optional[ObjectStore] = None,
+        jobs: Optional[IngestionJobRepo] = None,
+    ):
+        self.queue = queue if queue is not None else get_queue(INGESTION_QUEUE_URL_ENV)
+        self.uploads = uploads or get_upload_store()
+        self.jobs = jobs or get_ingestion_repo()
+
+    async def submit(
+        self,
+        user_id: str,
+        kind: IngestionKind,
+        file_bytes: bytes,
+        mime_type: str,
+        timezone: str,
+        now_iso: str,
+    ) -> IngestionJob:
+        job_id = str(uuid.uuid4())
+        key = upload_key(user_id, job_id)
+        await self.uploads.put(key, file_bytes, mime_type)
+        return await self._enqueue(user_id, job_id, kind, key, mime_type, len(file_bytes), timezone, now_iso)
+
+    def create_upload(
+        self, user_id: str, kind: IngestionKind, mime_type: str, size_bytes: int, method: PresignMethod = "POST"
+    ) -> UploadTicket:
+        """
+        Signs a direct upload for a file the client describes. The declared
+        type and size are only a first check: the worker sniffs and measures
+        the stored bytes again.
+        """
+        allowed_types, max_bytes = UPLOAD_LIMITS[kind]
+        if mime_type not in allowed_types:
+            raise HTTPException(status_code=400, detail=f"Unsupported {kind} type {mime_type}.")
+        if size_bytes > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large. Max {max_bytes // (1024 * 1024)}MB.")
+
+        upload_id = str(uuid.uuid4())
+        presigned = self.uploads.presign_upload(upload_key(user_id, upload_id), mime_type, max_bytes, method)
+        expires_at = datetime.now(tz.utc) + timedelta(seconds=presigned.expires_in)
+        return UploadTicket(
+            uploadId=upload_id,
+            method=presigned.method,
+            url=presigned.url,
+            fields=presigned.fields,
+            headers=presigned.headers,
+            expiresAt=expires_at.isoformat(),
+        )
+
+    async def submit_uploaded(self, user_id: str, upload_id: str, timezone: str, now_iso: str) -> IngestionJob:
+        """
+        Queues a file the client uploaded with a ticket from create_upload. The
+        upload id becomes the job id, so submitting twice returns the same job.
+        """
+        existing = await self.get_job(user_id, upload_id)
+        if existing is not None:
+            return existing
+
+        key = upload_key(user_id, upload_id)
+        head = await self.uploads.head(key)
+        if head is None:
+            raise HTTPException(status_code=404, detail="Upload not found.")
+        size, mime_type = head
+        kind = next((k for k, (types, _) in UPLOAD_LIMITS.items() if mime_type in types), None)
+        if kind is None:
+            await self.uploads.delete(key)
+            raise HTTPException(status_code=400, detail=f"Unsupported file type {mime_type}.")
+        if size > UPLOAD_LIMITS[kind][1]:
+            await self.uploads.delete(key)
+            raise HTTPException(status_code=413, detail=f"File too large. Max {UPLOAD_LIMITS[kind][1] // (1024 * 1024)}MB.")
+        return await self._enqueue(user_id, upload_id, kind, key, mime_type, size, timezone, now_iso)
+
+    async def _enqueue(
+        self,
+        user_id: str,
+        job_id: str,
+        kind: IngestionKind,
+        key: str,
+        mime_type: str,
+        size_bytes: int,
+        timezone: str,
+        now_iso: str,
+    ) -> IngestionJob:
+        now = utc_now_iso()
+        job = IngestionJob(jobId=job_id, userId=user_id, kind=kind, status="queued", createdAt=now, updatedAt=now)
+        await self.jobs.create(job)
+
+        event = IngestionJobCreatedEvent(
+            eventId=str(uuid.uuid4()),
+            occurredAt=now,
+            jobId=job_id,
+            userId=user_id,
+            kind=kind,
+            upload=UploadRef(key=key, mimeType=mime_type, sizeBytes=size_bytes),
+            timezone=timezone,
+            nowIso=now_iso,
+        )
+        await self.queue.send(event.model_dump())
+        return job
+
+    async def get_job(self, user_id: str, job_id: str) -> Optional[IngestionJob]:
+        job = await self.jobs.get(job_id)
+        if job is None or job.userId != user_id:
+            return None
+        return job
+
+
+_service: Optional[IngestionService] = None
+
+
+def get_ingestion_service() -> IngestionService:
+    """FastAPI dependency returning the process-wide ingestion service."""
+    global _service
+    if _service is None:
+        _service = IngestionService()
+    return _service
@@ -0,0 +1,74 @@
+from typing import Dict, List, Optional
+
+from app.domain.value_objects.date_range import DateRange, epoch_month, month_label
+from app.domain.value_objects.money import minor_exponent
+from app.pipelines.insights_engine.pipeline import TRAILING_MONTHS, InsightsEngine, get_insights_engine
+from app.repos.rollups_repo import MonthlyRollupsRepo, get_rollups_repo
+from app.schemas.analytics import SpendBucket
+from app.schemas.insight import InsightsReport, MonthlyRollup
+
+MAX_ROLLUP_MONTHS = 120
+
+
+def month_labels(start: str, end: str) -> List[str]:
+    """Every "YYYY-MM" from start to end, both included."""
+    first = epoch_month(DateRange.parse_month(start).start)
+    last = epoch_month(DateRange.parse_month(end).start)
+    if last < first:
+        raise ValueError(f"range ends ({end}) before it starts ({start})")
+    if last - first >= MAX_ROLLUP_MONTHS:
+        raise ValueError(f"at most {MAX_ROLLUP_MONTHS} months at a time")
+    return [month_label(month) for month in range(first, last + 1)]
+
+
+def _rollup(month: str, totals: Dict[str, Dict[str, List[int]]], currency: str) -> MonthlyRollup:
+    cells = totals.get(currency, {})
+    scale = 10 ** minor_exponent(currency)
+    largest_first = sorted(cells.items(), key=lambda item: -item[1][0])
+    return MonthlyRollup(
+        month=month,
+        currency=currency,
+        total=sum(amount for amount, _ in cells.values()) / scale,
+        count=sum(count for _, count in cells.values()),
+        byCategory=[
+            SpendBucket(key=category, amount=amount / scale, count=count)
+            for category, (amount, count) in largest_first
+        ],
+    )
+
+
+class InsightsService:
+    """
+    Dashboard reads served from the materialized monthly rollups: a query
+    reads one document per month asked for, however many expenses the
+    user has.
+    """
+
+    def __init__(self, repo: Optional[MonthlyRollupsRepo] = None, engine: Optional[InsightsEngine] = None):
+        self.repo = repo or get_rollups_repo()
+        self.engine = engine or get_insights_engine()
+
+    async def rollups(self, user_id: str, start: str, end: str, currency: str = "INR") -> List[MonthlyRollup]:
+        """Every month from start to end, empty ones included."""
+        currency = currency.upper()
+        months = month_labels(start, end)
+        totals = await self.repo.months(user_id, months)
+        return [_rollup(month, totals.get(month, {}), currency) for month in months]
+
+    async def insights(self, user_id: str, month: str, currency: str = "INR") -> InsightsReport:
+        currency = currency.upper()
+        current = epoch_month(DateRange.parse_month(month).start)
+        months = [month_label(current - i) for i in range(TRAILING_MONTHS + 1)]
+        totals = await self.repo.months(user_id, months)
+        rollup, *previous = [_rollup(m, totals.get(m, {}), currency) for m in months]
+        return InsightsReport(month=rollup.month, currency=currency, insights=self.engine.generate(rollup, previous))
+
+
+_service: Optional[InsightsService] = None
+
+
+def get_insights_service() -> InsightsService:
+    global _service
+    if _service is None:
+        _service = InsightsService()
+    return _service
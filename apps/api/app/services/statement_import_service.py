@@ -0,0 +1,201 @@
+import asyncio
+import csv
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from fastapi import HTTPException, UploadFile
+
+from app.core.telemetry import span
+from app.domain.value_objects.money import is_currency
+from app.modules.ai_expense_parser.concurrency import get_batch_concurrency
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService, get_parser_service
+from app.modules.ai_expense_parser.uploads import MAX_STATEMENT_BYTES
+from app.pipelines.categorizer.pipeline import Categorizer, get_categorizer
+from app.pipelines.categorizer.rules import DEFAULT_CATEGORY
+from app.pipelines.statement_import.pipeline import (
+    DEFAULT_BATCH_SIZE,
+    Row,
+    StatementBatch,
+    StatementFormatError,
+    statement_batches,
+    statement_rows,
+)
+from app.schemas.ingestion import StatementImport, StatementRowError
+from app.services.expenses_service import ExpensesService, get_expenses_service
+
+logger = logging.getLogger(__name__)
+
+# Distinct descriptions one import may send to the model; rows past that are filed under Misc
+DEFAULT_MAX_MODEL_LOOKUPS = 2_000
+# Descriptions per categorization prompt
+DEFAULT_MODEL_BATCH_SIZE = 100
+MAX_DESCRIPTION_CHARS = 200
+MAX_REPORTED_ERRORS = 20
+# Normalized batches held while their payees are with the model; bounds the import's memory
+MAX_BATCHES_WAITING = 8
+
+
+class StatementImportService:
+    """
+    Bulk import of bank, card and UPI app statement exports (CSV, or .xlsx
+    when openpyxl is installed). The file is read row by row and normalized
+    a batch at a time off the event loop, so memory stays flat however long
+    the statement is. Known merchants and category columns are resolved
+    locally; only the payees no rule places go to the model, many to a
+    prompt and each distinct payee once per import. Batches are saved in
+    file order, each with one bulk write, as their model answers arrive.
+
+    Debits become expenses; credits are counted and skipped. Rows with an
+    unreadable date, an unknown currency, or no amount or one out of range
+    are reported, not imported.
+    """
+
+    def __init__(
+        self,
+        expenses: Optional[ExpensesService] = None,
+        parser: Optional[GeminiExpenseParserService] = None,
+        categorizer: Optional[Categorizer] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_model_lookups: int = DEFAULT_MAX_MODEL_LOOKUPS,
+        model_batch_size: int = DEFAULT_MODEL_BATCH_SIZE,
+    ):
+        self.expenses = expenses or get_expenses_service()
+        self.parser = parser or get_parser_service()
+        self.categorizer = categorizer or get_categorizer()
+        self.batch_size = batch_size
+        self.max_model_lookups = max_model_lookups
+        self.model_batch_size = model_batch_size
+
+    async def import_upload(self, user_id: str, file: UploadFile, currency: str = "INR") -> StatementImport:
+        if file.size is not None and file.size > MAX_STATEMENT_BYTES:
+            raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_STATEMENT_BYTES // (1024 * 1024)}MB.")
+        try:
+            rows = statement_rows(file.file)
+        except StatementFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await self.import_rows(user_id, rows, currency)
+
+    async def import_rows(self, user_id: str, rows: Iterable[Row], currency: str = "INR") -> StatementImport:
+        if not is_currency(currency.upper()):
+            raise HTTPException(status_code=422, detail=f"Unknown currency {currency!r}, expected an ISO 4217 code.")
+        start = time.perf_counter()
+        batches = statement_batches(rows, self.categorizer, user_id, currency, self.batch_size)
+        lookups = _ModelLookups(self.parser, self.max_model_lookups, self.model_batch_size)
+        summary = StatementImport(
+            rowsRead=0, imported=0, creditsSkipped=0, failed=0, categorizedByModel=0, uncategorized=0,
+            modelCalls=0, durationMs=0,
+        )
+
+        def read_ahead() -> "asyncio.Future[Optional[StatementBatch]]":
+            # Reading and normalizing are CPU work, done off the event loop
+            return asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+
+        # Batches waiting on model answers, in file order, with the prompts each one needs
+        waiting: Deque[Tuple[StatementBatch, Set[asyncio.Task]]] = deque()
+        upcoming = read_ahead()
+        try:
+            while True:
+                try:
+                    with span("normalize"):
+                        batch = await upcoming
+                except (StatementFormatError, csv.Error) as e:
+                    detail = str(e) if not summary.imported else f"{e} ({summary.imported} rows were imported before this.)"
+                    raise HTTPException(status_code=422, detail=detail)
+                if batch is None:
+                    break
+                # The next batch is normalized while this one's payees are with the model
+                upcoming = read_ahead()
+                waiting.append((batch, lookups.request(batch.keys[batch.uncategorized()].tolist())))
+                while waiting and (len(waiting) > MAX_BATCHES_WAITING or all(t.done() for t in waiting[0][1])):
+                    await self._save(user_id, *waiting.popleft(), lookups, summary)
+            while waiting:
+                await self._save(user_id, *waiting.popleft(), lookups, summary)
+        finally:
+            upcoming.cancel()
+            lookups.cancel()
+
+        summary.modelCalls = lookups.calls
+        summary.durationMs = int((time.perf_counter() - start) * 1000)
+        return summary
+
+    async def _save(
+        self, user_id: str, batch: StatementBatch, prompts: Set[asyncio.Task], lookups: "_ModelLookups",
+        summary: StatementImport,
+    ) -> None:
+        if prompts:
+            await asyncio.wait(prompts)
+        pending = batch.uncategorized()
+        answered = np.array([lookups.category(key) for key in batch.keys[pending].tolist()], dtype=object)
+        batch.categories[pending] = answered
+
+        expenses = batch.expenses()
+        with span("save"):
+            await self.expenses.save_many(user_id, expenses)
+
+        summary.rowsRead += batch.rows
+        summary.imported += len(expenses)
+        summary.creditsSkipped += batch.credits
+        summary.failed += len(batch.errors)
+        summary.categorizedByModel += int(np.count_nonzero(answered != ""))
+        summary.uncategorized += int(np.count_nonzero(batch.categories == ""))
+        room = MAX_REPORTED_ERRORS - len(summary.errors)
+        summary.errors += [StatementRowError(row=row, detail=detail) for row, detail in batch.errors[:max(room, 0)]]
+
+
+class _ModelLookups:
+    """
+    One import's model categorizations: every description key is asked at
+    most once, `prompt_size` to a prompt, up to `limit` keys in all. Prompts
+    run in the background, so later batches are read while they are out.
+    """
+
+    def __init__(self, parser: GeminiExpenseParserService, limit: int, prompt_size: int):
+        self.parser = parser
+        self.limit = limit
+        self.prompt_size = prompt_size
+        self.slots = asyncio.Semaphore(get_batch_concurrency())
+        self.answers: Dict[str, str] = {}
+        self.prompts: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+
+    def request(self, keys: Sequence[str]) -> Set[asyncio.Task]:
+        """Sends the keys not asked yet; returns the prompts whose answers the keys wait on."""
+        new = [key for key in dict.fromkeys(keys) if key and key not in self.prompts]
+        new = new[:max(self.limit - len(self.prompts), 0)]
+        for i in range(0, len(new), self.prompt_size):
+            chunk = new[i:i + self.prompt_size]
+            self.prompts.update(dict.fromkeys(chunk, asyncio.create_task(self._ask(chunk))))
+            self.calls += 1
+        return {self.prompts[key] for key in keys if key in self.prompts}
+
+    async def _ask(self, keys: List[str]) -> None:
+        try:
+            categories = await self.parser.categorize_descriptions([key[:MAX_DESCRIPTION_CHARS] for key in keys], self.slots)
+        except Exception:
+            # Its rows are filed under Misc; the keys stay asked so they are not retried row after row
+            logger.warning("Statement categorization failed for %d descriptions", len(keys), exc_info=True)
+            return
+        self.answers.update(zip(keys, categories))
+
+    def category(self, key: str) -> str:
+        """The model's category for the key; "" when it was not asked, failed or only said Misc."""
+        category = self.answers.get(key, "")
+        return "" if category == DEFAULT_CATEGORY else category
+
+    def cancel(self) -> None:
+        for task in set(self.prompts.values()):
+            task.cancel()
+
+
+_service: Optional[StatementImportService] = None
+
+
+def get_statement_import_service() -> StatementImportService:
+    """FastAPI dependency returning the process-wide statement import service."""
+    global _service
+    if _service is None:
+        _service = StatementImportService()
+    return _service
@@ -0,0 +1,22 @@
+import hashlib
+from typing import Union
+
+
+def sha256_hex(data: Union[bytes, str]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_key(data: bytes, *qualifiers: str) -> str:
+    """
+    Content-addressed key for a blob plus the parameters that affect how it
+    is interpreted (mime type, prompt version, model, ...). Qualifiers are
+    NUL-separated so ("ab", "c") and ("a", "bc") never collide.
+    """
+    h = hashlib.sha256()
+    for q in qualifiers:
+        h.update(q.encode("utf-8"))
+        h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
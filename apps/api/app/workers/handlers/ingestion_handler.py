@@ -0,0 +1,120 @@
+import os
+import time
+import uuid
+from typing import Any, Dict, FrozenSet, Optional, Union
+
+from fastapi import HTTPException
+
+from app.clients.s3_client import ObjectStore, get_upload_store
+from app.clients.sqs_client import QueueClient, get_queue
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService, get_parser_service
+from app.modules.ai_expense_parser.uploads import read_stored_upload
+from app.repos.ingestion_repo import IngestionJobRepo, get_ingestion_repo, utc_now_iso
+from app.schemas.ingestion import (
+    IngestionJobCompletedEvent,
+    IngestionJobCreatedEvent,
+    IngestionJobFailedEvent,
+    JobError,
+)
+from app.services.ingestion_service import INGESTION_EVENTS_QUEUE_URL_ENV, UPLOAD_LIMITS
+
+DEFAULT_MAX_ATTEMPTS = 3
+# Busy limiter and upstream model errors are worth another delivery; anything else is final
+RETRYABLE_STATUSES: FrozenSet[int] = frozenset({500, 502, 503})
+FINISHED_STATUSES: FrozenSet[str] = frozenset({"completed", "failed"})
+
+
+class IngestionHandler:
+    """
+    Processes `ingestion-job-created` events: streams the stored upload in,
+    checking its real type and size, runs the same Gemini parse as the
+    synchronous endpoints and publishes
+    `ingestion-job-completed` or `ingestion-job-failed`.
+
+    Retryable failures re-raise so the consumer leaves the message on the queue;
+    after `max_attempts` deliveries the job is marked failed instead. A
+    redelivered event for a job that already finished is a lost ack and is
+    dropped; the upload is deleted only after the ack, so a redelivery never
+    finds it gone.
+
+    Outcome events go out only when INGESTION_EVENTS_QUEUE_URL names a queue
+    (or one is passed in): nothing in the process consumes an in-memory
+    one, and each event carries the whole parse result.
+    """
+
+    def __init__(
+        self,
+        parser: Optional[GeminiExpenseParserService] = None,
+        uploads: Optional[ObjectStore] = None,
+        jobs: Optional[IngestionJobRepo] = None,
+        events: Optional[QueueClient] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.parser = parser or get_parser_service()
+        self.uploads = uploads or get_upload_store()
+        self.jobs = jobs or get_ingestion_repo()
+        if events is None and os.getenv(INGESTION_EVENTS_QUEUE_URL_ENV):
+            events = get_queue(INGESTION_EVENTS_QUEUE_URL_ENV)
+        self.events = events
+        self.max_attempts = max_attempts
+
+    async def __call__(self, body: Dict[str, Any], receive_count: int) -> None:
+        event = IngestionJobCreatedEvent.model_validate(body)
+        job = await self.jobs.get(event.jobId)
+        if job is not None and job.status in FINISHED_STATUSES:
+            return
+        start = time.perf_counter()
+        await self.jobs.update(event.jobId, status="processing")
+
+        try:
+            allowed_types, max_bytes = UPLOAD_LIMITS[event.kind]
+            file_bytes, mime_type = await read_stored_upload(
+                self.uploads, event.upload.key, max_bytes, allowed_types,
+                invalid_detail=f"Stored upload is not a supported {event.kind} file.",
+            )
+
+            parse = self.parser.parse_image if event.kind == "image" else self.parser.parse_audio
+            result = await parse(
+                file_bytes=file_bytes, mime_type=mime_type, now_iso=event.nowIso, timezone=event.timezone,
+                user_id=event.userId,
+            )
+        except Exception as e:
+            status = e.status_code if isinstance(e, HTTPException) else 500
+            detail = str(e.detail) if isinstance(e, HTTPException) else f"Ingestion failed: {e}"
+            if status in RETRYABLE_STATUSES and receive_count < self.max_attempts:
+                await self.jobs.update(event.jobId, status="queued")
+                raise
+            await self._fail(event, JobError(status=status, detail=detail), receive_count)
+            return
+
+        await self.jobs.update(event.jobId, status="completed", result=result)
+        await self._publish(IngestionJobCompletedEvent(
+            eventId=str(uuid.uuid4()),
+            occurredAt=utc_now_iso(),
+            jobId=event.jobId,
+            userId=event.userId,
+            result=result,
+            durationMs=int((time.perf_counter() - start) * 1000),
+        ))
+
+    async def _publish(self, event: Union[IngestionJobCompletedEvent, IngestionJobFailedEvent]) -> None:
+        if self.events is not None:
+            await self.events.send(event.model_dump())
+
+    async def after_ack(self, body: Dict[str, Any]) -> None:
+        """Deletes a completed job's upload once its event is acked. Failed jobs keep theirs."""
+        event = IngestionJobCreatedEvent.model_validate(body)
+        job = await self.jobs.get(event.jobId)
+        if job is not None and job.status == "completed":
+            await self.uploads.delete(event.upload.key)
+
+    async def _fail(self, event: IngestionJobCreatedEvent, error: JobError, attempts: int) -> None:
+        await self.jobs.update(event.jobId, status="failed", error=error)
+        await self._publish(IngestionJobFailedEvent(
+            eventId=str(uuid.uuid4()),
+            occurredAt=utc_now_iso(),
+            jobId=event.jobId,
+            userId=event.userId,
+            error=error,
+            attempts=attempts,
+        ))
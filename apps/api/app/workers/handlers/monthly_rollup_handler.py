@@ -0,0 +1,97 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.domain.value_objects.date_range import month_label, months_of
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.repos.expenses_repo import CURRENCIES, ExpenseColumns, ExpensesRepo, get_expenses_repo
+from app.repos.rollups_repo import MonthlyRollupsRepo, MonthTotals, get_rollups_repo
+from app.schemas.expense import ExpensesChangedEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USERS_PER_RUN = 100
+
+
+class MonthlyRollupHandler:
+    """
+    Processes `expenses-changed` events by adding their deltas to the user's
+    monthly rollups. Applying is idempotent, so the consumer's at-least-once
+    delivery and retries are safe.
+    """
+
+    def __init__(self, rollups: Optional[MonthlyRollupsRepo] = None):
+        self.rollups = rollups or get_rollups_repo()
+
+    async def __call__(self, body: Dict[str, Any], receive_count: int) -> None:
+        event = ExpensesChangedEvent.model_validate(body)
+        await self.rollups.apply(event.userId, event.eventId, event.version, event.deltas)
+
+
+def monthly_totals(columns: ExpenseColumns) -> MonthTotals:
+    """A user's rollups recomputed from their expense columns, as one group-by over (month, currency, category)."""
+    rows = np.flatnonzero(columns.live[:columns.size])
+    if len(rows) == 0:
+        return {}
+    categories, currencies = len(ALLOWED_CATEGORIES), len(CURRENCIES)
+    keys = (
+        months_of(columns.day[rows]) * currencies + columns.currency[rows].astype(np.int64)
+    ) * categories + columns.category[rows]
+    groups, inverse = np.unique(keys, return_inverse=True)
+    amounts = np.bincount(inverse, weights=columns.amount_minor[rows]).astype(np.int64).tolist()
+    counts = np.bincount(inverse).tolist()
+
+    totals: MonthTotals = {}
+    for key, amount, count in zip(groups.tolist(), amounts, counts):
+        rest, category = divmod(key, categories)
+        month, currency = divmod(rest, currencies)
+        totals.setdefault(month_label(month), {}).setdefault(CURRENCIES[currency], {})[ALLOWED_CATEGORIES[category]] = [
+            amount, count,
+        ]
+    return totals
+
+
+class RollupReconciler:
+    """
+    Periodically rebuilds rollups from the expenses themselves, to repair
+    drift from lost events or a restart of the in-memory store. Each run
+    covers the next `users_per_run` users in turn, so a run costs the same
+    however many users there are.
+    """
+
+    def __init__(
+        self,
+        rollups: Optional[MonthlyRollupsRepo] = None,
+        expenses: Optional[ExpensesRepo] = None,
+        users_per_run: int = DEFAULT_USERS_PER_RUN,
+    ):
+        self.rollups = rollups or get_rollups_repo()
+        self.expenses = expenses or get_expenses_repo()
+        self.users_per_run = users_per_run
+        self._cursor = 0
+        self.reconciled = 0
+        self.drifted = 0
+
+    async def reconcile(self, user_id: str) -> int:
+        """Rebuilds one user's rollups; returns how many months were wrong."""
+        columns = self.expenses.columns(user_id)
+        drifted = await self.rollups.replace(user_id, lambda: (monthly_totals(columns), columns.version))
+        self.reconciled += 1
+        self.drifted += drifted
+        if drifted:
+            logger.warning("Rollups drifted from expenses", extra={"user_id": user_id, "months": drifted})
+        return drifted
+
+    async def run_once(self) -> int:
+        users = self.expenses.user_ids()
+        if not users:
+            return 0
+        start = self._cursor % len(users)
+        batch = users[start:start + self.users_per_run]
+        batch += users[:min(self.users_per_run - len(batch), start)]
+        self._cursor = start + len(batch)
+        drifted = 0
+        for user_id in batch:
+            drifted += await self.reconcile(user_id)
+        return drifted
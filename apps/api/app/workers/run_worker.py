@@ -0,0 +1,94 @@
+"""
+Worker entrypoint (ECS service):
+
+    python -m app.workers.run_worker
+
+Consumes INGESTION_QUEUE_URL (SQS_ENDPOINT_URL for ElasticMQ) and publishes
+results to INGESTION_EVENTS_QUEUE_URL; with EXPENSE_EVENTS_QUEUE_URL set it
+also applies expense changes to the monthly rollups (ROLLUPS_SQLITE_PATH
+shares them with the API). With no queue URL configured the API runs the
+same consumers in-process against the in-memory queues instead.
+"""
+import asyncio
+import os
+import signal
+from typing import List
+
+from dotenv import load_dotenv
+
+from app.clients.sqs_client import get_queue, is_in_memory
+from app.modules.ai_expense_parser.service import start_parser_service, stop_parser_service
+from app.services.expenses_service import EXPENSE_EVENTS_QUEUE_URL_ENV
+from app.services.ingestion_service import INGESTION_QUEUE_URL_ENV
+from app.workers.handlers.ingestion_handler import DEFAULT_MAX_ATTEMPTS, IngestionHandler
+from app.workers.handlers.monthly_rollup_handler import MonthlyRollupHandler
+from app.workers.sqs_consumer import DEFAULT_MAX_CONCURRENCY, DEFAULT_VISIBILITY_TIMEOUT, SqsConsumer
+
+
+def build_ingestion_consumer() -> SqsConsumer:
+    return SqsConsumer(
+        get_queue(INGESTION_QUEUE_URL_ENV),
+        handlers={
+            "ingestion-job-created": IngestionHandler(
+                max_attempts=int(os.getenv("INGESTION_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+            ),
+        },
+        max_concurrency=int(os.getenv("INGESTION_WORKER_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        visibility_timeout=float(os.getenv("INGESTION_VISIBILITY_TIMEOUT_SECONDS", DEFAULT_VISIBILITY_TIMEOUT)),
+    )
+
+
+def build_rollup_consumer() -> SqsConsumer:
+    return SqsConsumer(
+        get_queue(EXPENSE_EVENTS_QUEUE_URL_ENV),
+        handlers={"expenses-changed": MonthlyRollupHandler()},
+        max_concurrency=int(os.getenv("ROLLUP_WORKER_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+    )
+
+
+_embedded: List[SqsConsumer] = []
+_embedded_tasks: List[asyncio.Task] = []
+
+
+async def start_embedded_worker() -> None:
+    """
+    Runs each consumer inside the API process when its queue is the
+    in-memory stand-in, since no separate worker could see it.
+    INGESTION_WORKER_IN_PROCESS=0 turns this off.
+    """
+    if os.getenv("INGESTION_WORKER_IN_PROCESS", "1") == "0":
+        return
+    if is_in_memory(get_queue(INGESTION_QUEUE_URL_ENV)):
+        _embedded.append(build_ingestion_consumer())
+    if is_in_memory(get_queue(EXPENSE_EVENTS_QUEUE_URL_ENV)):
+        _embedded.append(build_rollup_consumer())
+    _embedded_tasks.extend(asyncio.create_task(consumer.run()) for consumer in _embedded)
+
+
+async def stop_embedded_worker() -> None:
+    for consumer in _embedded:
+        consumer.stop()
+    await asyncio.gather(*_embedded_tasks)
+    _embedded.clear()
+    _embedded_tasks.clear()
+
+
+async def main() -> None:
+    await start_parser_service()
+    consumers = [build_ingestion_consumer()]
+    if not is_in_memory(get_queue(EXPENSE_EVENTS_QUEUE_URL_ENV)):
+        consumers.append(build_rollup_consumer())
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: [consumer.stop() for consumer in consumers])
+
+    try:
+        await asyncio.gather(*(consumer.run() for consumer in consumers))
+    finally:
+        await stop_parser_service()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from app.workers.handlers.monthly_rollup_handler import DEFAULT_USERS_PER_RUN, RollupReconciler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECONCILE_INTERVAL_SECONDS = 300
+
+
+@dataclass
+class _Job:
+    name: str
+    interval: float
+    fn: Callable[[], Awaitable[object]]
+    due: float
+    runs: int = 0
+    failures: int = 0
+
+
+class Scheduler:
+    """
+    Runs async jobs at fixed intervals from a single task. Jobs run one at a
+    time, so a slow run delays the next instead of overlapping it; a job that
+    raises is logged and tried again at its next slot.
+    """
+
+    def __init__(self):
+        self.jobs: List[_Job] = []
+        self._stopping = asyncio.Event()
+
+    def add(self, name: str, interval_seconds: float, fn: Callable[[], Awaitable[object]], run_at_start: bool = False) -> None:
+        self.jobs.append(_Job(name, interval_seconds, fn, time.monotonic() + (0 if run_at_start else interval_seconds)))
+
+    async def run(self) -> None:
+        """Runs due jobs until stop() is called."""
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            for job in self.jobs:
+                if job.due > now:
+                    continue
+                try:
+                    await job.fn()
+                except Exception:
+                    job.failures += 1
+                    logger.exception("Scheduled job failed", extra={"job": job.name})
+                job.runs += 1
+                job.due = time.monotonic() + job.interval
+            if not self.jobs:
+                await self._stopping.wait()
+                break
+            delay = max(min(job.due for job in self.jobs) - time.monotonic(), 0)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+def build_scheduler() -> Scheduler:
+    """
+    The API's periodic jobs. Rollup reconciliation reads the expenses, which
+    live in the API process, so it runs there; ROLLUP_RECONCILE_INTERVAL_SECONDS=0
+    turns it off.
+    """
+    scheduler = Scheduler()
+    interval = float(os.getenv("ROLLUP_RECONCILE_INTERVAL_SECONDS", DEFAULT_RECONCILE_INTERVAL_SECONDS))
+    if interval > 0:
+        reconciler = RollupReconciler(
+            users_per_run=int(os.getenv("ROLLUP_RECONCILE_USERS_PER_RUN", DEFAULT_USERS_PER_RUN)),
+        )
+        scheduler.add("reconcile-rollups", interval, reconciler.run_once)
+    return scheduler
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+async def start_scheduler() -> None:
+    global _scheduler, _scheduler_task
+    _scheduler = build_scheduler()
+    _scheduler_task = asyncio.create_task(_scheduler.run())
+
+
+async def stop_scheduler() -> None:
+    global _scheduler, _scheduler_task
+    if _scheduler is not None:
+        _scheduler.stop()
+        await _scheduler_task
+        _scheduler, _scheduler_task = None, None
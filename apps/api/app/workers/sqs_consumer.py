@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.clients.sqs_client import MAX_BATCH_SIZE, MAX_WAIT_SECONDS, QueueClient, QueueMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_VISIBILITY_TIMEOUT = 60
+DEFAULT_RETRY_DELAY_SECONDS = 5
+
+# (message body, receive count)
+MessageHandler = Callable[[Dict[str, Any], int], Awaitable[None]]
+
+
+class SqsConsumer:
+    """
+    Long-polls a queue in batches and dispatches each message by its
+    `eventType` to a handler, running at most `max_concurrency` at once.
+
+    While a handler runs, the message's visibility is extended every half
+    timeout so a slow model call is not redelivered to another worker.
+    Handled messages are deleted; a handler exception leaves the message on
+    the queue, visible again after an exponential backoff. A handler with an
+    `after_ack(body)` coroutine has it called once the delete succeeds, for
+    cleanup a redelivery would still need (stored uploads, say).
+    """
+
+    def __init__(
+        self,
+        queue: QueueClient,
+        handlers: Dict[str, MessageHandler],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        batch_size: int = MAX_BATCH_SIZE,
+        wait_seconds: float = MAX_WAIT_SECONDS,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        retry_delay_seconds: float = DEFAULT_RETRY_DELAY_SECONDS,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.wait_seconds = wait_seconds
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_seconds = visibility_timeout / 2
+        self.retry_delay_seconds = retry_delay_seconds
+        self.processed = 0
+        self.failed = 0
+        self.visibility_extensions = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._receiving: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def run(self) -> None:
+        """Polls until stop() is called, then waits for in-flight messages to finish."""
+        self._stopping = False
+        while not self._stopping:
+            free = self.max_concurrency - len(self._tasks)
+            if free <= 0:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            self._receiving = asyncio.ensure_future(self.queue.receive(
+                max_messages=min(self.batch_size, free),
+                wait_seconds=self.wait_seconds,
+                visibility_timeout=self.visibility_timeout,
+            ))
+            try:
+                messages = await self._receiving
+            except asyncio.CancelledError:
+                if self._stopping:
+                    break
+                raise
+            except Exception as e:
+                logger.warning("Queue receive failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            finally:
+                self._receiving = None
+
+            for message in messages:
+                task = asyncio.create_task(self._process(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._receiving is not None:
+            self._receiving.cancel()
+
+    async def _process(self, message: QueueMessage) -> None:
+        event_type = message.body.get("eventType")
+        handler = self.handlers.get(event_type)
+        if handler is None:
+            logger.warning("No handler for event type %r, dropping message %s", event_type, message.message_id)
+            await self._ack(message)
+            return
+
+        heartbeat = asyncio.create_task(self._extend_visibility(message))
+        try:
+            await handler(message.body, message.receive_count)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(
+                "Handler for %s failed (attempt %d): %s", event_type, message.receive_count, e,
+                extra={"messageId": message.message_id},
+            )
+            await self._release_for_retry(message)
+            return
+        finally:
+            heartbeat.cancel()
+
+        self.processed += 1
+        after_ack = getattr(handler, "after_ack", None)
+        if await self._ack(message) and after_ack is not None:
+            try:
+                await after_ack(message.body)
+            except Exception as e:
+                logger.warning("After-ack cleanup for %s failed: %s", message.message_id, e)
+
+    async def _ack(self, message: QueueMessage) -> bool:
+        # A lost ack means a redelivery, which handlers must treat as a duplicate
+        try:
+            await self.queue.delete(message.receipt_handle)
+        except Exception as e:
+            logger.warning("Could not delete %s: %s", message.message_id, e)
+            return False
+        return True
+
+    async def _extend_visibility(self, message: QueueMessage) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.queue.change_visibility(message.receipt_handle, self.visibility_timeout)
+                self.visibility_extensions += 1
+            except Exception as e:
+                logger.warning("Visibility extension failed for %s: %s", message.message_id, e)
+
+    async def _release_for_retry(self, message: QueueMessage) -> None:
+        delay = min(self.visibility_timeout, self.retry_delay_seconds * 2 ** (message.receive_count - 1))
+        try:
+            await self.queue.change_visibility(message.receipt_handle, delay)
+        except Exception as e:
+            logger.warning("Could not reschedule %s: %s", message.message_id, e)
@@ -0,0 +1,134 @@
+"""
+Spending summary and budget burn-down over one user's synthetic history, as
+vectorized group-bys on the expense columns versus the row-wise loop over
+ExpenseDetails objects they replace.
+
+    python -m benchmarks.bench_analytics --rows 1000000 --repeat 3
+
+The row-wise baseline sums float amounts into dicts keyed by category, the
+"YYYY-MM" prefix of the date and payment method, which is what a service
+holding a list of parsed expenses would do. Both sides see the same expenses
+and must produce the same totals. Times are the best of --repeat runs.
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.domain.value_objects.date_range import DateRange
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+from app.repos.budgets_repo import BudgetsRepo
+from app.repos.expenses_repo import ExpensesRepo
+from app.schemas.budget import Budget
+from app.schemas.expense import Expense
+from app.services.analytics_service import AnalyticsService
+from app.services.budgets_service import BudgetsService
+
+USER = "bench-user"
+START = date(2021, 1, 1)
+YEARS = 4
+
+
+def synthetic_expenses(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    categories = rng.integers(0, len(ALLOWED_CATEGORIES), n).tolist()
+    methods = rng.integers(0, len(ALLOWED_PAYMENT_METHODS), n).tolist()
+    amounts = np.round(rng.lognormal(5.5, 1.0, n), 2).tolist()
+    offsets = rng.integers(0, 365 * YEARS, n).tolist()
+    return [
+        Expense.model_construct(
+            id=str(i), title="Shop", category=ALLOWED_CATEGORIES[c], paymentMethod=ALLOWED_PAYMENT_METHODS[m],
+            amount=a, currency="INR", date=(START + timedelta(days=d)).isoformat(), merchant=None, notes=None,
+            description=None,
+        )
+        for i, (c, m, a, d) in enumerate(zip(categories, methods, amounts, offsets))
+    ]
+
+
+def row_wise_summary(expenses, date_range: DateRange):
+    start, end = date_range.start.isoformat(), date_range.end.isoformat()
+    by_category, by_month, by_method = defaultdict(float), defaultdict(float), defaultdict(float)
+    total, count = 0.0, 0
+    for e in expenses:
+        day = e.date[:10]
+        if not (start <= day <= end) or e.currency != "INR":
+            continue
+        by_category[e.category] += e.amount
+        by_month[day[:7]] += e.amount
+        by_method[e.paymentMethod] += e.amount
+        total += e.amount
+        count += 1
+    return total, count, by_category, by_month, by_method
+
+
+def row_wise_burndown(expenses, month: DateRange, as_of: date):
+    daily = defaultdict(lambda: [0.0] * month.days)
+    start, end = month.start.isoformat(), month.end.isoformat()
+    for e in expenses:
+        day = e.date[:10]
+        if start <= day <= end and e.currency == "INR":
+            daily[e.category][int(day[8:10]) - 1] += e.amount
+    elapsed = (as_of - month.start).days + 1
+    return {category: np.cumsum(days)[:elapsed].tolist() for category, days in daily.items()}
+
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"generating {args.rows:,} expenses over {YEARS} years...")
+    expenses = synthetic_expenses(args.rows)
+
+    repo = ExpensesRepo()
+    start = time.perf_counter()
+    asyncio.run(repo.add_many(USER, expenses))
+    load = time.perf_counter() - start
+    columns = repo.columns(USER)
+    numeric = sum(getattr(columns, name)[:columns.size].nbytes for name in columns._ARRAYS)
+
+    analytics = AnalyticsService(repo)
+    year = DateRange(date(2023, 1, 1), date(2024, 12, 31))
+    summary = analytics.summary(USER, year)
+    total, count, by_category, _, _ = row_wise_summary(expenses, year)
+    # The row-wise float sums drift by rounding error; the columnar ones are exact
+    assert summary.count == count and abs(summary.total - total) <= 1e-9 * total, (summary.total, total)
+    for bucket in summary.byCategory:
+        assert abs(bucket.amount - by_category[bucket.key]) <= 1e-9 * bucket.amount, bucket
+
+    budgets = BudgetsService(BudgetsRepo(), repo)
+    asyncio.run(budgets.replace(USER, [Budget(amount=500_000)] + [Budget(category=c, amount=50_000) for c in ALLOWED_CATEGORIES]))
+    month, as_of = DateRange.month(2024, 6), date(2024, 6, 20)
+    report = asyncio.run(budgets.burndown(USER, month, as_of))
+    row_report = row_wise_burndown(expenses, month, as_of)
+    for budget in report.budgets[1:]:
+        assert abs(budget.spent - row_report[budget.category][-1]) < 0.01, budget.category
+
+    cases = [
+        ("summary (2 years)", lambda: row_wise_summary(expenses, year), lambda: analytics.summary(USER, year)),
+        ("burndown (1 month)", lambda: row_wise_burndown(expenses, month, as_of),
+         lambda: asyncio.run(budgets.burndown(USER, month, as_of))),
+    ]
+    print(f"load: {load:.2f}s for {len(columns):,} rows, numeric columns {numeric / 1e6:.1f} MB "
+          f"({numeric / len(columns):.0f} B/row)")
+    print(f"{'case':<20} {'row-wise ms':>12} {'columnar ms':>12} {'speedup':>8}")
+    for name, row_wise, columnar in cases:
+        row_time, col_time = best(row_wise, args.repeat), best(columnar, args.repeat)
+        print(f"{name:<20} {row_time * 1e3:>12.1f} {col_time * 1e3:>12.1f} {row_time / col_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Anomaly scoring throughput: streaming (one expense at a time against the
+running stats), batch (a whole history with NumPy) and, for contrast, a
+rescan that recomputes the category's mean and spread from the user's full
+history for every new expense.
+
+    python -m benchmarks.bench_anomalies --batch-rows 1000000 --history 1000 10000 100000
+
+Streaming cost is flat in the history size; the rescan grows with it.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.pipelines.anomaly_engine import rules
+from app.pipelines.anomaly_engine.pipeline import AnomalyEngine
+from app.schemas.expense import Expense
+
+SCORED = 2000
+
+
+def synthetic(n: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    minor = np.rint(rng.lognormal(5.5, 0.8, n) * 100).astype(np.int64)
+    categories = rng.integers(0, len(ALLOWED_CATEGORIES), n)
+    merchants = [f"merchant {i}" for i in rng.integers(0, 500, n).tolist()]
+    days = np.sort(rng.integers(0, 4 * 365, n))
+    return minor, categories, merchants, days
+
+
+def expenses_of(minor, categories, merchants):
+    return [
+        Expense.model_construct(
+            id=str(i), title=merchants[i], category=ALLOWED_CATEGORIES[categories[i]], paymentMethod="UPI",
+            amount=minor[i] / 100, currency="INR", date="2024-05-01", merchant=None, notes=None, description=None,
+        )
+        for i in range(len(minor))
+    ]
+
+
+def rescan_score(history_x, history_codes, history_merchants, x, code, merchant):
+    """What scoring costs without running stats: a pass over the user's whole history."""
+    same = history_x[history_codes == code]
+    count = len(same)
+    mean = same.mean() if count else 0.0
+    m2 = ((same - mean) ** 2).sum()
+    ewma = ewma_of(same)
+    return rules.flags(x, count, mean, m2, ewma, history_merchants.count(merchant))
+
+
+def ewma_of(values):
+    level = values[0] if len(values) else 0.0
+    for v in values[1:]:
+        level += rules.EWMA_ALPHA * (v - level)
+    return level
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-rows", type=int, default=1_000_000)
+    parser.add_argument("--history", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'history':>9} {'streaming us/expense':>21} {'rescan us/expense':>18}")
+    for size in args.history:
+        minor, categories, merchants, days = synthetic(size + SCORED)
+        engine = AnomalyEngine()
+        engine.observe_batch("u", minor[:size], categories[:size], merchants[:size], days[:size])
+        incoming = expenses_of(minor[size:], categories[size:], merchants[size:])
+
+        start = time.perf_counter()
+        for e in incoming:
+            engine.observe("u", e)
+        streaming = (time.perf_counter() - start) / SCORED
+
+        history_x = rules.log_amount(minor[:size])
+        history_codes, history_merchants = categories[:size], merchants[:size]
+        sample = min(SCORED, 200)
+        start = time.perf_counter()
+        for i in range(size, size + sample):
+            rescan_score(history_x, history_codes, history_merchants, rules.log_amount(minor[i]), categories[i], merchants[i])
+        rescan = (time.perf_counter() - start) / sample
+        print(f"{size:>9,} {streaming * 1e6:>21.1f} {rescan * 1e6:>18.1f}")
+
+    minor, categories, merchants, days = synthetic(args.batch_rows)
+    engine = AnomalyEngine()
+    start = time.perf_counter()
+    _, masks = engine.observe_batch("u", minor, categories, merchants, days)
+    elapsed = time.perf_counter() - start
+    print(f"batch: {args.batch_rows:,} expenses in {elapsed:.2f}s, {args.batch_rows / elapsed:,.0f}/s, "
+          f"{np.count_nonzero(masks):,} flagged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Payload size and end-to-end parse latency with and without audio preprocessing.
+
+    python -m benchmarks.bench_audio_preprocess [--fixtures DIR]
+
+Without --fixtures a corpus of synthetic 48 kHz stereo voice-note recordings
+with leading/trailing silence is generated. Parses go through the real
+service against the local fake Gemini server, so the latency difference is
+the cost of encoding and shipping the payload; model-side savings on real
+Gemini come on top of that.
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+import wave
+from typing import List, Tuple
+
+import numpy as np
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.modules.ai_expense_parser.uploads import sniff_mime
+from app.pipelines.audio_parser.pipeline import PreprocessedAudio, preprocess_audio, preprocess_audio_async
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def synthetic_voice_note(seed: int, rate: int = 48000) -> bytes:
+    rng = np.random.default_rng(seed)
+    lead, speech, tail = rng.uniform(1.0, 3.0), rng.uniform(3.0, 8.0), rng.uniform(1.0, 4.0)
+    t = np.arange(int(speech * rate)) / rate
+    # Voiced harmonics with a syllable-rate envelope, plus room noise throughout
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560)))
+    voice *= 0.25 * (0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 4 * t)))
+    mono = np.concatenate([np.zeros(int(lead * rate)), voice, np.zeros(int(tail * rate))])
+    mono += rng.normal(0, 0.002, mono.size)
+    stereo = np.stack([mono, mono * 0.9], axis=1)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(stereo, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def load_fixtures(path: str) -> List[Tuple[str, bytes]]:
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            data = f.read()
+        if (sniff_mime(data[:64]) or "").startswith("audio/"):
+            fixtures.append((name, data))
+    return fixtures
+
+
+async def passthrough(data: bytes, mime_type: str) -> PreprocessedAudio:
+    return PreprocessedAudio(data, mime_type, len(data), 0.0, 0.0, changed=False)
+
+
+async def e2e_latency(base_url: str, fixtures, preprocessor) -> List[float]:
+    http_client = build_http_client()
+    service = GeminiExpenseParserService(
+        client=build_gemini_client("bench-key", http_client, base_url=base_url),
+        limiter=InFlightLimiter(8, 30.0),
+        cache=ParseResultCache(),
+        audio_preprocessor=preprocessor,
+    )
+    timings = []
+    try:
+        for _, data in fixtures:
+            start = time.perf_counter()
+            await service.parse_audio(data, sniff_mime(data[:64]), "2024-06-01T00:00:00", "Asia/Kolkata")
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        await http_client.aclose()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures")
+    parser.add_argument("--count", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = [(f"voice-{i}.wav", synthetic_voice_note(i)) for i in range(args.count)]
+
+    before = after = 0
+    trimmed, timings = [], []
+    for name, data in fixtures:
+        start = time.perf_counter()
+        result = preprocess_audio(data, sniff_mime(data[:64]))
+        timings.append((time.perf_counter() - start) * 1000)
+        before += len(data)
+        after += len(result.data)
+        trimmed.append(result.trimmed_seconds)
+
+    print(f"payload {before / 1e6:.1f}MB -> {after / 1e6:.2f}MB ({100 * (1 - after / before):.1f}% saved), "
+          f"silence trimmed p50={statistics.median(trimmed):.1f}s, preprocess p50={statistics.median(timings):.0f}ms")
+
+    with FakeGeminiServer() as server:
+        raw = asyncio.run(e2e_latency(server.base_url, fixtures, passthrough))
+        pre = asyncio.run(e2e_latency(server.base_url, fixtures, preprocess_audio_async))
+    print(f"end-to-end parse p50 raw={statistics.median(raw):.0f}ms preprocessed={statistics.median(pre):.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Per-request auth overhead of get_current_user with and without the verified-claims
+cache, and JWKS fetches under a cold-start burst.
+
+    python -m benchmarks.bench_auth --requests 5000 --users 50 --burst 200
+
+JWKS is served by a local JwksServer, so the numbers isolate token verification.
+"without cache" clears the claims cache before every call, which is what
+every request paid before the cache existed. The burst sends `--burst`
+concurrent requests at an empty key store and reports how many JWKS fetches
+they caused.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from unittest import mock
+
+from benchmarks.fake_cognito import FakeUserPool, JwksServer
+
+from app.api.deps import get_current_user
+from app.core import security
+
+
+async def run(tokens, n: int, cached: bool) -> list:
+    timings = []
+    rng = random.Random(0)
+    for _ in range(n):
+        header = f"Bearer {rng.choice(tokens)}"
+        if not cached:
+            security.invalidate_claims_cache()
+        start = time.perf_counter()
+        await get_current_user(authorization=header)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+async def burst(server: JwksServer, tokens, n: int) -> None:
+    store = security.JwksKeyStore(server.url)
+    security.invalidate_claims_cache()
+    before = server.fetches
+    with mock.patch.object(security, "_KEY_STORE", store):
+        start = time.perf_counter()
+        await asyncio.gather(*(get_current_user(authorization=f"Bearer {tokens[i % len(tokens)]}") for i in range(n)))
+        elapsed = (time.perf_counter() - start) * 1e3
+    await store.stop()
+    print(f"cold burst     {n} requests  jwks_fetches={server.fetches - before}  wall={elapsed:.1f}ms")
+
+
+async def main_async(args) -> None:
+    pool = FakeUserPool()
+    tokens = [pool.issue_access_token() for _ in range(args.users)]
+
+    with JwksServer(pool, latency=args.jwks_latency) as server:
+        store = security.JwksKeyStore(server.url)
+        with mock.patch.object(security, "_KEY_STORE", store):
+            for label, cached in (("without cache", False), ("with cache", True)):
+                security.invalidate_claims_cache()
+                timings = sorted(await run(tokens, args.requests, cached))
+                p99 = timings[int(len(timings) * 0.99) - 1]
+                print(f"{label:<14} p50={statistics.median(timings):8.1f}us  p99={p99:8.1f}us")
+        await store.stop()
+
+        await burst(server, tokens, args.burst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--jwks-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Wall-clock time for a trip's worth of receipts: N sequential /parse-image
+calls vs one batch, against the local fake model server.
+
+    python -m benchmarks.bench_batch --receipts 50 --latency 3.0 --concurrency 4 8
+
+Receipts are synthetic camera-sized photos and go through the real
+preprocessing pool; each mode starts with an empty parse cache.
+"""
+import argparse
+import asyncio
+import time
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import shutdown_preprocess_pool
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from benchmarks.bench_receipt_preprocess import synthetic_receipt
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2024-05-02T00:00:00"
+
+
+def make_service(base_url: str, http_client) -> GeminiExpenseParserService:
+    return GeminiExpenseParserService(
+        client=build_gemini_client("bench-key", http_client, base_url=base_url),
+        limiter=InFlightLimiter(16, 60.0), cache=ParseResultCache(),
+        fast_path=ScreenshotFastPath(ocr=None),
+    )
+
+
+async def sequential(service, receipts) -> float:
+    start = time.perf_counter()
+    for data in receipts:
+        await service.parse_image(data, "image/jpeg", NOW_ISO, "UTC")
+    return time.perf_counter() - start
+
+
+async def batch(service, receipts, concurrency: int) -> float:
+    start = time.perf_counter()
+    items = [(data, "image/jpeg") for data in receipts]
+    async for _, outcome in service.parse_image_batch(items, NOW_ISO, "UTC", max_concurrency=concurrency):
+        if not hasattr(outcome, "expense"):
+            raise RuntimeError(outcome)
+    return time.perf_counter() - start
+
+
+async def main_async(args) -> None:
+    receipts = [synthetic_receipt(seed) for seed in range(args.receipts)]
+    with FakeGeminiServer(latency=args.latency) as server:
+        http_client = build_http_client()
+        try:
+            elapsed = await sequential(make_service(server.base_url, http_client), receipts)
+            print(f"{args.receipts} sequential calls        {elapsed:7.2f}s")
+            for concurrency in args.concurrency:
+                elapsed = await batch(make_service(server.base_url, http_client), receipts, concurrency)
+                print(f"1 batch, concurrency={concurrency:<3}      {elapsed:7.2f}s")
+        finally:
+            await http_client.aclose()
+            shutdown_preprocess_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--receipts", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Per-request vs shared Gemini client against the local fake model server.
+
+    python -m benchmarks.bench_gemini_client --requests 200
+
+The per-request mode mirrors the old `Depends(GeminiExpenseParserService)`
+wiring, which built a new genai.Client (and connection pool) for every call.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from google import genai
+from google.genai import types
+
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from benchmarks.fake_gemini import FakeGeminiServer
+
+MODEL = "gemini-flash-latest"
+API_KEY = "bench-key"
+
+
+async def _timed_call(client: genai.Client) -> float:
+    start = time.perf_counter()
+    await client.aio.models.generate_content(model=MODEL, contents=["hello"])
+    return time.perf_counter() - start
+
+
+async def run_per_request(base_url: str, n: int) -> list:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client = genai.Client(api_key=API_KEY, http_options=types.HttpOptions(base_url=base_url))
+        await client.aio.models.generate_content(model=MODEL, contents=["hello"])
+        timings.append(time.perf_counter() - start)
+        await client.aio.aclose()
+    return timings
+
+
+async def run_shared(base_url: str, n: int) -> list:
+    http_client = build_http_client()
+    client = build_gemini_client(API_KEY, http_client, base_url=base_url)
+    await client.aio.models.get(model=MODEL)  # warm-up, as at app startup
+    try:
+        return [await _timed_call(client) for _ in range(n)]
+    finally:
+        await http_client.aclose()
+
+
+def _report(label: str, timings: list, connections: int) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p50 = statistics.median(timings_ms)
+    p99 = timings_ms[int(len(timings_ms) * 0.99) - 1]
+    print(f"{label:<12} p50={p50:7.3f}ms  p99={p99:7.3f}ms  connections={connections}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, runner in (("per-request", run_per_request), ("shared", run_shared)):
+        with FakeGeminiServer() as server:
+            timings = asyncio.run(runner(server.base_url, args.requests))
+            _report(label, timings, server.connections)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Ingestion worker throughput against the in-memory queue and the local fake
+model server.
+
+    python -m benchmarks.bench_ingestion --jobs 64 --latency 1.0 --concurrency 1 8 32
+
+Each run submits `--jobs` distinct uploads through IngestionService (timing
+the submit, which is all the HTTP request waits for), then drains them with
+SqsConsumer and the real parser service.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.clients.s3_client import InMemoryObjectStore
+from app.clients.sqs_client import InMemoryQueue
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo
+from app.repos.ingestion_repo import IngestionJobRepo
+from app.services.ingestion_service import IngestionService
+from app.workers.handlers.ingestion_handler import IngestionHandler
+from app.workers.sqs_consumer import SqsConsumer
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+async def run(base_url: str, jobs: int, concurrency: int):
+    queue, events, uploads = InMemoryQueue(), InMemoryQueue(), InMemoryObjectStore()
+    repo = IngestionJobRepo(InMemoryIdempotencyRepo())
+    service = IngestionService(queue=queue, uploads=uploads, jobs=repo)
+
+    http_client = build_http_client()
+    parser = GeminiExpenseParserService(
+        client=build_gemini_client("bench-key", http_client, base_url=base_url),
+        limiter=InFlightLimiter(concurrency, 60.0), cache=ParseResultCache(),
+        image_preprocessor=passthrough, audio_preprocessor=passthrough,
+        fast_path=ScreenshotFastPath(ocr=None),
+    )
+    handler = IngestionHandler(parser=parser, uploads=uploads, jobs=repo, events=events)
+    consumer = SqsConsumer(queue, {"ingestion-job-created": handler}, max_concurrency=concurrency, wait_seconds=0.1)
+
+    submit_ms = []
+    for i in range(jobs):
+        start = time.perf_counter()
+        await service.submit("bench-user", "image", b"\xff\xd8\xff" + i.to_bytes(4, "big"), "image/jpeg", "UTC", "2024-05-02T00:00:00")
+        submit_ms.append((time.perf_counter() - start) * 1e3)
+
+    start = time.perf_counter()
+    task = asyncio.create_task(consumer.run())
+    while consumer.processed < jobs:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    consumer.stop()
+    await task
+    await http_client.aclose()
+    return statistics.median(submit_ms), elapsed
+
+
+async def main_async(args) -> None:
+    with FakeGeminiServer(latency=args.latency) as server:
+        for concurrency in args.concurrency:
+            submit_p50, elapsed = await run(server.base_url, args.jobs, concurrency)
+            print(
+                f"concurrency={concurrency:<3} submit p50={submit_p50:6.2f}ms  "
+                f"drain={elapsed:6.2f}s  throughput={args.jobs / elapsed:6.1f} jobs/s"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Input tokens and latency per parse call for the three ways of sending the
+instructions, against the fake model server:
+
+- inline: the whole prompt formatted into the request contents on every call
+  (how parses worked before the prompt split)
+- system: the static prefix as a system instruction, the dynamic suffix in contents
+- cached: the prefix held in a context cache and referenced by name
+
+    python -m benchmarks.bench_prompts --requests 200 --latency 0.0
+
+Token counts are the fake server's estimate (see fake_gemini.py); only the
+differences between modes are meaningful. Gemini bills cached tokens at a
+reduced rate, so "billed at full rate" is prompt minus cached tokens.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import timeit
+
+from google.genai import types
+
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.prompt_cache import SystemPromptCache
+from app.modules.ai_expense_parser.prompts import (
+    ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS, IMAGE_SYSTEM_PROMPT, image_request_prompt,
+)
+from benchmarks.fake_gemini import FakeGeminiServer
+
+MODEL = "gemini-flash-latest"
+NOW_ISO = "2024-05-02T00:00:00"
+IMAGE = types.Part.from_bytes(data=b"\xff\xd8\xff" + b"\x00" * 4096, mime_type="image/jpeg")
+
+# The pre-split prompt: the same text as one template, formatted per request
+LEGACY_TEMPLATE = (
+    IMAGE_SYSTEM_PROMPT.replace("{", "{{").replace("}", "}}")
+    + "\nContext:\n- Current Time: {now_iso}\n- Timezone: {timezone}\n\nInput Image is a {image_type}.\n"
+)
+
+
+def legacy_prompt() -> str:
+    return LEGACY_TEMPLATE.format(
+        categories=", ".join(ALLOWED_CATEGORIES),
+        payment_methods=", ".join(ALLOWED_PAYMENT_METHODS),
+        now_iso=NOW_ISO, timezone="UTC", image_type="image/jpeg",
+    )
+
+
+def build_cost_us(fn) -> float:
+    timer = timeit.Timer(fn)
+    n, _ = timer.autorange()
+    return min(timer.repeat(5, n)) / n * 1e6
+
+
+async def run_mode(client, mode: str, n: int):
+    cache = SystemPromptCache(client, enabled=mode == "cached")
+    if mode == "cached":
+        cache.config_for(MODEL, "image")
+        while cache._creating:
+            await asyncio.sleep(0.01)
+
+    timings, usage = [], None
+    for _ in range(n):
+        start = time.perf_counter()
+        if mode == "inline":
+            response = await client.aio.models.generate_content(model=MODEL, contents=[IMAGE, legacy_prompt()])
+        else:
+            response = await client.aio.models.generate_content(
+                model=MODEL,
+                contents=[IMAGE, image_request_prompt(NOW_ISO, "UTC", "image/jpeg")],
+                config=cache.config_for(MODEL, "image"),
+            )
+        timings.append(time.perf_counter() - start)
+        usage = response.usage_metadata
+    return usage, statistics.median(timings) * 1000, sorted(timings)[int(len(timings) * 0.99) - 1] * 1000
+
+
+async def main_async(args) -> None:
+    suffix = lambda: image_request_prompt(NOW_ISO, "UTC", "image/jpeg")
+    print(f"prompt build: legacy format {build_cost_us(legacy_prompt):.2f}us, suffix {build_cost_us(suffix):.2f}us")
+    print(f"prompt text:  legacy {len(legacy_prompt())} chars, suffix {len(suffix())} chars per request\n")
+
+    with FakeGeminiServer(latency=args.latency) as server:
+        http_client = build_http_client()
+        client = build_gemini_client("bench-key", http_client, base_url=server.base_url)
+        print(f"{'mode':8} {'prompt':>7} {'cached':>7} {'full rate':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for mode in ("inline", "system", "cached"):
+            usage, p50, p99 = await run_mode(client, mode, args.requests)
+            full = usage.prompt_token_count - (usage.cached_content_token_count or 0)
+            print(f"{mode:8} {usage.prompt_token_count:7} {usage.cached_content_token_count or 0:7} {full:9} {p50:8.2f} {p99:8.2f}")
+        await http_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake model latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Per-request overhead of RateLimitMiddleware on an AI route, measured by calling
+the ASGI stack directly with a no-op endpoint.
+
+    python -m benchmarks.bench_rate_limit --requests 20000 --users 500
+
+"bare" is the endpoint alone; "anonymous" keys the bucket by client address;
+"bearer" keys it by the token's `sub`, which after each user's first request
+is a claims-cache hit. Buckets are sized so nothing is rejected, so every
+request pays the full path: key lookup, bucket refill, admission slot.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from unittest import mock
+
+from benchmarks.fake_cognito import FakeUserPool, JwksServer
+
+from app.core import security
+from app.core.rate_limit import AdmissionGate, InMemoryRateLimitStore, RateLimitMiddleware
+
+PATH = "/api/ai/expense/parse-image"
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scope(ip: str, token: str = None) -> dict:
+    headers = [(b"content-type", b"multipart/form-data")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "POST", "path": PATH, "headers": headers, "client": (ip, 5000)}
+
+
+async def run(app, scopes, n: int) -> list:
+    timings = []
+    rng = random.Random(0)
+    for _ in range(n):
+        scope = rng.choice(scopes)
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+async def main_async(args) -> None:
+    pool = FakeUserPool()
+    tokens = [pool.issue_access_token(sub=f"user-{i}") for i in range(args.users)]
+    anonymous = [make_scope(f"10.0.{i // 256}.{i % 256}") for i in range(args.users)]
+    bearer = [make_scope("10.0.0.1", token) for token in tokens]
+
+    limited = RateLimitMiddleware(
+        endpoint,
+        costs={PATH: 1},
+        admission_paths={PATH},
+        store=InMemoryRateLimitStore(rate_per_second=1e6, burst=1e6),
+        gate=AdmissionGate(max_concurrent=64),
+    )
+
+    with JwksServer(pool) as server:
+        store = security.JwksKeyStore(server.url)
+        with mock.patch.object(security, "_KEY_STORE", store):
+            security.invalidate_claims_cache()
+            # Warm the claims cache: one full verification per user
+            await run(limited, bearer, args.users * 5)
+            results = [
+                ("bare", await run(endpoint, anonymous, args.requests)),
+                ("anonymous", await run(limited, anonymous, args.requests)),
+                ("bearer", await run(limited, bearer, args.requests)),
+            ]
+        await store.stop()
+
+    bare_p50 = statistics.median(results[0][1])
+    for label, timings in results:
+        timings.sort()
+        p50 = statistics.median(timings)
+        p99 = timings[int(0.99 * len(timings))]
+        print(f"{label:<10} p50={p50:6.1f}us p99={p99:6.1f}us overhead p50={p50 - bare_p50:5.1f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
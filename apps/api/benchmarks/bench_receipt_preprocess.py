@@ -0,0 +1,128 @@
+"""
+Bytes saved (and, with GEMINI_API_KEY set, model latency and field agreement)
+from receipt image preprocessing.
+
+    python -m benchmarks.bench_receipt_preprocess [--fixtures DIR] [--live]
+
+Without --fixtures a set of synthetic camera-sized receipt photos is
+generated. --live sends every fixture to Gemini twice, raw and preprocessed,
+and compares latency and the extracted title/amount/date.
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from app.pipelines.receipt_ocr.pipeline import preprocess_receipt_image
+from app.modules.ai_expense_parser.uploads import sniff_mime
+
+MERCHANTS = ["Blue Tokai Coffee", "DMart", "Haldiram's", "Reliance Fresh", "Croma", "Apollo Pharmacy"]
+
+
+def synthetic_receipt(seed: int) -> bytes:
+    rng = random.Random(seed)
+    paper = Image.new("L", (900, 1800), 245)
+    draw = ImageDraw.Draw(paper)
+    font = ImageFont.load_default(size=34)
+    y = 60
+    draw.text((60, y), rng.choice(MERCHANTS), fill=20, font=ImageFont.load_default(size=52))
+    y += 120
+    total = 0.0
+    for i in range(rng.randint(6, 14)):
+        price = round(rng.uniform(20, 900), 2)
+        total += price
+        draw.text((60, y), f"Item {i + 1:02d}", fill=30, font=font)
+        draw.text((640, y), f"{price:8.2f}", fill=30, font=font)
+        y += 56
+    draw.text((60, y + 40), f"TOTAL  INR {total:.2f}", fill=10, font=ImageFont.load_default(size=44))
+    draw.text((60, y + 120), f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 1{rng.randint(0, 9)}:2{rng.randint(0, 9)}", fill=30, font=font)
+
+    # Place on a table-coloured background at camera resolution with sensor noise
+    photo = Image.new("RGB", (3024, 4032), (120, 96, 70))
+    paper = paper.rotate(rng.uniform(-4, 4), expand=True, fillcolor=0).resize((2100, 3800))
+    photo.paste(paper.convert("RGB"), (450, 110), paper.point(lambda p: 255 if p else 0))
+    noise = Image.effect_noise(photo.size, 18).convert("RGB")
+    photo = Image.blend(photo, noise, 0.12).filter(ImageFilter.GaussianBlur(0.6))
+
+    out = io.BytesIO()
+    photo.save(out, format="JPEG", quality=95)
+    return out.getvalue()
+
+
+def load_fixtures(path: str) -> List[Tuple[str, bytes]]:
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            data = f.read()
+        if (sniff_mime(data[:64]) or "").startswith("image/"):
+            fixtures.append((name, data))
+    return fixtures
+
+
+async def live_compare(fixtures: List[Tuple[str, bytes]]) -> None:
+    from app.modules.ai_expense_parser.cache import ParseResultCache
+    from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+    from app.pipelines.receipt_ocr.pipeline import PreprocessedImage, preprocess_receipt_image_async
+
+    async def passthrough(data, mime_type):
+        return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+    raw = GeminiExpenseParserService(cache=ParseResultCache(), image_preprocessor=passthrough)
+    pre = GeminiExpenseParserService(cache=ParseResultCache(), image_preprocessor=preprocess_receipt_image_async)
+    now = "2024-06-01T00:00:00"
+    agree, raw_ms, pre_ms = 0, [], []
+    for name, data in fixtures:
+        mime = sniff_mime(data[:64])
+        t0 = time.perf_counter()
+        a = await raw.parse_image(data, mime, now, "Asia/Kolkata")
+        t1 = time.perf_counter()
+        b = await pre.parse_image(data, mime, now, "Asia/Kolkata")
+        t2 = time.perf_counter()
+        raw_ms.append((t1 - t0) * 1000)
+        pre_ms.append((t2 - t1) * 1000)
+        same = (a.expense.title, a.expense.amount, a.expense.date) == (b.expense.title, b.expense.amount, b.expense.date)
+        agree += same
+        print(f"  {name}: raw={a.expense.amount} pre={b.expense.amount} {'ok' if same else 'DIFF'}")
+    print(f"model latency p50 raw={statistics.median(raw_ms):.0f}ms preprocessed={statistics.median(pre_ms):.0f}ms")
+    print(f"field agreement {agree}/{len(fixtures)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures")
+    parser.add_argument("--count", type=int, default=8)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = [(f"synthetic-{i}.jpg", synthetic_receipt(i)) for i in range(args.count)]
+
+    before, after, timings = 0, 0, []
+    for name, data in fixtures:
+        start = time.perf_counter()
+        result = preprocess_receipt_image(data, sniff_mime(data[:64]))
+        timings.append((time.perf_counter() - start) * 1000)
+        before += len(data)
+        after += len(result.data)
+        print(f"  {name}: {len(data) / 1e6:6.2f}MB -> {len(result.data) / 1e6:5.2f}MB ({result.width}x{result.height})")
+
+    print(f"total {before / 1e6:.1f}MB -> {after / 1e6:.1f}MB ({100 * (1 - after / before):.1f}% saved), "
+          f"preprocess p50={statistics.median(timings):.0f}ms")
+
+    if args.live:
+        if not os.getenv("GEMINI_API_KEY"):
+            print("--live needs GEMINI_API_KEY")
+            return
+        asyncio.run(live_compare(fixtures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Dashboard reads from the materialized monthly rollups versus recomputing the
+same twelve months from the expense columns, as the history grows, plus the
+cost of keeping the rollups current (one expense saved and its delta event
+applied).
+
+    python -m benchmarks.bench_rollups --rows 10000 100000 1000000 --repeat 5
+
+The rollup read touches one document per month, so it stays flat; the
+recompute is a vectorized pass over every expense in the range. Both must
+return the same totals. Times are the best of --repeat runs.
+"""
+import argparse
+import asyncio
+import time
+
+from app.clients.sqs_client import InMemoryQueue
+from app.domain.value_objects.date_range import DateRange
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+from app.repos.expenses_repo import ExpensesRepo
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo
+from app.repos.rollups_repo import MonthlyRollupsRepo
+from app.services.analytics_service import AnalyticsService
+from app.services.expenses_service import ExpensesService
+from app.services.insights_service import InsightsService
+from app.workers.handlers.monthly_rollup_handler import MonthlyRollupHandler, RollupReconciler
+from benchmarks.bench_analytics import USER, synthetic_expenses
+
+FIRST_MONTH, LAST_MONTH = "2024-01", "2024-12"
+WRITES = 500
+
+
+async def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+async def run(rows: int, repeat: int) -> None:
+    expenses = ExpensesRepo()
+    await expenses.add_many(USER, synthetic_expenses(rows))
+    rollups = MonthlyRollupsRepo(InMemoryIdempotencyRepo())
+    start = time.perf_counter()
+    await RollupReconciler(rollups, expenses).reconcile(USER)
+    rebuild = time.perf_counter() - start
+
+    insights = InsightsService(rollups)
+    analytics = AnalyticsService(expenses)
+    date_range = DateRange(DateRange.parse_month(FIRST_MONTH).start, DateRange.parse_month(LAST_MONTH).end)
+
+    from_rollups = await insights.rollups(USER, FIRST_MONTH, LAST_MONTH)
+    recomputed = analytics.summary(USER, date_range)
+    assert [round(m.total, 2) for m in from_rollups] == [round(b.amount, 2) for b in recomputed.byMonth]
+
+    async def read_rollups():
+        await insights.rollups(USER, FIRST_MONTH, LAST_MONTH)
+
+    async def recompute():
+        analytics.summary(USER, date_range)
+
+    read = await best(read_rollups, repeat)
+    full = await best(recompute, repeat)
+
+    events = InMemoryQueue()
+    service = ExpensesService(expenses, events=events)
+    handler = MonthlyRollupHandler(rollups)
+    details = ExpenseDetails(title="Cafe", category="Food & Dining", paymentMethod="UPI", amount=120.0, date="2024-06-01")
+    start = time.perf_counter()
+    for _ in range(WRITES):
+        await service.create(USER, details)
+        (message,) = await events.receive()
+        await handler(message.body, message.receive_count)
+        await events.delete(message.receipt_handle)
+    write = (time.perf_counter() - start) / WRITES
+
+    print(f"{rows:>10,} {read * 1e3:>16.3f} {full * 1e3:>14.2f} {write * 1e6:>18.0f} {rebuild * 1e3:>13.1f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'expenses':>10} {'rollups read ms':>16} {'recompute ms':>14} {'write+apply us':>18} {'reconcile ms':>13}")
+    for rows in args.rows:
+        await run(rows, args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Tail latency of the parse call with and without hedged requests, against a
+fake model server whose latency has a long tail.
+
+    python -m benchmarks.bench_routing --requests 200 --fast 0.2 --slow 3.0 --slow-rate 0.05
+
+Each request takes `--fast` seconds, except a random `--slow-rate` fraction
+that stall for `--slow` seconds, which is roughly how a loaded model backend
+behaves at the 95th+ percentile.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.routing import ModelRouter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2024-05-02T00:00:00"
+MODEL = "gemini-flash-latest"
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+async def run(server: FakeGeminiServer, router: ModelRouter, n: int, concurrency: int):
+    http_client = build_http_client()
+    service = GeminiExpenseParserService(
+        client=build_gemini_client("bench-key", http_client, base_url=server.base_url),
+        limiter=InFlightLimiter(concurrency * 2, 30.0), cache=ParseResultCache(),
+        image_preprocessor=passthrough, audio_preprocessor=passthrough,
+        fast_path=ScreenshotFastPath(ocr=None), router=router,
+    )
+    gate = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one(i: int) -> None:
+        async with gate:
+            start = time.perf_counter()
+            await service.parse_image(b"\xff\xd8\xff" + i.to_bytes(4, "big"), "image/jpeg", NOW_ISO, "UTC")
+            timings.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(one(i) for i in range(n)))
+    finally:
+        await http_client.aclose()
+    return sorted(timings)
+
+
+def report(label: str, timings, router: ModelRouter) -> None:
+    p99 = timings[min(len(timings) - 1, int(0.99 * len(timings)))]
+    print(
+        f"{label:<10} p50={statistics.median(timings) * 1e3:7.1f}ms p99={p99 * 1e3:7.1f}ms "
+        f"max={timings[-1] * 1e3:7.1f}ms hedges={router.hedges} hedge_wins={router.hedge_wins}"
+    )
+
+
+async def main_async(args) -> None:
+    rng = random.Random(args.seed)
+    latency = lambda model: args.slow if rng.random() < args.slow_rate else args.fast
+
+    with FakeGeminiServer(latency=latency) as server:
+        for label, hedging in (("no hedge", False), ("hedged", True)):
+            router = ModelRouter(
+                [MODEL], hedging=hedging, hedge_min_delay=args.fast, hedge_default_delay=args.fast * 2,
+            )
+            report(label, await run(server, router, args.requests, args.concurrency), router)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast", type=float, default=0.2)
+    parser.add_argument("--slow", type=float, default=3.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
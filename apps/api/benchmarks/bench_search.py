@@ -0,0 +1,135 @@
+"""
+Expense search latency over one user's synthetic history: the inverted index
+versus scanning and lower-casing every title, merchant and notes field.
+
+    python -m benchmarks.bench_search --rows 100000 --repeat 20
+
+Each query asks for the first page of 20 results, newest first, which is what
+the expenses route serves. The scan baseline does the same filtering and
+sorting in Python, and both sides must return the same expenses. Times are
+the median of --repeat runs; the index build happens on the first search and
+is reported separately. Titles carry a unique reference number, as imported
+statement narrations do, so the vocabulary grows with the row count and the
+build is timed at its worst.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.domain.value_objects.date_range import DateRange
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.pipelines.categorizer.rules import MERCHANT_CATEGORIES
+from app.repos.expenses_repo import ExpensesRepo
+from app.repos.search_index import search_terms
+from app.schemas.expense import Expense
+
+USER = "bench-user"
+START = date(2021, 1, 1)
+PAGE = 20
+# Multiplying by a number coprime to 10**12 gives every expense its own
+# twelve-digit UPI reference, in scrambled rather than sorted order
+REFERENCE_STEP = 2_654_435_761
+WORDS = ("order", "dinner", "lunch", "office", "weekend", "trip", "refund", "gift", "monthly", "family", "snacks",
+         "groceries", "airport", "birthday", "team", "fuel", "recharge", "bill", "subscription", "medicine")
+
+# (label, query, filters)
+QUERIES = [
+    ("word", "swiggy", {}),
+    ("prefix", "swi", {}),
+    ("substring", "iggy", {}),
+    ("typo", "swigy", {}),
+    ("two words", "swiggy dinner", {}),
+    ("rare word", "birthday gift", {}),
+    ("filtered", "uber", {"min_amount": 500.0, "date_range": DateRange(date(2023, 1, 1), date(2023, 6, 30))}),
+    ("category only", "", {"categories": ["Transport"]}),
+]
+
+
+def synthetic_expenses(n: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    merchants = [name for names in MERCHANT_CATEGORIES.values() for name in names]
+    picks = rng.integers(0, len(merchants), n).tolist()
+    notes = rng.integers(0, len(WORDS), (n, 2)).tolist()
+    has_notes = (rng.random(n) < 0.6).tolist()
+    categories = rng.integers(0, len(ALLOWED_CATEGORIES), n).tolist()
+    amounts = np.round(rng.lognormal(5.5, 1.0, n), 2).tolist()
+    offsets = rng.integers(0, 4 * 365, n).tolist()
+    return [
+        Expense.model_construct(
+            id=f"e{i}", title=f"{merchants[m].title()} UPI/{i * REFERENCE_STEP % 10 ** 12:012d}",
+            category=ALLOWED_CATEGORIES[c], paymentMethod="UPI", amount=a, currency="INR",
+            date=(START + timedelta(days=d)).isoformat(), merchant=merchants[m], notes=f"{WORDS[w1]} {WORDS[w2]}" if has else None, description=None,
+        )
+        for i, (m, (w1, w2), has, c, a, d) in enumerate(zip(picks, notes, has_notes, categories, amounts, offsets))
+    ]
+
+
+def scan(expenses, query, date_range=None, categories=None, min_amount=None):
+    """What search costs without an index: fold and test every expense's text."""
+    terms = search_terms(query)
+    hits = []
+    for seq, e in enumerate(expenses):
+        if categories and e.category not in categories:
+            continue
+        if min_amount is not None and e.amount < min_amount:
+            continue
+        if date_range is not None and e.date not in date_range:
+            continue
+        words = " ".join(filter(None, (e.title, e.merchant, e.notes))).lower()
+        if all(term in words for term in terms):
+            hits.append((e.date, seq, e))
+    hits.sort(key=lambda hit: (hit[0], hit[1]), reverse=True)
+    return [e for _, _, e in hits[:PAGE]]
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    expenses = synthetic_expenses(args.rows)
+    repo = ExpensesRepo()
+    await repo.add_many(USER, expenses)
+    columns = repo.columns(USER)
+
+    start = time.perf_counter()
+    index = columns.search_index()
+    print(f"{args.rows:,} expenses; index built in {(time.perf_counter() - start) * 1e3:.0f} ms, "
+          f"{len(index):,} words")
+
+    print(f"{'query':>14} {'matches':>8} {'index ms':>9} {'scan ms':>8}")
+    for label, query, filters in QUERIES:
+        terms = search_terms(query)
+        rows, _ = columns.search(terms, limit=PAGE, **filters)
+        found = [columns.ids[row] for row in rows.tolist()]
+        matches = len(columns.search(terms, limit=args.rows, **filters)[0])
+        indexed = median_ms(lambda: columns.search(terms, limit=PAGE, **filters), args.repeat)
+        scanned = median_ms(lambda: scan(expenses, query, **filters), max(args.repeat // 4, 1))
+        if label != "typo":
+            assert found == [e.id for e in scan(expenses, query, **filters)], label
+        print(f"{label:>14} {matches:>8,} {indexed:>9.3f} {scanned:>8.1f}")
+
+    # Keeping the index current costs little per write once it exists
+    start = time.perf_counter()
+    for i in range(1000):
+        await repo.add(USER, Expense(id=f"new{i}", title="Swiggy dinner", category="Food & Dining",
+                                     paymentMethod="UPI", amount=250.0, date="2024-12-31"))
+    print(f"insert with the index built: {(time.perf_counter() - start) * 1e3:.1f} us each")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Bulk statement import throughput and memory on a synthetic bank statement.
+
+    python -m benchmarks.bench_statement_import --rows 500000
+
+Writes an HDFC-style CSV (a preamble, debit and credit columns, UPI, card
+and NEFT narrations with reference numbers) where most debits name a known
+merchant and the rest go to a few thousand person-to-person payees. The
+import runs end to end: streaming read, batch normalization, model calls
+for the payees no rule places (a fake model with --model-latency per
+prompt) and bulk saves, with anomaly checks and rollup events.
+
+Peak memory is measured with tracemalloc on a normalize-only pass at a
+tenth of the rows and at all of them, so the pipeline's own footprint can
+be seen not to grow with the file; the full import also keeps every saved
+expense, which the process's max RSS includes.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.clients.sqs_client import InMemoryQueue
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.routing import ModelRouter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.categorizer.pipeline import Categorizer
+from app.pipelines.categorizer.rules import MERCHANT_CATEGORIES
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from app.pipelines.statement_import.pipeline import statement_batches, statement_rows
+from app.repos.expenses_repo import ExpensesRepo
+from app.services.anomalies_service import AnomaliesService
+from app.services.expenses_service import ExpensesService
+from app.services.statement_import_service import StatementImportService
+
+USER = "bench-user"
+PAYEES = 3_000
+
+
+class FakeModels:
+    """Categorizes every description as Misc after `latency` seconds, counting prompts."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.prompts = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.prompts += 1
+        await asyncio.sleep(self.latency)
+        n = len(contents[0].splitlines()) - 1
+        return SimpleNamespace(text=json.dumps({"categories": ["Misc"] * n}))
+
+
+def write_statement(path: str, rows: int, seed: int = 11) -> None:
+    rng = np.random.default_rng(seed)
+    merchants = [name.upper() for names in MERCHANT_CATEGORIES.values() for name in names]
+    payees = [f"PAYEE {i} {'ABCDEFGHIJ'[i % 10]}KUMAR" for i in range(PAYEES)]
+    kinds = rng.random(rows)
+    picks = rng.integers(0, len(merchants), rows).tolist()
+    people = rng.integers(0, PAYEES, rows).tolist()
+    amounts = np.round(rng.lognormal(5.5, 1.0, rows), 2).tolist()
+    days = rng.integers(0, 3 * 365, rows)
+    dates = (np.datetime64("2022-01-01") + np.sort(days)).astype("datetime64[D]").astype(object).tolist()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("HDFC BANK Ltd.,Statement of account\nAccount No :,XXXXXX1234\n\n")
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"])
+        for i in range(rows):
+            day = dates[i].strftime("%d/%m/%y")
+            ref = f"{400000000000 + i}"
+            if kinds[i] < 0.03:
+                writer.writerow([day, f"NEFT CR-{ref}-SALARY ACME CORP", ref, day, "", f"{amounts[i] * 100:,.2f}", ""])
+            elif kinds[i] < 0.60:
+                name = merchants[picks[i]]
+                writer.writerow([day, f"UPI/DR/{ref}/{name}/YESB/{name.lower().replace(' ', '')}@ybl/Payment", ref, day, f"{amounts[i]:,.2f}", "", ""])
+            elif kinds[i] < 0.80:
+                writer.writerow([day, f"POS {ref[:4]}XXXXXXXX{ref[-4:]} {merchants[picks[i]]}", ref, day, f"{amounts[i]:,.2f}", "", ""])
+            else:
+                writer.writerow([day, f"UPI/DR/{ref}/{payees[people[i]]}/SBIN/payee{people[i]}@oksbi/Paid", ref, day, f"{amounts[i]:,.2f}", "", ""])
+
+
+def normalize_peak(path: str, limit: int) -> float:
+    """tracemalloc peak (MB) of reading and normalizing the first `limit` rows, nothing kept."""
+    categorizer = Categorizer()
+    tracemalloc.start()
+    with open(path, "rb") as f:
+        read = 0
+        for batch in statement_batches(statement_rows(f), categorizer, USER):
+            batch.expenses()
+            read += batch.rows
+            if read >= limit:
+                break
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--model-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        start = time.perf_counter()
+        write_statement(path, args.rows)
+        print(f"{args.rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MB written in {time.perf_counter() - start:.1f} s")
+
+        for limit in (args.rows // 10, args.rows):
+            print(f"normalize-only peak over {limit:>9,} rows: {normalize_peak(path, limit):6.1f} MB")
+
+        models = FakeModels(args.model_latency)
+        expenses = ExpensesRepo()
+        service = StatementImportService(
+            ExpensesService(expenses, anomalies=AnomaliesService(), events=InMemoryQueue()),
+            GeminiExpenseParserService(
+                client=SimpleNamespace(aio=SimpleNamespace(models=models)),
+                limiter=InFlightLimiter(max_in_flight=8, queue_timeout=30.0),
+                cache=ParseResultCache(),
+                fast_path=ScreenshotFastPath(ocr=None),
+                router=ModelRouter(["gemini-flash-latest"]),
+            ),
+            Categorizer(),
+        )
+        with open(path, "rb") as f:
+            start = time.perf_counter()
+            summary = await service.import_rows(USER, statement_rows(f))
+            elapsed = time.perf_counter() - start
+
+    print(f"imported {summary.imported:,}, credits skipped {summary.creditsSkipped:,}, failed {summary.failed:,}")
+    print(f"model prompts {summary.modelCalls} ({models.prompts} sent), rows left as Misc {summary.uncategorized:,}")
+    print(f"end to end: {elapsed:.1f} s, {summary.rowsRead / elapsed:,.0f} rows/s")
+    print(f"process max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB "
+          f"(includes the {len(expenses.columns(USER)):,} saved expenses)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Time to first field for the streaming parse vs the blocking parse, against the
+local fake model server.
+
+    python -m benchmarks.bench_streaming --requests 20 --latency 2.0
+
+The fake spreads `--latency` evenly over `--chunks` SSE chunks, so the
+blocking parse waits the full latency while the stream can show the first
+field after roughly one chunk.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2024-05-02T00:00:00"
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+async def run(service: GeminiExpenseParserService, n: int):
+    blocking, first_field, stream_total = [], [], []
+    for i in range(n):
+        payload = b"\xff\xd8\xff" + i.to_bytes(4, "big")
+
+        start = time.perf_counter()
+        await service.parse_image(payload + b"b", "image/jpeg", NOW_ISO, "UTC")
+        blocking.append(time.perf_counter() - start)
+
+        start, first = time.perf_counter(), None
+        async for event, _ in service.stream_image(payload + b"s", "image/jpeg", NOW_ISO, "UTC"):
+            if event == "field" and first is None:
+                first = time.perf_counter() - start
+        first_field.append(first)
+        stream_total.append(time.perf_counter() - start)
+    return blocking, first_field, stream_total
+
+
+async def main_async(args) -> None:
+    with FakeGeminiServer(latency=args.latency, stream_chunks=args.chunks) as server:
+        http_client = build_http_client()
+        service = GeminiExpenseParserService(
+            client=build_gemini_client("bench-key", http_client, base_url=server.base_url),
+            limiter=InFlightLimiter(4, 30.0), cache=ParseResultCache(),
+            image_preprocessor=passthrough, audio_preprocessor=passthrough,
+            fast_path=ScreenshotFastPath(ocr=None),
+        )
+        try:
+            blocking, first_field, stream_total = await run(service, args.requests)
+        finally:
+            await http_client.aclose()
+
+    for label, timings in (
+        ("blocking result", blocking),
+        ("stream 1st field", first_field),
+        ("stream result", stream_total),
+    ):
+        print(f"{label:<17} p50={statistics.median(timings) * 1e3:8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--chunks", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
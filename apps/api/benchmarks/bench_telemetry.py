@@ -0,0 +1,121 @@
+"""
+Cost of the request instrumentation: one span, the request middleware (trace,
+duration histogram and JSON log line), and both against a whole parse.
+
+    python -m benchmarks.bench_telemetry --iterations 20000
+
+The parse uses an instant in-process model, so its time is all local work
+and the instrumentation share is an upper bound; against a real model call
+of a second or more it is thousands of times smaller.
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+from app.core.logging import JsonFormatter
+from app.core.telemetry import RequestTelemetryMiddleware, span
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.routing import ModelRouter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+
+MODEL_JSON = '{"title": "Cafe", "category": "Food & Dining", "paymentMethod": "UPI", "amount": 250, "date": "2024-05-01"}'
+# Spans opened by one uncached image parse, upload read included
+SPANS_PER_PARSE = 9
+
+
+class InstantModels:
+    async def generate_content(self, model, contents, config=None):
+        return SimpleNamespace(text=MODEL_JSON)
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def time_spans(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench"):
+            pass
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def time_middleware(n: int) -> float:
+    app = RequestTelemetryMiddleware(endpoint)
+    scope = {"type": "http", "method": "POST", "path": "/api/ai/expense/parse-image", "headers": []}
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await app(dict(scope), receive, send)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+async def time_parse(n: int) -> float:
+    service = GeminiExpenseParserService(
+        client=SimpleNamespace(aio=SimpleNamespace(models=InstantModels())),
+        limiter=InFlightLimiter(8, 5.0), cache=ParseResultCache(max_entries=1),
+        image_preprocessor=passthrough, audio_preprocessor=passthrough,
+        fast_path=ScreenshotFastPath(ocr=None), router=ModelRouter(["bench-model"]),
+    )
+    timings = []
+    for i in range(n):
+        payload = b"\xff\xd8\xff" + i.to_bytes(4, "big")
+        start = time.perf_counter()
+        await service.parse_image(payload, "image/jpeg", "2024-05-02T00:00:00", "UTC")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+async def main_async(args) -> None:
+    # Log lines are formatted for real but written to memory, not the terminal
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(JsonFormatter())
+    request_log = logging.getLogger("app.request")
+    request_log.addHandler(handler)
+    request_log.setLevel(logging.INFO)
+    request_log.propagate = False
+
+    per_span = time_spans(args.iterations)
+    per_request = await time_middleware(args.iterations)
+    per_parse = await time_parse(args.iterations // 10)
+    instrumentation = per_span * SPANS_PER_PARSE + per_request
+
+    print(f"span enter/exit      {per_span:7.2f}us")
+    print(f"request middleware   {per_request:7.2f}us  (p50, incl. JSON log line)")
+    print(f"parse, instant model {per_parse:7.2f}us  (p50)")
+    print(
+        f"instrumentation      {instrumentation:7.2f}us per parse = {instrumentation / per_parse:.1%} of the "
+        f"instant-model parse, {instrumentation / 1e6:.4%} of a 1s model call"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Peak RSS of the API process under concurrent large uploads.
+
+    python -m benchmarks.bench_upload_memory --uploads 32 --size-mb 15
+    python -m benchmarks.bench_upload_memory --app-dir /path/to/other/checkout
+
+Starts uvicorn in a subprocess (pointed at the local fake Gemini server),
+fires concurrent multipart uploads at /parse-image and reports the server's
+VmHWM. `--app-dir` lets the same load run against another checkout for a
+before/after comparison.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGeminiServer
+
+JPEG_HEADER = b"\xff\xd8\xff\xe0"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _start_server(app_dir: str, port: int, gemini_url: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        AWS_REGION="ap-south-1",
+        COGNITO_USER_POOL_ID="bench",
+        COGNITO_CLIENT_ID="bench",
+        GEMINI_API_KEY="bench-key",
+        GEMINI_BASE_URL=gemini_url,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", app_dir,
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+        cwd=app_dir,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("API server did not start")
+
+
+async def _upload_all(port: int, n: int, size: int) -> dict:
+    body = JPEG_HEADER + os.urandom(size - len(JPEG_HEADER))
+    statuses: dict = {}
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def one(i: int) -> None:
+            try:
+                resp = await client.post(
+                    f"http://127.0.0.1:{port}/api/ai/expense/parse-image",
+                    files={"file": (f"r{i}.jpg", body, "image/jpeg")},
+                )
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+
+        await asyncio.gather(*(one(i) for i in range(n)))
+    return statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--size-mb", type=float, default=15)
+    parser.add_argument("--app-dir", default=os.getcwd())
+    args = parser.parse_args()
+
+    with FakeGeminiServer() as gemini:
+        port = _free_port()
+        proc = _start_server(args.app_dir, port, gemini.base_url)
+        try:
+            idle = _peak_rss_mb(proc.pid)
+            start = time.perf_counter()
+            statuses = asyncio.run(_upload_all(port, args.uploads, int(args.size_mb * 1024 * 1024)))
+            elapsed = time.perf_counter() - start
+            peak = _peak_rss_mb(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"uploads={args.uploads} size={args.size_mb}MB statuses={statuses}")
+    print(f"rss idle={idle:.1f}MB peak={peak:.1f}MB elapsed={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
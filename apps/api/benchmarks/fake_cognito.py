@@ -0,0 +1,117 @@
+"""
+Local stand-in for a Cognito user pool: RSA signing keys, a JWKS document
+and access tokens shaped like Cognito's, for auth benchmarks and tests.
+JwksServer publishes the pool's JWKS over HTTP and counts fetches.
+
+The app settings must be importable, so AWS_REGION / COGNITO_* are defaulted
+here when the environment does not provide them.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+os.environ.setdefault("AWS_REGION", "ap-south-1")
+os.environ.setdefault("COGNITO_USER_POOL_ID", "ap-south-1_bench")
+os.environ.setdefault("COGNITO_CLIENT_ID", "bench-client")
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.core.config import settings
+
+
+class SigningKey:
+    def __init__(self, kid: str):
+        self.kid = kid
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        public_pem = private.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        self.public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig"}
+
+
+class FakeUserPool:
+    def __init__(self, kids: List[str] = ("key-1",)):
+        self.keys = {kid: SigningKey(kid) for kid in kids}
+
+    def jwks(self) -> Dict[str, Any]:
+        return {"keys": [k.public_jwk for k in self.keys.values()]}
+
+    def rotate(self, new_kid: str) -> None:
+        self.keys = {new_kid: SigningKey(new_kid)}
+
+    def issue_access_token(self, kid: str = None, ttl_seconds: int = 3600, **overrides: Any) -> str:
+        key = self.keys[kid] if kid else next(iter(self.keys.values()))
+        now = int(time.time())
+        claims = {
+            "sub": str(uuid.uuid4()),
+            "iss": settings.cognito_issuer,
+            "client_id": settings.cognito_client_id,
+            "token_use": "access",
+            "scope": "openid email",
+            "username": "bench-user",
+            "iat": now,
+            "exp": now + ttl_seconds,
+            **overrides,
+        }
+        return jwt.encode(claims, key.private_pem, algorithm="RS256", headers={"kid": key.kid})
+
+
+class JwksServer:
+    def __init__(self, pool: FakeUserPool, latency: float = 0.0):
+        self.pool = pool
+        self.latency = latency
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/.well-known/jwks.json"
+
+    def start(self) -> "JwksServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "JwksServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.fetches += 1
+                time.sleep(fake.latency)
+                body = json.dumps(fake.pool.jwks()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,223 @@
+"""
+Local stand-in for the Gemini REST API used by benchmarks and tests.
+
+Serves `models/{model}:generateContent`, `models/{model}:streamGenerateContent`,
+`models/{model}` and `cachedContents` over plain HTTP with configurable
+latency, and counts requests and TCP connections so connection reuse can be
+observed from the outside. Models listed in `failing_models` answer 500.
+Streamed responses split the text into `stream_chunks` SSE chunks with the
+latency spread evenly across them, like a model emitting tokens.
+
+Usage metadata reports input tokens estimated the way Gemini bills them
+closely enough for comparisons: about four characters of text per token and
+a flat 258 per inline image or audio part. Context caches smaller than
+`min_cache_tokens` are refused with a 400, as the real API does.
+"""
+import itertools
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Union
+
+DEFAULT_RESPONSE_TEXT = json.dumps({
+    "title": "Blue Tokai Coffee",
+    "category": "Food & Dining",
+    "paymentMethod": "UPI",
+    "amount": 345.0,
+    "date": "2024-05-01T09:30:00Z",
+    "description": "Cold brew and croissant",
+})
+
+Latency = Union[float, Callable[[str], float]]
+
+TOKENS_PER_MEDIA_PART = 258
+
+
+def estimate_tokens(content: Optional[Dict[str, Any]]) -> int:
+    """Input tokens for one Content object (role + parts) of a request body."""
+    if not content:
+        return 0
+    tokens = 0
+    for part in content.get("parts", []):
+        if "text" in part:
+            tokens += -(-len(part["text"]) // 4)
+        elif "inlineData" in part:
+            tokens += TOKENS_PER_MEDIA_PART
+    return tokens
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops SYNs when dozens of clients connect at once
+    request_queue_size = 128
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Cancelled hedges and timed-out attempts hang up mid-response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeGeminiServer:
+    def __init__(
+        self,
+        response_text: str = DEFAULT_RESPONSE_TEXT,
+        latency: Latency = 0.0,
+        stream_chunks: int = 8,
+        failing_models: Iterable[str] = (),
+        min_cache_tokens: int = 0,
+    ):
+        self.response_text = response_text
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.failing_models: Set[str] = set(failing_models)
+        self.min_cache_tokens = min_cache_tokens
+        # cache name -> tokens it holds
+        self.cached_contents: Dict[str, int] = {}
+        # Body of the latest generate call
+        self.last_request: Optional[Dict[str, Any]] = None
+        self._cache_ids = itertools.count(1)
+        self.requests = 0
+        self.connections = 0
+        self.requests_by_model: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _latency_for(self, model: str) -> float:
+        return self.latency(model) if callable(self.latency) else self.latency
+
+    def _record(self, model: str) -> None:
+        with self._lock:
+            self.requests += 1
+            self.requests_by_model[model] = self.requests_by_model.get(model, 0) + 1
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _model(self) -> str:
+                path = self.path.split("?", 1)[0]
+                return path.rsplit("/models/", 1)[-1].split(":", 1)[0]
+
+            def do_GET(self):
+                model = self._model()
+                self._send_json(200, {"name": f"models/{model}", "displayName": model})
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _stream(self, model: str, usage: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                text, n = fake.response_text, max(1, fake.stream_chunks)
+                size = -(-len(text) // n)
+                pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                for i, piece in enumerate(pieces):
+                    time.sleep(fake._latency_for(model) / len(pieces))
+                    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                    if i == len(pieces) - 1:
+                        chunk["candidates"][0]["finishReason"] = "STOP"
+                        chunk["usageMetadata"] = usage
+                    self._write_chunk(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+                self._write_chunk(b"")
+
+            def _create_cache(self, body: dict) -> None:
+                tokens = sum(estimate_tokens(c) for c in body.get("contents", [])) + estimate_tokens(
+                    body.get("systemInstruction")
+                )
+                if tokens < fake.min_cache_tokens:
+                    self._send_json(400, {"error": {
+                        "code": 400,
+                        "message": f"Cached content is too small. total_token_count={tokens}, "
+                                   f"min_total_token_count={fake.min_cache_tokens}",
+                        "status": "INVALID_ARGUMENT",
+                    }})
+                    return
+                name = f"cachedContents/{next(fake._cache_ids)}"
+                with fake._lock:
+                    fake.cached_contents[name] = tokens
+                self._send_json(200, {"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": tokens}})
+
+            def _usage(self, body: dict) -> Optional[dict]:
+                cached = fake.cached_contents.get(body.get("cachedContent", ""))
+                if body.get("cachedContent") and cached is None:
+                    self._send_json(404, {"error": {"code": 404, "message": "CachedContent not found", "status": "NOT_FOUND"}})
+                    return None
+                prompt = sum(estimate_tokens(c) for c in body.get("contents", []))
+                prompt += estimate_tokens(body.get("systemInstruction")) + (cached or 0)
+                return {"promptTokenCount": prompt, "cachedContentTokenCount": cached or 0, "candidatesTokenCount": 0}
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.split("?", 1)[0].endswith("/cachedContents"):
+                    self._create_cache(body)
+                    return
+                fake.last_request = body
+                model = self._model()
+                fake._record(model)
+                if model in fake.failing_models:
+                    time.sleep(fake._latency_for(model))
+                    self._send_json(500, {"error": {"code": 500, "message": "backend error", "status": "INTERNAL"}})
+                    return
+                usage = self._usage(body)
+                if usage is None:
+                    return
+                if ":streamGenerateContent" in self.path:
+                    self._stream(model, usage)
+                    return
+                time.sleep(fake._latency_for(model))
+                self._send_json(200, {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": fake.response_text}]},
+                        "finishReason": "STOP",
+                    }],
+                    "usageMetadata": usage,
+                })
+
+        return Handler
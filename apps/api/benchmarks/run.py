@@ -0,0 +1,311 @@
+"""
+Benchmark suite for the parser hot path, with JSON baselines.
+
+    python -m benchmarks.run                          # run all, compare with the baseline
+    python -m benchmarks.run --only extract_json jwt  # name prefixes
+    python -m benchmarks.run --save                   # write the results as the new baseline
+    python -m benchmarks.run --check --threshold 0.5  # exit 1 on any regression over 50%
+
+Micro cases time a function in a tight loop and report the best of several
+repeats in microseconds per call: `extract_json` on clean, fenced, large and
+messy model outputs, the `normalize_*` helpers, `compute_confidence`,
+building `ExpenseAIResult`, and Cognito token verification with and without
+the claims cache.
+
+The end-to-end case posts receipts to /api/ai/expense/parse-image on the real
+app (all middleware included) through an in-process ASGI transport. The model
+is an in-process fake with fixed `--latency` and a fixed answer, and image
+preprocessing is a passthrough, so the numbers cover our request path and not
+Gemini or Pillow.
+
+Results go to stdout and, with --output, to a JSON file. The baseline holds
+the same format, so `--compare` works on any two runs. Only compare runs from
+the same machine: sub-microsecond cases swing by a third between runs on a
+shared single-core runner, hence the loose default threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+from benchmarks.fake_cognito import FakeUserPool, JwksServer
+
+# The end-to-end app must not throttle or log every request of the run
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "100000000")
+os.environ.setdefault("RATE_LIMIT_BURST", "100000000")
+os.environ.setdefault("AI_MAX_CONCURRENT_REQUESTS", "1024")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from app.core import security
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.json_guard import extract_json
+from app.modules.ai_expense_parser.normalizer import (
+    compute_confidence, normalize_amount, normalize_category, normalize_date, normalize_payment_method,
+)
+from app.modules.ai_expense_parser.routing import ModelRouter
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult, ExpenseDetails
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService, get_parser_service
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+
+BASELINE = Path(__file__).parent / "baselines" / "baseline.json"
+NOW_ISO = "2024-05-02T00:00:00"
+
+EXPENSE = {
+    "title": "Blue Tokai Coffee", "category": "Food & Dining", "paymentMethod": "UPI", "amount": 250.0,
+    "currency": "INR", "date": "2024-05-01T10:00:00Z", "merchant": "Blue Tokai", "notes": None,
+    "description": "Coffee and a croissant",
+}
+MODEL_JSON = json.dumps(EXPENSE)
+LARGE_JSON = json.dumps({
+    **EXPENSE,
+    "items": [{"name": f"Item {i}", "qty": i % 3 + 1, "price": 10.5 * i, "note": "x" * 40} for i in range(300)],
+})
+MODEL_OUTPUTS = {
+    "clean": MODEL_JSON,
+    "fenced": f"Sure! Here is the extracted expense:\n```json\n{MODEL_JSON}\n```\nLet me know if anything is off.",
+    "large": f"Here is the itemised receipt:\n```json\n{LARGE_JSON}\n```\n",
+    # Braces in the surrounding prose break the greedy brace fallback; only the fence parses
+    "messy": f"Reading the receipt {{total at bottom}}, {'lorem ipsum ' * 200}\n```json\n{MODEL_JSON}\n```\n{{end}}",
+    "no_json": "I could not read this receipt. " * 500,
+}
+AMOUNTS = [250, "1,234.50", "$50.00", "₹ 500", "invalid", None, 99.99, "12,00,000"]
+DATES = ["2024-05-01T10:00:00Z", "2024-05-01", None, "not-a-date", "01/05/2024", ""]
+CATEGORIES = ["Food & Dining", "food", "groceries", "Transport", "unknown", "", "Bills & Utilities"]
+METHODS = ["UPI", "upi", "Credit Card", "cash", "netbanking", "", "Paytm"]
+
+
+class FakeModels:
+    """Deterministic stand-in for `client.aio.models`: fixed latency, fixed answer."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=MODEL_JSON)
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+def result(value: float, unit: str, better: str = "lower") -> Dict[str, Any]:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def time_per_call(fn: Callable[[], Any], calls_per_run: int = 1, repeat: int = 7) -> float:
+    """Best-of-`repeat` microseconds per call, each repeat running for ~0.2s."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * 0.2 / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number / calls_per_run * 1e6
+
+
+def over(fn: Callable[[Any], Any], inputs: List[Any]) -> Callable[[], None]:
+    def run() -> None:
+        for value in inputs:
+            fn(value)
+    return run
+
+
+def micro_cases() -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """Case name -> (function timed in a loop, calls it makes per run)."""
+    cases: Dict[str, Tuple[Callable[[], Any], int]] = {}
+    for name, text in MODEL_OUTPUTS.items():
+        cases[f"extract_json.{name}"] = (lambda text=text: extract_json(text), 1)
+
+    cases["normalize.amount"] = (over(normalize_amount, AMOUNTS), len(AMOUNTS))
+    cases["normalize.date"] = (over(lambda d: normalize_date(d, NOW_ISO), DATES), len(DATES))
+    cases["normalize.category"] = (over(normalize_category, CATEGORIES), len(CATEGORIES))
+    cases["normalize.payment_method"] = (over(normalize_payment_method, METHODS), len(METHODS))
+    cases["compute_confidence"] = (lambda: compute_confidence(EXPENSE), 1)
+    cases["pydantic.expense_ai_result"] = (lambda: ExpenseAIResult(
+        expense=ExpenseDetails(**EXPENSE), confidence=0.9, warnings=[], rawText=MODEL_JSON,
+    ), 1)
+    cases["pydantic.model_dump"] = (ExpenseAIResult(expense=ExpenseDetails(**EXPENSE), confidence=0.9).model_dump, 1)
+    return cases
+
+
+async def jwt_results() -> Dict[str, Dict[str, Any]]:
+    pool = FakeUserPool()
+    token = pool.issue_access_token()
+    with JwksServer(pool) as server:
+        store = security.JwksKeyStore(server.url)
+        with mock.patch.object(security, "_KEY_STORE", store):
+            await security.verify_cognito_access_token(token)
+
+            async def timed(n: int, clear: bool) -> float:
+                start = time.perf_counter()
+                for _ in range(n):
+                    if clear:
+                        security.invalidate_claims_cache()
+                    await security.verify_cognito_access_token(token)
+                return (time.perf_counter() - start) / n * 1e6
+
+            uncached = min([await timed(300, clear=True) for _ in range(3)])
+            cached = min([await timed(20000, clear=False) for _ in range(3)])
+        await store.stop()
+    return {"jwt.verify_uncached": result(uncached, "us/call"), "jwt.verify_cached": result(cached, "us/call")}
+
+
+async def e2e_results(requests: int, concurrency: int, latency: float) -> Dict[str, Dict[str, Any]]:
+    from app.main import app
+
+    service = GeminiExpenseParserService(
+        client=SimpleNamespace(aio=SimpleNamespace(models=FakeModels(latency))),
+        limiter=InFlightLimiter(concurrency, 30.0), cache=ParseResultCache(),
+        image_preprocessor=passthrough, audio_preprocessor=passthrough,
+        fast_path=ScreenshotFastPath(ocr=None), router=ModelRouter(["bench-model"]),
+    )
+    app.dependency_overrides[get_parser_service] = lambda: service
+    gate = asyncio.Semaphore(concurrency)
+    timings: List[float] = []
+    failures = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            nonlocal failures
+            # Distinct bytes per request so nothing is served from the parse cache
+            image = b"\xff\xd8\xff\xe0" + i.to_bytes(4, "big") + b"\x00" * 64 * 1024
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/ai/expense/parse-image",
+                    files={"file": ("receipt.jpg", image, "image/jpeg")},
+                    data={"timezone": "UTC", "now_iso": NOW_ISO},
+                )
+                timings.append(time.perf_counter() - start)
+                failures += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    app.dependency_overrides.pop(get_parser_service, None)
+
+    if failures:
+        raise RuntimeError(f"{failures} of {requests} end-to-end requests failed")
+    timings.sort()
+    overhead = [t - latency for t in timings]
+    return {
+        "e2e.parse_image.throughput": result(requests / elapsed, "req/s", better="higher"),
+        "e2e.parse_image.p50": result(statistics.median(timings) * 1e3, "ms"),
+        "e2e.parse_image.p99": result(timings[int(0.99 * (len(timings) - 1))] * 1e3, "ms"),
+        # Time each request spent outside the fake model call
+        "e2e.parse_image.overhead_p50": result(statistics.median(overhead) * 1e3, "ms"),
+    }
+
+
+def environment(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "e2e": {"requests": args.requests, "concurrency": args.concurrency, "latency": args.latency},
+    }
+
+
+def selected(name: str, prefixes: Optional[List[str]]) -> bool:
+    return not prefixes or any(name.startswith(p) for p in prefixes)
+
+
+async def run_all(args) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, (fn, calls) in micro_cases().items():
+        if selected(name, args.only):
+            results[name] = result(time_per_call(fn, calls, args.repeat), "us/call")
+            print_row(name, results[name])
+    for prefix, runner in (
+        ("jwt.", jwt_results),
+        ("e2e.", lambda: e2e_results(args.requests, args.concurrency, args.latency)),
+    ):
+        if args.only and not any(prefix.startswith(p) or p.startswith(prefix) for p in args.only):
+            continue
+        for name, value in (await runner()).items():
+            if selected(name, args.only):
+                results[name] = value
+                print_row(name, value)
+    return results
+
+
+def print_row(name: str, value: Dict[str, Any]) -> None:
+    print(f"{name:<32} {value['value']:>12.3f} {value['unit']}", flush=True)
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Prints the change per shared case and returns the names that regressed past `threshold`."""
+    regressions = []
+    print(f"\n{'case':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None or not before["value"]:
+            continue
+        change = now["value"] / before["value"] - 1
+        worse = change > threshold if now["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(name)
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<32} {before['value']:>12.3f} {now['value']:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="*", help="run only cases whose name starts with one of these")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    parser.add_argument("--output", type=Path, help="also write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, default=BASELINE, help="baseline to compare against")
+    parser.add_argument("--save", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--repeat", type=int, default=7, help="timed repeats per micro case; the best is kept")
+    parser.add_argument("--threshold", type=float, default=0.5, help="relative change counted as a regression")
+    parser.add_argument("--check", action="store_true", help="exit 1 when any case regressed")
+    args = parser.parse_args()
+
+    report = {"environment": environment(args), "results": asyncio.run(run_all(args))}
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {BASELINE}")
+        return
+
+    if not args.compare.exists():
+        print(f"\nNo baseline at {args.compare}; run with --save to create one.")
+        return
+    baseline = json.loads(args.compare.read_text())
+    regressions = compare(report["results"], baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
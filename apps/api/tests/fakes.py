@@ -0,0 +1,79 @@
+"""
+In-process stand-ins for the Gemini SDK shared by the parser tests. Tests
+that need the SDK's own HTTP path use benchmarks.fake_gemini instead.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.routing import ModelRouter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.receipt_ocr.pipeline import PreprocessedImage
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+
+MODEL = "gemini-flash-latest"
+MODEL_JSON = '{"title": "Cafe", "category": "Food & Dining", "paymentMethod": "UPI", "amount": 250, "date": "2024-05-01T10:00:00Z"}'
+
+
+class FakeModels:
+    """
+    `client.aio.models` answering every call with `text` after `latency`
+    seconds. Set `error` to fail every call, or list inline payloads in
+    `fail_payloads` to fail just those. Counts calls and peak concurrency.
+    """
+
+    def __init__(self, text: str = MODEL_JSON, latency: float = 0.0):
+        self.text = text
+        self.latency = latency
+        self.calls = 0
+        self.error = None
+        self.fail_payloads = set()
+        self.active = 0
+        self.max_active = 0
+
+    def answer(self, contents) -> str:
+        if self.fail_payloads and contents[0].inline_data.data in self.fail_payloads:
+            raise RuntimeError("unreadable receipt")
+        return self.text
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text=self.answer(contents))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        response = await self.generate_content(model, contents, config)
+
+        async def chunks():
+            yield SimpleNamespace(text=response.text, usage_metadata=None)
+        return chunks()
+
+
+async def passthrough(data, mime_type):
+    return PreprocessedImage(data, mime_type, len(data), 0, 0, changed=False)
+
+
+def make_parser(models=None, model: str = MODEL, **parts) -> GeminiExpenseParserService:
+    """
+    A parser on `models` (a FakeModels by default) with preprocessing, the
+    screenshot fast path and shared state out of the way; `parts` replace
+    any constructor argument.
+    """
+    defaults = dict(
+        client=SimpleNamespace(aio=SimpleNamespace(models=models if models is not None else FakeModels())),
+        limiter=InFlightLimiter(4, 5.0),
+        cache=ParseResultCache(),
+        image_preprocessor=passthrough,
+        audio_preprocessor=passthrough,
+        fast_path=ScreenshotFastPath(ocr=None),
+        router=ModelRouter([model]),
+    )
+    return GeminiExpenseParserService(**{**defaults, **parts})
@@ -1,6 +1,6 @@
 import unittest
-from app.modules.ai_expense_parser.json_guard import extract_json
-from app.modules.ai_expense_parser.normalizer import normalize_amount, normalize_date, normalize_category
+from app.modules.ai_expense_parser.json_guard import IncrementalJsonExtractor, extract_json
+from app.modules.ai_expense_parser.normalizer import normalize_amount, normalize_date, normalize_category, normalize_parsed_amount
 
 class TestAiExpenseParser(unittest.TestCase):
 
@@ -21,12 +21,30 @@ class TestAiExpenseParser(unittest.TestCase):
         text = 'No JSON here'
         self.assertIsNone(extract_json(text))
 
+    def test_incremental_json_extractor(self):
+        text = 'Sure!\n```json\n{"title": "Cafe, \\"Bandra\\"", "items": [{"a": "}"}], "amount": 250.5}\n```'
+        extractor = IncrementalJsonExtractor()
+        emitted = []
+        for i in range(0, len(text), 7):
+            emitted.extend(extractor.feed(text[i:i + 7]))
+
+        self.assertEqual(emitted, [
+            ("title", 'Cafe, "Bandra"'),
+            ("items", [{"a": "}"}]),
+            ("amount", 250.5),
+        ])
+        self.assertTrue(extractor.complete)
+        self.assertEqual(extractor.value()["amount"], 250.5)
+
     def test_normalize_amount(self):
         self.assertEqual(normalize_amount(100), 100.0)
         self.assertEqual(normalize_amount("1,234.50"), 1234.5)
         self.assertEqual(normalize_amount("$50.00"), 50.0)
         self.assertEqual(normalize_amount("₹ 500"), 500.0)
         self.assertEqual(normalize_amount("invalid"), 0.0)
+        self.assertEqual(normalize_parsed_amount("inf"), 0.0)
+        self.assertEqual(normalize_parsed_amount(float("nan")), 0.0)
+        self.assertEqual(normalize_parsed_amount("1,234.50"), 1234.5)
 
     def test_normalize_date(self):
         now = "2023-01-01T12:00:00"
@@ -0,0 +1,236 @@
+import asyncio
+import time
+import unittest
+
+from fastapi import HTTPException
+
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath
+from benchmarks.fake_gemini import FakeGeminiServer
+from tests.fakes import FakeModels, make_parser, passthrough
+
+
+def make_service(latency: float = 0.2, max_in_flight: int = 8, queue_timeout: float = 5.0) -> GeminiExpenseParserService:
+    return make_parser(
+        FakeModels(latency=latency),
+        limiter=InFlightLimiter(max_in_flight=max_in_flight, queue_timeout=queue_timeout),
+    )
+
+
+class TestGeminiExpenseParserService(unittest.IsolatedAsyncioTestCase):
+
+    async def parse(self, service, n=1):
+        return await service.parse_image(
+            file_bytes=b"\xff\xd8\xff" + bytes([n % 256]),
+            mime_type="image/jpeg",
+            now_iso="2024-05-02T00:00:00",
+            timezone="UTC",
+        )
+
+    async def test_parse_image_builds_result(self):
+        service = make_service(latency=0)
+        result = await self.parse(service)
+        self.assertEqual(result.expense.amount, 250.0)
+        self.assertEqual(result.expense.category, "Food & Dining")
+        self.assertEqual(result.confidence, 1.0)
+
+    async def test_concurrent_parses_take_about_one_call(self):
+        # Load test: N parses in parallel should finish in roughly the latency of one.
+        latency, n = 0.2, 8
+        service = make_service(latency=latency, max_in_flight=n)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self.parse(service, i) for i in range(n)))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), n)
+        self.assertLess(elapsed, latency * 2)
+
+    async def test_event_loop_stays_responsive_during_parse(self):
+        service = make_service(latency=0.2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await self.parse(service)
+        task.cancel()
+        self.assertGreater(ticks, 10)
+
+    async def test_in_flight_limit_queues_then_rejects(self):
+        service = make_service(latency=0.2, max_in_flight=1, queue_timeout=0.05)
+        first = asyncio.create_task(self.parse(service, 1))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await self.parse(service, 2)
+        self.assertEqual(ctx.exception.status_code, 503)
+        await first
+
+    async def test_repeat_upload_served_from_cache(self):
+        service = make_service(latency=0)
+        first = await self.parse(service)
+        second = await service.parse_image(
+            file_bytes=b"\xff\xd8\xff\x01",
+            mime_type="image/jpeg",
+            now_iso="2024-06-01T00:00:00",
+            timezone="UTC",
+        )
+        self.assertEqual(service.client.aio.models.calls, 1)
+        self.assertEqual(second.expense, first.expense)
+        self.assertEqual(service.cache.stats()["hits"], 1)
+
+    async def test_concurrent_identical_uploads_share_one_call(self):
+        service = make_service(latency=0.05)
+        results = await asyncio.gather(*(self.parse(service) for _ in range(50)))
+
+        self.assertEqual(service.client.aio.models.calls, 1)
+        self.assertEqual(service.inflight.coalesced, 49)
+        self.assertTrue(all(r == results[0] for r in results))
+
+    async def test_shared_failure_reaches_all_waiters_and_is_not_cached(self):
+        service = make_service(latency=0.05)
+        service.client.aio.models.error = RuntimeError("backend down")
+
+        outcomes = await asyncio.gather(*(self.parse(service) for _ in range(10)), return_exceptions=True)
+        self.assertEqual(service.client.aio.models.calls, 1)
+        self.assertTrue(all(isinstance(o, HTTPException) and o.status_code == 502 for o in outcomes))
+
+        service.client.aio.models.error = None
+        result = await self.parse(service)
+        self.assertEqual(result.expense.amount, 250.0)
+        self.assertEqual(service.client.aio.models.calls, 2)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        service = make_service(latency=0.05)
+        first = asyncio.create_task(self.parse(service))
+        second = asyncio.create_task(self.parse(service))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        result = await second
+        self.assertEqual(result.expense.title, "Cafe")
+        self.assertEqual(service.client.aio.models.calls, 1)
+
+    async def test_confident_upi_screenshot_skips_model(self):
+        service = make_service(latency=0)
+        service.fast_path = ScreenshotFastPath(
+            ocr=lambda _: "PhonePe\nPaid to\nChai Point\n₹60\n8:15 am on 03 Feb 2024\nUPI Ref No: 402345678901"
+        )
+        result = await service.parse_image(b"\x89PNG\r\n\x1a\n", "image/png", "2024-06-01T00:00:00", "UTC")
+
+        self.assertEqual(result.expense.title, "Chai Point")
+        self.assertEqual(service.client.aio.models.calls, 0)
+
+    async def test_batch_caps_model_calls_and_isolates_failures(self):
+        service = make_service(latency=0.05, max_in_flight=16)
+        payloads = [b"\xff\xd8\xff" + bytes([i]) for i in range(12)]
+        service.client.aio.models.fail_payloads = {payloads[3]}
+
+        outcomes = dict([o async for o in service.parse_image_batch(
+            [(p, "image/jpeg") for p in payloads], "2024-05-02T00:00:00", "UTC", max_concurrency=4
+        )])
+
+        self.assertEqual(len(outcomes), 12)
+        self.assertEqual(outcomes[3].status_code, 502)
+        self.assertTrue(all(outcomes[i].expense.title == "Cafe" for i in outcomes if i != 3))
+        self.assertEqual(service.client.aio.models.max_active, 4)
+
+    async def test_batch_yields_in_completion_order(self):
+        service = make_service(latency=0)
+        slow = b"\xff\xd8\xff\x00"
+
+        async def preprocess(data, mime_type):
+            await asyncio.sleep(0.1 if data == slow else 0)
+            return await passthrough(data, mime_type)
+
+        service.image_preprocessor = preprocess
+        order = [i async for i, _ in service.parse_image_batch(
+            [(slow, "image/jpeg"), (b"\xff\xd8\xff\x01", "image/jpeg")], "2024-05-02T00:00:00", "UTC"
+        )]
+        self.assertEqual(order, [1, 0])
+
+    async def test_shared_client_reuses_connection(self):
+        with FakeGeminiServer() as server:
+            http_client = build_http_client()
+            client = build_gemini_client("test-key", http_client, base_url=server.base_url)
+            service = make_parser(client=client)
+            try:
+                for i in range(5):
+                    result = await self.parse(service, i)
+                    self.assertEqual(result.expense.title, "Blue Tokai Coffee")
+            finally:
+                await http_client.aclose()
+
+            self.assertEqual(server.requests, 5)
+            self.assertEqual(server.connections, 1)
+
+
+class TestStreamingParse(unittest.IsolatedAsyncioTestCase):
+
+    async def collect(self, service, n=1):
+        events, start = [], time.perf_counter()
+        async for event, data in service.stream_image(
+            b"\xff\xd8\xff" + bytes([n]), "image/jpeg", "2024-05-02T00:00:00", "UTC"
+        ):
+            events.append((event, data, time.perf_counter() - start))
+        return events
+
+    async def test_fields_stream_before_full_response(self):
+        latency = 0.8
+        with FakeGeminiServer(latency=latency, stream_chunks=8) as server:
+            http_client = build_http_client()
+            service = make_parser(client=build_gemini_client("test-key", http_client, base_url=server.base_url))
+            try:
+                events = await self.collect(service)
+            finally:
+                await http_client.aclose()
+
+        fields = {data["name"]: data["value"] for event, data, _ in events if event == "field"}
+        self.assertEqual(fields["title"], "Blue Tokai Coffee")
+        self.assertEqual(fields["amount"], 345.0)
+        self.assertEqual(fields["category"], "Food & Dining")
+
+        first_field_at = events[0][2]
+        self.assertLess(first_field_at, latency / 2)
+
+        event, result, _ = events[-1]
+        self.assertEqual(event, "result")
+        self.assertEqual(result["confidence"], 1.0)
+        self.assertEqual(result["expense"]["title"], "Blue Tokai Coffee")
+
+    async def test_cached_result_is_replayed_as_events(self):
+        with FakeGeminiServer() as server:
+            http_client = build_http_client()
+            service = make_parser(client=build_gemini_client("test-key", http_client, base_url=server.base_url))
+            try:
+                await self.collect(service)
+                events = await self.collect(service)
+            finally:
+                await http_client.aclose()
+
+            self.assertEqual(server.requests, 1)
+        self.assertEqual(events[-1][0], "result")
+        self.assertIn(("field", {"name": "amount", "value": 345.0}), [(e, d) for e, d, _ in events])
+
+    async def test_unparseable_stream_ends_with_error_event(self):
+        with FakeGeminiServer(response_text="Sorry, I cannot read this receipt.") as server:
+            http_client = build_http_client()
+            service = make_parser(client=build_gemini_client("test-key", http_client, base_url=server.base_url))
+            try:
+                events = await self.collect(service)
+            finally:
+                await http_client.aclose()
+
+        self.assertEqual([e for e, _, _ in events], ["error"])
+        self.assertEqual(events[0][1]["status"], 502)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+from datetime import date
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user
+from app.api.v1.routes import analytics, budgets
+from app.core.exceptions import add_exception_handlers
+from app.domain.value_objects.date_range import DateRange, epoch_day, epoch_month, from_epoch_day, month_label, months_of
+from app.domain.value_objects.money import Money, to_minor
+from app.repos.budgets_repo import BudgetsRepo
+from app.repos.expenses_repo import ExpensesRepo
+from app.schemas.expense import Expense
+from app.services.analytics_service import AnalyticsService, get_analytics_service
+from app.services.budgets_service import BudgetsService, get_budgets_service
+
+EXPENSES = [
+    ("Zomato", "Food & Dining", "UPI", 250.5, "2024-04-30T23:00:00"),
+    ("Uber", "Transport", "Card", 120.0, "2024-05-01"),
+    ("Swiggy", "Food & Dining", "UPI", 99.99, "2024-05-02"),
+    ("DMart", "Groceries", "Cash", 1000.0, "2024-05-10"),
+    ("Metro", "Transport", "UPI", 30.0, "2024-06-01"),
+]
+
+
+class TestValueObjects(unittest.TestCase):
+
+    def test_money(self):
+        self.assertEqual(Money.of("10.005"), Money(1001, "INR"))
+        self.assertEqual(Money.of(1500, "jpy"), Money(1500, "JPY"))
+        self.assertEqual((Money.of(0.1) + Money.of(0.2)).amount, 0.3)
+        with self.assertRaises(ValueError):
+            Money.of(1, "USD") + Money.of(1)
+        self.assertEqual(to_minor([0.1, 19.99, 250.005]).tolist(), [10, 1999, 25000])
+
+    def test_epoch_days_and_months(self):
+        self.assertEqual(epoch_day("1970-01-02"), 1)
+        self.assertEqual(from_epoch_day(epoch_day("2024-02-29T10:00:00Z")), date(2024, 2, 29))
+        days = np.array([epoch_day(d) for d in ("2023-12-31", "2024-01-01", "2024-02-29")])
+        self.assertEqual(months_of(days).tolist(), [epoch_month("2023-12-31"), epoch_month("2024-01-15"), epoch_month("2024-02-01")])
+        self.assertEqual(month_label(epoch_month("2024-02-29")), "2024-02")
+
+    def test_date_range(self):
+        feb = DateRange.parse_month("2024-02")
+        self.assertEqual((feb.end, feb.days), (date(2024, 2, 29), 29))
+        self.assertIn("2024-02-29T23:59:00", feb)
+        self.assertNotIn(date(2024, 3, 1), feb)
+        with self.assertRaises(ValueError):
+            DateRange(date(2024, 2, 2), date(2024, 2, 1))
+
+
+class TestAnalytics(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.expenses = ExpensesRepo()
+        await self.expenses.add_many("u1", [
+            Expense(id=str(i), title=t, category=c, paymentMethod=p, amount=a, date=d)
+            for i, (t, c, p, a, d) in enumerate(EXPENSES)
+        ])
+        await self.expenses.add("u1", Expense(id="usd", title="AWS", category="Bills & Utilities",
+                                              paymentMethod="Card", amount=12.0, currency="USD", date="2024-05-03"))
+        self.budgets = BudgetsService(BudgetsRepo(), self.expenses)
+        self.user = {"sub": "u1"}
+        app = FastAPI()
+        app.include_router(analytics.router, prefix="/analytics")
+        app.include_router(budgets.router, prefix="/budgets")
+        add_exception_handlers(app)
+        app.dependency_overrides[get_analytics_service] = lambda: AnalyticsService(self.expenses)
+        app.dependency_overrides[get_budgets_service] = lambda: self.budgets
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def test_summary_matches_a_row_wise_sum(self):
+        summary = self.client.get("/analytics/summary", params={"start": "2024-04-01", "end": "2024-05-31"}).json()
+
+        rows = [e for e in EXPENSES if "2024-04-01" <= e[4][:10] <= "2024-05-31"]
+        self.assertEqual(summary["count"], len(rows))
+        self.assertAlmostEqual(summary["total"], sum(e[3] for e in rows))
+        self.assertEqual(summary["byCategory"], [
+            {"key": "Groceries", "amount": 1000.0, "count": 1},
+            {"key": "Food & Dining", "amount": 350.49, "count": 2},
+            {"key": "Transport", "amount": 120.0, "count": 1},
+        ])
+        self.assertEqual(summary["byMonth"], [
+            {"key": "2024-04", "amount": 250.5, "count": 1},
+            {"key": "2024-05", "amount": 1219.99, "count": 3},
+        ])
+        self.assertEqual([b["key"] for b in summary["byPaymentMethod"]], ["Cash", "UPI", "Card"])
+
+    def test_summary_is_per_currency_and_user(self):
+        usd = self.client.get("/analytics/summary", params={"start": "2024-01-01", "end": "2024-12-31", "currency": "USD"}).json()
+        self.assertEqual((usd["total"], usd["count"]), (12.0, 1))
+
+        self.user = {"sub": "u2"}
+        empty = self.client.get("/analytics/summary", params={"start": "2024-01-01", "end": "2024-03-31"}).json()
+        self.assertEqual((empty["total"], empty["byCategory"]), (0.0, []))
+        self.assertEqual(len(empty["byMonth"]), 3)
+        response = self.client.get("/analytics/summary", params={"start": "2024-02-01", "end": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_span_is_capped(self):
+        decade = self.client.get("/analytics/summary", params={"start": "2015-01-01", "end": "2024-12-31"})
+        self.assertEqual(len(decade.json()["byMonth"]), 120)
+        response = self.client.get("/analytics/summary", params={"start": "0001-01-01", "end": "9999-12-31"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_budget_burndown(self):
+        response = self.client.put("/budgets", json={"budgets": [
+            {"amount": 2000}, {"category": "Food & Dining", "amount": 100}, {"category": "Rent", "amount": 15000},
+        ]})
+        self.assertEqual(response.status_code, 200)
+
+        report = self.client.get("/budgets/burndown", params={"month": "2024-05", "asOf": "2024-05-10"}).json()
+        overall, food, rent = report["budgets"]
+        self.assertEqual(overall["daily"][0], 120.0)
+        self.assertEqual(len(overall["daily"]), 10)
+        self.assertEqual((overall["spent"], overall["remaining"]), (1219.99, 780.01))
+        self.assertFalse(overall["onTrack"])
+        self.assertEqual((food["spent"], food["remaining"]), (99.99, 0.01))
+        self.assertEqual(food["daily"][:3], [0.0, 99.99, 99.99])
+        self.assertTrue(rent["onTrack"])
+
+        # Before the month starts nothing has elapsed
+        report = self.client.get("/budgets/burndown", params={"month": "2024-06", "asOf": "2024-05-20"}).json()
+        self.assertEqual(report["budgets"][0]["daily"], [])
+
+    def test_rejects_unknown_budget_categories(self):
+        response = self.client.put("/budgets", json={"budgets": [{"category": "Snacks", "amount": 10}]})
+        self.assertEqual(response.status_code, 422)
+        response = self.client.put("/budgets", json={"budgets": [{"amount": 10}, {"amount": 20, "currency": "inr"}]})
+        self.assertEqual(response.status_code, 422)
+
+    def test_rejects_unknown_budget_currencies(self):
+        response = self.client.put("/budgets", json={"budgets": [{"amount": 10, "currency": "XYZ"}]})
+        self.assertEqual(response.status_code, 422)
+        response = self.client.put("/budgets", json={"budgets": [{"amount": 10, "currency": "usd"}]})
+        self.assertEqual(response.json()[0]["currency"], "USD")
+
+    def test_rejects_unbounded_budget_amounts(self):
+        for amount in ("1e20", "Infinity", "NaN"):
+            response = self.client.put(
+                "/budgets", content='{"budgets": [{"amount": %s}]}' % amount, headers={"Content-Type": "application/json"},
+            )
+            self.assertEqual(response.status_code, 422, amount)
+
+
+if __name__ == '__main__':
+    unittest.main()
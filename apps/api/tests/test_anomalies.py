@@ -0,0 +1,182 @@
+import unittest
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user
+from app.api.v1.routes import anomalies, expenses
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES
+from app.pipelines.anomaly_engine import rules
+from app.pipelines.anomaly_engine.pipeline import AnomalyEngine, ewma_levels
+from app.repos.anomalies_repo import AnomaliesRepo
+from app.repos.expenses_repo import ExpensesRepo
+from app.schemas.expense import Expense
+from app.services.anomalies_service import AnomaliesService, get_anomalies_service
+from app.services.expenses_service import ExpensesService, get_expenses_service
+
+
+def expense(n, amount, category="Food & Dining", title="Cafe", day=1):
+    return Expense(id=str(n), title=title, category=category, paymentMethod="UPI", amount=amount,
+                   date=f"2024-05-{day:02d}")
+
+
+def history(n, seed=3):
+    """Random history with a 25x outlier every 97 expenses."""
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.lognormal(5, 0.6, n), 2)
+    amounts[50::97] *= 25
+    categories = rng.integers(0, len(ALLOWED_CATEGORIES), n)
+    titles = [f"shop {i}" for i in rng.integers(0, 40, n)]
+    days = rng.integers(1, 29, n)
+    return [expense(i, float(amounts[i]), ALLOWED_CATEGORIES[categories[i]], titles[i], int(days[i])) for i in range(n)]
+
+
+class TestRules(unittest.TestCase):
+
+    def test_welford_matches_numpy_and_reverses(self):
+        xs = np.random.default_rng(0).normal(5, 2, 500)
+        state = (0, 0.0, 0.0)
+        for x in xs:
+            state = rules.welford_update(*state, x)
+        count, mean, m2 = state
+        self.assertAlmostEqual(mean, xs.mean())
+        self.assertAlmostEqual(m2 / (count - 1), xs.var(ddof=1))
+
+        for x in xs[::-1][:499]:
+            state = rules.welford_remove(*state, x)
+        self.assertEqual(state[0], 1)
+        self.assertAlmostEqual(state[1], xs[0])
+
+        merged = rules.combine(300, xs[:300].mean(), ((xs[:300] - xs[:300].mean()) ** 2).sum(),
+                               200, xs[300:].mean(), ((xs[300:] - xs[300:].mean()) ** 2).sum())
+        np.testing.assert_allclose(merged, (count, mean, m2))
+
+    def test_ewma_levels_match_the_recurrence(self):
+        xs = np.random.default_rng(1).normal(size=1000)
+        level, expected = 0.5, []
+        for x in xs:
+            level += rules.EWMA_ALPHA * (x - level)
+            expected.append(level)
+        np.testing.assert_allclose(ewma_levels(xs, 0.5), expected)
+
+
+class TestAnomalyEngine(unittest.TestCase):
+
+    def test_flags_outliers_after_warm_up(self):
+        engine = AnomalyEngine()
+        # Not enough history to judge yet
+        self.assertFalse(engine.observe("u1", expense(0, 5000.0)).flagged)
+        for n in range(1, 12):
+            self.assertFalse(engine.observe("u1", expense(n, 200.0 + n * 10)).flagged)
+
+        result = engine.observe("u1", expense(20, 5000.0))
+        self.assertIn("amount_outlier", result.reasons)
+        self.assertGreater(result.zScore, rules.Z_THRESHOLD)
+        self.assertIn("new_merchant", engine.observe("u1", expense(21, 5000.0, title="Fancy Place")).reasons)
+        # Other users and categories have their own stats
+        self.assertFalse(engine.observe("u2", expense(22, 5000.0)).flagged)
+        self.assertFalse(engine.observe("u1", expense(23, 5000.0, category="Rent")).flagged)
+        self.assertEqual(engine.stats()["scored"], 16)
+
+    def test_batch_matches_one_by_one(self):
+        expenses = history(2000)
+        ordered = sorted(expenses, key=lambda e: e.date)
+        streaming = AnomalyEngine()
+        by_id = {e.id: streaming.observe("u1", e) for e in ordered}
+
+        batch = AnomalyEngine()
+        minor = np.array([round(e.amount * 100) for e in expenses])
+        codes = np.array([ALLOWED_CATEGORIES.index(e.category) for e in expenses])
+        days = np.array([e.date for e in expenses], dtype="datetime64[D]")
+        merchants = [e.title for e in expenses]
+        # Two batches, so the second is merged with the stats the first left
+        first = days < np.datetime64("2024-05-10")
+        results = {}
+        for part in (first, ~first):
+            rows = np.flatnonzero(part)
+            z, masks = batch.observe_batch("u1", minor[rows], codes[rows], [merchants[i] for i in rows], days[rows])
+            results.update({expenses[i].id: (z[k], masks[k]) for k, i in enumerate(rows)})
+
+        flagged = 0
+        for expense_id, score in by_id.items():
+            z, mask = results[expense_id]
+            self.assertAlmostEqual(z, score.zScore, places=6)
+            self.assertEqual(rules.reasons(int(mask)), score.reasons)
+            flagged += score.flagged
+        self.assertGreater(flagged, 10)
+
+        a, b = streaming._users["u1"], batch._users["u1"]
+        for name in ("count", "mean", "m2", "ewma"):
+            np.testing.assert_allclose(getattr(a, name), getattr(b, name))
+        self.assertEqual(a.merchants, b.merchants)
+
+    def test_merchant_table_keeps_the_most_recently_seen(self):
+        engine = AnomalyEngine(max_merchants_per_user=3)
+        for n, title in enumerate(["a", "b", "a", "b", "c", "a", "d", "e"]):
+            engine.observe("u1", expense(n, 100.0, title=f"Shop {title}"))
+        self.assertEqual(list(engine._users["u1"].merchants.items()), [("shop a", 3), ("shop d", 1), ("shop e", 1)])
+
+        batch = AnomalyEngine(max_merchants_per_user=3)
+        batch.observe_batch("u1", np.full(8, 10000), np.zeros(8, dtype=np.int64), [f"shop {t}" for t in "ababcade"])
+        self.assertEqual(batch._users["u1"].merchants, engine._users["u1"].merchants)
+
+    def test_forget_restores_the_stats(self):
+        engine = AnomalyEngine()
+        for n in range(10):
+            engine.observe("u1", expense(n, 100.0 + n))
+        before = engine._users["u1"].mean.copy(), engine._users["u1"].m2.copy()
+        engine.observe("u1", expense(10, 900.0, title="Other"))
+        engine.forget("u1", expense(10, 900.0, title="Other"))
+        np.testing.assert_allclose(engine._users["u1"].mean, before[0])
+        np.testing.assert_allclose(engine._users["u1"].m2, before[1], atol=1e-9)
+        self.assertNotIn("other", engine._users["u1"].merchants)
+
+
+class TestAnomalyRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.expenses = ExpensesRepo()
+        self.service = AnomaliesService(AnomalyEngine(), AnomaliesRepo(), self.expenses)
+        app = FastAPI()
+        app.include_router(expenses.router, prefix="/expenses")
+        app.include_router(anomalies.router, prefix="/anomalies")
+        app.dependency_overrides[get_expenses_service] = lambda: ExpensesService(self.expenses, self.service)
+        app.dependency_overrides[get_anomalies_service] = lambda: self.service
+        app.dependency_overrides[get_current_user] = lambda: {"sub": "u1"}
+        self.client = TestClient(app)
+
+    def post(self, amount, day=1):
+        body = {"title": "Cafe", "category": "Food & Dining", "paymentMethod": "UPI", "amount": amount,
+                "date": f"2024-05-{day:02d}"}
+        return self.client.post("/expenses", json=body).json()
+
+    def test_saved_expenses_are_scored_and_listed(self):
+        for n in range(10):
+            self.post(200 + n, day=n + 1)
+        outlier = self.post(6000, day=20)
+
+        (anomaly,) = self.client.get("/anomalies").json()
+        self.assertEqual(anomaly["expenseId"], outlier["id"])
+        self.assertIn("amount_outlier", anomaly["reasons"])
+
+        # Deleting the expense drops its flag
+        self.client.delete(f"/expenses/{outlier['id']}")
+        self.assertEqual(self.client.get("/anomalies").json(), [])
+
+    def test_backfill_rescans_history(self):
+        self.post(6000, day=20)
+        for n in range(10):
+            self.post(200 + n, day=n + 1)
+        # Saved first, so it was scored without history
+        self.assertEqual(self.client.get("/anomalies").json(), [])
+
+        self.assertEqual(self.client.post("/anomalies/backfill").json(), {"scanned": 11, "flagged": 1})
+        (anomaly,) = self.client.get("/anomalies").json()
+        self.assertEqual((anomaly["amount"], anomaly["date"]), (6000.0, "2024-05-20"))
+
+
+if __name__ == '__main__':
+    unittest.main()
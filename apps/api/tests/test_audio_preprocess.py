@@ -0,0 +1,91 @@
+import io
+import subprocess
+import unittest
+import wave
+from unittest import mock
+
+import numpy as np
+
+from app.pipelines.audio_parser import pipeline
+from app.pipelines.audio_parser.pipeline import preprocess_audio, voiced_bounds
+
+
+def make_wav(seconds_silence: float, seconds_speech: float, rate: int = 48000, channels: int = 2) -> bytes:
+    t = np.arange(int(seconds_speech * rate)) / rate
+    speech = 0.5 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    pad = np.zeros(int(seconds_silence * rate))
+    mono = np.concatenate([pad, speech, pad])
+    pcm = (np.repeat(mono[:, None], channels, axis=1) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def wav_info(data: bytes):
+    with wave.open(io.BytesIO(data)) as w:
+        return w.getnchannels(), w.getframerate(), w.getnframes() / w.getframerate()
+
+
+@mock.patch.object(pipeline, "_ffmpeg", return_value=None)
+class TestAudioPreprocess(unittest.TestCase):
+
+    def test_downmix_resample_and_trim(self, _):
+        data = make_wav(seconds_silence=2.0, seconds_speech=3.0)
+        result = preprocess_audio(data, "audio/wav")
+
+        self.assertTrue(result.changed)
+        self.assertEqual(result.mime_type, "audio/wav")
+        channels, rate, duration = wav_info(result.data)
+        self.assertEqual((channels, rate), (1, 16000))
+        self.assertAlmostEqual(duration, 3.5, delta=0.1)
+        self.assertAlmostEqual(result.trimmed_seconds, 3.5, delta=0.1)
+        self.assertLess(len(result.data), len(data) / 6)
+
+    def test_duration_is_capped(self, _):
+        data = make_wav(seconds_silence=0.0, seconds_speech=5.0, rate=16000, channels=1)
+        result = preprocess_audio(data, "audio/wav", max_seconds=2.0)
+        self.assertAlmostEqual(wav_info(result.data)[2], 2.0, delta=0.01)
+
+    def test_decode_is_bounded(self, ffmpeg):
+        data = make_wav(seconds_silence=0.0, seconds_speech=30.0, rate=16000, channels=1)
+        with mock.patch.object(pipeline, "DECODE_HEADROOM_SECONDS", 1.0):
+            self.assertEqual(pipeline.decode(data, "audio/wav", 3.0).size, 3 * 16000)
+            result = preprocess_audio(data, "audio/wav", max_seconds=2.0)
+        self.assertAlmostEqual(result.trimmed_seconds, 1.0, delta=0.01)
+
+        ffmpeg.return_value = "ffmpeg"
+        decoded = subprocess.CompletedProcess([], 0, stdout=b"\0\0" * 16000)
+        with mock.patch.object(pipeline.subprocess, "run", return_value=decoded) as run:
+            pipeline.decode(data, "audio/webm", 75.0)
+        args = run.call_args.args[0]
+        self.assertEqual(args[args.index("-t") + 1], "75")
+        self.assertLess(args.index("-i"), args.index("-t"))
+
+    def test_undecodable_passes_through(self, _):
+        blob = b"\x1a\x45\xdf\xa3 webm without a decoder"
+        result = preprocess_audio(blob, "audio/webm")
+        self.assertFalse(result.changed)
+        self.assertEqual(result.data, blob)
+
+    def test_opus_timeout_falls_back_to_wav(self, ffmpeg):
+        ffmpeg.return_value = "ffmpeg"
+        data = make_wav(seconds_silence=1.0, seconds_speech=2.0, rate=16000, channels=1)
+        samples = np.frombuffer(data[44:], dtype="<i2").astype(np.float32) / 32768
+        timeout = subprocess.TimeoutExpired("ffmpeg", pipeline.FFMPEG_TIMEOUT_SECONDS)
+        with mock.patch.object(pipeline, "_decode_ffmpeg", return_value=samples), \
+                mock.patch.object(pipeline.subprocess, "run", side_effect=timeout):
+            result = preprocess_audio(data, "audio/wav")
+        self.assertTrue(result.changed)
+        self.assertEqual(result.mime_type, "audio/wav")
+
+    def test_silent_input_is_not_emptied(self, _):
+        silence = np.zeros(16000, dtype=np.float32)
+        self.assertEqual(voiced_bounds(silence), (0, 16000))
+
+
+if __name__ == '__main__':
+    unittest.main()
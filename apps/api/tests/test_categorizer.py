@@ -0,0 +1,215 @@
+import asyncio
+import io
+import json
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user, get_optional_user
+from app.api.v1.routes import categories
+from app.modules.ai_expense_parser.prompts import ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS
+from app.modules.ai_expense_parser.router import router as ai_router
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+from app.modules.ai_expense_parser.service import get_parser_service
+from app.pipelines.categorizer import rules
+from app.pipelines.categorizer.pipeline import Categorizer, MerchantIndex, get_categorizer
+from app.pipelines.screenshot_parser.pipeline import CATEGORY_NOT_DETECTED, build_result
+from app.repos.expenses_repo import ExpensesRepo
+from app.services.expenses_service import ExpensesService
+from tests.fakes import FakeModels, make_parser
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+
+class TestRules(unittest.TestCase):
+
+    def test_tables_cover_the_allowed_values(self):
+        self.assertEqual(set(rules.CATEGORY_ALIASES), set(ALLOWED_CATEGORIES))
+        self.assertEqual(set(rules.PAYMENT_METHOD_ALIASES), set(ALLOWED_PAYMENT_METHODS))
+        self.assertLessEqual(set(rules.MERCHANT_CATEGORIES), set(ALLOWED_CATEGORIES))
+
+    def test_category_aliases(self):
+        cases = {
+            "Food & Dining": "Food & Dining",
+            "FOOD": "Food & Dining",
+            "Travel & Transport": "Transport",
+            "Coffee shop": "Food & Dining",
+            "electricity bill": "Bills & Utilities",
+            "groc": "Groceries",
+            "unknown": "Misc",
+            "": "Misc",
+        }
+        for raw, expected in cases.items():
+            self.assertEqual(rules.match_category(raw), expected, raw)
+
+    def test_payment_method_aliases(self):
+        cases = {
+            "UPI": "UPI",
+            "paid via Google Pay": "UPI",
+            "HDFC Credit Card": "Card",
+            "NEFT transfer": "NetBanking",
+            "wallet": "Cash",
+            "": "Cash",
+        }
+        for raw, expected in cases.items():
+            self.assertEqual(rules.match_payment_method(raw), expected, raw)
+
+    def test_merchant_longest_prefix(self):
+        def lookup(name):
+            return rules.lookup_merchant(rules.MERCHANT_INDEX, rules.merchant_tokens(name))
+
+        self.assertEqual(lookup("Zomato Pvt. Ltd."), "Food & Dining")
+        self.assertEqual(lookup("zomato@paytm"), "Food & Dining")
+        self.assertEqual(lookup("Swiggy Instamart"), "Groceries")
+        self.assertEqual(lookup("Swiggy Order 4411"), "Food & Dining")
+        self.assertIsNone(lookup("Corner Bakery"))
+
+
+class TestCategorizer(unittest.TestCase):
+
+    def test_user_confirmations_beat_the_builtin_list(self):
+        categorizer = Categorizer()
+        self.assertEqual(categorizer.merchant_category("Amazon"), ("Shopping", "global"))
+
+        categorizer.learn("u1", "Amazon", "Groceries")
+        categorizer.learn("u1", "Corner Bakery", "Food & Dining")
+        self.assertEqual(categorizer.merchant_category("AMAZON.IN", "u1"), ("Groceries", "user"))
+        self.assertEqual(categorizer.merchant_category("Amazon", "u2"), ("Shopping", "global"))
+        self.assertEqual(categorizer.merchant_category("Corner Bakery #12", "u1"), ("Food & Dining", "user"))
+
+        # The latest confirmation wins and restarts the count
+        categorizer.learn("u1", "Amazon", "Groceries")
+        categorizer.learn("u1", "Amazon", "Shopping")
+        self.assertIn(("amazon", "Shopping", 1), categorizer.merchants.entries("u1"))
+
+        with self.assertRaises(ValueError):
+            categorizer.learn("u1", "Amazon", "Snacks")
+        self.assertIsNone(categorizer.learn("u1", "Pvt Ltd", "Misc"))
+
+    def test_index_eviction(self):
+        index = MerchantIndex(max_users=2, max_merchants_per_user=2)
+        for user in ("a", "b", "c"):
+            index.learn(user, "zomato", "Misc")
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.lookup("a", ["zomato"]))
+
+        for merchant in ("one", "two", "three"):
+            index.learn("b", merchant, "Misc")
+        self.assertEqual([key for key, _, _ in index.entries("b")], ["two", "three"])
+
+    def test_apply_fills_screenshot_category(self):
+        fields = {"amount": 250.0, "payee": "Zomato", "upiRef": "412345678901", "date": "2024-05-01T12:30:00"}
+        result = build_result(fields, "2024-05-02T00:00:00", "raw")
+        self.assertIn(CATEGORY_NOT_DETECTED, result.warnings)
+
+        categorized = Categorizer().apply(result)
+        self.assertEqual(categorized.expense.category, "Food & Dining")
+        self.assertNotIn(CATEGORY_NOT_DETECTED, categorized.warnings)
+        self.assertGreater(categorized.confidence, result.confidence)
+        # The input may be a cached result shared with other callers
+        self.assertEqual(result.expense.category, "Misc")
+
+    def test_recategorize_batch(self):
+        categorizer = Categorizer()
+        categorizer.learn("u1", "Corner Bakery", "Groceries")
+        merchants = ["Uber", "Corner Bakery", None, "Corner Bakery", "Local Shop", "Uber"]
+        labels = ["Misc", "Food & Dining", "electricity", None, "shopping", "Misc"]
+
+        self.assertEqual(categorizer.recategorize(merchants, labels, "u1").tolist(), [
+            "Transport", "Groceries", "Bills & Utilities", "Groceries", "Shopping", "Transport",
+        ])
+        self.assertEqual(categorizer.recategorize([], []).tolist(), [])
+
+
+class TestParseOverrides(unittest.TestCase):
+
+    def setUp(self):
+        self.models = FakeModels('{"title": "Corner Bakery", "category": "Misc", "paymentMethod": "upi", "amount": 90}')
+        self.categorizer = Categorizer()
+        service = make_parser(self.models, model="categorizer-test-model", categorizer=self.categorizer)
+        self.user = None
+        app = FastAPI()
+        app.include_router(ai_router, prefix="/ai")
+        app.include_router(categories.router, prefix="/categories")
+        app.dependency_overrides[get_parser_service] = lambda: service
+        app.dependency_overrides[get_categorizer] = lambda: self.categorizer
+        app.dependency_overrides[get_optional_user] = lambda: self.user
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def parse(self):
+        response = self.client.post("/ai/parse-image", files={"file": ("r.jpg", io.BytesIO(JPEG), "image/jpeg")})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["expense"]
+
+    def test_confirmed_merchant_applies_per_user(self):
+        self.user = {"sub": "u1"}
+        response = self.client.post("/categories/confirmations", json={"expenses": [
+            {"merchant": "Corner Bakery", "category": "Food & Dining"},
+            {"title": "", "category": "Misc"},
+        ]})
+        self.assertEqual(response.json(), {"learned": 1, "skipped": 1})
+        self.assertEqual(self.client.get("/categories/merchants").json(), [
+            {"merchant": "corner bakery", "category": "Food & Dining", "confirmations": 1},
+        ])
+
+        self.assertEqual(self.parse()["category"], "Food & Dining")
+        self.assertEqual(self.categorizer.overrides["user"], 1)
+
+        # Served from the cache, which still holds the model's own answer
+        self.user = None
+        expense = self.parse()
+        self.assertEqual((expense["category"], expense["paymentMethod"]), ("Misc", "UPI"))
+        self.assertEqual(self.models.calls, 1)
+
+    def stream(self):
+        response = self.client.post("/ai/parse-image/stream", files={"file": ("r.jpg", io.BytesIO(JPEG), "image/jpeg")})
+        event, data = response.text.strip().split("\n\n")[-1].split("\n")
+        self.assertEqual(event, "event: result")
+        return json.loads(data[len("data: "):])["expense"]
+
+    def test_saved_expenses_teach_the_categorizer(self):
+        expenses = ExpensesService(ExpensesRepo(), categorizer=self.categorizer)
+        saved = asyncio.run(expenses.create("u1", ExpenseDetails(
+            title="Corner Bakery", category="Groceries", paymentMethod="UPI", amount=90, date="2024-05-01",
+        )))
+        asyncio.run(expenses.update("u1", saved.id, ExpenseDetails(
+            title="Corner Bakery", category="Food & Dining", paymentMethod="UPI", amount=90, date="2024-05-01",
+        )))
+        asyncio.run(expenses.create("u1", ExpenseDetails(title="Tea Stall", category="Misc", paymentMethod="Cash", amount=10)))
+        self.assertEqual(self.categorizer.merchants.entries("u1"), [("corner bakery", "Food & Dining", 1)])
+
+        # Streamed results get the learned category too, live and from the cache
+        self.user = {"sub": "u1"}
+        self.assertEqual(self.stream()["category"], "Food & Dining")
+        self.assertEqual(self.stream()["category"], "Food & Dining")
+        self.assertEqual(self.models.calls, 1)
+        self.user = None
+        self.assertEqual(self.stream()["category"], "Misc")
+
+    def test_rejects_unknown_categories_without_learning(self):
+        self.user = {"sub": "u1"}
+        response = self.client.post("/categories/confirmations", json={"expenses": [
+            {"merchant": "Corner Bakery", "category": "Food & Dining"},
+            {"merchant": "Tea Stall", "category": "Chai"},
+        ]})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.categorizer.merchants.entries("u1"), [])
+
+    def test_recategorize_endpoint(self):
+        self.user = {"sub": "u1"}
+        response = self.client.post("/categories/recategorize", json={"expenses": [
+            {"merchant": "Netflix", "category": "Misc"},
+            {"title": "Dinner", "category": "food"},
+            {"title": "Rent May", "category": "Rent"},
+        ]})
+        self.assertEqual(response.json(), {
+            "categories": ["Entertainment", "Food & Dining", "Rent"], "changed": 2,
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
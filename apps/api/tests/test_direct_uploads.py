@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+import unittest
+
+import httpx
+from fastapi import HTTPException
+
+from app.clients.s3_client import InMemoryObjectStore, S3ObjectStore
+from app.clients.sqs_client import InMemoryQueue
+from app.modules.ai_expense_parser.uploads import MAX_IMAGE_BYTES
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo
+from app.repos.ingestion_repo import IngestionJobRepo
+from app.services.ingestion_service import IngestionService, upload_key
+from app.workers.handlers.ingestion_handler import IngestionHandler
+from app.workers.sqs_consumer import SqsConsumer
+from tests.test_ingestion import FakeParser
+
+try:
+    import boto3
+    from moto.server import ThreadedMotoServer
+except ImportError:
+    boto3 = None
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+
+class TestDirectUploads(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.queue = InMemoryQueue()
+        self.uploads = InMemoryObjectStore()
+        self.jobs = IngestionJobRepo(InMemoryIdempotencyRepo())
+        self.service = IngestionService(queue=self.queue, uploads=self.uploads, jobs=self.jobs)
+
+    async def upload(self, data, mime_type="image/jpeg", kind="image", method="POST"):
+        """Gets a ticket and stores the bytes the way the client's upload would."""
+        ticket = self.service.create_upload("user-1", kind, mime_type, min(len(data), 1000), method)
+        await self.uploads.put(upload_key("user-1", ticket.uploadId), data, mime_type)
+        return ticket
+
+    async def submit(self, upload_id):
+        return await self.service.submit_uploaded("user-1", upload_id, "UTC", "2024-05-02T00:00:00")
+
+    async def run_worker(self, parser):
+        handler = IngestionHandler(parser=parser, uploads=self.uploads, jobs=self.jobs, events=InMemoryQueue(), max_attempts=2)
+        consumer = SqsConsumer(self.queue, {"ingestion-job-created": handler}, wait_seconds=0.05, retry_delay_seconds=0.01)
+        task = asyncio.create_task(consumer.run())
+        deadline = time.monotonic() + 5.0
+        while consumer.processed < 1 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await task
+
+    async def test_uploaded_file_is_parsed(self):
+        ticket = await self.upload(JPEG)
+        self.assertEqual(ticket.method, "POST")
+        self.assertEqual(ticket.fields["key"], upload_key("user-1", ticket.uploadId))
+
+        job = await self.submit(ticket.uploadId)
+        self.assertEqual((job.jobId, job.status), (ticket.uploadId, "queued"))
+        # Submitting again is a no-op
+        self.assertEqual((await self.submit(ticket.uploadId)).jobId, job.jobId)
+        self.assertEqual(len(self.queue), 1)
+
+        parser = FakeParser()
+        await self.run_worker(parser)
+        self.assertEqual((await self.service.get_job("user-1", job.jobId)).status, "completed")
+        self.assertEqual(parser.calls, 1)
+
+    async def test_put_ticket(self):
+        ticket = self.service.create_upload("user-1", "audio", "audio/webm", 1000, "PUT")
+        self.assertEqual(ticket.headers, {"Content-Type": "audio/webm"})
+        self.assertEqual(ticket.fields, {})
+
+    async def test_ticket_rejects_declared_type_and_size(self):
+        with self.assertRaises(HTTPException) as ctx:
+            self.service.create_upload("user-1", "image", "application/pdf", 1000)
+        self.assertEqual(ctx.exception.status_code, 400)
+        with self.assertRaises(HTTPException) as ctx:
+            self.service.create_upload("user-1", "image", "image/png", MAX_IMAGE_BYTES + 1)
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    async def test_submit_checks_the_stored_object(self):
+        with self.assertRaises(HTTPException) as ctx:
+            await self.submit("never-uploaded")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+        # Another user's upload id does not resolve to their file
+        ticket = await self.upload(JPEG)
+        with self.assertRaises(HTTPException) as ctx:
+            await self.service.submit_uploaded("user-2", ticket.uploadId, "UTC", "2024-05-02T00:00:00")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+        # Declared small, stored large
+        ticket = await self.upload(JPEG + b"\x00" * MAX_IMAGE_BYTES)
+        with self.assertRaises(HTTPException) as ctx:
+            await self.submit(ticket.uploadId)
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertIsNone(await self.uploads.head(upload_key("user-1", ticket.uploadId)))
+        self.assertEqual(len(self.queue), 0)
+
+    async def test_worker_rejects_content_that_is_not_the_declared_type(self):
+        ticket = await self.upload(b"%PDF-1.7 not an image")
+        job = await self.submit(ticket.uploadId)
+
+        parser = FakeParser()
+        await self.run_worker(parser)
+        stored = await self.jobs.get(job.jobId)
+        self.assertEqual((stored.status, stored.error.status), ("failed", 400))
+        self.assertEqual(parser.calls, 0)
+
+
+@unittest.skipIf(boto3 is None, "boto3 and moto are not installed")
+class TestS3DirectUploads(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = ThreadedMotoServer(port=0)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        host, port = self.server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+        self.store = S3ObjectStore("uploads", endpoint_url=endpoint, region_name="us-east-1")
+        self.store._s3.create_bucket(Bucket="uploads")
+
+    async def test_presigned_post_then_streamed_read(self):
+        presigned = self.store.presign_upload("uploads/u1/a", "image/jpeg", 1024)
+        async with httpx.AsyncClient() as http:
+            response = await http.post(presigned.url, data=presigned.fields, files={"file": ("r.jpg", JPEG, "image/jpeg")})
+            self.assertLess(response.status_code, 300)
+            too_big = await http.post(presigned.url, data=presigned.fields, files={"file": ("r.jpg", JPEG * 100, "image/jpeg")})
+            self.assertEqual(too_big.status_code, 400)
+
+        self.assertEqual(await self.store.head("uploads/u1/a"), (len(JPEG), "image/jpeg"))
+        chunks = [chunk async for chunk in self.store.iter_chunks("uploads/u1/a", chunk_size=16)]
+        self.assertEqual(b"".join(chunks), JPEG)
+        self.assertIsNone(await self.store.head("uploads/u1/missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user
+from app.api.v1.routes import expenses
+from app.core.exceptions import add_exception_handlers
+from app.domain.value_objects.money import ISO_CURRENCIES
+from app.repos.expenses_repo import ExpenseColumns, ExpensesRepo
+from app.repos.search_index import SearchIndex, search_terms, search_tokens
+from app.schemas.expense import Expense
+from app.services.expenses_service import ExpensesService, get_expenses_service
+
+
+PAGE_CONTRACT = json.loads(
+    (Path(__file__).resolve().parents[3] / "packages" / "contracts" / "shared" / "pagination.json").read_text()
+)
+
+
+def expense(n, **changes):
+    fields = dict(id=f"e{n}", title=f"Shop {n}", category="Groceries", paymentMethod="UPI", amount=10.0 + n,
+                  date=f"2024-05-{n % 28 + 1:02d}")
+    return Expense(**{**fields, **changes})
+
+
+class TestExpenseColumns(unittest.TestCase):
+
+    def test_round_trip_and_growth(self):
+        columns = ExpenseColumns(capacity=2)
+        columns.append([expense(i) for i in range(5)])
+        columns.append([expense(5, amount=0.1 + 0.2, currency="jpy", merchant="Daiso")])
+
+        self.assertEqual(len(columns), 6)
+        self.assertGreaterEqual(len(columns.live), 6)
+        self.assertEqual(columns.get("e3"), expense(3))
+        self.assertEqual(columns.amount_minor[:6].tolist(), [1000, 1100, 1200, 1300, 1400, 0])
+        self.assertEqual(columns.get("e5").currency, "JPY")
+        # Already stored ids are skipped
+        columns.append([expense(3, amount=99.0)])
+        self.assertEqual(columns.get("e3").amount, 13.0)
+
+    def test_update_and_delete_return_the_previous_version(self):
+        columns = ExpenseColumns()
+        columns.append([expense(1), expense(2)])
+
+        previous = columns.update(expense(1, amount=55.25, category="Rent"))
+        self.assertEqual(previous.amount, 11.0)
+        self.assertEqual((columns.get("e1").amount, columns.get("e1").category), (55.25, "Rent"))
+        self.assertIsNone(columns.update(expense(9)))
+
+        self.assertEqual(columns.delete("e2"), expense(2))
+        self.assertIsNone(columns.get("e2"))
+        self.assertIsNone(columns.delete("e2"))
+        self.assertEqual(columns.select().tolist(), [0])
+
+    def test_compaction_keeps_ids_addressable(self):
+        columns = ExpenseColumns()
+        columns.append([expense(i) for i in range(200)])
+        for i in range(0, 150):
+            columns.delete(f"e{i}")
+
+        self.assertLess(columns.size, 200)
+        self.assertEqual(len(columns), 50)
+        self.assertEqual(columns.get("e199"), expense(199))
+        self.assertEqual(columns.amount_minor[columns.select()].sum(), sum(1000 + 100 * i for i in range(150, 200)))
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        texts = ["Swiggy order", "Swiggy Instamart", "Zomato", "Uber ride to airport", "Swim class"]
+        self.index.add_many((row, search_tokens(text)) for row, text in enumerate(texts))
+
+    def search(self, query):
+        return sorted(self.index.search(search_terms(query)).tolist())
+
+    def test_words_prefixes_substrings_and_typos(self):
+        self.assertEqual(self.search("swiggy"), [0, 1])
+        self.assertEqual(self.search("SWI"), [0, 1, 4])
+        self.assertEqual(self.search("swiggy insta"), [1])
+        self.assertEqual(self.search("iggy"), [0, 1])
+        self.assertEqual(self.search("airprt"), [3])
+        self.assertEqual(self.search("ub"), [3])
+        # Short terms only match at the start of a word
+        self.assertEqual(self.search("gy"), [])
+        self.assertEqual(self.search("pizza"), [])
+
+    def test_words_added_after_a_query_are_found(self):
+        self.assertEqual(self.search("swi"), [0, 1, 4])
+        self.index.add(5, search_tokens("Swiss Bakery ref 412345678901"))
+        self.assertEqual(self.search("swi"), [0, 1, 4, 5])
+        self.assertEqual(self.search("4123456"), [5])
+        self.assertEqual(self.index.vocabulary, sorted(self.index.vocabulary))
+
+    def test_edits_that_drop_words_are_rechecked(self):
+        self.index.update(0, search_tokens("Swiggy order"), search_tokens("Zepto order"))
+        self.assertEqual(self.search("swiggy"), [1])
+        self.assertEqual(self.search("zepto"), [0])
+        self.assertEqual(self.search("order"), [0])
+
+
+class TestExpenseSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ExpenseColumns()
+        self.columns.append([
+            expense(1, title="Swiggy", notes="biryani"),
+            expense(2, title="Zomato", category="Food & Dining"),
+            expense(3, title="Groceries", merchant="Swiggy Instamart", amount=450.0),
+            expense(4, title="Taxi", notes="swiggy pickup", currency="USD"),
+        ])
+
+    def ids(self, **kwargs):
+        rows, _ = self.columns.search(**kwargs)
+        return [self.columns.ids[row] for row in rows.tolist()]
+
+    def test_filters_and_newest_first(self):
+        self.assertEqual(self.ids(terms=["swiggy"]), ["e4", "e3", "e1"])
+        self.assertEqual(self.ids(terms=["swiggy"], currency="INR", min_amount=100), ["e3"])
+        self.assertEqual(self.ids(terms=["swiggy"], max_amount=11.5), ["e1"])
+        self.assertEqual(self.ids(categories=["Food & Dining"]), ["e2"])
+        self.assertEqual(self.ids(currency="EUR"), [])
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.ids(terms=["biryani"]), ["e1"])
+        self.columns.append([expense(5, title="Biryani House")])
+        self.columns.update(expense(1, title="Swiggy"))
+        self.columns.delete("e3")
+        self.assertEqual(self.ids(terms=["biryani"]), ["e5"])
+        self.assertEqual(self.ids(terms=["swig"]), ["e4", "e1"])
+
+
+class TestSearchIndexBuild(unittest.IsolatedAsyncioTestCase):
+
+    async def test_first_search_builds_the_index_off_the_loop(self):
+        repo = ExpensesRepo()
+        await repo.add_many("u1", [expense(i) for i in range(3)])
+        with mock.patch("asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            found, _ = await repo.search("u1", ["shop"])
+        self.assertEqual(len(found), 3)
+        self.assertEqual(to_thread.call_count, 1)
+        self.assertIsNotNone(repo.columns("u1")._search)
+
+    async def test_index_built_during_a_write_is_dropped(self):
+        columns = ExpenseColumns()
+        columns.append([expense(i) for i in range(3)])
+        build = asyncio.create_task(columns.build_search_index())
+        await asyncio.sleep(0)
+        columns.append([expense(3, title="Late Write")])
+        await build
+        self.assertIsNone(columns._search)
+        rows, _ = columns.search(["late"])
+        self.assertEqual([columns.ids[row] for row in rows.tolist()], ["e3"])
+
+
+class TestExpenseRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = ExpensesRepo()
+        self.user = {"sub": "u1"}
+        app = FastAPI()
+        app.include_router(expenses.router, prefix="/expenses")
+        add_exception_handlers(app)
+        app.dependency_overrides[get_expenses_service] = lambda: ExpensesService(self.repo)
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def test_crud(self):
+        response = self.client.post("/expenses", json={
+            "title": "Dinner", "category": "food", "paymentMethod": "gpay", "amount": 420.5,
+            "date": "2024-05-01T20:00:00", "description": "team dinner",
+        })
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual((created["category"], created["paymentMethod"]), ("Food & Dining", "UPI"))
+        self.assertEqual(created["notes"], "team dinner")
+        path = f"/expenses/{created['id']}"
+        self.assertEqual(self.client.get(path).json(), created)
+
+        updated = self.client.put(path, json={**created, "amount": 400}).json()
+        self.assertEqual(updated["amount"], 400.0)
+
+        self.user = {"sub": "u2"}
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.user = {"sub": "u1"}
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_rejects_bad_amounts_and_dates(self):
+        body = {"title": "x", "category": "Misc", "paymentMethod": "Cash"}
+        self.assertEqual(self.client.post("/expenses", json={**body, "amount": 0}).status_code, 422)
+        self.assertEqual(self.client.post("/expenses", json={**body, "amount": 5, "date": "yesterday"}).status_code, 422)
+        self.assertEqual(self.client.post("/expenses", json={**body, "amount": 5}).status_code, 201)
+
+    def test_rejects_amounts_the_columns_cannot_hold(self):
+        body = '{"title": "x", "category": "Misc", "paymentMethod": "Cash", "amount": %s}'
+        for amount in ("1e20", "Infinity", "NaN"):
+            response = self.client.post("/expenses", content=body % amount, headers={"Content-Type": "application/json"})
+            self.assertEqual(response.status_code, 422, amount)
+        self.assertEqual(len(self.repo.columns("u1")), 0)
+        self.assertEqual(self.client.post("/expenses", content=body % "1e12", headers={"Content-Type": "application/json"}).status_code, 201)
+
+    def test_currencies_must_be_iso_4217(self):
+        body = {"title": "x", "category": "Misc", "paymentMethod": "Cash", "amount": 5, "date": "2024-05-01"}
+        made_up = [f"Q{a}{b}" for a in "ABCDEFGHIJKLMNOP" for b in "ABCDEFGHIJ"]
+        for currency in made_up + ["RUPEES", "", "₹"]:
+            self.assertEqual(self.client.post("/expenses", json={**body, "currency": currency}).status_code, 422)
+        # More currencies than an int8 code holds, all still readable
+        for currency in ISO_CURRENCIES:
+            self.assertEqual(self.client.post("/expenses", json={**body, "currency": currency}).status_code, 201)
+        saved = self.client.get("/expenses", params={"limit": 100, "currency": "zwl"}).json()["items"]
+        self.assertEqual([e["currency"] for e in saved], ["ZWL"])
+        self.assertEqual(self.client.post("/expenses", json={**body, "currency": "usd"}).json()["currency"], "USD")
+
+    def test_search_pages_through_results(self):
+        for day in range(1, 8):
+            self.client.post("/expenses", json={
+                "title": f"Swiggy order {day}", "category": "Food & Dining", "paymentMethod": "UPI",
+                "amount": 100 + day, "date": f"2024-05-{day:02d}",
+            })
+        self.client.post("/expenses", json={
+            "title": "Rent", "category": "Rent", "paymentMethod": "UPI", "amount": 9000, "date": "2024-05-03",
+        })
+
+        params, titles = {"q": "swig", "limit": 3, "end": "2024-05-06"}, []
+        while True:
+            page = self.client.get("/expenses", params=params).json()
+            self.assertLessEqual(set(page), set(PAGE_CONTRACT["properties"]))
+            titles += [e["title"] for e in page["items"]]
+            if page["nextCursor"] is None:
+                break
+            params["cursor"] = page["nextCursor"]
+        self.assertEqual(titles, [f"Swiggy order {day}" for day in range(6, 0, -1)])
+
+        self.assertEqual(len(self.client.get("/expenses", params={"limit": 100}).json()["items"]), 8)
+        self.assertEqual(self.client.get("/expenses", params={"cursor": "%%%"}).status_code, 400)
+        self.assertEqual(self.client.get("/expenses", params={"category": "Snacks"}).status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.clients.s3_client import InMemoryObjectStore
+from app.clients.sqs_client import InMemoryQueue
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult, ExpenseDetails
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo
+from app.repos.ingestion_repo import IngestionJobRepo
+from app.services.ingestion_service import INGESTION_EVENTS_QUEUE_URL_ENV, IngestionService
+from app.workers.handlers.ingestion_handler import IngestionHandler
+from app.workers.sqs_consumer import SqsConsumer
+
+CONTRACTS = Path(__file__).resolve().parents[3] / "packages" / "contracts" / "events"
+
+RESULT = ExpenseAIResult(
+    expense=ExpenseDetails(title="Cafe", category="Food & Dining", paymentMethod="UPI", amount=250.0),
+    confidence=0.9,
+)
+
+
+class FakeParser:
+    def __init__(self, latency: float = 0.0, errors=()):
+        self.latency = latency
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def parse_image(self, file_bytes, mime_type, now_iso, timezone, user_id=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.errors:
+            raise self.errors.pop(0)
+        return RESULT
+
+    parse_audio = parse_image
+
+
+class LosesFirstAck(InMemoryQueue):
+    """Fails the first delete, as when an ack is lost, so the message comes back after its timeout."""
+
+    def __init__(self):
+        super().__init__()
+        self.lost = 0
+
+    async def delete(self, receipt_handle):
+        if not self.lost:
+            self.lost += 1
+            raise ConnectionError("ack lost")
+        await super().delete(receipt_handle)
+
+
+def assert_matches_contract(test: unittest.TestCase, event: dict) -> None:
+    """Checks the top-level shape against the JSON schema (required keys, no extras, eventType)."""
+    schema = json.loads((CONTRACTS / f"{event['eventType']}.json").read_text())
+    test.assertEqual(event["eventType"], schema["properties"]["eventType"]["const"])
+    test.assertLessEqual(set(schema["required"]), set(event))
+    test.assertLessEqual(set(event), set(schema["properties"]))
+
+
+class TestIngestion(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.queue = InMemoryQueue()
+        self.events = InMemoryQueue()
+        self.uploads = InMemoryObjectStore()
+        self.jobs = IngestionJobRepo(InMemoryIdempotencyRepo())
+        self.service = IngestionService(queue=self.queue, uploads=self.uploads, jobs=self.jobs)
+
+    def consumer(self, parser, max_concurrency=8, visibility_timeout=30.0, retry_delay=0.01, max_attempts=3):
+        handler = IngestionHandler(
+            parser=parser, uploads=self.uploads, jobs=self.jobs, events=self.events, max_attempts=max_attempts,
+        )
+        return SqsConsumer(
+            self.queue,
+            {"ingestion-job-created": handler},
+            max_concurrency=max_concurrency,
+            wait_seconds=0.05,
+            visibility_timeout=visibility_timeout,
+            retry_delay_seconds=retry_delay,
+        )
+
+    async def submit(self, n=1):
+        return await self.service.submit(
+            user_id="user-1", kind="image", file_bytes=b"\xff\xd8\xff" + bytes([n]),
+            mime_type="image/jpeg", timezone="UTC", now_iso="2024-05-02T00:00:00",
+        )
+
+    async def drain(self, consumer, until, timeout=5.0):
+        task = asyncio.create_task(consumer.run())
+        deadline = time.monotonic() + timeout
+        while not until() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await task
+
+    async def test_submit_returns_queued_job_and_enqueues_created_event(self):
+        job = await self.submit()
+
+        self.assertEqual(job.status, "queued")
+        (message,) = await self.queue.receive(wait_seconds=0)
+        self.assertEqual(message.body["jobId"], job.jobId)
+        assert_matches_contract(self, message.body)
+        self.assertIsNotNone(await self.uploads.get(message.body["upload"]["key"]))
+
+    async def test_worker_completes_job_and_publishes_event(self):
+        job = await self.submit()
+        consumer = self.consumer(FakeParser())
+        await self.drain(consumer, until=lambda: consumer.processed == 1)
+
+        stored = await self.service.get_job("user-1", job.jobId)
+        self.assertEqual(stored.status, "completed")
+        self.assertEqual(stored.result.expense.title, "Cafe")
+        self.assertIsNone(await self.service.get_job("someone-else", job.jobId))
+
+        (event,) = await self.events.receive(wait_seconds=0)
+        self.assertEqual(event.body["eventType"], "ingestion-job-completed")
+        assert_matches_contract(self, event.body)
+        self.assertEqual(len(self.queue), 0)
+
+    async def test_jobs_run_concurrently_up_to_limit(self):
+        n, latency = 20, 0.2
+        for i in range(n):
+            await self.submit(i)
+        consumer = self.consumer(FakeParser(latency=latency), max_concurrency=10)
+
+        start = time.perf_counter()
+        await self.drain(consumer, until=lambda: consumer.processed == n)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(consumer.processed, n)
+        # Two waves of ten, not twenty sequential calls
+        self.assertLess(elapsed, latency * 4)
+
+    async def test_visibility_extended_during_long_parse(self):
+        await self.submit()
+        consumer = self.consumer(FakeParser(latency=0.35), visibility_timeout=0.2)
+        await self.drain(consumer, until=lambda: consumer.processed == 1)
+
+        self.assertGreaterEqual(consumer.visibility_extensions, 2)
+        # The message never became visible again, so it was parsed once
+        self.assertEqual(consumer.handlers["ingestion-job-created"].parser.calls, 1)
+
+    async def test_transient_error_is_retried(self):
+        job = await self.submit()
+        parser = FakeParser(errors=[HTTPException(status_code=503, detail="AI parser is busy, please retry shortly.")])
+        consumer = self.consumer(parser)
+        await self.drain(consumer, until=lambda: consumer.processed == 1)
+
+        self.assertEqual(parser.calls, 2)
+        self.assertEqual(consumer.failed, 1)
+        self.assertEqual((await self.jobs.get(job.jobId)).status, "completed")
+
+    async def test_final_failure_publishes_failed_event(self):
+        job = await self.submit()
+        parser = FakeParser(errors=[HTTPException(status_code=502, detail="AI Processing Failed: boom")] * 2)
+        consumer = self.consumer(parser, max_attempts=2)
+        await self.drain(consumer, until=lambda: consumer.processed == 1)
+
+        stored = await self.jobs.get(job.jobId)
+        self.assertEqual(stored.status, "failed")
+        self.assertEqual(stored.error.status, 502)
+
+        (event,) = await self.events.receive(wait_seconds=0)
+        self.assertEqual(event.body["eventType"], "ingestion-job-failed")
+        self.assertEqual(event.body["attempts"], 2)
+        assert_matches_contract(self, event.body)
+
+    async def test_lost_ack_redelivery_is_dropped(self):
+        self.queue = LosesFirstAck()
+        self.service = IngestionService(queue=self.queue, uploads=self.uploads, jobs=self.jobs)
+        job = await self.submit()
+        parser = FakeParser()
+        consumer = self.consumer(parser, visibility_timeout=0.2)
+        await self.drain(consumer, until=lambda: consumer.processed == 2)
+
+        # The redelivery neither parsed again nor overwrote the completed job
+        self.assertEqual((self.queue.lost, parser.calls), (1, 1))
+        self.assertEqual((await self.jobs.get(job.jobId)).status, "completed")
+        events = await self.events.receive(wait_seconds=0)
+        self.assertEqual([e.body["eventType"] for e in events], ["ingestion-job-completed"])
+        # The upload went once the redelivery was acked
+        self.assertIsNone(await self.uploads.get(f"uploads/user-1/{job.jobId}"))
+        self.assertEqual(len(self.queue), 0)
+
+    async def test_no_events_queue_without_a_url(self):
+        with mock.patch.dict(os.environ, {INGESTION_EVENTS_QUEUE_URL_ENV: ""}):
+            handler = IngestionHandler(parser=FakeParser(), uploads=self.uploads, jobs=self.jobs)
+        self.assertIsNone(handler.events)
+        job = await self.submit()
+        (message,) = await self.queue.receive(wait_seconds=0)
+        await handler(message.body, 1)
+        self.assertEqual((await self.jobs.get(job.jobId)).status, "completed")
+
+
+class TestInMemoryIdempotencyRepo(unittest.IsolatedAsyncioTestCase):
+
+    async def test_expired_entries_are_swept_and_size_is_bounded(self):
+        repo = InMemoryIdempotencyRepo(max_entries=3, sweep_interval=0)
+        for key in "abc":
+            await repo.put(key, {"v": key}, ttl_seconds=-1)
+        await repo.put("d", {"v": "d"}, ttl_seconds=60)
+        # The expired entries went with the sweep, unread
+        self.assertEqual(len(repo), 1)
+
+        repo = InMemoryIdempotencyRepo(max_entries=3)
+        for key in "abcd":
+            await repo.put(key, {"v": key}, ttl_seconds=60)
+        await repo.put("b", {"v": "b2"}, ttl_seconds=60)
+        await repo.put("e", {"v": "e"}, ttl_seconds=60)
+        # The least recently written go first; rewriting "b" kept it
+        self.assertEqual(len(repo), 3)
+        self.assertEqual([await repo.get(k) is not None for k in "abcde"], [False, True, False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import itertools
+import time
+import unittest
+
+from fastapi import HTTPException
+from google.genai import errors
+
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.concurrency import InFlightLimiter
+from app.modules.ai_expense_parser.routing import CircuitBreaker, ModelRouter
+from app.modules.ai_expense_parser.service import GeminiExpenseParserService
+from benchmarks.fake_gemini import FakeGeminiServer
+from tests.fakes import make_parser
+
+PRIMARY, FALLBACK = "primary-model", "fallback-model"
+
+
+def every_nth_slow(n: int, slow: float, fast: float):
+    """Latency distribution where every n-th request (counted across models) stalls."""
+    counter = itertools.count(1)
+    return lambda model: slow if next(counter) % n == 0 else fast
+
+
+class TestModelRouting(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.http_client = build_http_client()
+        self.addAsyncCleanup(self.http_client.aclose)
+
+    def serve(self, **kwargs) -> FakeGeminiServer:
+        server = FakeGeminiServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_service(self, server, router: ModelRouter) -> GeminiExpenseParserService:
+        return make_parser(
+            client=build_gemini_client("test-key", self.http_client, base_url=server.base_url),
+            limiter=InFlightLimiter(16, 5.0), router=router,
+        )
+
+    async def parse(self, service, n=0):
+        return await service.parse_image(
+            b"\xff\xd8\xff" + n.to_bytes(2, "big"), "image/jpeg", "2024-05-02T00:00:00", "UTC"
+        )
+
+    async def timed_parses(self, service, n):
+        timings = []
+        for i in range(n):
+            start = time.perf_counter()
+            await self.parse(service, i)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    async def test_hedged_request_cuts_the_tail(self):
+        server = self.serve(latency=every_nth_slow(5, slow=2.0, fast=0.02))
+        router = ModelRouter([PRIMARY], hedge_min_delay=0.1, hedge_default_delay=0.1)
+        timings = await self.timed_parses(self.make_service(server, router), 20)
+
+        # Without hedging four of these would take 2s
+        self.assertLess(max(timings), 0.5)
+        self.assertGreaterEqual(router.hedge_wins, 3)
+
+    async def test_hedge_delay_follows_observed_p95(self):
+        server = self.serve(latency=0.05)
+        router = ModelRouter([PRIMARY], hedge_min_delay=0.01, hedge_default_delay=5.0)
+        await self.timed_parses(self.make_service(server, router), 25)
+
+        self.assertLess(router.hedge_delay(PRIMARY), 0.2)
+        self.assertEqual(router.hedges, 0)
+
+    async def test_slow_primary_falls_back_within_deadline(self):
+        server = self.serve(latency=lambda model: 2.0 if model == PRIMARY else 0.02)
+        router = ModelRouter([PRIMARY, FALLBACK], attempt_timeout=0.3, hedging=False)
+        service = self.make_service(server, router)
+
+        start = time.perf_counter()
+        result = await self.parse(service)
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(result.expense.title, "Blue Tokai Coffee")
+        self.assertEqual((router.timeouts, router.fallbacks), (1, 1))
+
+        # Fallback answers are not cached under the primary's key
+        await self.parse(service)
+        self.assertEqual(server.requests_by_model[FALLBACK], 2)
+
+    async def test_erroring_primary_falls_back_then_breaker_skips_it(self):
+        server = self.serve(failing_models={PRIMARY})
+        router = ModelRouter([PRIMARY, FALLBACK], breaker_failures=3, breaker_reset_timeout=60)
+        service = self.make_service(server, router)
+
+        for i in range(6):
+            await self.parse(service, i)
+
+        self.assertEqual(server.requests_by_model[PRIMARY], 3)
+        self.assertEqual(server.requests_by_model[FALLBACK], 6)
+        self.assertEqual(router.breakers[PRIMARY].state, "open")
+
+    async def test_all_tiers_down_fails_fast_with_503(self):
+        server = self.serve(failing_models={PRIMARY, FALLBACK})
+        router = ModelRouter([PRIMARY, FALLBACK], breaker_failures=2, breaker_reset_timeout=60)
+        service = self.make_service(server, router)
+
+        for i in range(2):
+            with self.assertRaises(HTTPException) as ctx:
+                await self.parse(service, i)
+            self.assertEqual(ctx.exception.status_code, 502)
+
+        requests = server.requests
+        with self.assertRaises(HTTPException) as ctx:
+            await self.parse(service, 99)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(server.requests, requests)
+
+    async def test_stalled_model_times_out_with_504(self):
+        server = self.serve(latency=1.0)
+        router = ModelRouter([PRIMARY], attempt_timeout=0.2, hedging=False)
+
+        start = time.perf_counter()
+        with self.assertRaises(HTTPException) as ctx:
+            await self.parse(self.make_service(server, router))
+        self.assertEqual(ctx.exception.status_code, 504)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    async def test_stalled_stream_ends_with_504_and_counts_against_the_primary(self):
+        server = self.serve(latency=1.0, stream_chunks=1)
+        router = ModelRouter([PRIMARY], attempt_timeout=0.2)
+
+        start = time.perf_counter()
+        events = [event async for event in self.make_service(server, router).stream_image(
+            b"\xff\xd8\xff", "image/jpeg", "2024-05-02T00:00:00", "UTC"
+        )]
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(events, [("error", {"status": 504, "detail": "AI model did not respond in time."})])
+        self.assertEqual((router.breakers[PRIMARY].failures, router.timeouts), (1, 1))
+
+
+def api_error(cls, code: int, status: str):
+    return cls(code, {"error": {"code": code, "message": "rejected", "status": status}})
+
+
+class TestFailureClassification(unittest.IsolatedAsyncioTestCase):
+
+    async def test_rejected_request_neither_falls_back_nor_trips_the_breaker(self):
+        router = ModelRouter([PRIMARY, FALLBACK], breaker_failures=2, hedging=False)
+        calls = []
+
+        async def call(model):
+            calls.append(model)
+            raise api_error(errors.ClientError, 400, "INVALID_ARGUMENT")
+
+        for _ in range(5):
+            with self.assertRaises(errors.ClientError):
+                await router.generate(call)
+        self.assertEqual(calls, [PRIMARY] * 5)
+        self.assertEqual([b.state for b in router.breakers.values()], ["closed", "closed"])
+        self.assertEqual(router.fallbacks, 0)
+
+    async def test_server_errors_and_throttling_fall_back(self):
+        router = ModelRouter([PRIMARY, FALLBACK], breaker_failures=2, hedging=False)
+        failures = iter([api_error(errors.ServerError, 503, "UNAVAILABLE"), api_error(errors.ClientError, 429, "RESOURCE_EXHAUSTED")])
+
+        async def call(model):
+            if model == PRIMARY:
+                raise next(failures)
+            return "ok"
+
+        self.assertEqual(await router.generate(call), ("ok", FALLBACK))
+        self.assertEqual(await router.generate(call), ("ok", FALLBACK))
+        self.assertEqual(router.breakers[PRIMARY].state, "open")
+
+    async def test_stream_outcomes_reach_the_primary_breaker(self):
+        router = ModelRouter([PRIMARY, FALLBACK], breaker_failures=2)
+        outcomes = iter([api_error(errors.ClientError, 400, "INVALID_ARGUMENT"), None,
+                         api_error(errors.ServerError, 503, "UNAVAILABLE"), api_error(errors.ServerError, 500, "INTERNAL")])
+
+        async def chunks(error):
+            yield "a"
+            if error:
+                raise error
+            yield "b"
+
+        async def call(model):
+            self.assertEqual(model, PRIMARY)
+            return chunks(next(outcomes))
+
+        async def read():
+            return [chunk async for chunk in router.stream(call)]
+
+        with self.assertRaises(errors.ClientError):
+            await read()
+        self.assertEqual(router.breakers[PRIMARY].failures, 0)
+        self.assertEqual(await read(), ["a", "b"])
+        for _ in range(2):
+            with self.assertRaises(errors.ServerError):
+                await read()
+        with self.assertRaises(HTTPException) as ctx:
+            await read()
+        self.assertEqual(ctx.exception.status_code, 503)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_half_open_allows_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from app.modules.ai_expense_parser.cache import ParseResultCache
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult, ExpenseDetails
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo, SqliteIdempotencyRepo
+
+
+def make_result(date: str) -> ExpenseAIResult:
+    return ExpenseAIResult(
+        expense=ExpenseDetails(title="Cafe", category="Food & Dining", paymentMethod="UPI", amount=120.0, date=date),
+        confidence=1.0,
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseResultCache(unittest.IsolatedAsyncioTestCase):
+
+    async def test_key_depends_on_bytes_mime_and_model(self):
+        key = ParseResultCache.key_for("image", b"abc", "image/jpeg", "m1")
+        self.assertEqual(key, ParseResultCache.key_for("image", b"abc", "image/jpeg", "m1"))
+        self.assertNotEqual(key, ParseResultCache.key_for("image", b"abd", "image/jpeg", "m1"))
+        self.assertNotEqual(key, ParseResultCache.key_for("image", b"abc", "image/png", "m1"))
+        self.assertNotEqual(key, ParseResultCache.key_for("image", b"abc", "image/jpeg", "m2"))
+
+    async def test_hit_renormalizes_missing_date(self):
+        cache = ParseResultCache()
+        await cache.put("k", make_result("2024-01-01T00:00:00"), raw_date=None)
+
+        result = await cache.get("k", now_iso="2024-06-01T08:00:00")
+        self.assertEqual(result.expense.date, "2024-06-01T08:00:00")
+        self.assertIsNone(await cache.get("other", now_iso="2024-06-01T08:00:00"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    async def test_hit_keeps_printed_date(self):
+        cache = ParseResultCache()
+        await cache.put("k", make_result("2024-01-01T10:00:00Z"), raw_date="2024-01-01T10:00:00Z")
+        result = await cache.get("k", now_iso="2024-06-01T08:00:00")
+        self.assertEqual(result.expense.date, "2024-01-01T10:00:00Z")
+
+    async def test_lru_bound_and_ttl(self):
+        cache = ParseResultCache(max_entries=2)
+        for key in ("a", "b"):
+            await cache.put(key, make_result("2024-01-01T00:00:00Z"), raw_date=None)
+        await cache.get("a", now_iso="x")  # "a" becomes most recent
+        await cache.put("c", make_result("2024-01-01T00:00:00Z"), raw_date=None)
+        self.assertIsNone(await cache.get("b", now_iso="x"))
+        self.assertIsNotNone(await cache.get("a", now_iso="x"))
+
+        clock = FakeClock()
+        cache = ParseResultCache(ttl_seconds=10, clock=clock)
+        await cache.put("a", make_result("2024-01-01T00:00:00Z"), raw_date=None)
+        clock.now += 10
+        self.assertIsNone(await cache.get("a", now_iso="x"))
+
+    async def test_persistent_tier_survives_new_process_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            store = SqliteIdempotencyRepo(path)
+            await ParseResultCache(store=store).put("k", make_result("2024-01-01T10:00:00Z"), "2024-01-01T10:00:00Z")
+            store.close()
+
+            store = SqliteIdempotencyRepo(path)
+            result = await ParseResultCache(store=store).get("k", now_iso="2024-06-01T08:00:00")
+            store.close()
+        self.assertEqual(result.expense.title, "Cafe")
+
+    async def test_promoted_entry_keeps_its_expiry(self):
+        store, clock = InMemoryIdempotencyRepo(), FakeClock()
+        await ParseResultCache(ttl_seconds=60, store=store, clock=clock).put("k", make_result("2024-01-01T10:00:00Z"), None)
+        clock.now += 40
+        cache = ParseResultCache(ttl_seconds=60, store=store, clock=clock)
+        self.assertIsNotNone(await cache.get("k", now_iso="x"))
+        clock.now += 40
+        # Past the original expiry, though only 40 s after the promotion
+        self.assertIsNone(await cache.get("k", now_iso="x"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+
+
+from app.core.telemetry import PROMPT_TOKENS
+from app.modules.ai_expense_parser.client import build_gemini_client, build_http_client
+from app.modules.ai_expense_parser.prompt_cache import SystemPromptCache
+from app.modules.ai_expense_parser.prompts import (
+    ALLOWED_CATEGORIES, ALLOWED_PAYMENT_METHODS, SYSTEM_PROMPTS, image_request_prompt,
+)
+from app.modules.ai_expense_parser.routing import ModelRouter
+from benchmarks.fake_gemini import FakeGeminiServer
+from tests.fakes import make_parser
+
+MODEL = "prompt-cache-model"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPrompts(unittest.TestCase):
+
+    def test_system_prompts_are_static(self):
+        for kind, prompt in SYSTEM_PROMPTS.items():
+            self.assertNotIn("{categories}", prompt, kind)
+            self.assertNotIn("Current Time", prompt, kind)
+            for value in ALLOWED_CATEGORIES + ALLOWED_PAYMENT_METHODS:
+                self.assertIn(value, prompt, kind)
+
+    def test_request_prompt(self):
+        self.assertEqual(
+            image_request_prompt("2024-05-02T00:00:00", "Asia/Kolkata", "image/png"),
+            "Context:\n- Current Time: 2024-05-02T00:00:00\n- Timezone: Asia/Kolkata\n\nInput Image is a image/png.",
+        )
+
+
+class TestSystemPromptCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.http_client = build_http_client()
+        self.addAsyncCleanup(self.http_client.aclose)
+
+    def serve(self, **kwargs) -> FakeGeminiServer:
+        server = FakeGeminiServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def client_for(self, server):
+        return build_gemini_client("test-key", self.http_client, base_url=server.base_url)
+
+    async def settle(self, cache: SystemPromptCache):
+        await asyncio.gather(*cache._creating.values())
+
+    async def test_inline_until_cached_then_by_name(self):
+        server = self.serve()
+        cache = SystemPromptCache(self.client_for(server))
+
+        config = cache.config_for(MODEL, "image")
+        self.assertEqual(config.system_instruction, SYSTEM_PROMPTS["image"])
+        # Concurrent misses share one creation
+        cache.config_for(MODEL, "image")
+        await self.settle(cache)
+        self.assertEqual(len(server.cached_contents), 1)
+
+        config = cache.config_for(MODEL, "image")
+        self.assertIsNone(config.system_instruction)
+        self.assertIn(config.cached_content, server.cached_contents)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    async def test_too_small_prefix_falls_back_and_retries_later(self):
+        server = self.serve(min_cache_tokens=100_000)
+        clock = FakeClock()
+        cache = SystemPromptCache(self.client_for(server), retry_seconds=60, clock=clock)
+
+        cache.config_for(MODEL, "audio")
+        await self.settle(cache)
+        self.assertEqual(cache.failures, 1)
+
+        cache.config_for(MODEL, "audio")
+        self.assertFalse(cache._creating)
+        clock.now += 61
+        self.assertEqual(cache.config_for(MODEL, "audio").system_instruction, SYSTEM_PROMPTS["audio"])
+        await self.settle(cache)
+        self.assertEqual(cache.failures, 2)
+
+    async def test_refreshes_before_expiry(self):
+        server = self.serve()
+        clock = FakeClock()
+        cache = SystemPromptCache(self.client_for(server), ttl_seconds=100, clock=clock)
+        cache.config_for(MODEL, "image")
+        await self.settle(cache)
+        first = cache.config_for(MODEL, "image").cached_content
+
+        clock.now += 91
+        self.assertIsNone(cache.config_for(MODEL, "image").cached_content)
+        await self.settle(cache)
+        self.assertNotEqual(cache.config_for(MODEL, "image").cached_content, first)
+
+
+class TestServiceWithPromptCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.http_client = build_http_client()
+        self.addAsyncCleanup(self.http_client.aclose)
+        self.server = FakeGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        client = build_gemini_client("test-key", self.http_client, base_url=self.server.base_url)
+        self.prompt_cache = SystemPromptCache(client)
+        self.service = make_parser(
+            client=client, router=ModelRouter([MODEL], hedging=False), prompt_cache=self.prompt_cache,
+        )
+
+    async def parse(self, n):
+        return await self.service.parse_image(b"\xff\xd8\xff" + bytes([n]), "image/jpeg", "2024-05-02T00:00:00", "UTC")
+
+    async def test_sends_only_the_suffix_per_request(self):
+        calls = PROMPT_TOKENS.count("image", "total")
+        await self.parse(0)
+        request = self.server.last_request
+        self.assertEqual(request["systemInstruction"]["parts"][0]["text"], SYSTEM_PROMPTS["image"])
+        self.assertTrue(request["contents"][0]["parts"][1]["text"].startswith("Context:"))
+
+        await asyncio.gather(*self.prompt_cache._creating.values())
+        await self.parse(1)
+        request = self.server.last_request
+        self.assertNotIn("systemInstruction", request)
+        self.assertIn(request["cachedContent"], self.server.cached_contents)
+        self.assertEqual(PROMPT_TOKENS.count("image", "total"), calls + 2)
+
+    async def test_lost_cache_is_dropped(self):
+        await self.parse(0)
+        await asyncio.gather(*self.prompt_cache._creating.values())
+        self.server.cached_contents.clear()
+        requests = self.server.requests
+
+        # Retried once on the same model with the inline prompt while a new cache is made
+        result = await self.parse(1)
+        self.assertEqual(result.expense.title, "Blue Tokai Coffee")
+        self.assertIn("systemInstruction", self.server.last_request)
+        self.assertEqual(self.server.requests, requests + 2)
+        self.assertEqual(self.service.router.breakers[MODEL].failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
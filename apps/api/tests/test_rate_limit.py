@@ -0,0 +1,169 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.fake_cognito import FakeUserPool, JwksServer
+
+from app.core import security
+from app.core.rate_limit import AdmissionGate, InMemoryRateLimitStore, RateLimitMiddleware, RateLimitStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_app(store, gate, latency=0.0):
+    app = FastAPI()
+
+    @app.post("/ai/parse")
+    async def parse():
+        await asyncio.sleep(latency)
+        return {"ok": True}
+
+    @app.post("/jobs")
+    async def jobs():
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware, costs={"/ai/parse": 1, "/jobs": 2}, admission_paths={"/ai/parse"}, store=store, gate=gate,
+    )
+    return app
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+
+    def test_store_without_take_cannot_be_built(self):
+        class Incomplete(RateLimitStore):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(rate_per_second=1.0, burst=1)
+
+    async def test_burst_then_refill(self):
+        clock = FakeClock()
+        store = InMemoryRateLimitStore(rate_per_second=2.0, burst=3, clock=clock)
+
+        self.assertEqual([await store.take("a") for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(await store.take("a"), 0.5)
+        self.assertEqual(await store.take("b"), 0.0)
+
+        clock.now += 0.5
+        self.assertEqual(await store.take("a"), 0.0)
+        clock.now += 60
+        self.assertEqual([await store.take("a") for _ in range(4)][-1], 0.5)
+
+    async def test_cost_and_key_eviction(self):
+        clock = FakeClock()
+        store = InMemoryRateLimitStore(rate_per_second=1.0, burst=5, max_keys=2, clock=clock)
+
+        self.assertEqual(await store.take("a", cost=4), 0.0)
+        self.assertAlmostEqual(await store.take("a", cost=4), 3.0)
+        # A cost above the burst is clamped so it can be paid at all
+        self.assertEqual(await store.take("b", cost=50), 0.0)
+
+        await store.take("c")
+        self.assertEqual(len(store), 2)
+        self.assertEqual(await store.take("a", cost=4), 0.0)
+
+
+class TestAdmissionGate(unittest.IsolatedAsyncioTestCase):
+
+    async def test_queues_within_budget_and_sheds_beyond(self):
+        gate = AdmissionGate(max_concurrent=1, latency_budget=1.0, service_time=0.4)
+        self.assertIsNone(await gate.acquire())
+
+        queued = [asyncio.create_task(gate.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(gate.waiting, 2)
+
+        # Third in line would expect 3 * 0.4s > 1s
+        self.assertAlmostEqual(await gate.acquire(), 1.2)
+        self.assertEqual(gate.shed, 1)
+
+        gate.release(0.4)
+        self.assertIsNone(await queued[0])
+        gate.release(0.4)
+        self.assertIsNone(await queued[1])
+        gate.release(0.4)
+        self.assertEqual(gate.in_flight, 0)
+
+    async def test_sheds_when_queued_past_budget(self):
+        gate = AdmissionGate(max_concurrent=1, latency_budget=0.1, service_time=0.01)
+        await gate.acquire()
+
+        self.assertIsNotNone(await gate.acquire())
+        self.assertEqual((gate.shed, gate.waiting), (1, 0))
+
+    async def test_service_time_tracks_releases(self):
+        gate = AdmissionGate(max_concurrent=4, service_time=1.0)
+        for _ in range(30):
+            await gate.acquire()
+            gate.release(0.1)
+        self.assertAlmostEqual(gate.service_time, 0.1, places=2)
+
+
+class TestRateLimitMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def client(self, app, ip="10.0.0.1"):
+        transport = httpx.ASGITransport(app=app, client=(ip, 1234))
+        client = httpx.AsyncClient(transport=transport, base_url="http://test")
+        self.addAsyncCleanup(client.aclose)
+        return client
+
+    async def test_limits_per_user_sub(self):
+        pool = FakeUserPool()
+        server = JwksServer(pool).start()
+        self.addCleanup(server.stop)
+        key_store = security.JwksKeyStore(server.url)
+        self.addAsyncCleanup(key_store.stop)
+        alice_auth, bob_auth = (f"Bearer {pool.issue_access_token(sub=user)}" for user in ("alice", "bob"))
+        store = InMemoryRateLimitStore(rate_per_second=0.5, burst=2, clock=FakeClock())
+        # Same address for both users, so only the sub tells them apart
+        client = self.client(make_app(store, AdmissionGate()))
+
+        with mock.patch.object(security, "_KEY_STORE", key_store):
+            alice = [await client.post("/ai/parse", headers={"Authorization": alice_auth}) for _ in range(3)]
+            bob = await client.post("/ai/parse", headers={"Authorization": bob_auth})
+            forged = await client.post("/ai/parse", headers={"Authorization": "Bearer not-a-jwt"})
+
+        self.assertEqual([r.status_code for r in alice], [200, 200, 429])
+        self.assertEqual(alice[-1].headers["Retry-After"], "2")
+        self.assertEqual(bob.status_code, 200)
+        # Unverifiable tokens fall back to the caller's address
+        self.assertEqual(forged.status_code, 200)
+        self.assertIn("ip:10.0.0.1", store._buckets)
+
+    async def test_anonymous_callers_keyed_by_address(self):
+        store = InMemoryRateLimitStore(rate_per_second=0.5, burst=2, clock=FakeClock())
+        app = make_app(store, AdmissionGate())
+
+        first = [(await self.client(app).post("/jobs")).status_code for _ in range(2)]
+        other = await self.client(app, ip="10.0.0.2").post("/jobs")
+
+        self.assertEqual(first, [200, 429])
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual((await self.client(app).get("/docs")).status_code, 200)
+
+    async def test_overloaded_ai_route_sheds_with_429(self):
+        store = InMemoryRateLimitStore(rate_per_second=100, burst=100)
+        gate = AdmissionGate(max_concurrent=2, latency_budget=0.35, service_time=0.3)
+        client = self.client(make_app(store, gate, latency=0.2))
+
+        responses = await asyncio.gather(*(client.post("/ai/parse") for _ in range(8)))
+        statuses = sorted(r.status_code for r in responses)
+
+        self.assertEqual(statuses.count(200), 4)
+        self.assertEqual(statuses.count(429), 4)
+        self.assertTrue(all(r.headers["Retry-After"] == "1" for r in responses if r.status_code == 429))
+        self.assertEqual(gate.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
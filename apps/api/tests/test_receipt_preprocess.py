@@ -0,0 +1,67 @@
+import asyncio
+import io
+import unittest
+
+from PIL import Image
+
+from app.pipelines.receipt_ocr.pipeline import (
+    preprocess_receipt_image,
+    preprocess_receipt_image_async,
+    shutdown_preprocess_pool,
+)
+
+
+def make_jpeg(width: int, height: int, orientation: int = 1, quality: int = 95) -> bytes:
+    img = Image.effect_noise((width, height), 64).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, exif=exif)
+    return out.getvalue()
+
+
+class TestReceiptPreprocess(unittest.TestCase):
+
+    def test_downscales_to_target_long_edge_in_grayscale(self):
+        data = make_jpeg(3000, 4000)
+        result = preprocess_receipt_image(data, "image/jpeg")
+
+        self.assertTrue(result.changed)
+        self.assertEqual(result.mime_type, "image/jpeg")
+        self.assertEqual((result.width, result.height), (1200, 1600))
+        self.assertGreater(result.bytes_saved, 0)
+        with Image.open(io.BytesIO(result.data)) as img:
+            self.assertEqual(img.mode, "L")
+
+    def test_exif_rotation_applied(self):
+        # Orientation 6: stored landscape, displayed portrait
+        result = preprocess_receipt_image(make_jpeg(4000, 3000, orientation=6), "image/jpeg")
+        self.assertEqual((result.width, result.height), (1200, 1600))
+
+    def test_narrow_receipt_keeps_readable_width(self):
+        result = preprocess_receipt_image(make_jpeg(1000, 6000), "image/jpeg")
+        self.assertEqual(result.width, 720)
+
+    def test_webp_output(self):
+        result = preprocess_receipt_image(make_jpeg(2000, 3000), "image/jpeg", output_format="WEBP")
+        self.assertEqual(result.mime_type, "image/webp")
+
+    def test_undecodable_or_small_input_passes_through(self):
+        garbage = b"\xff\xd8\xff not really a jpeg"
+        result = preprocess_receipt_image(garbage, "image/jpeg")
+        self.assertFalse(result.changed)
+        self.assertEqual(result.data, garbage)
+
+        small = make_jpeg(200, 300, quality=30)
+        self.assertEqual(preprocess_receipt_image(small, "image/jpeg").data, small)
+
+    def test_runs_in_process_pool(self):
+        try:
+            result = asyncio.run(preprocess_receipt_image_async(make_jpeg(2000, 3000), "image/jpeg"))
+        finally:
+            shutdown_preprocess_pool()
+        self.assertTrue(result.changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
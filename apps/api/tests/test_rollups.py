@@ -0,0 +1,166 @@
+import asyncio
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user
+from app.api.v1.routes import insights
+from app.clients.sqs_client import InMemoryQueue
+from app.modules.ai_expense_parser.schemas import ExpenseDetails
+from app.repos.expenses_repo import ExpensesRepo
+from app.repos.idempotency_repo import InMemoryIdempotencyRepo
+from app.repos.rollups_repo import MonthlyRollupsRepo
+from app.services.expenses_service import ExpensesService
+from app.services.insights_service import InsightsService, get_insights_service
+from app.workers.handlers.monthly_rollup_handler import MonthlyRollupHandler, RollupReconciler, monthly_totals
+from app.workers.scheduler import Scheduler
+from tests.test_ingestion import assert_matches_contract
+
+
+def details(amount, date, category="Food & Dining", currency="INR"):
+    return ExpenseDetails(title="Cafe", category=category, paymentMethod="UPI", amount=amount, currency=currency,
+                          date=date)
+
+
+class TestMonthlyRollups(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.events = InMemoryQueue()
+        self.expenses = ExpensesRepo()
+        self.rollups = MonthlyRollupsRepo(InMemoryIdempotencyRepo())
+        self.service = ExpensesService(self.expenses, events=self.events)
+        self.handler = MonthlyRollupHandler(self.rollups)
+
+    async def deliver(self):
+        """Applies every published event, returning their bodies."""
+        bodies = []
+        for message in await self.events.receive(max_messages=10):
+            await self.handler(message.body, message.receive_count)
+            bodies.append(message.body)
+        return bodies
+
+    async def stored(self, user_id="u1"):
+        index = await self.rollups.index(user_id)
+        return await self.rollups.months(user_id, index["months"])
+
+    async def test_deltas_keep_rollups_equal_to_a_recompute(self):
+        saved = await self.service.create_many("u1", [
+            details(250.5, "2024-04-30T23:00:00"), details(99.99, "2024-05-02"),
+            details(1000, "2024-05-10", "Groceries"), details(20, "2024-05-11", currency="usd"),
+        ])
+        (created,) = await self.deliver()
+        assert_matches_contract(self, created)
+        self.assertEqual((created["change"], len(created["deltas"])), ("created", 4))
+
+        await self.service.update("u1", saved[0].id, details(300, "2024-05-03"))
+        await self.service.delete("u1", saved[2].id)
+        await self.deliver()
+
+        expected = {
+            "2024-05": {"INR": {"Food & Dining": [39999, 2]}, "USD": {"Food & Dining": [2000, 1]}},
+        }
+        self.assertEqual(await self.stored(), expected)
+        self.assertEqual(monthly_totals(self.expenses.columns("u1")), expected)
+
+    async def test_compact_and_week_dates_are_stored_in_extended_form(self):
+        saved = await self.service.create_many("u1", [
+            details(100, "20260105"), details(50, "2026-W02-1"), details(20, "20260105T101500"),
+        ])
+        self.assertEqual([e.date for e in saved], ["2026-01-05", "2026-01-05", "2026-01-05T10:15:00"])
+        await self.deliver()
+        expected = {"2026-01": {"INR": {"Food & Dining": [17000, 3]}}}
+        self.assertEqual(await self.stored(), expected)
+        self.assertEqual(monthly_totals(self.expenses.columns("u1")), expected)
+
+    async def test_redelivered_events_apply_once(self):
+        await self.service.create("u1", details(100, "2024-05-01"))
+        (message,) = await self.events.receive()
+        await self.handler(message.body, 1)
+        await self.handler(message.body, 2)
+        self.assertEqual(await self.stored(), {"2024-05": {"INR": {"Food & Dining": [10000, 1]}}})
+        self.assertEqual((self.rollups.applied, self.rollups.duplicates), (1, 1))
+
+    async def test_reconciliation_repairs_drift_and_covers_late_events(self):
+        reconciler = RollupReconciler(self.rollups, self.expenses, users_per_run=1)
+        await self.service.create("u1", details(100, "2024-05-01"))
+        await self.deliver()
+        # A lost event, and one still in flight when reconciliation runs
+        await self.service.create("u1", details(50, "2024-06-01"))
+        await self.events.receive()
+        await self.service.create("u1", details(70, "2024-06-02"))
+
+        self.assertEqual(await reconciler.run_once(), 1)
+        expected = {"2024-05": {"INR": {"Food & Dining": [10000, 1]}}, "2024-06": {"INR": {"Food & Dining": [12000, 2]}}}
+        self.assertEqual(await self.stored(), expected)
+        # The in-flight event is already part of the recomputed totals
+        await self.deliver()
+        self.assertEqual(await self.stored(), expected)
+        self.assertEqual(await reconciler.reconcile("u1"), 0)
+
+        # Users are covered in turn, one per run here
+        await self.service.create("u2", details(5, "2024-06-01"))
+        await reconciler.run_once()
+        self.assertEqual(await self.stored("u2"), {"2024-06": {"INR": {"Food & Dining": [500, 1]}}})
+
+    async def test_scheduler_runs_jobs_and_survives_failures(self):
+        runs = []
+
+        async def job():
+            runs.append(1)
+            if len(runs) == 1:
+                raise RuntimeError("boom")
+
+        scheduler = Scheduler()
+        scheduler.add("job", 0.01, job, run_at_start=True)
+        task = asyncio.create_task(scheduler.run())
+        while len(runs) < 3:
+            await asyncio.sleep(0.01)
+        scheduler.stop()
+        await task
+        self.assertEqual(scheduler.jobs[0].failures, 1)
+
+
+class TestInsightsRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.rollups = MonthlyRollupsRepo(InMemoryIdempotencyRepo())
+        app = FastAPI()
+        app.include_router(insights.router, prefix="/insights")
+        app.dependency_overrides[get_insights_service] = lambda: InsightsService(self.rollups)
+        app.dependency_overrides[get_current_user] = lambda: {"sub": "u1"}
+        self.client = TestClient(app)
+
+        async def seed():
+            expenses = ExpensesRepo()
+            service = ExpensesService(expenses)
+            for month, food, rent in (("02", 100, 1000), ("03", 120, 1000), ("04", 110, 1000), ("05", 400, 1000)):
+                await service.create_many("u1", [details(food, f"2024-{month}-05"), details(rent, f"2024-{month}-01", "Rent")])
+            await RollupReconciler(self.rollups, expenses).run_once()
+
+        asyncio.run(seed())
+
+    def test_rollups_by_month(self):
+        months = self.client.get("/insights/rollups", params={"start": "2024-04", "end": "2024-06"}).json()
+        self.assertEqual([m["month"] for m in months], ["2024-04", "2024-05", "2024-06"])
+        self.assertEqual((months[1]["total"], months[1]["count"]), (1400.0, 2))
+        self.assertEqual([b["key"] for b in months[1]["byCategory"]], ["Rent", "Food & Dining"])
+        self.assertEqual(months[2]["count"], 0)
+
+        self.assertEqual(self.client.get("/insights/rollups", params={"start": "2024-05", "end": "2024-04"}).status_code, 400)
+
+    def test_insights_compare_against_earlier_months(self):
+        report = self.client.get("/insights", params={"month": "2024-05"}).json()
+        by_kind = {i["kind"]: i for i in report["insights"]}
+        self.assertEqual(by_kind["top_category"]["category"], "Rent")
+        self.assertEqual(by_kind["month_over_month"]["change"], round(1400 / 1110 - 1, 4))
+        self.assertEqual(by_kind["category_change"]["category"], "Food & Dining")
+        self.assertIn("more on Food & Dining in May 2024", by_kind["category_change"]["message"])
+
+        self.assertEqual(self.client.get("/insights", params={"month": "2023-01"}).json()["insights"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from app.pipelines.screenshot_parser.pipeline import ScreenshotFastPath, build_result, extract_payment_fields
+
+GPAY = """
+G Pay
+To SWIGGY
+₹452.00
+Completed
+12 Jan 2024, 9:41 pm
+UPI transaction ID
+4012 3456 7890
+To: Swiggy
+swiggy.stores@axb
+"""
+
+PHONEPE = """
+PhonePe
+Transaction Successful
+10:32 am on 03 Feb 2024
+Paid to
+Rahul Sharma
+₹1,250
+UPI Ref. No: 402345678901
+"""
+
+PAYTM = """
+Paytm
+Paid Successfully to Reliance Fresh
+Rs. 86.50
+Mar 7, 2024 12:05 PM
+UPI Ref No: 406712345678
+"""
+
+NOT_A_PAYMENT = "Weekly grocery list\nMilk 2L\nEggs 12\n"
+
+NOW = "2024-06-01T00:00:00"
+
+
+class TestExtractPaymentFields(unittest.TestCase):
+
+    def test_google_pay(self):
+        fields = extract_payment_fields(GPAY)
+        self.assertEqual(fields["amount"], 452.0)
+        self.assertEqual(fields["payee"], "SWIGGY")
+        self.assertEqual(fields["upiRef"], "401234567890")
+        self.assertEqual(fields["date"], "2024-01-12T21:41:00")
+        self.assertEqual(fields["app"], "Google Pay")
+
+    def test_phonepe(self):
+        fields = extract_payment_fields(PHONEPE)
+        self.assertEqual(fields["amount"], 1250.0)
+        self.assertEqual(fields["payee"], "Rahul Sharma")
+        self.assertEqual(fields["upiRef"], "402345678901")
+        self.assertEqual(fields["date"], "2024-02-03T10:32:00")
+
+    def test_paytm(self):
+        fields = extract_payment_fields(PAYTM)
+        self.assertEqual(fields["amount"], 86.5)
+        self.assertEqual(fields["payee"], "Reliance Fresh")
+        self.assertEqual(fields["date"], "2024-03-07T12:05:00")
+
+    def test_build_result_requires_payment_markers(self):
+        self.assertIsNone(build_result(extract_payment_fields(NOT_A_PAYMENT), NOW, NOT_A_PAYMENT))
+
+        result = build_result(extract_payment_fields(PHONEPE), NOW, PHONEPE)
+        self.assertEqual(result.expense.paymentMethod, "UPI")
+        self.assertAlmostEqual(result.confidence, 0.85)
+
+
+class TestScreenshotFastPath(unittest.TestCase):
+
+    def run_fast_path(self, text, mime_type="image/png", **kwargs):
+        fast_path = ScreenshotFastPath(ocr=lambda _: text, **kwargs)
+        return fast_path, asyncio.run(fast_path.try_parse(b"png", mime_type, NOW))
+
+    def test_serves_confident_screenshots(self):
+        fast_path, parsed = self.run_fast_path(GPAY)
+        result, printed_date = parsed
+        self.assertEqual(result.expense.amount, 452.0)
+        self.assertEqual(printed_date, "2024-01-12T21:41:00")
+        self.assertEqual(fast_path.stats()["servedFraction"], 1.0)
+
+    def test_falls_back_below_threshold(self):
+        no_date = PHONEPE.replace("10:32 am on 03 Feb 2024", "")
+        fast_path, parsed = self.run_fast_path(no_date)
+        self.assertIsNone(parsed)
+        self.assertEqual(fast_path.served, 0)
+
+    def test_skips_camera_photos(self):
+        fast_path, parsed = self.run_fast_path(GPAY, mime_type="image/jpeg")
+        self.assertIsNone(parsed)
+        self.assertEqual(fast_path.stats()["attempts"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
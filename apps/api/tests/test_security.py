@@ -0,0 +1,123 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from jose import jwt
+
+from benchmarks.fake_cognito import FakeUserPool, JwksServer
+
+from app.core import security
+from app.core.security import CognitoAuthError, JwksKeyStore, verify_cognito_access_token
+
+
+class TestVerifyCognitoAccessToken(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pool = FakeUserPool()
+        self.server = JwksServer(self.pool).start()
+        self.addCleanup(self.server.stop)
+        self.store = self.use_store(JwksKeyStore(self.server.url))
+        security.invalidate_claims_cache()
+
+    def use_store(self, store: JwksKeyStore) -> JwksKeyStore:
+        patcher = mock.patch.object(security, "_KEY_STORE", store)
+        patcher.start()
+        self.addAsyncCleanup(store.stop)
+        self.addCleanup(patcher.stop)
+        return store
+
+    async def test_valid_token(self):
+        token = self.pool.issue_access_token(sub="user-1")
+        claims = await verify_cognito_access_token(token)
+        self.assertEqual(claims["sub"], "user-1")
+
+    async def test_rejects_wrong_client_and_expired(self):
+        with self.assertRaises(CognitoAuthError):
+            await verify_cognito_access_token(self.pool.issue_access_token(client_id="other"))
+        with self.assertRaises(CognitoAuthError):
+            await verify_cognito_access_token(self.pool.issue_access_token(ttl_seconds=-10))
+
+    async def test_repeat_token_skips_signature_verification(self):
+        token = self.pool.issue_access_token()
+        await verify_cognito_access_token(token)
+        with mock.patch.object(security.jwt, "decode", side_effect=AssertionError("decoded twice")):
+            claims = await verify_cognito_access_token(token)
+        self.assertEqual(claims["token_use"], "access")
+
+    async def test_cached_claims_expire_with_token(self):
+        token = self.pool.issue_access_token(ttl_seconds=60)
+        await verify_cognito_access_token(token)
+        with mock.patch.object(security.time, "time", return_value=time.time() + 120):
+            self.assertIsNone(security._CLAIMS_CACHE.get(security.sha256_hex(token)))
+
+    async def test_key_rotation_invalidates_cache(self):
+        await verify_cognito_access_token(self.pool.issue_access_token())
+        self.assertEqual(len(security._CLAIMS_CACHE), 1)
+
+        self.pool.rotate("key-2")
+        await verify_cognito_access_token(self.pool.issue_access_token())
+        # Only the token signed by the new key remains
+        self.assertEqual(len(security._CLAIMS_CACHE), 1)
+
+    async def test_cold_store_thundering_herd_fetches_once(self):
+        self.server.latency = 0.1
+        tokens = [self.pool.issue_access_token() for _ in range(25)]
+
+        results = await asyncio.gather(*(verify_cognito_access_token(t) for t in tokens))
+
+        self.assertEqual(len(results), 25)
+        self.assertEqual(self.server.fetches, 1)
+
+    async def test_expired_key_set_refreshes_once_under_load(self):
+        await verify_cognito_access_token(self.pool.issue_access_token())
+        self.store._expires_at = 0
+        self.server.latency = 0.1
+        security.invalidate_claims_cache()
+
+        tokens = [self.pool.issue_access_token() for _ in range(25)]
+        await asyncio.gather(*(verify_cognito_access_token(t) for t in tokens))
+
+        self.assertEqual(self.server.fetches, 2)
+
+    async def test_unknown_kid_flood_is_rate_limited(self):
+        await verify_cognito_access_token(self.pool.issue_access_token())
+        forger = FakeUserPool(kids=["forged"]).keys["forged"]
+        claims = jwt.get_unverified_claims(self.pool.issue_access_token())
+        tokens = [
+            jwt.encode(claims, forger.private_pem, algorithm="RS256", headers={"kid": f"bogus-{i}"})
+            for i in range(20)
+        ]
+
+        results = await asyncio.gather(
+            *(verify_cognito_access_token(t) for t in tokens), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(r, CognitoAuthError) for r in results))
+        # One refetch in case the keys rotated, then the interval holds
+        self.assertEqual(self.server.fetches, 2)
+
+    async def test_stale_keys_used_when_refresh_fails(self):
+        token = self.pool.issue_access_token()
+        await verify_cognito_access_token(token)
+        security.invalidate_claims_cache()
+        self.store._expires_at = 0
+        self.store.url = "http://127.0.0.1:1/.well-known/jwks.json"
+
+        claims = await verify_cognito_access_token(token)
+        self.assertEqual(claims["token_use"], "access")
+
+    async def test_background_renewal_before_expiry(self):
+        store = self.use_store(JwksKeyStore(self.server.url, ttl_seconds=0.3, refresh_margin_seconds=0.2))
+        await store.start()
+        await asyncio.sleep(0.45)
+
+        self.assertGreaterEqual(self.server.fetches, 3)
+        # Requests are served from the renewed set without waiting on a fetch
+        fetches = self.server.fetches
+        await verify_cognito_access_token(self.pool.issue_access_token())
+        self.assertEqual(self.server.fetches, fetches)
+
+
+if __name__ == '__main__':
+    unittest.main()
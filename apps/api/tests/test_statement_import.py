@@ -0,0 +1,217 @@
+import io
+import json
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.api.deps import get_current_user
+from app.api.v1.routes import ingestion
+from app.clients.sqs_client import InMemoryQueue
+from app.pipelines.categorizer.pipeline import Categorizer
+from app.pipelines.statement_import import pipeline, rules
+from app.pipelines.statement_import.pipeline import StatementFormatError, statement_batches, statement_rows
+from app.repos.expenses_repo import ExpensesRepo
+from app.services.expenses_service import ExpensesService
+from app.services.statement_import_service import StatementImportService, get_statement_import_service
+from tests.fakes import FakeModels, make_parser
+
+HDFC_CSV = """HDFC BANK Ltd.,Statement of account
+Account No :,XXXXXX1234
+
+Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance
+01/04/24,UPI/DR/412345678901/SWIGGY/YESB/swiggy@yes/Payment,0000412345,01/04/24,"1,250.00",,10000.00
+02/04/24,NEFT CR-SALARY ACME CORP,0000,02/04/24,,"50,000.00",61250.00
+03/04/24,UPI/DR/412345678902/RAMESH KUMAR/SBIN/ramesh@oksbi/Paid,0000,03/04/24,300.00,,60950.00
+04/04/24,POS 4321XXXX UBER INDIA,0000,04/04/24,220.50,,60729.50
+05/04/24,UPI/DR/412345678903/RAMESH KUMAR/SBIN/ramesh@oksbi/Paid,0000,05/04/24,150.00,,60579.50
+Total,,,,,,
+""".encode()
+
+UPI_APP_CSV = """Date;Transaction Details;Type;Amount
+2024-05-01 10:15:00;Paid to Zomato;Debit;INR 420.00
+2024-05-02 18:40:00;Received from Asha;Credit;INR 1000.00
+2024-05-03 09:05:00;Paid to Corner Bakery;DEBIT;INR 95.00
+""".encode()
+
+
+class FakeStatementModels(FakeModels):
+    """Answers categorization prompts from a description keyword -> category map."""
+
+    def __init__(self, answers, fail=False):
+        super().__init__()
+        self.answers = answers
+        self.prompts = []
+        if fail:
+            self.error = RuntimeError("model unavailable")
+
+    def answer(self, contents) -> str:
+        prompt = contents[0]
+        self.prompts.append(prompt)
+        lines = [line.split(". ", 1)[1] for line in prompt.splitlines()[1:]]
+        categories = [next((c for word, c in self.answers.items() if word in line), "Misc") for line in lines]
+        return json.dumps({"categories": categories})
+
+
+class TestStatementRules(unittest.TestCase):
+
+    def test_dates(self):
+        self.assertEqual(rules.parse_date("15/04/2024"), "2024-04-15")
+        self.assertEqual(rules.parse_date("15/04/24"), "2024-04-15")
+        self.assertEqual(rules.parse_date("15-Apr-2024"), "2024-04-15")
+        self.assertEqual(rules.parse_date("15/04/2024 10:32:11"), "2024-04-15T10:32:11")
+        self.assertEqual(rules.parse_date("2024-04-15T10:00:00Z"), "2024-04-15T10:00:00Z")
+        self.assertEqual(rules.parse_date("20240415"), "2024-04-15")
+        self.assertIsNone(rules.parse_date("Total"))
+
+    def test_amounts(self):
+        self.assertEqual(rules.parse_amount("1,250.00"), (1250.0, 0))
+        self.assertEqual(rules.parse_amount("1,250.00 Dr"), (1250.0, rules.DEBIT))
+        self.assertEqual(rules.parse_amount("500.00Cr"), (500.0, rules.CREDIT))
+        self.assertEqual(rules.parse_amount("(75.50)"), (75.5, rules.DEBIT))
+        self.assertEqual(rules.parse_amount("-75.50"), (75.5, rules.DEBIT))
+        self.assertEqual(rules.parse_amount("Rs. 99"), (99.0, 0))
+        self.assertEqual(rules.parse_amount(""), (0.0, 0))
+
+    def test_description_key_drops_references(self):
+        self.assertEqual(rules.description_key("UPI/DR/412345678901/SWIGGY/YESB"), "upi dr swiggy yesb")
+        self.assertEqual(rules.description_key("Tata 1mg order"), "tata 1mg order")
+
+
+class TestStatementPipeline(unittest.TestCase):
+
+    def test_bank_statement_batches(self):
+        batches = list(statement_batches(statement_rows(io.BytesIO(HDFC_CSV)), Categorizer(), "u1", batch_size=2))
+        self.assertEqual([b.rows for b in batches], [2, 2, 2])
+        self.assertEqual(sum(b.credits for b in batches), 1)
+        self.assertEqual([e for b in batches for e in b.errors], [(10, "unreadable date")])
+
+        expenses = [e for b in batches for e in b.expenses()]
+        self.assertEqual([e.amount for e in expenses], [1250.0, 300.0, 220.5, 150.0])
+        self.assertEqual([e.date for e in expenses], ["2024-04-01", "2024-04-03", "2024-04-04", "2024-04-05"])
+        self.assertEqual([e.paymentMethod for e in expenses], ["UPI", "UPI", "Card", "UPI"])
+        # Unknown payees are left for the model and filed under Misc meanwhile
+        self.assertEqual([e.category for e in expenses], ["Food & Dining", "Misc", "Transport", "Misc"])
+        keys = [k for b in batches for k in b.keys[b.uncategorized()].tolist()]
+        self.assertEqual(keys, ["upi dr ramesh kumar sbin ramesh oksbi paid"] * 2)
+
+    def test_type_column_and_semicolons(self):
+        (batch,) = statement_batches(statement_rows(io.BytesIO(UPI_APP_CSV)), Categorizer())
+        self.assertEqual((batch.rows, batch.credits, len(batch)), (3, 1, 2))
+        self.assertEqual(batch.dates, ["2024-05-01 10:15:00", "2024-05-03 09:05:00"])
+        self.assertEqual(batch.amounts.tolist(), [420.0, 95.0])
+        self.assertEqual(batch.categories.tolist(), ["Food & Dining", ""])
+
+    def test_users_confirmed_merchants_apply_inside_descriptions(self):
+        categorizer = Categorizer()
+        categorizer.learn("u1", "Ramesh Kumar", "Groceries")
+        (batch,) = statement_batches(statement_rows(io.BytesIO(HDFC_CSV)), categorizer, "u1")
+        self.assertEqual(batch.categories.tolist()[1], "Groceries")
+
+    def test_unknown_currencies_are_reported(self):
+        rows = [["Date", "Description", "Amount", "Currency"], ["2024-06-01", "Cafe", "10", "usd"],
+                ["2024-06-02", "Cafe", "10", "XYZ"], ["2024-06-03", "Cafe", "10", ""]]
+        (batch,) = statement_batches(rows, Categorizer())
+        self.assertEqual(batch.currencies, ["USD", "INR"])
+        self.assertEqual(batch.errors, [(3, "unknown currency")])
+
+    def test_amounts_the_columns_cannot_hold_are_reported(self):
+        rows = [["Date", "Description", "Debit"], ["2024-06-01", "Cafe", "1e30"], ["2024-06-02", "Cafe", "inf"],
+                ["2024-06-03", "Cafe", "nan"], ["2024-06-04", "Cafe", "10"]]
+        (batch,) = statement_batches(rows, Categorizer())
+        self.assertEqual(batch.amounts.tolist(), [10.0])
+        self.assertEqual(batch.errors, [(2, "amount out of range"), (3, "amount out of range"), (4, "amount out of range")])
+
+    def test_unreadable_files(self):
+        with self.assertRaises(StatementFormatError):
+            list(statement_batches(statement_rows(io.BytesIO(b"just,some\ncells,here\n")), Categorizer()))
+        with self.assertRaises(StatementFormatError):
+            statement_rows(io.BytesIO(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"))
+
+    @unittest.skipIf(pipeline.openpyxl is None, "openpyxl not installed")
+    def test_xlsx(self):
+        from datetime import datetime
+        workbook = pipeline.openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Txn Date", "Description", "Debit", "Credit"])
+        sheet.append([datetime(2024, 4, 1), "Swiggy order", 250.0, None])
+        sheet.append([datetime(2024, 4, 2), "Refund", None, 90.0])
+        buf = io.BytesIO()
+        workbook.save(buf)
+        buf.seek(0)
+        (batch,) = statement_batches(statement_rows(buf), Categorizer())
+        self.assertEqual((batch.dates, batch.amounts.tolist(), batch.credits), (["2024-04-01"], [250.0], 1))
+
+
+class TestStatementImportService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.repo = ExpensesRepo()
+        self.events = InMemoryQueue()
+        self.models = FakeStatementModels({"ramesh": "Groceries", "bakery": "Food & Dining"})
+
+    def service(self, models=None, **kwargs):
+        parser = make_parser(models or self.models, categorizer=Categorizer())
+        return StatementImportService(ExpensesService(self.repo, events=self.events), parser, Categorizer(), **kwargs)
+
+    async def test_import_saves_debits_and_asks_the_model_once_per_payee(self):
+        summary = await self.service(batch_size=2).import_rows("u1", statement_rows(io.BytesIO(HDFC_CSV)))
+        self.assertEqual(
+            (summary.rowsRead, summary.imported, summary.creditsSkipped, summary.failed, summary.modelCalls),
+            (6, 4, 1, 1, 1),
+        )
+        self.assertEqual((summary.categorizedByModel, summary.uncategorized), (2, 0))
+        self.assertEqual([(e.row, e.detail) for e in summary.errors], [(10, "unreadable date")])
+        self.assertEqual(len(self.models.prompts), 1)
+        # Reference numbers never reach the model
+        self.assertNotIn("412345678902", self.models.prompts[0])
+
+        saved, _ = await self.repo.search("u1", limit=10)
+        self.assertEqual(sorted(e.category for e in saved), ["Food & Dining", "Groceries", "Groceries", "Transport"])
+        # One expenses-changed event per saved batch, for the rollups
+        self.assertEqual(len(await self.events.receive(max_messages=10)), 3)
+
+    async def test_model_prompts_are_batched_and_capped(self):
+        rows = [["Date", "Description", "Amount"]] + [
+            ["2024-06-01", f"UPI/DR/9{i:011d}/PAYEE{chr(65 + i)} STORE/Paid", "10"] for i in range(5)
+        ]
+        summary = await self.service(max_model_lookups=3, model_batch_size=2).import_rows("u1", rows)
+        self.assertEqual((summary.imported, summary.modelCalls, len(self.models.prompts)), (5, 2, 2))
+        self.assertEqual(summary.uncategorized, 5)
+
+    async def test_model_failure_leaves_rows_as_misc(self):
+        summary = await self.service(FakeStatementModels({}, fail=True)).import_rows(
+            "u1", statement_rows(io.BytesIO(HDFC_CSV))
+        )
+        self.assertEqual((summary.imported, summary.categorizedByModel, summary.uncategorized), (4, 0, 2))
+
+
+class TestStatementRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = ExpensesRepo()
+        parser = make_parser(FakeStatementModels({"ramesh": "Groceries"}), categorizer=Categorizer())
+        service = StatementImportService(ExpensesService(self.repo), parser, Categorizer())
+        app = FastAPI()
+        app.include_router(ingestion.router, prefix="/ingestion")
+        app.dependency_overrides[get_statement_import_service] = lambda: service
+        app.dependency_overrides[get_current_user] = lambda: {"sub": "u1"}
+        self.client = TestClient(app)
+
+    def test_import_statement(self):
+        response = self.client.post("/ingestion/statements", files={"file": ("april.csv", HDFC_CSV, "text/csv")})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["imported"], 4)
+        self.assertEqual(len(self.repo.columns("u1")), 4)
+
+    def test_rejects_unreadable_statements(self):
+        no_header = self.client.post("/ingestion/statements", files={"file": ("x.csv", b"a,b\n1,2\n", "text/csv")})
+        self.assertEqual(no_header.status_code, 422)
+        xls = self.client.post("/ingestion/statements", files={"file": ("x.xls", b"\xd0\xcf\x11\xe0" + bytes(64), "application/vnd.ms-excel")})
+        self.assertEqual(xls.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
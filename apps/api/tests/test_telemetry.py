@@ -0,0 +1,144 @@
+import io
+import json
+import logging
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.core.logging import JsonFormatter
+from app.core.telemetry import (
+    CONFIDENCE, MODEL_SECONDS, PAYLOAD_BYTES, Registry, RequestTelemetryMiddleware, STAGE_SECONDS,
+)
+from app.modules.ai_expense_parser.router import router as ai_router
+from app.modules.ai_expense_parser.service import get_parser_service
+from tests.fakes import FakeModels, make_parser
+
+MODEL = "telemetry-test-model"
+MODEL_JSON = '{"title": "Cafe", "category": "Food & Dining", "paymentMethod": "UPI", "amount": 250}'
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+PARSE_STAGES = {
+    "upload_read", "prompt", "cache_lookup", "fast_path", "preprocess",
+    "model_call", "extract_json", "normalize", "validate",
+}
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_renders_prometheus_text(self):
+        registry = Registry()
+        counter = registry.counter("jobs_total", "Jobs.", ("queue",))
+        histogram = registry.histogram("size_bytes", "Sizes.", buckets=(10, 100))
+        registry.callback("depth", "gauge", "Depth.", lambda: [({"queue": 'a"b'}, 3)])
+
+        counter.inc("default")
+        counter.inc("default", amount=2)
+        for value in (5, 50, 500):
+            histogram.observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE jobs_total counter", lines)
+        self.assertIn('jobs_total{queue="default"} 3', lines)
+        self.assertIn('size_bytes_bucket{le="10"} 1', lines)
+        self.assertIn('size_bytes_bucket{le="100"} 2', lines)
+        self.assertIn('size_bytes_bucket{le="+Inf"} 3', lines)
+        self.assertIn("size_bytes_sum 555", lines)
+        self.assertIn('depth{queue="a\\"b"} 3', lines)
+
+        with self.assertRaises(ValueError):
+            registry.counter("jobs_total", "Again.")
+
+
+class TestJsonLogging(unittest.TestCase):
+
+    def test_extra_fields_and_exception(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        log = logging.getLogger("test.json")
+        log.addHandler(handler)
+        log.propagate = False
+        self.addCleanup(log.removeHandler, handler)
+
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            log.exception("parse failed for %s", "receipt", extra={"kind": "image"})
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry["level"], entry["msg"], entry["kind"]), ("ERROR", "parse failed for receipt", "image"))
+        self.assertIn("RuntimeError: boom", entry["exc"])
+
+
+class TestParseInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(ai_router, prefix="/ai")
+        app.add_middleware(RequestTelemetryMiddleware)
+        service = make_parser(FakeModels(MODEL_JSON), model=MODEL)
+        app.dependency_overrides[get_parser_service] = lambda: service
+        self.client = TestClient(app)
+
+    def upload(self):
+        with self.assertLogs("app.request", level="INFO") as logs:
+            response = self.client.post("/ai/parse-image", files={"file": ("r.jpg", io.BytesIO(JPEG), "image/jpeg")})
+        self.assertEqual(response.status_code, 200)
+        (record,) = logs.records
+        return record
+
+    def test_request_log_has_every_stage(self):
+        model_calls = MODEL_SECONDS.count(MODEL, "ok")
+        payloads = PAYLOAD_BYTES.count("image")
+        confidences = CONFIDENCE.count("receipt")
+
+        record = self.upload()
+        self.assertEqual(record.status, 200)
+        self.assertEqual(set(record.stagesMs), PARSE_STAGES)
+        self.assertLessEqual(sum(record.stagesMs.values()), record.durationMs)
+        self.assertEqual(MODEL_SECONDS.count(MODEL, "ok"), model_calls + 1)
+        self.assertEqual(PAYLOAD_BYTES.count("image"), payloads + 1)
+        self.assertEqual(CONFIDENCE.count("receipt"), confidences + 1)
+
+        # The repeat is a cache hit and never reaches the model stages
+        record = self.upload()
+        self.assertEqual(set(record.stagesMs), {"upload_read", "prompt", "cache_lookup"})
+        self.assertEqual(MODEL_SECONDS.count(MODEL, "ok"), model_calls + 1)
+
+    def test_stage_histogram_counts(self):
+        before = STAGE_SECONDS.count("extract_json")
+        self.upload()
+        self.assertEqual(STAGE_SECONDS.count("extract_json"), before + 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_scrape(self):
+        from app.main import app
+
+        response = TestClient(app).get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        for name in ("expense_parse_stage_seconds", "expense_parse_cache_lookups_total", "screenshot_fast_path_requests_total"):
+            self.assertIn(f"# TYPE {name} ", response.text)
+
+
+class TestRouteLabels(unittest.TestCase):
+
+    def test_labels_are_full_path_templates(self):
+        from app.main import app
+
+        client = TestClient(app)
+        paths = ["/api/v1/expenses", "/api/v1/budgets", "/api/v1/anomalies", "/api/v1/expenses/abc", "/nope"]
+        with self.assertLogs("app.request", level="INFO") as logs:
+            for path in paths:
+                client.get(path)
+        self.assertEqual([record.route for record in logs.records], [
+            "/api/v1/expenses", "/api/v1/budgets", "/api/v1/anomalies", "/api/v1/expenses/{expense_id}", "unmatched",
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import json
+import unittest
+
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_cognito import FakeUserPool  # noqa: F401 (defaults the settings env)
+
+from app.core.middleware import UploadSizeLimitMiddleware, add_upload_limits
+from app.core.rate_limit import RateLimitMiddleware
+from app.modules.ai_expense_parser.router import router as ai_router
+from app.modules.ai_expense_parser.schemas import ExpenseAIResult, ExpenseDetails
+from app.modules.ai_expense_parser.service import get_parser_service
+from app.modules.ai_expense_parser.uploads import IMAGE_MIME_TYPES, MAX_STATEMENT_BYTES, read_upload, sniff_mime
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+
+class RecordingService:
+    def __init__(self):
+        self.calls = []
+
+    async def parse_image(self, file_bytes, mime_type, now_iso, timezone, user_id=None):
+        self.calls.append((len(file_bytes), mime_type))
+        return ExpenseAIResult(
+            expense=ExpenseDetails(title="t", category="Misc", paymentMethod="Cash", amount=1.0),
+            confidence=0.5,
+        )
+
+    parse_audio = parse_image
+
+    def parse_image_batch(self, items, now_iso, timezone, user_id=None):
+        async def results():
+            for i, (data, mime_type) in enumerate(items):
+                yield i, await self.parse_image(data, mime_type, now_iso, timezone)
+        return results()
+
+
+def make_client(image_limit=1024, audio_limit=2048):
+    app = FastAPI()
+    add_upload_limits(app, {"/ai/parse-image": image_limit, "/ai/parse-audio": audio_limit})
+    app.include_router(ai_router, prefix="/ai")
+    service = RecordingService()
+    app.dependency_overrides[get_parser_service] = lambda: service
+    return TestClient(app), service
+
+
+class TestSniffMime(unittest.TestCase):
+
+    def test_known_signatures(self):
+        self.assertEqual(sniff_mime(JPEG), "image/jpeg")
+        self.assertEqual(sniff_mime(b"\x89PNG\r\n\x1a\n...."), "image/png")
+        self.assertEqual(sniff_mime(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "image/webp")
+        self.assertEqual(sniff_mime(b"\x00\x00\x00\x18ftypheic"), "image/heic")
+        self.assertEqual(sniff_mime(b"\x1a\x45\xdf\xa3\x9f"), "audio/webm")
+        self.assertEqual(sniff_mime(b"OggS\x00\x02"), "audio/ogg")
+        self.assertEqual(sniff_mime(b"\x00\x00\x00\x20ftypM4A "), "audio/mp4")
+        self.assertEqual(sniff_mime(b"RIFF\x00\x00\x00\x00WAVEfmt "), "audio/wav")
+        self.assertEqual(sniff_mime(b"ID3\x04"), "audio/mpeg")
+        self.assertEqual(sniff_mime(b"\xff\xf1\x50"), "audio/aac")
+
+    def test_unknown(self):
+        self.assertIsNone(sniff_mime(b"%PDF-1.7"))
+        self.assertIsNone(sniff_mime(b""))
+
+
+class TestUploadLimits(unittest.TestCase):
+
+    def test_sniffed_type_is_used_instead_of_declared(self):
+        client, service = make_client()
+        resp = client.post("/ai/parse-image", files={"file": ("r.png", JPEG, "image/png")})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(service.calls, [(len(JPEG), "image/jpeg")])
+
+    def test_octet_stream_audio_accepted_by_magic(self):
+        client, service = make_client()
+        resp = client.post("/ai/parse-audio", files={"file": ("a", b"OggS" + b"\x00" * 100, "application/octet-stream")})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(service.calls[0][1], "audio/ogg")
+
+    def test_invalid_type_rejected(self):
+        client, service = make_client()
+        resp = client.post("/ai/parse-image", files={"file": ("r.jpg", b"%PDF-1.7 not an image", "image/jpeg")})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(service.calls, [])
+
+    def test_batch_rejects_bad_file_without_failing_batch(self):
+        client, service = make_client()
+        resp = client.post("/ai/parse-image/batch", files=[
+            ("files", ("a.jpg", JPEG, "image/jpeg")),
+            ("files", ("b.pdf", b"%PDF-1.7", "application/pdf")),
+            ("files", ("c.jpg", JPEG, "image/jpeg")),
+        ])
+        self.assertEqual(resp.status_code, 200)
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+
+        by_index = {line["index"]: line for line in lines if "index" in line}
+        self.assertEqual(by_index[1]["status"], 400)
+        self.assertEqual((by_index[0]["status"], by_index[2]["filename"]), (200, "c.jpg"))
+        self.assertEqual(lines[-1]["summary"]["failed"], 1)
+        self.assertEqual(len(service.calls), 2)
+
+    def test_oversize_file_rejected(self):
+        data = JPEG + b"\x00" * 2048
+        for size in (len(data), None):
+            upload = UploadFile(io.BytesIO(data), size=size)
+            with self.assertRaises(HTTPException) as ctx:
+                asyncio.run(read_upload(upload, 1024, IMAGE_MIME_TYPES, "bad"))
+            self.assertEqual(ctx.exception.status_code, 413)
+
+    def test_declared_content_length_rejected_before_body(self):
+        client, service = make_client(image_limit=1024)
+        body = b"x" * (2 * 1024 * 1024)
+        resp = client.post(
+            "/ai/parse-image",
+            content=body,
+            headers={"Content-Type": "multipart/form-data; boundary=b"},
+        )
+        self.assertEqual(resp.status_code, 413)
+        self.assertEqual(service.calls, [])
+
+    def test_chunked_body_cut_off_at_limit(self):
+        client, service = make_client(image_limit=1024)
+
+        def chunks():
+            for _ in range(64):
+                yield b"x" * 65536
+
+        resp = client.post(
+            "/ai/parse-image",
+            content=chunks(),
+            headers={"Content-Type": "multipart/form-data; boundary=b"},
+        )
+        self.assertEqual(resp.status_code, 413)
+
+    def test_oversize_rejection_carries_cors_headers(self):
+        from app.main import app
+
+        resp = TestClient(app).post(
+            "/api/ai/expense/parse-image",
+            content=b"x" * (32 * 1024 * 1024),
+            headers={"Content-Type": "multipart/form-data; boundary=b", "Origin": "http://localhost:5173"},
+        )
+        self.assertEqual(resp.status_code, 413)
+        self.assertEqual(resp.headers["access-control-allow-origin"], "http://localhost:5173")
+
+    def test_every_upload_route_is_capped_and_rate_limited(self):
+        from app.main import app
+
+        config = {m.cls: m.kwargs for m in app.user_middleware}
+        uploads = {
+            path for path, operations in app.openapi()["paths"].items() for operation in operations.values()
+            if "multipart/form-data" in operation.get("requestBody", {}).get("content", {})
+        }
+        self.assertIn("/api/v1/ingestion/statements", uploads)
+        self.assertLessEqual(uploads, set(config[UploadSizeLimitMiddleware]["limits"]))
+        self.assertLessEqual(uploads, set(config[RateLimitMiddleware]["costs"]))
+        self.assertEqual(config[UploadSizeLimitMiddleware]["limits"]["/api/v1/ingestion/statements"], MAX_STATEMENT_BYTES)
+
+
+if __name__ == '__main__':
+    unittest.main()